@@ -0,0 +1,92 @@
+"""
+Measures the evidence per second that go through the serialization path
+of the evidence pipeline: serialized by the db in set_evidence(), then
+deserialized by the evidence handler, serialized again for the
+report_to_peers channel, and deserialized by p2ptrust.
+Compares utils.to_dict() and dict_to_evidence(), used before, vs.
+evidence_to_dict() and trusted_dict_to_evidence().
+
+usage: python3 -m benchmarks.evidence_serialization [--evidence N]
+"""
+
+import argparse
+import json
+import time
+
+from slips_files.common.slips_utils import utils
+from slips_files.core.structures.evidence import (
+    Attacker,
+    Direction,
+    Evidence,
+    EvidenceType,
+    IoCType,
+    ProfileID,
+    Proto,
+    ThreatLevel,
+    TimeWindow,
+    Victim,
+    dict_to_evidence,
+    evidence_to_dict,
+    trusted_dict_to_evidence,
+)
+
+
+def get_evidence(n: int) -> list:
+    evidence = []
+    for i in range(n):
+        attacker_ip = f"10.0.{i // 256 % 256}.{i % 256}"
+        evidence.append(
+            Evidence(
+                evidence_type=EvidenceType.CONNECTION_TO_PRIVATE_IP,
+                description=f"Connecting to private IP: 192.168.1.{i % 256}",
+                attacker=Attacker(
+                    direction=Direction.SRC,
+                    attacker_type=IoCType.IP,
+                    value=attacker_ip,
+                ),
+                victim=Victim(
+                    direction=Direction.DST,
+                    victim_type=IoCType.IP,
+                    value=f"192.168.1.{i % 256}",
+                ),
+                threat_level=ThreatLevel.INFO,
+                profile=ProfileID(ip=attacker_ip),
+                timewindow=TimeWindow(number=1),
+                uid=[f"CrD2Kk2ooMGA8KT2J{i}"],
+                timestamp="2023/10/26 10:10:10.000000+0000",
+                proto=Proto.TCP,
+                dst_port=443,
+                confidence=0.8,
+            )
+        )
+    return evidence
+
+
+def pipeline(evidence: list, to_dict, from_dict) -> float:
+    """returns the evidence per second"""
+    start = time.process_time()
+    for e in evidence:
+        # set_evidence()
+        msg = json.dumps(to_dict(e))
+        # EvidenceHandler.main()
+        e = from_dict(json.loads(msg))
+        msg = json.dumps(to_dict(e))
+        # p2ptrust
+        from_dict(json.loads(msg))
+    return len(evidence) / (time.process_time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--evidence", type=int, default=20000)
+    args = parser.parse_args()
+
+    evidence = get_evidence(args.evidence)
+    before = pipeline(evidence, utils.to_dict, dict_to_evidence)
+    after = pipeline(evidence, evidence_to_dict, trusted_dict_to_evidence)
+    print(f"before: {before:,.0f} evidence/s")
+    print(f"after:  {after:,.0f} evidence/s")
+
+
+if __name__ == "__main__":
+    main()
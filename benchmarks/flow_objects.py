@@ -0,0 +1,217 @@
+"""
+Compares the memory and CPU time used by the zeek flow objects the way
+they were before being slotted, with a __dict__ per flow, the derived
+conn fields computed for every flow and asdict() called every time
+the flow is published or stored, vs. now.
+
+usage: python3 -m benchmarks.flow_objects [--flows N] [--serializations N]
+"""
+
+import argparse
+import time
+import tracemalloc
+from dataclasses import (
+    MISSING,
+    asdict,
+    field,
+    fields,
+    make_dataclass,
+)
+from datetime import timedelta
+from typing import (
+    Callable,
+    Dict,
+    List,
+)
+
+from slips_files.common.slips_utils import utils
+from slips_files.core.flows.zeek import (
+    Conn,
+    DNS,
+    HTTP,
+    SSL,
+)
+
+SAMPLES = {
+    Conn: {
+        "starttime": "1726249372.312124",
+        "uid": "CbqlAh3BSJiXrAbWW3",
+        "saddr": "192.168.1.129",
+        "daddr": "142.250.185.78",
+        "dur": "1.032",
+        "proto": "tcp",
+        "appproto": "ssl",
+        "sport": "49712",
+        "dport": "443",
+        "spkts": 12,
+        "dpkts": 10,
+        "sbytes": 1435,
+        "dbytes": 5421,
+        "smac": "",
+        "dmac": "",
+        "state": "SF",
+        "history": "ShADadFf",
+    },
+    DNS: {
+        "starttime": "1726249372.312124",
+        "uid": "CbqlAh3BSJiXrAbWW3",
+        "saddr": "192.168.1.129",
+        "daddr": "192.168.1.1",
+        "query": "www.example.com",
+        "qclass_name": "C_INTERNET",
+        "qtype_name": "A",
+        "rcode_name": "NOERROR",
+        "answers": ["93.184.215.14"],
+        "TTLs": "3600",
+    },
+    HTTP: {
+        "starttime": "1726249372.312124",
+        "uid": "CbqlAh3BSJiXrAbWW3",
+        "saddr": "192.168.1.129",
+        "daddr": "93.184.215.14",
+        "method": "GET",
+        "host": "www.example.com",
+        "uri": "/index.html",
+        "version": "1.1",
+        "user_agent": "Mozilla/5.0 (X11; Linux x86_64)",
+        "request_body_len": 0,
+        "response_body_len": 1256,
+        "status_code": "200",
+        "status_msg": "OK",
+        "resp_mime_types": "text/html",
+        "resp_fuids": "FnKj3f2Vj1cMKW5Hwe",
+    },
+    SSL: {
+        "starttime": "1726249372.312124",
+        "uid": "CbqlAh3BSJiXrAbWW3",
+        "saddr": "192.168.1.129",
+        "daddr": "142.250.185.78",
+        "version": "TLSv13",
+        "sport": "49712",
+        "dport": "443",
+        "cipher": "TLS_AES_128_GCM_SHA256",
+        "resumed": "F",
+        "established": "T",
+        "cert_chain_fuids": "",
+        "client_cert_chain_fuids": "",
+        "subject": "CN=*.google.com",
+        "issuer": "CN=GTS CA 1C3,O=Google Trust Services LLC,C=US",
+        "validation_status": "ok",
+        "curve": "x25519",
+        "server_name": "www.google.com",
+        "ja3": "773906b0efdefa24a7f2b8eb6985bf37",
+        "ja3s": "eb1d94daa7e0344597e756a1fb6e7054",
+        "is_DoH": "False",
+    },
+}
+
+
+def conn_post_init(self) -> None:
+    """how Conn.__post_init__() used to compute the derived fields"""
+    endtime = str(self.starttime) + str(timedelta(seconds=float(self.dur)))
+    self.endtime = endtime
+    self.pkts = self.spkts + self.dpkts
+    self.bytes = self.sbytes + self.dbytes
+    self.state_hist = self.history or self.state
+    self.aid = utils.get_aid(self)
+
+
+def get_old_class(flow_class):
+    """returns the given flow class the way it was before being slotted"""
+    post_init = {
+        Conn: conn_post_init,
+        DNS: DNS.__post_init__,
+    }.get(flow_class)
+    namespace = {"__post_init__": post_init} if post_init else {}
+    old_fields = []
+    for flow_field in fields(flow_class):
+        if flow_field.default is MISSING:
+            old_fields.append((flow_field.name, flow_field.type))
+        else:
+            old_fields.append(
+                (
+                    flow_field.name,
+                    flow_field.type,
+                    field(default=flow_field.default),
+                )
+            )
+    return make_dataclass(flow_class.__name__, old_fields, namespace=namespace)
+
+
+def create_flows(flow_class, sample: dict, flows: int) -> List:
+    return [
+        flow_class(**{**sample, "uid": f"{sample['uid']}{i}"})
+        for i in range(flows)
+    ]
+
+
+def measure_creation(flow_class, sample: dict, flows: int) -> float:
+    """returns the CPU microseconds spent creating each flow"""
+    start = time.process_time()
+    create_flows(flow_class, sample, flows)
+    return (time.process_time() - start) / flows * 1e6
+
+
+def measure_memory(flow_class, sample: dict, flows: int) -> float:
+    """returns the bytes allocated per flow"""
+    tracemalloc.start()
+    created = create_flows(flow_class, sample, flows)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del created
+    return allocated / flows
+
+
+def measure_serialization(
+    serialize: Callable, flows: List, serializations: int
+) -> float:
+    """
+    returns the CPU microseconds spent serializing each flow the given
+    number of times, the way the publishers and the db do it
+    """
+    start = time.process_time()
+    for flow in flows:
+        for _ in range(serializations):
+            serialize(flow)
+    return (time.process_time() - start) / len(flows) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flows", type=int, default=20000)
+    parser.add_argument(
+        "--serializations",
+        type=int,
+        default=3,
+        help="times each flow is serialized, e.g. add_flow(), "
+        "new_flow and new_letters for conn flows",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'flow':<8}{'':<8}{'bytes/flow':>12}"
+        f"{'create (us)':>14}{'serialize (us)':>16}"
+    )
+    for flow_class, sample in SAMPLES.items():
+        old_class = get_old_class(flow_class)
+        results: Dict[str, tuple] = {}
+        for label, cls, serialize in (
+            ("before", old_class, asdict),
+            ("after", flow_class, utils.flow_to_dict),
+        ):
+            flows = create_flows(cls, sample, args.flows)
+            results[label] = (
+                measure_memory(cls, sample, args.flows),
+                measure_creation(cls, sample, args.flows),
+                measure_serialization(serialize, flows, args.serializations),
+            )
+
+        for label, (memory, creation, serialization) in results.items():
+            print(
+                f"{flow_class.__name__:<8}{label:<8}{memory:>12.0f}"
+                f"{creation:>14.2f}{serialization:>16.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Replays the pcaps and zeek dirs in dataset/ through slips, input ->
+profiler -> modules, against a local redis-server, and reports per
+dataset:
+- the flows/s of the profiler and of the whole run
+- the msgs/s, latency and handler time of each module, as reported by
+  the redis bus telemetry
+- the peak memory of each slips process
+- the number of profiles, evidence and alerts detected
+
+The results are written as json so runs before and after a change can
+be compared.
+The msgs received by the modules are flushed to redis every few seconds
+so their msgs/s are only meaningful for datasets that take longer than
+that.
+
+usage: python3 -m benchmarks.ingestion [--dataset PATH ...] [--port P]
+                                       [--output FILE]
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import redis
+
+from slips_files.core.helpers import bus_telemetry
+
+SLIPS = "./slips.py"
+DATASET_DIR = "dataset"
+
+
+def get_datasets() -> List[str]:
+    """returns the pcaps and zeek dirs in dataset/"""
+    pcaps = glob.glob(os.path.join(DATASET_DIR, "*.pcap"))
+    zeek_dirs = [
+        os.path.dirname(conn_log)
+        for conn_log in glob.glob(os.path.join(DATASET_DIR, "*", "conn.log"))
+    ]
+    return sorted(pcaps + zeek_dirs)
+
+
+def get_peak_rss_mb(pid: int) -> Optional[float]:
+    """
+    returns the max RSS the given process had since it started, None if
+    it's not running
+    """
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                # VmHWM:    123456 kB
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        pass
+    return None
+
+
+def get_rate(samples: List[Tuple[float, int]]) -> float:
+    """
+    returns the items/s of the given (time, total items so far) samples,
+    over the time the total was increasing
+    """
+    total = samples[-1][1] if samples else 0
+    if not total:
+        return 0
+    # from the last sample before the first item to the first sample
+    # with the total
+    if samples[0][1]:
+        start = samples[0][0]
+    else:
+        start = max(t for t, items in samples if items == 0)
+    end = min(t for t, items in samples if items == total)
+    return total / max(end - start, 1e-3)
+
+
+class Run:
+    """runs slips on 1 dataset and samples its redis db while it runs"""
+
+    def __init__(
+        self,
+        dataset: str,
+        port: int,
+        output_dir: str,
+        poll_interval: float,
+    ):
+        self.dataset = dataset
+        self.port = port
+        self.output_dir = output_dir
+        self.poll_interval = poll_interval
+        self.r = redis.StrictRedis(
+            port=port, db=0, charset="utf-8", decode_responses=True
+        )
+        # [(time, flows processed by the profiler so far)]
+        self.profiler_samples: List[Tuple[float, int]] = []
+        # {module: [(time, msgs received so far)]}
+        self.module_samples: Dict[str, List[Tuple[float, int]]] = {}
+        # {process name: peak rss in MB}
+        self.peak_rss_mb: Dict[str, float] = {}
+
+    def sample(self, now: float):
+        with contextlib.suppress(redis.exceptions.ConnectionError):
+            processed = self.r.get("processed_flows_so_far")
+            self.profiler_samples.append((now, int(processed or 0)))
+
+            for key in self.r.scan_iter(
+                match=bus_telemetry.RECEIVED_KEY.format(module="*")
+            ):
+                module = key[
+                    : -len(bus_telemetry.RECEIVED_KEY.format(module=""))
+                ]
+                received = sum(map(int, self.r.hvals(key)))
+                self.module_samples.setdefault(module, []).append(
+                    (now, received)
+                )
+
+            for process, pid in self.r.hgetall("PIDs").items():
+                if (rss := get_peak_rss_mb(int(pid))) is not None:
+                    self.peak_rss_mb[process] = max(
+                        rss, self.peak_rss_mb.get(process, 0)
+                    )
+
+    def get_detections(self) -> dict:
+        evidence_types = Counter()
+        # other keys end with _evidence too, e.g. processed_evidence
+        for key in self.r.scan_iter(match="profile_*_timewindow*_evidence"):
+            for evidence in self.r.hvals(key):
+                evidence_types[json.loads(evidence)["evidence_type"]] += 1
+        return {
+            "profiles": self.r.scard("profiles"),
+            "evidence": int(self.r.get("number_of_evidence") or 0),
+            "alerts": int(self.r.get("number_of_alerts") or 0),
+            "evidence_types": dict(sorted(evidence_types.items())),
+        }
+
+    def get_modules(self) -> Dict[str, dict]:
+        modules = {}
+        for row in bus_telemetry.get_bus_telemetry(self.r):
+            samples = self.module_samples.get(row["module"], [])
+            module = modules.setdefault(
+                row["module"],
+                {
+                    "msgs_received": 0,
+                    "msgs_per_second": round(get_rate(samples), 2),
+                    "channels": {},
+                },
+            )
+            module["msgs_received"] += row["received"]
+            module["channels"][row["channel"]] = {
+                key: value
+                for key, value in row.items()
+                if key not in ("module", "channel")
+            }
+        return modules
+
+    def shutdown_redis(self):
+        """shuts down the redis server slips started on the used port"""
+        with contextlib.suppress(redis.exceptions.ConnectionError):
+            self.r.shutdown(nosave=True)
+
+    def run(self) -> dict:
+        cmd = [
+            sys.executable,
+            SLIPS,
+            "-e",
+            "1",
+            # keeps the db after slips stops
+            "-t",
+            "-o",
+            self.output_dir,
+            "-P",
+            str(self.port),
+            "-f",
+            self.dataset,
+        ]
+        start = time.time()
+        with open(os.path.join(self.output_dir, "slips_output.txt"), "w") as f:
+            slips = subprocess.Popen(cmd, stdout=f, stderr=subprocess.STDOUT)
+            while slips.poll() is None:
+                self.sample(time.time())
+                time.sleep(self.poll_interval)
+        wall_time = time.time() - start
+        self.sample(time.time())
+
+        flows = self.profiler_samples[-1][1] if self.profiler_samples else 0
+        result = {
+            "dataset": self.dataset,
+            "exit_code": slips.returncode,
+            "wall_time_seconds": round(wall_time, 2),
+            "stages": {
+                "profiler": {
+                    "flows": flows,
+                    "flows_per_second": round(
+                        get_rate(self.profiler_samples), 2
+                    ),
+                },
+                "end_to_end": {
+                    "flows": flows,
+                    "flows_per_second": round(flows / wall_time, 2),
+                },
+            },
+            "modules": self.get_modules(),
+            "peak_rss_mb": {
+                process: round(rss, 1)
+                for process, rss in sorted(self.peak_rss_mb.items())
+            },
+            "detections": self.get_detections(),
+        }
+        self.shutdown_redis()
+        return result
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--dataset",
+        action="append",
+        help="the pcap, zeek dir or flows file to replay, can be given "
+        "more than once. default: all pcaps and zeek dirs in dataset/",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=6390,
+        help="the redis port slips uses, the redis server on this port "
+        "is shutdown after each run",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.5,
+        help="seconds between 2 samples of the db and memory",
+    )
+    parser.add_argument(
+        "--output",
+        help="the json file to write the results to. default: stdout",
+    )
+    args = parser.parse_args()
+
+    runs = []
+    for dataset in args.dataset or get_datasets():
+        print(f"Replaying {dataset} ...", file=sys.stderr)
+        output_dir = tempfile.mkdtemp(prefix="slips_benchmark_")
+        try:
+            runs.append(
+                Run(dataset, args.port, output_dir, args.poll_interval).run()
+            )
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    results = json.dumps(
+        {
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "time": time.time(),
+            "runs": runs,
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(results)
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
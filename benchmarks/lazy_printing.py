@@ -0,0 +1,144 @@
+"""
+Compares the CPU time spent per flow on the verbose=3 msgs of the
+profiler hot paths (ProfileHandler.add_tuple, SymbolHandler.compute,
+Profiler.main) when building them eagerly, the way they were built
+before Printer.lazy_print(), vs. lazily.
+
+usage: python3 -m benchmarks.lazy_printing [--flows N] [--tuples N]
+"""
+
+import argparse
+import time
+
+from slips_files.common.printer import Printer
+from slips_files.core.output import Output
+
+
+def eager_print(printer: Printer, text: str, verbose=1, debug=0):
+    """how Printer.print() used to handle every msg"""
+    printer.notify_observers(
+        {
+            "from": printer.name,
+            "txt": text,
+            "verbose": verbose,
+            "debug": debug,
+            "log_to_logfiles_only": False,
+            "end": "\n",
+        }
+    )
+
+
+def eager_flow(printer: Printer, line: dict, prev_symbols: dict):
+    profileid, twid, tupleid = "profile_10.0.0.1", "timewindow1", "t-80-tcp"
+    eager_print(printer, f"< Received Line: {line}", 2)
+    eager_print(printer, f"Storing data in the profile: {profileid}", 3)
+    eager_print(
+        printer,
+        f"Starting compute symbol. Profileid: {profileid}, "
+        f"Tupleid {tupleid}, time:{twid} ({type(twid)}), "
+        f"dur:{line['dur']}, size:{line['bytes']}",
+        3,
+    )
+    eager_print(
+        printer,
+        f"Compute Periodicity: Profileid: {profileid}, Tuple: {tupleid}, "
+        f"T1=1.0, T2=2.0, TD=1",
+        3,
+    )
+    eager_print(
+        printer,
+        f"Profileid: {profileid}, Tuple: {tupleid}, Periodicity: 1, "
+        f"Duration: 1, Size: 1, Letter: a. TimeChar: .",
+        3,
+    )
+    eager_print(
+        printer,
+        f"Not the first time for tuple {tupleid} as an OutTuples for "
+        f"{profileid} in TW {twid}. Add the symbol: a. "
+        f"Store previous_times: (1.0, 2.0). "
+        f"Prev Data: {prev_symbols}",
+        3,
+    )
+    eager_print(printer, f"\tLetters so far for tuple {tupleid}: 99a", 3)
+
+
+def lazy_flow(printer: Printer, line: dict, prev_symbols: dict):
+    profileid, twid, tupleid = "profile_10.0.0.1", "timewindow1", "t-80-tcp"
+    printer.lazy_print("< Received Line: %s", line, verbose=2)
+    printer.lazy_print("Storing data in the profile: %s", profileid, verbose=3)
+    printer.lazy_print(
+        lambda: f"Starting compute symbol. Profileid: {profileid}, "
+        f"Tupleid {tupleid}, time:{twid} ({type(twid)}), "
+        f"dur:{line['dur']}, size:{line['bytes']}",
+        verbose=3,
+    )
+    printer.lazy_print(
+        "Compute Periodicity: Profileid: %s, Tuple: %s, T1=%s, T2=%s, TD=%s",
+        profileid,
+        tupleid,
+        1.0,
+        2.0,
+        1,
+        verbose=3,
+    )
+    printer.lazy_print(
+        lambda: f"Profileid: {profileid}, Tuple: {tupleid}, "
+        f"Periodicity: 1, Duration: 1, Size: 1, Letter: a. TimeChar: .",
+        verbose=3,
+    )
+    printer.lazy_print(
+        lambda: f"Not the first time for tuple {tupleid} as an OutTuples "
+        f"for {profileid} in TW {twid}. Add the symbol: a. "
+        f"Store previous_times: (1.0, 2.0). "
+        f"Prev Data: {prev_symbols}",
+        verbose=3,
+    )
+    printer.lazy_print(
+        "\tLetters so far for tuple %s: %s", tupleid, "99a", verbose=3
+    )
+
+
+def measure(func, printer, line, prev_symbols, flows: int) -> float:
+    """returns the CPU microseconds spent per flow"""
+    start = time.process_time()
+    for _ in range(flows):
+        func(printer, line, prev_symbols)
+    return (time.process_time() - start) / flows * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flows", type=int, default=20000)
+    parser.add_argument(
+        "--tuples",
+        type=int,
+        default=100,
+        help="number of tuples in the prev_symbols of the profile",
+    )
+    args = parser.parse_args()
+
+    # default verbosity. stop_daemon skips creating the log files
+    logger = Output(verbose=1, debug=0, stop_daemon=True)
+    printer = Printer(logger, "Benchmark")
+    line = {
+        "ts": 1601998398.945854,
+        "uid": "CrD2Kk2ooMGA8KT2Jk",
+        "id.orig_h": "10.0.0.1",
+        "id.resp_h": "8.8.8.8",
+        "dur": 1.5,
+        "bytes": 1200,
+    }
+    prev_symbols = {
+        f"1.1.{i // 256}.{i % 256}-80-tcp": ("99*z*i.i*", (1.0, 2.0))
+        for i in range(args.tuples)
+    }
+
+    eager = measure(eager_flow, printer, line, prev_symbols, args.flows)
+    lazy = measure(lazy_flow, printer, line, prev_symbols, args.flows)
+    print(f"eager: {eager:.2f} us of CPU per flow")
+    print(f"lazy:  {lazy:.2f} us of CPU per flow")
+    print(f"saved: {eager - lazy:.2f} us of CPU per flow")
+
+
+if __name__ == "__main__":
+    main()
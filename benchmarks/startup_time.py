@@ -0,0 +1,102 @@
+"""
+Compares the time the main slips process spends importing its modules
+on startup, measured using python -X importtime.
+before: every module in modules/ is imported by the main process, the
+way ProcessManager.get_modules() did before the module manifests.
+after: ProcessManager.get_modules() reads the manifests, and the modules
+are imported in their own processes.
+
+usage: python3 -m benchmarks.startup_time [--top N]
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from typing import (
+    Dict,
+    List,
+    Tuple,
+)
+
+GET_PROCESS_MANAGER = (
+    "from managers.process_manager import ProcessManager\n"
+    "proc_man = object.__new__(ProcessManager)\n"
+    "proc_man.modules_to_ignore = []\n"
+)
+
+BEFORE = GET_PROCESS_MANAGER + (
+    "import importlib\n"
+    "from managers.module_manifest import get_manifests\n"
+    "for manifest in get_manifests('modules').values():\n"
+    "    try:\n"
+    "        importlib.import_module(manifest.module)\n"
+    "    except ImportError:\n"
+    "        pass\n"
+)
+
+AFTER = GET_PROCESS_MANAGER + "proc_man.get_modules()\n"
+
+# import time:  self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def get_import_times(code: str) -> Dict[str, Tuple[int, int]]:
+    """
+    runs the given code using python -X importtime
+    returns {imported package: (self us, cumulative us)}
+    """
+    stderr: str = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if match := IMPORTTIME_LINE.match(line):
+            self_us, cumulative_us, _, package = match.groups()
+            times[package] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def get_total_ms(times: Dict[str, Tuple[int, int]]) -> float:
+    return sum(self_us for self_us, _ in times.values()) / 1000
+
+
+def get_slowest(
+    times: Dict[str, Tuple[int, int]], top: int
+) -> List[Tuple[str, int]]:
+    """returns the packages with the highest cumulative import time"""
+    packages = [
+        (package, cumulative_us)
+        for package, (_, cumulative_us) in times.items()
+        # only count the top level packages
+        if "." not in package
+    ]
+    return sorted(packages, key=lambda p: p[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="number of slowest imports to print",
+    )
+    args = parser.parse_args()
+
+    for label, code in (("before", BEFORE), ("after", AFTER)):
+        times = get_import_times(code)
+        print(
+            f"{label}: {get_total_ms(times):.0f} ms importing "
+            f"{len(times)} packages"
+        )
+        for package, cumulative_us in get_slowest(times, args.top):
+            print(f"\t{package:<40}{cumulative_us / 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Compares the time UpdateManager takes to load a TI feed to redis the way
+it used to, line by line, detecting the type of every ioc on its own
+and updating the threat level of every blacklisted ip with a few round
+trips each, vs. now, in chunks of lines, with the iocs classified per
+chunk and the threat levels written in pipelines.
+Also reports the time taken to detect that a re-downloaded feed didn't
+change, instead of parsing it again.
+
+The feeds are generated, with the given number of ips, domains and ip
+ranges, and loaded to a redis-server started on the given port. The
+cache db of that server is used instead of the one of port 6379.
+
+usage: python3 -m benchmarks.ti_feeds [--iocs N] [--port P]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from multiprocessing import Event
+from typing import (
+    IO,
+    Callable,
+    Dict,
+    Optional,
+    Tuple,
+)
+
+from modules.update_manager.update_manager import UpdateManager
+from slips_files.common.slips_utils import utils
+from slips_files.core.database.redis_db.database import RedisDB
+from slips_files.core.output import Output
+
+FEED_LINK = "https://example.com/benchmark_feed.csv"
+
+
+def create_feed(path: str, iocs: int):
+    """
+    writes a feed with the given number of iocs, 80% ips, 15% domains
+    and 5% ip ranges, some of them repeated
+    """
+    with open(path, "w") as feed:
+        feed.write("# generated feed for benchmarking\n")
+        feed.write("# ioc,description\n")
+        for i in range(iocs):
+            if i % 20 == 0:
+                ioc = f"{20 + i % 200}.{i % 251}.{i % 241}.0/24"
+            elif i % 20 < 4:
+                ioc = f"malicious-{i}.example.com"
+            else:
+                ioc = f"{20 + i % 200}.{i % 251}.{i % 241}.{i % 239 + 1}"
+            feed.write(f"{ioc},seen in campaign {i % 50}\n")
+        # repeated iocs
+        for i in range(0, iocs, 10):
+            feed.write(f"{20 + i % 200}.{i % 251}.{i % 241}.{i % 239 + 1},\n")
+
+
+def is_ignored_line(update_manager: UpdateManager, line: str) -> bool:
+    """how UpdateManager.is_ignored_line() used to look for keywords"""
+    if (
+        line.startswith("#")
+        or line.startswith(";")
+        or line.isspace()
+        or len(line) < 3
+    ):
+        return True
+
+    for keyword in (
+        update_manager.header_keywords + update_manager.ignored_IoCs
+    ):
+        if keyword in line.lower():
+            return True
+    return False
+
+
+def parse_ti_feed_line_by_line(
+    update_manager: UpdateManager, feed_link: str, ti_file_path: str
+) -> bool:
+    """how UpdateManager.parse_ti_feed() used to load a feed"""
+    structure: Tuple[int] = update_manager.get_feed_structure(ti_file_path)
+    if not structure:
+        return False
+    description_col, data_col, line_fields, separator = structure
+
+    update_manager.malicious_ips_dict = {}
+    update_manager.malicious_domains_dict = {}
+    update_manager.malicious_ip_ranges = {}
+    update_manager.blacklisted_ips_threat_levels = {}
+    handlers = {
+        "domain": update_manager.extract_domain_info,
+        "ip": update_manager.extract_ip_info,
+        "ip_range": update_manager.extract_ip_range_info,
+    }
+    ti_file_name: str = ti_file_path.split("/")[-1]
+    db = update_manager.db
+    feed: IO = open(ti_file_path)
+    while line := feed.readline():
+        if is_ignored_line(update_manager, line):
+            continue
+
+        line = update_manager.normalize_line(ti_file_path, line)
+        ioc, description = update_manager.extract_ioc_from_line(
+            line,
+            line_fields,
+            separator,
+            data_col,
+            description_col,
+            ti_file_path,
+        )
+        if not update_manager.is_valid_ioc_and_description(ioc, description):
+            continue
+        data_type: Optional[str] = utils.detect_ioc_type(ioc)
+        if data_type not in handlers:
+            continue
+
+        handlers[data_type](ioc, ti_file_name, feed_link, description)
+        # the threat level of every ip used to be updated as soon as
+        # it was found
+        for (
+            profileid,
+            threat_levels,
+        ) in update_manager.blacklisted_ips_threat_levels.items():
+            for threat_level in threat_levels:
+                db.update_threat_level(profileid, threat_level, 1)
+        update_manager.blacklisted_ips_threat_levels = {}
+
+    for key, iocs in (
+        (db.rdb.constants.IOC_IPS, update_manager.malicious_ips_dict),
+        (db.rdb.constants.IOC_DOMAINS, update_manager.malicious_domains_dict),
+        (db.rdb.constants.IOC_IP_RANGES, update_manager.malicious_ip_ranges),
+    ):
+        if iocs:
+            db.rdb.rcache.hmset(key, iocs)
+    feed.close()
+    return True
+
+
+def measure(
+    update_manager: UpdateManager, parse: Callable, feed_path: str
+) -> float:
+    """returns the seconds spent loading the given feed to an empty db"""
+    update_manager.db.rdb.r.flushdb()
+    update_manager.db.rdb.rcache.flushdb()
+    start = time.perf_counter()
+    parse(FEED_LINK, feed_path)
+    return time.perf_counter() - start
+
+
+def get_stored_iocs(update_manager: UpdateManager) -> Dict[str, int]:
+    rcache = update_manager.db.rdb.rcache
+    constants = update_manager.db.rdb.constants
+    return {
+        "ips": rcache.hlen(constants.IOC_IPS),
+        "domains": rcache.hlen(constants.IOC_DOMAINS),
+        "ip ranges": rcache.hlen(constants.IOC_IP_RANGES),
+        "profiles": len(update_manager.db.rdb.r.keys("profile_*")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iocs", type=int, default=100000)
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=32850,
+        help="the redis port to use, the redis server on this port "
+        "is flushed and shut down when done",
+    )
+    args = parser.parse_args()
+
+    logger = Output(verbose=0, debug=0, stop_daemon=True)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        feed_path = os.path.join(tmp_dir, "benchmark_feed.csv")
+        create_feed(feed_path, args.iocs)
+
+        update_manager = UpdateManager(logger, tmp_dir, args.port, Event())
+        # don't touch the cache db slips uses
+        RedisDB.rcache = RedisDB._connect(args.port, 1)
+        update_manager.print = lambda *args, **kwargs: None
+        update_manager.url_feeds = {
+            FEED_LINK: {"threat_level": "medium", "tags": ["benchmark"]}
+        }
+
+        try:
+            before = measure(
+                update_manager,
+                lambda link, path: parse_ti_feed_line_by_line(
+                    update_manager, link, path
+                ),
+                feed_path,
+            )
+            stored_before = get_stored_iocs(update_manager)
+            after = measure(
+                update_manager, update_manager.parse_ti_feed, feed_path
+            )
+            stored_after = get_stored_iocs(update_manager)
+
+            start = time.perf_counter()
+            utils.get_sha256_hash(feed_path)
+            unchanged = time.perf_counter() - start
+        finally:
+            update_manager.db.rdb.rcache.flushdb()
+            update_manager.db.rdb.r.shutdown(nosave=True)
+
+    print(f"before:            {before:.2f}s {json.dumps(stored_before)}")
+    print(f"after:             {after:.2f}s {json.dumps(stored_after)}")
+    print(f"unchanged feed:    {unchanged:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
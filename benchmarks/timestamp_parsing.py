@@ -0,0 +1,74 @@
+"""
+Compares the CPU time spent converting a timestamp to a datetime obj
+using every format in SlipsUtils.time_formats, the way
+utils.convert_to_datetime() detected the format before memoizing it,
+vs. now.
+
+usage: python3 -m benchmarks.timestamp_parsing [--timestamps N]
+"""
+
+import argparse
+import datetime
+import time
+
+from slips_files.common.slips_utils import utils
+
+
+def detect_and_convert(ts):
+    """how utils.convert_to_datetime() used to convert every ts"""
+    given_format = False
+    if isinstance(ts, datetime.datetime):
+        given_format = "datetimeobj"
+    else:
+        try:
+            datetime.datetime.fromtimestamp(float(ts))
+            given_format = "unixtimestamp"
+        except ValueError:
+            for time_format in utils.time_formats:
+                try:
+                    datetime.datetime.strptime(ts, time_format)
+                    given_format = time_format
+                    break
+                except ValueError:
+                    pass
+
+    if given_format == "unixtimestamp":
+        return datetime.datetime.fromtimestamp(float(ts))
+    return datetime.datetime.strptime(ts, given_format)
+
+
+def measure(func, timestamps: list) -> float:
+    """returns the CPU microseconds spent per timestamp"""
+    start = time.process_time()
+    for ts in timestamps:
+        func(ts)
+    return (time.process_time() - start) / len(timestamps) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--timestamps", type=int, default=20000)
+    args = parser.parse_args()
+
+    start = datetime.datetime(
+        2023, 4, 6, 12, 34, 56, 789000, tzinfo=datetime.timezone.utc
+    )
+    samples = {"unixtimestamp": [str(start.timestamp() + i) for i in range(2)]}
+    for time_format in utils.time_formats:
+        samples[time_format] = [
+            (start + datetime.timedelta(seconds=i)).strftime(time_format)
+            for i in range(2)
+        ]
+
+    print(f"{'format':<28}{'before (us)':>14}{'after (us)':>14}")
+    for time_format, timestamps in samples.items():
+        # every flow of the same source has a different ts
+        # with the same format
+        timestamps = timestamps * (args.timestamps // len(timestamps))
+        before = measure(detect_and_convert, timestamps)
+        after = measure(utils.convert_to_datetime, timestamps)
+        print(f"{time_format:<28}{before:>14.2f}{after:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
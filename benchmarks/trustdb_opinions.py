@@ -0,0 +1,132 @@
+"""
+Measures the opinions per second computed by TrustDB.get_opinion_on_ip()
+on a trust db with synthetic reports.
+Compares the 1 + 3 queries per report done before, without indexes, vs.
+the single indexed query, and the single query with the opinion cache.
+
+usage: python3 -m benchmarks.trustdb_opinions [--reports N] [--ips N]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from unittest.mock import Mock
+
+from modules.p2ptrust.trust.trustdb import TrustDB
+
+INDEXES = (
+    "reports_reported_key_idx",
+    "peer_ips_peerid_idx",
+    "go_reliability_peerid_idx",
+    "slips_reputation_ipaddress_idx",
+)
+
+
+def fill(trust_db: TrustDB, reports: int, ips: int, peers: int):
+    rand = random.Random(0)
+    peer_ips = [
+        (f"192.168.{i // 256}.{i % 256}", f"peer_{i}", t)
+        for i in range(peers)
+        for t in (0, 50)
+    ]
+    trust_db.conn.executemany(
+        "INSERT INTO peer_ips (ipaddress, peerid, update_time) "
+        "VALUES (?, ?, ?);",
+        peer_ips,
+    )
+    trust_db.conn.executemany(
+        "INSERT INTO go_reliability (peerid, reliability, update_time) "
+        "VALUES (?, ?, ?);",
+        [(peerid, rand.random(), t) for _, peerid, t in peer_ips],
+    )
+    trust_db.conn.executemany(
+        "INSERT INTO slips_reputation "
+        "(ipaddress, score, confidence, update_time) VALUES (?, ?, ?, ?);",
+        [(ip, rand.random(), rand.random(), t) for ip, _, t in peer_ips],
+    )
+    trust_db.insert_new_go_data(
+        [
+            (
+                f"peer_{rand.randrange(peers)}",
+                "ip",
+                f"10.0.{i % ips // 256}.{i % ips % 256}",
+                rand.random(),
+                rand.random(),
+                rand.uniform(1, 100),
+            )
+            for i in range(reports)
+        ]
+    )
+
+
+def get_opinion_on_ip_per_report(trust_db: TrustDB, ipaddress: str):
+    """the 1 + 3 queries per report used before"""
+    reporters_scores = []
+    for (
+        reporter_peerid,
+        report_timestamp,
+        report_score,
+        report_confidence,
+        _,
+    ) in trust_db.get_reports_for_ip(ipaddress):
+        reporter_ip = trust_db.get_reporter_ip(
+            reporter_peerid, report_timestamp
+        )
+        if reporter_ip == ipaddress:
+            continue
+        reliability = trust_db.get_reporter_reliability(reporter_peerid)
+        if reliability is None:
+            continue
+        score, confidence = trust_db.get_reporter_reputation(reporter_ip)
+        if score is None or confidence is None:
+            continue
+        reporters_scores.append(
+            (report_score, report_confidence, reliability, score, confidence)
+        )
+    return reporters_scores
+
+
+def measure(get_opinion, ips: list) -> float:
+    """returns the opinions per second"""
+    start = time.perf_counter()
+    for ip in ips:
+        get_opinion(ip)
+    return len(ips) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=100000)
+    parser.add_argument("--ips", type=int, default=1000)
+    parser.add_argument("--peers", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        trust_db = TrustDB(Mock(), os.path.join(tmp_dir, "trustdb.db"))
+        trust_db.print = Mock()
+        fill(trust_db, args.reports, args.ips, args.peers)
+        # the opinions on 200 ips, each one is asked for 5 times
+        ips = [f"10.0.{i // 256}.{i % 256}" for i in range(200)] * 5
+
+        for index in INDEXES:
+            trust_db.conn.execute(f"DROP INDEX {index};")
+        before = measure(
+            lambda ip: get_opinion_on_ip_per_report(trust_db, ip), ips[:50]
+        )
+        trust_db.create_indexes()
+
+        trust_db.opinion_cache_size = 0
+        after = measure(trust_db.get_opinion_on_ip, ips)
+        trust_db.opinion_cache_size = 1000
+        cached = measure(trust_db.get_opinion_on_ip, ips)
+        trust_db.conn.close()
+
+    print(f"before:            {before:,.0f} opinions/s")
+    print(f"after:             {after:,.0f} opinions/s")
+    print(f"after with cache:  {cached:,.0f} opinions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import importlib
+import os
+import traceback
+from dataclasses import (
+    dataclass,
+    field,
+)
+from multiprocessing import (
+    Event,
+    Process,
+)
+from typing import (
+    Dict,
+    List,
+    Optional,
+)
+
+import yaml
+
+
+MANIFEST_FILE_NAME = "manifest.yaml"
+
+
+@dataclass
+class ModuleManifest:
+    """
+    The static metadata of a module, read from the manifest.yaml in
+    the module's dir without importing the module
+    """
+
+    name: str
+    description: str
+    # e.g. modules.arp.arp
+    module: str
+    # the name of the IModule class in the module
+    class_name: str
+    channels: List[str] = field(default_factory=list)
+    heavy_dependencies: List[str] = field(default_factory=list)
+
+    def load_class(self):
+        """imports the module and returns its IModule class"""
+        return getattr(importlib.import_module(self.module), self.class_name)
+
+
+def read_manifest(path: str) -> ModuleManifest:
+    with open(path) as f:
+        manifest: dict = yaml.safe_load(f)
+
+    return ModuleManifest(
+        name=manifest["name"],
+        description=manifest["description"],
+        module=manifest["module"],
+        class_name=manifest["class"],
+        channels=manifest.get("channels") or [],
+        heavy_dependencies=manifest.get("heavy_dependencies") or [],
+    )
+
+
+def get_manifest(module_dir: str) -> Optional[ModuleManifest]:
+    """
+    returns the manifest of the module in the given dir, or None if it
+    doesn't have one
+    """
+    path = os.path.join(module_dir, MANIFEST_FILE_NAME)
+    if not os.path.isfile(path):
+        return None
+    return read_manifest(path)
+
+
+class LazyModule(Process):
+    """
+    Imports and starts a module in its own process, so the main slips
+    process never imports the module or its heavy dependencies.
+    is created using the same args as the module itself.
+    """
+
+    def __init__(self, manifest: ModuleManifest, *args, **kwargs):
+        Process.__init__(self, name=manifest.name)
+        self.manifest = manifest
+        self.args = args
+        self.kwargs = kwargs
+        # set once the module subscribed to its channels
+        self.ready = Event()
+
+    def wait_until_ready(self, poll_interval: float = 0.1) -> bool:
+        """
+        waits for the module to be initialized, so it doesn't miss the
+        msgs sent in its channels.
+        returns False if the module failed to start
+        """
+        while not self.ready.wait(poll_interval):
+            if not self.is_alive():
+                return False
+        return True
+
+    def run(self):
+        try:
+            module_class = self.manifest.load_class()
+            module = module_class(*self.args, **self.kwargs)
+        except Exception:
+            print(
+                f"Something wrong happened while starting the module "
+                f"{self.manifest.module}"
+            )
+            print(traceback.format_exc())
+            return
+
+        self.ready.set()
+        module.run()
+
+
+def get_manifests(modules_dir: str) -> Dict[str, ModuleManifest]:
+    """
+    returns the manifests of the modules in the given dir
+    {module dir name: ModuleManifest}
+    """
+    manifests = {}
+    for dir_name in sorted(os.listdir(modules_dir)):
+        module_dir = os.path.join(modules_dir, dir_name)
+        if not os.path.isdir(module_dir):
+            continue
+        if manifest := get_manifest(module_dir):
+            manifests[dir_name] = manifest
+    return manifests
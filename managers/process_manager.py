@@ -9,6 +9,7 @@ import time
 import traceback
 from collections import OrderedDict
 from datetime import datetime
+from functools import partial
 from multiprocessing import (
     Queue,
     Event,
@@ -28,6 +29,11 @@ from exclusiveprocess import (
 import multiprocessing
 
 import modules
+from managers.module_manifest import (
+    LazyModule,
+    ModuleManifest,
+    get_manifests,
+)
 from modules.update_manager.update_manager import UpdateManager
 from slips_files.common.slips_utils import utils
 from slips_files.common.abstracts.module import (
@@ -87,6 +93,8 @@ class ProcessManager:
             stop_daemon=self.main.args.stopdaemon,
         )
         self.slips_logfile = output_process.slips_logfile
+        if not self.main.args.stopdaemon:
+            output_process.start_log_writer()
         return output_process
 
     def start_profiler_process(self):
@@ -223,6 +231,23 @@ class ProcessManager:
         # __path__ is the current path of this python program
         look_for_modules_in = modules.__path__
         prefix = f"{modules.__name__}."
+
+        # modules with a manifest.yaml are never imported here.
+        # disabled ones are skipped using their manifest, and enabled ones
+        # are imported by LazyModule in their own process
+        manifests: Dict[str, ModuleManifest] = {}
+        for modules_dir in look_for_modules_in:
+            manifests.update(get_manifests(modules_dir))
+
+        for dir_name, manifest in manifests.items():
+            if self.is_ignored_module(f"{prefix}{dir_name}.{dir_name}"):
+                continue
+            plugins[manifest.name] = dict(
+                # is called with the same args as the module class
+                obj=partial(LazyModule, manifest),
+                description=manifest.description,
+            )
+
         # Walk recursively through all modules and packages found on the .
         # folder.
         for loader, module_name, ispkg in pkgutil.walk_packages(
@@ -236,7 +261,7 @@ class ProcessManager:
             # only load modules that have the same name as the dir name
             dir_name = module_name.split(".")[1]
             file_name = module_name.split(".")[2]
-            if dir_name != file_name:
+            if dir_name != file_name or dir_name in manifests:
                 continue
 
             if self.is_ignored_module(module_name):
@@ -299,6 +324,7 @@ class ProcessManager:
     def load_modules(self):
         """responsible for starting all the modules in the modules/ dir"""
         modules_to_call = self.get_modules()[0]
+        lazy_modules: List[LazyModule] = []
         for module_name in modules_to_call:
             module_class = modules_to_call[module_name]["obj"]
             module = module_class(
@@ -314,6 +340,16 @@ class ProcessManager:
                 module.pid,
                 modules_to_call[module_name]["description"],
             )
+            if isinstance(module, LazyModule):
+                lazy_modules.append(module)
+
+        # the modules initialize in parallel, but the flows shouldn't be
+        # read before they subscribe to their channels
+        for module in lazy_modules:
+            if not module.wait_until_ready():
+                self.main.print(
+                    f"Failed to start the module {module.name}.", 0, 1
+                )
 
     def print_started_module(
         self, module_name: str, module_pid: int, module_description: str
@@ -743,6 +779,9 @@ class ProcessManager:
                     f"shutdown gracefully - {reason}\n",
                     log_to_logfiles_only=True,
                 )
+            # write the pending log lines to the logfiles
+            self.main.logger.shutdown_gracefully()
 
         except KeyboardInterrupt:
+            self.main.logger.shutdown_gracefully()
             return False
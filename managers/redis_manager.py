@@ -10,6 +10,10 @@ from typing import Dict, Union
 from slips_files.core.output import Output
 from slips_files.common.slips_utils import utils
 from slips_files.core.database.database_manager import DBManager
+from slips_files.core.helpers.bus_telemetry import (
+    get_bus_telemetry,
+    format_bus_telemetry,
+)
 
 
 class RedisManager:
@@ -178,6 +182,29 @@ class RedisManager:
         rcache.flushdb()
         return True
 
+    def print_bus_telemetry(self, redis_port: int, redis_host="localhost"):
+        """
+        prints the msgs received, backlog, latency and handler time of
+        each module and channel of the slips instance using the given
+        redis port
+        """
+        r = redis.StrictRedis(
+            host=redis_host,
+            port=redis_port,
+            db=0,
+            charset="utf-8",
+            decode_responses=True,
+        )
+        try:
+            telemetry = get_bus_telemetry(r)
+        except redis.exceptions.ConnectionError:
+            print(f"No redis server is running on port {redis_port}.")
+            return
+        if not telemetry:
+            print(f"No bus telemetry found in redis port {redis_port}.")
+            return
+        print(format_bus_telemetry(telemetry))
+
     def close_all_ports(self):
         """
         Closes all the redis ports in running_slips_info.txt and
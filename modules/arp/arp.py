@@ -4,12 +4,17 @@ import os
 import time
 import threading
 from multiprocessing import Queue
-from typing import List
+from queue import Full
+from typing import (
+    Dict,
+    List,
+)
 
 from slips_files.common.flow_classifier import FlowClassifier
 from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.slips_utils import utils
 from slips_files.common.abstracts.module import IModule
+from slips_files.core.helpers.tw_state_store import TWStateStore
 from slips_files.core.structures.evidence import (
     Evidence,
     ProfileID,
@@ -23,6 +28,17 @@ from slips_files.core.structures.evidence import (
 )
 
 
+class ArpRequests:
+    """the arp requests sent by a profile to one daddr in a tw"""
+
+    __slots__ = ("uids", "ts")
+
+    def __init__(self, uid: str, ts):
+        self.uids: List[str] = [uid]
+        # the ts of the last request
+        self.ts = ts
+
+
 class ARP(IModule):
     # Name: short name of the module. Do not use spaces
     name = "ARP"
@@ -38,8 +54,9 @@ class ARP(IModule):
         }
         self.read_configuration()
         self.classifier = FlowClassifier()
-        # this dict will categorize arp requests by profileid_twid
-        self.cache_arp_requests = {}
+        # the arp requests of each profileid and twid
+        # {daddr: ArpRequests} in the order they were first requested
+        self.cache_arp_requests = TWStateStore("arp.cache_arp_requests")
         # Threshold to use to detect a port scan. How many arp minimum
         # are required?
         self.arp_scan_threshold = 5
@@ -55,7 +72,9 @@ class ARP(IModule):
         self.timer_thread_arp_scan = threading.Thread(
             target=self.wait_for_arp_scans, daemon=True
         )
-        self.pending_arp_scan_evidence = Queue()
+        # bounded, the evidence of new scans are dropped while the
+        # thread is busy combining the ones in the queue
+        self.pending_arp_scan_evidence = Queue(maxsize=1000)
         self.alerted_once_arp_scan = False
         # wait 10s for mmore arp scan evidence to come
         self.time_to_wait = 10
@@ -115,13 +134,19 @@ class ARP(IModule):
                     # evidence  store it back in the queue until we're done
                     # with the current one
                     scans_ctr += 1
-                    self.pending_arp_scan_evidence.put(new_evidence)
+                    self.put_pending_arp_scan_evidence(new_evidence)
                     if scans_ctr == 3:
                         scans_ctr = 0
                         break
 
             self.set_evidence_arp_scan(ts, profileid, twid, uids)
 
+    def put_pending_arp_scan_evidence(self, evidence: tuple):
+        try:
+            self.pending_arp_scan_evidence.put_nowait(evidence)
+        except Full:
+            pass
+
     def check_arp_scan(self, profileid, twid, flow):
         """
         Check if the profile is doing an arp scan
@@ -145,9 +170,8 @@ class ARP(IModule):
             get the uids causing this evidence
             """
             res = []
-            for daddr, daddr_info in cached_requests.items():
-                for uid in daddr_info["uids"]:
-                    res.append(uid)
+            for requests in cached_requests.values():
+                res.extend(requests.uids)
             return res
 
         # The Gratuitous arp is sent as a broadcast, as a way for a
@@ -161,25 +185,26 @@ class ARP(IModule):
         if flow.saddr == "0.0.0.0":
             return False
 
-        daddr_info = {flow.daddr: {"uids": [flow.uid], "ts": flow.starttime}}
-        try:
-            # Get together all the arp requests to IPs in this TW
-            cached_requests = self.cache_arp_requests[f"{profileid}_{twid}"]
-            # Append the arp request, and when it happened
-            if flow.daddr in cached_requests:
-                cached_requests[flow.daddr]["uids"].append(flow.uid)
-                cached_requests[flow.daddr]["ts"] = flow.starttime
-                self.cache_arp_requests[f"{profileid}_{twid}"] = (
-                    cached_requests
-                )
-            else:
-                cached_requests.update(daddr_info)
-        except KeyError:
-            # create the key for this profileid_twid if it doesn't exist
-            self.cache_arp_requests[f"{profileid}_{twid}"] = daddr_info
-
+        # Get together all the arp requests to IPs in this TW
+        cached_requests: Dict[str, ArpRequests] = self.cache_arp_requests.get(
+            profileid, twid
+        )
+        if cached_requests is None:
+            # first arp request of this profileid in this twid
+            self.cache_arp_requests.set(
+                profileid,
+                twid,
+                {flow.daddr: ArpRequests(flow.uid, flow.starttime)},
+            )
             return True
 
+        # Append the arp request, and when it happened
+        if flow.daddr in cached_requests:
+            cached_requests[flow.daddr].uids.append(flow.uid)
+            cached_requests[flow.daddr].ts = flow.starttime
+        else:
+            cached_requests[flow.daddr] = ArpRequests(flow.uid, flow.starttime)
+
         # the list of daddrs that are scanned by the current
         # proffileid in the curr tw
         daddrs = list(cached_requests.keys())
@@ -191,8 +216,8 @@ class ARP(IModule):
             # get the first and the last request of the 10
             first_daddr = daddrs[0]
             last_daddr = daddrs[-1]
-            starttime = cached_requests[first_daddr]["ts"]
-            endtime = cached_requests[last_daddr]["ts"]
+            starttime = cached_requests[first_daddr].ts
+            endtime = cached_requests[last_daddr].ts
             # todo do we need mac addresses?
             self.diff = utils.get_time_diff(starttime, endtime)
 
@@ -208,7 +233,7 @@ class ARP(IModule):
                 else:
                     # after alerting once, wait 10s to see
                     # if more evidence are coming
-                    self.pending_arp_scan_evidence.put(
+                    self.put_pending_arp_scan_evidence(
                         (flow.starttime, profileid, twid, uids)
                     )
 
@@ -238,17 +263,9 @@ class ARP(IModule):
         )
 
         self.db.set_evidence(evidence)
-        # after we set evidence, clear the dict so we can detect if it
+        # after we set evidence, clear the requests so we can detect if it
         # does another scan
-        try:
-            self.cache_arp_requests.pop(f"{profileid}_{twid}")
-        except KeyError:
-            # when a tw is closed, we clear all its' entries from the
-            # cache_arp_requests dict
-            # having keyerr is a result of closing a timewindow before
-            # setting an evidence
-            # ignore it
-            pass
+        self.cache_arp_requests.pop(profileid, twid)
 
     def check_dstip_outside_localnet(self, twid, flow):
         """Function to setEvidence when daddr is outside the local network"""
@@ -535,17 +552,7 @@ class ARP(IModule):
                 # Unsolicited ARPs should be of type reply only, not request
                 self.detect_unsolicited_arp(twid, flow)
 
-        # if the tw is closed, remove all its entries from the cache dict
-        if msg := self.get_msg("tw_closed"):
-            profileid_tw = msg["data"]
-            # when a tw is closed, this means that it's too
-            # old so we don't check for arp scan in this time
-            # range anymore
-            # this copy is made to avoid dictionary
-            # changed size during iteration err
-            cache_copy = self.cache_arp_requests.copy()
-            for key in cache_copy:
-                if profileid_tw in key:
-                    self.cache_arp_requests.pop(key)
-                    # don't break, keep looking for more
-                    # keys that belong to the same tw
+        # when a tw is closed, this means that it's too old so we don't
+        # check for arp scan in this time range anymore.
+        # get_msg() evicts its arp requests from self.cache_arp_requests
+        self.get_msg("tw_closed")
@@ -1,4 +1,10 @@
 from slips_files.common.abstracts.module import IModule
+from modules.blocking.firewall_sets import (
+    CommandExecutor,
+    FirewallSet,
+    IPSet,
+    NFTSet,
+)
 import platform
 import sys
 import os
@@ -6,6 +12,7 @@ import shutil
 import json
 import subprocess
 import time
+from typing import Optional
 
 
 class Blocking(IModule):
@@ -28,7 +35,11 @@ class Blocking(IModule):
             sys.exit()
         self.firewall = self.determine_linux_firewall()
         self.set_sudo_according_to_env()
+        self.executor = CommandExecutor(self.sudo)
         self.initialize_chains_in_firewall()
+        # blocks ips without ports or protocols in batches using
+        # ipset/nft sets. None if ipset or nft aren't installed
+        self.firewall_set: Optional[FirewallSet] = self.init_firewall_set()
         # this will keep track of ips that are blocked only for a specific time
         # format {ip: (block_for(seconds), time_of_blocking(epoch))}
         self.unblock_ips = {}
@@ -100,6 +111,8 @@ class Blocking(IModule):
             # flush and delete all the rules in slipsBlocking
             cmd = f"{self.sudo}iptables -F slipsBlocking >/dev/null 2>&1 ; {self.sudo} iptables -X slipsBlocking >/dev/null 2>&1"
             os.system(cmd)
+            if self.firewall_set:
+                self.firewall_set.destroy()
             print("Successfully deleted slipsBlocking chain.")
             return True
         elif self.firewall == "nftables":
@@ -108,9 +121,31 @@ class Blocking(IModule):
             os.system(f"{self.sudo}nft flush chain inet slipsBlocking")
             # Delete slipsBlocking chain from nftables
             os.system(f"{self.sudo}nft delete chain inet slipsBlocking")
+            if self.firewall_set:
+                self.firewall_set.destroy()
             return True
         return False
 
+    def init_firewall_set(self) -> Optional[FirewallSet]:
+        """
+        returns the set based backend to use with the current firewall,
+        and creates its sets
+        """
+        if self.firewall == "iptables" and shutil.which("ipset"):
+            firewall_set = IPSet(self.executor)
+        elif self.firewall == "nftables" and shutil.which("nft"):
+            firewall_set = NFTSet(self.executor)
+        else:
+            return
+
+        if not firewall_set.init_sets():
+            self.print(
+                f"Unable to create the {firewall_set.name} sets. "
+                f"Blocking each IP using a separate {self.firewall} rule."
+            )
+            return
+        return firewall_set
+
     def get_cmd_output(self, command):
         """Executes a command and returns the output"""
 
@@ -131,33 +166,16 @@ class Blocking(IModule):
             os.system(f"{self.sudo}iptables -N slipsBlocking >/dev/null 2>&1")
 
             # Check if we're already redirecting to slipsBlocking chain
-            INPUT_chain_rules = self.get_cmd_output(
-                f"{self.sudo} iptables -nvL INPUT"
-            )
-            OUTPUT_chain_rules = self.get_cmd_output(
-                f"{self.sudo} iptables -nvL OUTPUT"
-            )
-            FORWARD_chain_rules = self.get_cmd_output(
-                f"{self.sudo} iptables -nvL FORWARD"
-            )
+            # using 1 command for all chains
+            rules = self.executor.get_output(["iptables", "-S"])
             # Redirect the traffic from all other chains to slipsBlocking so rules
             # in any pre-existing chains dont override it
             # -I to insert slipsBlocking at the top of the INPUT, OUTPUT and FORWARD chains
-            if "slipsBlocking" not in INPUT_chain_rules:
-                os.system(
-                    self.sudo
-                    + "iptables -I INPUT -j slipsBlocking >/dev/null 2>&1"
-                )
-            if "slipsBlocking" not in OUTPUT_chain_rules:
-                os.system(
-                    self.sudo
-                    + "iptables -I OUTPUT -j slipsBlocking >/dev/null 2>&1"
-                )
-            if "slipsBlocking" not in FORWARD_chain_rules:
-                os.system(
-                    self.sudo
-                    + "iptables -I FORWARD -j slipsBlocking >/dev/null 2>&1"
-                )
+            for chain in ("INPUT", "OUTPUT", "FORWARD"):
+                if f"-A {chain} -j slipsBlocking" not in rules:
+                    self.executor.run(
+                        ["iptables", "-I", chain, "-j", "slipsBlocking"]
+                    )
 
         elif self.firewall == "nftables":
             self.print(
@@ -194,6 +212,8 @@ class Blocking(IModule):
 
     def is_ip_blocked(self, ip) -> bool:
         """Checks if ip is already blocked or not"""
+        if self.firewall_set and self.firewall_set.is_blocked(ip):
+            return True
 
         command = f"{self.sudo}iptables -L slipsBlocking -v -n"
         # Execute command
@@ -220,6 +240,16 @@ class Blocking(IModule):
         if not isinstance(ip_to_block, str):
             return False
 
+        # the firewall sets can only block all traffic of an ip
+        blocks_all_traffic = all(
+            option is None for option in (dport, sport, protocol)
+        )
+        if self.firewall_set and blocks_all_traffic:
+            # no need to spawn iptables to check if the ip is blocked
+            if self.firewall_set.is_blocked(ip_to_block):
+                return False
+            return self.add_to_firewall_set(ip_to_block, from_, to, block_for)
+
         # Make sure ip isn't already blocked before blocking
         if self.is_ip_blocked(ip_to_block):
             return False
@@ -283,6 +313,133 @@ class Blocking(IModule):
 
         return False
 
+    def add_to_firewall_set(
+        self, ip_to_block: str, from_, to, block_for
+    ) -> bool:
+        """
+        queues the blocking of the given ip in the firewall set, it's
+        applied with the rest of the queued ips by the next flush.
+        the kernel unblocks the ip after block_for seconds, so there's
+        no need to keep track of it in self.unblock_ips
+        the ip is reported as blocked by flush_firewall_set() once the
+        flush succeeds
+        """
+        # Set the default behaviour to block all traffic from and to an ip
+        if from_ is None and to is None:
+            from_, to = True, True
+
+        queued = False
+        if from_ and self.firewall_set.add(ip_to_block, "src", block_for):
+            queued = True
+        if to and self.firewall_set.add(ip_to_block, "dst", block_for):
+            queued = True
+        return queued
+
+    def flush_firewall_set(self, retry=True) -> bool:
+        """
+        applies the queued blocks and unblocks to the firewall set and
+        reports them once they're applied.
+        if the flush fails, the changes are retried by the next flush.
+        once they failed too many times, or if retry is False, the
+        queued ips are blocked using a separate iptables rule each, or
+        on nftables hosts, applied to the nft sets one by one
+        """
+        additions = list(self.firewall_set.pending_additions)
+        removals = list(self.firewall_set.pending_removals)
+        if self.firewall_set.flush():
+            for ip, direction in additions:
+                direction = "from" if direction == "src" else "to"
+                self.print(f"Blocked all traffic {direction}: {ip}")
+            for ip in dict.fromkeys(ip for ip, _ in removals):
+                self.print(f"Unblocked: {ip}")
+            return True
+
+        self.print(
+            f"Failed to apply {len(additions) + len(removals)} changes "
+            f"to the {self.firewall_set.name} sets.",
+            0,
+            1,
+        )
+        if not retry or self.firewall_set.has_given_up():
+            if self.firewall == "iptables":
+                self.block_pending_ips_using_iptables()
+            else:
+                self.apply_pending_changes_one_by_one()
+        return False
+
+    def apply_pending_changes_one_by_one(self):
+        """
+        stops retrying the changes queued in the firewall set and applies
+        each of them in its own transaction, so the ips that can't be
+        blocked or unblocked don't keep the rest from being applied.
+        used when there are no iptables to fall back to
+        """
+        additions, removals = self.firewall_set.drop_pending_changes()
+        for ip, direction in removals:
+            if self.firewall_set.apply({}, [(ip, direction)]):
+                self.print(f"Unblocked: {ip}")
+            else:
+                self.print(
+                    f"Unable to unblock {ip} from the "
+                    f"{self.firewall_set.name} sets.",
+                    0,
+                    1,
+                )
+
+        for (ip, direction), block_for in additions.items():
+            if self.firewall_set.apply({(ip, direction): block_for}, []):
+                direction = "from" if direction == "src" else "to"
+                self.print(f"Blocked all traffic {direction}: {ip}")
+            else:
+                self.print(f"Unable to block {ip}.", 0, 1)
+
+    def block_pending_ips_using_iptables(self):
+        """
+        stops retrying the changes queued in the firewall set and blocks
+        its queued ips using a separate iptables rule per ip and direction
+        """
+        additions, removals = self.firewall_set.drop_pending_changes()
+        for ip in dict.fromkeys(ip for ip, _ in removals):
+            self.print(
+                f"Unable to unblock {ip} from the "
+                f"{self.firewall_set.name} sets.",
+                0,
+                1,
+            )
+
+        for (ip, direction), block_for in additions.items():
+            flag = "-s" if direction == "src" else "-d"
+            if not self.exec_iptables_command(
+                action="insert", ip_to_block=ip, flag=flag, options={}
+            ):
+                self.print(f"Unable to block {ip}.", 0, 1)
+                continue
+
+            from_ = direction == "src"
+            self.print(
+                f"Blocked all traffic {'from' if from_ else 'to'}: {ip}"
+            )
+            if not block_for:
+                continue
+            # the iptables rules aren't removed by the kernel like the
+            # set entries, unblock the ip after block_for
+            if ip in self.unblock_ips:
+                details = self.unblock_ips[ip]["blocking_details"]
+                details["from"] = details["from"] or from_
+                details["to"] = details["to"] or not from_
+                continue
+            self.unblock_ips[ip] = {
+                "block_for": block_for,
+                "time_of_blocking": time.time(),
+                "blocking_details": {
+                    "from": from_,
+                    "to": not from_,
+                    "dport": None,
+                    "sport": None,
+                    "protocol": None,
+                },
+            }
+
     def unblock_ip(
         self,
         ip_to_unblock,
@@ -293,15 +450,26 @@ class Blocking(IModule):
         protocol=None,
     ):
         """Unblocks an ip based on the flags passed in the message"""
+        # Set the default behaviour to unblock all traffic from and to an ip
+        if from_ is None and to is None:
+            from_, to = True, True
+
+        if self.firewall_set and not (dport or sport or protocol):
+            unblocked = False
+            if from_:
+                unblocked |= self.firewall_set.remove(ip_to_unblock, "src")
+            if to:
+                unblocked |= self.firewall_set.remove(ip_to_unblock, "dst")
+            if unblocked:
+                # reported by flush_firewall_set() once it's applied
+                return True
+
         # This dictionary will be used to construct the rule
         options = {
             "protocol": f" -p {protocol}" if protocol else "",
             "dport": f" --dport {dport}" if dport else "",
             "sport": f" --sport {sport}" if sport else "",
         }
-        # Set the default behaviour to unblock all traffic from and to an ip
-        if from_ is None and to is None:
-            from_, to = True, True
         # Set the appropriate iptables flag to use in the command
         # The module sending the message HAS TO specify either 'from_' or 'to' or both
         # so that this function knows which rule to delete
@@ -396,3 +564,11 @@ class Blocking(IModule):
             else:
                 self.unblock_ip(ip, from_, to, dport, sport, protocol)
         self.check_for_ips_to_unblock()
+        if self.firewall_set and self.firewall_set.should_flush():
+            self.flush_firewall_set()
+
+    def shutdown_gracefully(self):
+        # apply the blocks that are still queued, there's no next flush
+        # to retry them
+        if self.firewall_set:
+            self.flush_firewall_set(retry=False)
@@ -0,0 +1,409 @@
+import ipaddress
+import subprocess
+import time
+from abc import ABC, abstractmethod
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+
+class CommandExecutor:
+    """
+    Runs the firewall commands of the blocking module.
+    the firewall sets never call subprocess directly, so this can be
+    replaced by a fake executor to test them without root
+    """
+
+    def __init__(self, sudo: str = ""):
+        self.sudo: List[str] = sudo.split()
+
+    def run(self, cmd: List[str], stdin: Optional[str] = None) -> bool:
+        """
+        runs the given command and feeds it the given stdin
+        returns True if the command succeeded
+        """
+        result = subprocess.run(
+            self.sudo + cmd,
+            input=stdin,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        return result.returncode == 0
+
+    def get_output(self, cmd: List[str]) -> str:
+        """runs the given command and returns its stdout"""
+        result = subprocess.run(
+            self.sudo + cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        return result.stdout
+
+
+class FirewallSet(ABC):
+    """
+    Blocks IPs by adding them to kernel sets that are matched by a
+    constant number of firewall rules, instead of adding 1 rule per
+    IP and direction.
+    Additions and removals are queued and applied in batched
+    transactions by flush()
+    """
+
+    name = "abstract firewall set"
+    # the pending changes are kept for a retry when a flush fails, until
+    # this many flushes in a row fail
+    max_failed_flushes = 3
+    # the directions an ip can be blocked in.
+    # src: block traffic from the ip, dst: block traffic to the ip
+    directions = ("src", "dst")
+
+    def __init__(
+        self,
+        executor: CommandExecutor,
+        batch_size: int = 1000,
+        flush_interval: float = 1,
+    ):
+        """
+        :param batch_size: flush once this many changes are pending
+        :param flush_interval: max seconds a change stays pending
+        """
+        self.executor = executor
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # {(ip, direction): timeout or None}
+        self.pending_additions: Dict[Tuple[str, str], Optional[int]] = {}
+        self.pending_removals: Set[Tuple[str, str]] = set()
+        # {(ip, direction): epoch of when the kernel removes it or None}
+        self.blocked: Dict[Tuple[str, str], Optional[float]] = {}
+        # when the oldest pending change was queued
+        self.first_pending_at: Optional[float] = None
+        # the number of flushes in a row that failed
+        self.failed_flushes = 0
+
+    @staticmethod
+    def get_ip_version(ip: str) -> Optional[int]:
+        """returns 4 or 6, or None if the given ip isn't a valid ip/net"""
+        try:
+            return ipaddress.ip_network(ip, strict=False).version
+        except ValueError:
+            return None
+
+    def get_set_name(self, direction: str, version: int) -> str:
+        return f"slips_blocked_{direction}_v{version}"
+
+    def get_set_names(self) -> List[Tuple[str, str, int]]:
+        """returns (set name, direction, ip version) of all the sets"""
+        return [
+            (self.get_set_name(direction, version), direction, version)
+            for direction in self.directions
+            for version in (4, 6)
+        ]
+
+    def _queue_change(self):
+        if self.first_pending_at is None:
+            self.first_pending_at = time.time()
+
+    def add(self, ip: str, direction: str, timeout: Optional[int] = None):
+        """
+        queues the blocking of the given ip in the given direction
+        :param timeout: seconds after which the kernel unblocks the ip
+        returns False if the given ip is invalid
+        """
+        if not self.get_ip_version(ip):
+            return False
+        key = (ip, direction)
+        self.pending_removals.discard(key)
+        self.pending_additions[key] = int(timeout) if timeout else None
+        self._queue_change()
+        return True
+
+    def remove(self, ip: str, direction: str):
+        """queues the unblocking of the given ip in the given direction"""
+        key = (ip, direction)
+        was_pending = key in self.pending_additions
+        self.pending_additions.pop(key, None)
+        if key not in self.blocked:
+            # the addition was never applied, nothing to remove
+            return was_pending
+
+        self.pending_removals.add(key)
+        self._queue_change()
+        return True
+
+    def is_blocked(self, ip: str) -> bool:
+        """
+        returns True if the ip is blocked, or will be by the next flush
+        """
+        now = time.time()
+        for direction in self.directions:
+            key = (ip, direction)
+            if key in self.pending_additions:
+                return True
+            if key in self.pending_removals or key not in self.blocked:
+                continue
+            expires_at = self.blocked[key]
+            if expires_at is None or expires_at > now:
+                return True
+        return False
+
+    def has_pending_changes(self) -> bool:
+        return bool(self.pending_additions or self.pending_removals)
+
+    def should_flush(self) -> bool:
+        if not self.has_pending_changes():
+            return False
+        pending = len(self.pending_additions) + len(self.pending_removals)
+        return (
+            pending >= self.batch_size
+            or time.time() - self.first_pending_at >= self.flush_interval
+        )
+
+    def _forget_expired(self):
+        now = time.time()
+        expired = [
+            key
+            for key, expires_at in self.blocked.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for key in expired:
+            self.blocked.pop(key)
+
+    def has_given_up(self) -> bool:
+        """
+        returns True if the pending changes failed to be applied too
+        many times, and won't be retried
+        """
+        return self.failed_flushes >= self.max_failed_flushes
+
+    def drop_pending_changes(
+        self,
+    ) -> Tuple[Dict[Tuple[str, str], Optional[int]], Set[Tuple[str, str]]]:
+        """
+        returns the pending additions and removals and stops retrying
+        them
+        """
+        additions, removals = self.pending_additions, self.pending_removals
+        self.pending_additions = {}
+        self.pending_removals = set()
+        self.first_pending_at = None
+        self.failed_flushes = 0
+        return additions, removals
+
+    def flush(self) -> bool:
+        """
+        applies all pending additions and removals in one transaction
+        returns True if the transaction succeeded.
+        if it fails, the changes stay pending and are retried by the
+        next flush, after flush_interval
+        """
+        if not self.has_pending_changes():
+            return True
+
+        if not self.apply(self.pending_additions, self.pending_removals):
+            self.failed_flushes += 1
+            self.first_pending_at = time.time()
+            return False
+
+        self.drop_pending_changes()
+        return True
+
+    def apply(
+        self,
+        additions: Dict[Tuple[str, str], Optional[int]],
+        removals: Iterable[Tuple[str, str]],
+    ) -> bool:
+        """
+        applies the given changes in one transaction, regardless of the
+        pending ones.
+        returns True if the transaction succeeded
+        """
+        self._forget_expired()
+        # the kernel already removed the expired ips, deleting them
+        # again would fail the whole transaction
+        removals = [key for key in removals if key in self.blocked]
+        if not (additions or removals):
+            return True
+
+        transaction: str = self.build_transaction(additions, removals)
+        if not self.executor.run(self.restore_cmd, stdin=transaction):
+            return False
+
+        now = time.time()
+        for key in removals:
+            self.blocked.pop(key, None)
+        for key, timeout in additions.items():
+            self.blocked[key] = now + timeout if timeout else None
+        return True
+
+    @property
+    @abstractmethod
+    def restore_cmd(self) -> List[str]:
+        """the command that reads a transaction from stdin"""
+
+    @abstractmethod
+    def build_transaction(
+        self,
+        additions: Dict[Tuple[str, str], Optional[int]],
+        removals: List[Tuple[str, str]],
+    ) -> str:
+        """returns the transaction that applies the given changes"""
+
+    @abstractmethod
+    def init_sets(self) -> bool:
+        """creates the sets and the rules matching them"""
+
+    @abstractmethod
+    def destroy(self):
+        """removes the sets and the rules matching them"""
+
+
+class IPSet(FirewallSet):
+    """
+    Uses ipset hash:net sets matched by 1 iptables/ip6tables rule per
+    set in the slipsBlocking chain
+    """
+
+    name = "ipset"
+    parent_chains = ("INPUT", "OUTPUT", "FORWARD")
+
+    def get_iptables_bin(self, version: int) -> str:
+        return "iptables" if version == 4 else "ip6tables"
+
+    def get_match_rule(self, set_name: str, direction: str) -> List[str]:
+        return [
+            "slipsBlocking",
+            "-m",
+            "set",
+            "--match-set",
+            set_name,
+            direction,
+            "-j",
+            "DROP",
+        ]
+
+    @property
+    def restore_cmd(self) -> List[str]:
+        return ["ipset", "-exist", "restore"]
+
+    def init_ip6tables_chain(self):
+        """
+        the ipv4 slipsBlocking chain is created by the blocking module,
+        this creates the ipv6 one and redirects traffic to it
+        """
+        self.executor.run(["ip6tables", "-N", "slipsBlocking"])
+        for chain in self.parent_chains:
+            jump = [chain, "-j", "slipsBlocking"]
+            if not self.executor.run(["ip6tables", "-C"] + jump):
+                self.executor.run(["ip6tables", "-I"] + jump)
+
+    def build_transaction(self, additions, removals) -> str:
+        lines = []
+        for ip, direction in removals:
+            set_name = self.get_set_name(direction, self.get_ip_version(ip))
+            lines.append(f"del {set_name} {ip}")
+        for (ip, direction), timeout in additions.items():
+            set_name = self.get_set_name(direction, self.get_ip_version(ip))
+            line = f"add {set_name} {ip}"
+            if timeout:
+                line += f" timeout {timeout}"
+            lines.append(line)
+        return "\n".join(lines) + "\n"
+
+    def init_sets(self) -> bool:
+        lines = []
+        for set_name, _, version in self.get_set_names():
+            family = "inet" if version == 4 else "inet6"
+            # timeout 0 enables per-entry timeouts without a default one
+            lines.append(
+                f"create {set_name} hash:net family {family} timeout 0"
+            )
+        if not self.executor.run(
+            self.restore_cmd, stdin="\n".join(lines) + "\n"
+        ):
+            return False
+
+        self.init_ip6tables_chain()
+        for set_name, direction, version in self.get_set_names():
+            iptables = self.get_iptables_bin(version)
+            rule = self.get_match_rule(set_name, direction)
+            # -C checks if the rule already exists
+            if not self.executor.run([iptables, "-C"] + rule):
+                self.executor.run([iptables, "-I"] + rule)
+        return True
+
+    def destroy(self):
+        for set_name, direction, version in self.get_set_names():
+            iptables = self.get_iptables_bin(version)
+            self.executor.run(
+                [iptables, "-D"] + self.get_match_rule(set_name, direction)
+            )
+            self.executor.run(["ipset", "destroy", set_name])
+
+        for chain in self.parent_chains:
+            self.executor.run(
+                ["ip6tables", "-D", chain, "-j", "slipsBlocking"]
+            )
+        self.executor.run(["ip6tables", "-X", "slipsBlocking"])
+
+
+class NFTSet(FirewallSet):
+    """
+    Uses named sets with timeouts in the inet slipsBlocking nft table
+    """
+
+    name = "nft"
+    table = "inet slipsBlocking"
+    hooks = ("input", "output", "forward")
+
+    @property
+    def restore_cmd(self) -> List[str]:
+        return ["nft", "-f", "-"]
+
+    def build_transaction(self, additions, removals) -> str:
+        lines = []
+        for ip, direction in removals:
+            set_name = self.get_set_name(direction, self.get_ip_version(ip))
+            lines.append(f"delete element {self.table} {set_name} {{ {ip} }}")
+        for (ip, direction), timeout in additions.items():
+            set_name = self.get_set_name(direction, self.get_ip_version(ip))
+            element = f"{ip} timeout {timeout}s" if timeout else ip
+            lines.append(
+                f"add element {self.table} {set_name} {{ {element} }}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def init_sets(self) -> bool:
+        lines = [f"add table {self.table}"]
+        for set_name, _, version in self.get_set_names():
+            lines.append(
+                f"add set {self.table} {set_name} "
+                f"{{ type ipv{version}_addr; flags interval, timeout; }}"
+            )
+
+        for hook in self.hooks:
+            lines.append(
+                f"add chain {self.table} {hook} "
+                f"{{ type filter hook {hook} priority -10; policy accept; }}"
+            )
+            # so restarting slips doesn't duplicate the rules
+            lines.append(f"flush chain {self.table} {hook}")
+            for set_name, direction, version in self.get_set_names():
+                family = "ip" if version == 4 else "ip6"
+                addr = "saddr" if direction == "src" else "daddr"
+                lines.append(
+                    f"add rule {self.table} {hook} "
+                    f"{family} {addr} @{set_name} drop"
+                )
+        return self.executor.run(
+            self.restore_cmd, stdin="\n".join(lines) + "\n"
+        )
+
+    def destroy(self):
+        self.executor.run(["nft", "delete", "table", *self.table.split()])
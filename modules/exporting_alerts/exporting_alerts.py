@@ -42,7 +42,7 @@ class ExportingAlerts(IModule):
             # it starts the timer when the first alert happens
             self.stix.start_exporting_thread()
 
-        if not export_to_slack or export_to_stix:
+        if not (export_to_slack or export_to_stix):
             return 1
 
     def remove_sensitive_info(self, evidence: dict) -> str:
@@ -73,8 +73,9 @@ class ExportingAlerts(IModule):
                     evidence["attacker"]["value"],
                 )
                 added_to_stix: bool = self.stix.add_to_stix_file(msg_to_send)
-                if added_to_stix:
-                    # now export to taxii
-                    self.stix.export()
-                else:
+                if not added_to_stix:
                     self.print("Problem in add_to_stix_file()", 0, 3)
+
+        if self.stix.should_export():
+            # the bundle is pushed to taxii by the exporting thread
+            self.stix.flush_if_needed()
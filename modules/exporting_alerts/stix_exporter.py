@@ -1,8 +1,17 @@
-from stix2 import Indicator, Bundle
+from stix2 import Indicator, Bundle, parse
+from stix2.exceptions import STIXError
 from cabby import create_client
+import json
+import re
 import time
 import threading
 import os
+from typing import (
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 from slips_files.common.abstracts.exporter import IExporter
 from slips_files.common.parsers.config_parser import ConfigParser
@@ -14,17 +23,34 @@ class StixExporter(IExporter):
         self.port = None
         self.is_running_non_stop: bool = self.db.is_running_non_stop()
         self.stix_filename = "STIX_data.json"
+        # (ioc type, value) of all the iocs ever pushed to the taxii
+        # server, one json list per line. is kept across runs to avoid
+        # exporting duplicates
+        self.index_filename = "STIX_exported_iocs.json"
+        # seconds to wait before writing the new indicators to
+        # STIX_data.json
+        self.flush_interval = 10
         self.configs_read: bool = self.read_configuration()
         if self.should_export():
             self.print(
                 f"Exporting to Stix & TAXII very "
                 f"{self.push_delay} seconds."
             )
-            # This bundle should be created once and we should
-            # append all indicators to it
-            self.is_bundle_created = False
+            # the bundle of indicators that weren't pushed to the taxii
+            # server yet. STIX_data.json is a snapshot of it
+            self.indicators: List[Indicator] = []
+            # the (ioc type, value) of each indicator in self.indicators
+            self.pending_iocs: List[Tuple[str, str]] = []
+            # True when indicators were added since the last flush
+            self.is_dirty = False
+            self.last_flush = time.time()
+            # the add_to_stix_file() and the exporting thread both
+            # change the bundle
+            self.bundle_lock = threading.Lock()
             # To avoid duplicates in STIX_data.json
-            self.added_ips = set()
+            self.added_iocs: Set[Tuple[str, str]] = self.read_index()
+            # the indicators of the previous run that weren't pushed
+            self.read_pending_bundle()
             self.export_to_taxii_thread = threading.Thread(
                 target=self.schedule_sending_to_taxii_server, daemon=True
             )
@@ -90,7 +116,7 @@ class StixExporter(IExporter):
          pushes of cyber threat information) to publish
         our STIX_data.json file
         """
-        if not self.should_export:
+        if not self.should_export():
             return False
 
         client = self.create_client()
@@ -126,7 +152,7 @@ class StixExporter(IExporter):
         """Exits gracefully"""
         # We need to publish to taxii server before stopping
         if self.should_export():
-            self.export()
+            self.push_snapshot()
 
     def should_export(self) -> bool:
         """Determines whether to export or not"""
@@ -158,9 +184,76 @@ class StixExporter(IExporter):
         # stopping
         return True
 
-    def ip_exists_in_stix_file(self, ip):
-        """Searches for ip in STIX_data.json to avoid exporting duplicates"""
-        return ip in self.added_ips
+    def read_index(self) -> Set[Tuple[str, str]]:
+        """
+        returns the (ioc type, value) of the iocs exported in this run
+        and the previous ones
+        """
+        added_iocs = set()
+        try:
+            with open(self.index_filename) as index:
+                for line in index:
+                    try:
+                        ioc_type, value = json.loads(line)
+                    except ValueError:
+                        # a partially written line, slips was killed
+                        # while writing it
+                        continue
+                    added_iocs.add((ioc_type, value))
+        except FileNotFoundError:
+            pass
+        return added_iocs
+
+    def add_to_index(self, iocs: List[Tuple[str, str]]):
+        """adds the given pushed iocs to STIX_exported_iocs.json"""
+        with open(self.index_filename, "a") as index:
+            for ioc in iocs:
+                index.write(json.dumps(ioc) + "\n")
+
+    @staticmethod
+    def get_ioc_from_pattern(pattern: str) -> Optional[Tuple[str, str]]:
+        """
+        returns the (ioc type, value) of the given pattern built by
+        get_ioc_pattern()
+        """
+        ioc_types = {
+            "ip-addr": "ip",
+            "domain-name": "domain",
+            "url": "url",
+        }
+        if match := re.fullmatch(r"\[([\w-]+):value = '(.*)'\]", pattern):
+            if ioc_type := ioc_types.get(match.group(1)):
+                return ioc_type, match.group(2)
+
+    def read_pending_bundle(self):
+        """
+        STIX_data.json has the indicators that weren't pushed yet when
+        slips stopped, e.g. if it crashed or was restarted before the
+        push delay passed. they're added back to the bundle so they're
+        pushed by this run
+        """
+        try:
+            bundle = parse(self.read_stix_file(), allow_custom=True)
+        except FileNotFoundError:
+            return
+        except (ValueError, STIXError):
+            self.print(f"Unable to read {self.stix_filename}.", 0, 1)
+            return
+
+        for indicator in bundle.get("objects", []):
+            ioc = self.get_ioc_from_pattern(indicator.get("pattern", ""))
+            if not ioc or ioc in self.added_iocs:
+                continue
+            self.indicators.append(indicator)
+            self.pending_iocs.append(ioc)
+            self.added_iocs.add(ioc)
+
+    def ioc_exists_in_stix_file(self, ioc: Tuple[str, str]) -> bool:
+        """
+        checks if the given (ioc type, value) was exported before to
+        avoid exporting duplicates
+        """
+        return ioc in self.added_iocs
 
     def get_ioc_pattern(self, ioc_type: str, attacker) -> str:
         patterns_map = {
@@ -175,10 +268,9 @@ class StixExporter(IExporter):
 
     def add_to_stix_file(self, to_add: tuple) -> bool:
         """
-        Function to export evidence to a STIX_data.json file in the cwd.
-        It keeps appending the given indicator to STIX_data.json until they're
-         sent to the
-        taxii server
+        Adds the given evidence as an indicator to the bundle of
+        indicators that weren't sent to the taxii server yet.
+        the bundle is written to STIX_data.json by flush()
         msg_to_send is a tuple: (evidence_type,attacker)
             evidence_type: e.g PortScan, ThreatIntelligence etc
             attacker: ip of the attcker
@@ -187,9 +279,13 @@ class StixExporter(IExporter):
             to_add[0],
             to_add[1],
         )
+        ioc_type = utils.detect_ioc_type(attacker)
+        ioc = (ioc_type, attacker)
+        if self.ioc_exists_in_stix_file(ioc):
+            return True
+
         # Get the right description to use in stix
         name = evidence_type
-        ioc_type = utils.detect_ioc_type(attacker)
         pattern: str = self.get_ioc_pattern(ioc_type, attacker)
         # Required Indicator Properties: type, spec_version, id, created,
         # modified , all are set automatically
@@ -200,38 +296,73 @@ class StixExporter(IExporter):
         indicator = Indicator(
             name=name, pattern=pattern, pattern_type="stix"
         )  # the pattern language that the indicator pattern is expressed in.
-        # Create and Populate Bundle.
-        # All our indicators will be inside bundle['objects'].
-        bundle = Bundle()
-        if not self.is_bundle_created:
-            bundle = Bundle(indicator)
-            # Clear everything in the existing STIX_data.json
-            # if it's not empty
-            open(self.stix_filename, "w").close()
-            # Write the bundle.
-            with open(self.stix_filename, "w") as stix_file:
-                stix_file.write(str(bundle))
-            self.is_bundle_created = True
-        elif not self.ip_exists_in_stix_file(attacker):
-            # Bundle is already created just append to it
-            # r+ to delete last 4 chars
-            with open(self.stix_filename, "r+") as stix_file:
-                # delete the last 4 characters in the file ']\n}\n' so we
-                # can append to the objects array and add them back later
-                stix_file.seek(0, os.SEEK_END)
-                stix_file.seek(stix_file.tell() - 4, 0)
-                stix_file.truncate()
-
-            # Append mode to add the new indicator to the objects array
-            with open(self.stix_filename, "a") as stix_file:
-                # Append the indicator in the objects array
-                stix_file.write(f",{str(indicator)}" + "]\n}\n")
-
-        # Set of unique ips added to stix_data.json to avoid duplicates
-        self.added_ips.add(attacker)
+        with self.bundle_lock:
+            self.indicators.append(indicator)
+            self.pending_iocs.append(ioc)
+            self.added_iocs.add(ioc)
+            self.is_dirty = True
         self.print("Indicator added to STIX_data.json", 2, 0)
         return True
 
+    def write_stix_file(self):
+        """
+        writes the bundle to STIX_data.json atomically, the file either
+        has the old bundle or the new one, never a partially written one.
+        should be called while holding the bundle lock
+        """
+        if not self.indicators:
+            # Make sure we don't push empty files
+            if os.path.exists(self.stix_filename):
+                os.remove(self.stix_filename)
+            return
+
+        # All our indicators will be inside bundle['objects'].
+        bundle = Bundle(*self.indicators)
+        tmp_filename = f"{self.stix_filename}.tmp"
+        with open(tmp_filename, "w") as stix_file:
+            stix_file.write(str(bundle))
+        os.replace(tmp_filename, self.stix_filename)
+
+    def flush(self) -> int:
+        """
+        writes the indicators added since the last flush to STIX_data.json
+        returns the number of indicators in the written snapshot
+        """
+        with self.bundle_lock:
+            if self.is_dirty:
+                self.write_stix_file()
+                self.is_dirty = False
+            self.last_flush = time.time()
+            return len(self.indicators)
+
+    def flush_if_needed(self):
+        """flushes the bundle every flush_interval seconds"""
+        if (
+            self.is_dirty
+            and time.time() - self.last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def push_snapshot(self):
+        """
+        flushes the bundle and pushes the flushed snapshot to the
+        taxii server. the pushed indicators are then removed from the
+        bundle so they're not pushed again, and their iocs are added to
+        the index
+        """
+        pushed_indicators: int = self.flush()
+        if not pushed_indicators or not self.export():
+            return
+
+        with self.bundle_lock:
+            # keep the indicators added while exporting for the next push
+            del self.indicators[:pushed_indicators]
+            pushed_iocs = self.pending_iocs[:pushed_indicators]
+            del self.pending_iocs[:pushed_indicators]
+            self.write_stix_file()
+            self.is_dirty = False
+        self.add_to_index(pushed_iocs)
+
     def schedule_sending_to_taxii_server(self):
         """
         Responsible for publishing STIX_data.json to the taxii server every
@@ -244,11 +375,8 @@ class StixExporter(IExporter):
             # Sometimes the time's up and we need to send to
             # server again but there's no
             # new alerts in stix_data.json yet
-            if os.path.exists(self.stix_filename):
-                self.export()
-                # Delete stix_data.json file so we don't send duplicates
-                os.remove(self.stix_filename)
-                self.is_bundle_created = False
+            if self.indicators:
+                self.push_snapshot()
             else:
                 self.print(
                     f"{self.push_delay} seconds passed, "
@@ -72,7 +72,14 @@ class FidesModule(IModule):
             "fides2slips": self.f2s,
         }
 
-        self.sqlite = SQLiteDB(self.logger, os.path.join(os.getcwd(), 'p2p_db.sqlite'))
+        self.sqlite = SQLiteDB(
+            self.logger,
+            os.path.join(os.getcwd(), 'p2p_db.sqlite'),
+            history_max_size=max(
+                self.__trust_model_config.service_history_max_size,
+                self.__trust_model_config.recommendations.history_max_size,
+            ),
+        )
 
     def read_configuration(self) -> bool:
         """reurns true if all necessary configs are present and read"""
@@ -136,6 +143,10 @@ class FidesModule(IModule):
     #     # TODO: [S+] determine correct level for trust model log levels
     #     self.__output.print(f"33|{self.name}|{level} {msg}")
 
+    def shutdown_gracefully(self):
+        # write the cached trust data of the hot peers to the sqlite db
+        self.sqlite.close()
+
     def pre_main(self):
         """
         Initializations that run only once before the main() function runs in a loop
@@ -1,6 +1,9 @@
+import math
 import sqlite3
 import logging
-from typing import List, Any, Optional
+import time
+from collections import OrderedDict
+from typing import List, Any, Optional, Dict, Iterable, Set, Tuple
 
 from slips_files.core.output import Output
 from ..model.peer import PeerInfo
@@ -9,7 +12,7 @@ from ..model.recommendation import Recommendation
 from ..model.recommendation_history import RecommendationHistory, RecommendationHistoryRecord
 from ..model.service_history import ServiceHistoryRecord, ServiceHistory
 from .. model.threat_intelligence import SlipsThreatIntelligence, ThreatIntelligence
-from ..model.aliases import *
+from ..model.aliases import PeerId, OrganisationId, Target
 import threading
 
 """
@@ -21,17 +24,41 @@ Python has None, SQLite has NULL, conversion is automatic in both ways.
 class SQLiteDB:
     _lock = threading.RLock()
 
-    def __init__(self, logger: Output, db_path: str) -> None:
+    def __init__(
+        self,
+        logger: Output,
+        db_path: str,
+        history_max_size: int = 100,
+        peers_cache_size: int = 1000,
+        max_dirty_peers: int = 100,
+        flush_interval: float = 10,
+    ) -> None:
         """
         Initializes the SQLiteDB instance, sets up logging, and connects to the database.
 
         :param logger: Logger for logging debug information.
         :param db_path: Path where the SQLite database will be stored.
+        :param history_max_size: Max number of service and recommendation history records kept per peer.
+        :param peers_cache_size: Max number of hot peers whose trust data are kept in memory.
+        :param max_dirty_peers: Number of peers with unwritten trust data that triggers a flush.
+        :param flush_interval: Max seconds the trust data of a peer stays unwritten.
         """
         self.logger = logger
         self.db_path = db_path
+        self.history_max_size = history_max_size
+        self.peers_cache_size = peers_cache_size
+        self.max_dirty_peers = max_dirty_peers
+        self.flush_interval = flush_interval
+        # write-back cache of the trust data of hot peers {peerID: PeerTrustData}
+        self.peers_cache: OrderedDict[PeerId, PeerTrustData] = OrderedDict()
+        # peers whose trust data in peers_cache aren't written to the database yet
+        self.dirty_peers: Set[PeerId] = set()
+        # {peerID: (time of the newest stored service record, of the newest recommendation record)}
+        self.last_history_times: Dict[PeerId, Tuple[float, float]] = {}
+        self.last_flush = time.monotonic()
         self.connection: Optional[sqlite3.Connection] = None
         self.__connect()
+        self.__migrate_tables()
         self.__create_tables()
 
     def __slips_log(self, txt: str) -> None:
@@ -91,61 +118,171 @@ class SQLiteDB:
         self.__execute_query(query, params)
 
     def store_peer_trust_data(self, peer_trust_data: PeerTrustData) -> None:
+        """
+        Stores the given trust data in the write-back cache of hot peers.
+        The dirty peers are written to the database in one transaction
+        once there are too many of them or the flush interval passed.
+
+        :param peer_trust_data: The PeerTrustData to store, overwrites the peer's previous data.
+        """
+        with SQLiteDB._lock:
+            peer_id = peer_trust_data.info.id
+            self.__cache_peer(peer_trust_data)
+            self.dirty_peers.add(peer_id)
+            if (
+                len(self.dirty_peers) >= self.max_dirty_peers
+                or time.monotonic() - self.last_flush >= self.flush_interval
+            ):
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the trust data of all dirty peers to the database in one transaction.
+        """
+        with SQLiteDB._lock:
+            if self.dirty_peers:
+                peers = [self.peers_cache[peer_id] for peer_id in self.dirty_peers]
+                self.__write_peers_trust_data(peers)
+                self.dirty_peers.clear()
+            self.last_flush = time.monotonic()
+
+    def __cache_peer(self, peer_trust_data: PeerTrustData) -> None:
+        """
+        Adds the given trust data to the LRU cache of hot peers. The least recently
+        used peer is evicted, and written to the database first if it's dirty.
+        """
+        peer_id = peer_trust_data.info.id
+        self.peers_cache[peer_id] = peer_trust_data
+        self.peers_cache.move_to_end(peer_id)
+        if len(self.peers_cache) <= self.peers_cache_size:
+            return
+
+        evicted_id, evicted = self.peers_cache.popitem(last=False)
+        if evicted_id in self.dirty_peers:
+            self.__write_peers_trust_data([evicted])
+            self.dirty_peers.discard(evicted_id)
+        self.last_history_times.pop(evicted_id, None)
+
+    def __get_last_history_times(self, cursor: sqlite3.Cursor, peer_id: PeerId) -> Tuple[float, float]:
+        """
+        Returns the time of the newest service and recommendation history records
+        stored for the given peer, -inf if there are none.
+        """
+        if peer_id in self.last_history_times:
+            return self.last_history_times[peer_id]
+
+        cursor.execute("""
+            SELECT
+                (SELECT MAX(service_time) FROM ServiceHistory WHERE peerID = ?),
+                (SELECT MAX(recommend_time) FROM RecommendationHistory WHERE peerID = ?);
+        """, (peer_id, peer_id))
+        last_service_time, last_recommend_time = cursor.fetchone()
+        return (
+            -math.inf if last_service_time is None else last_service_time,
+            -math.inf if last_recommend_time is None else last_recommend_time,
+        )
+
+    @staticmethod
+    def __get_new_records(history: list, last_time: float) -> list:
+        """
+        Returns the records of the given history that happened after last_time.
+        The history is ordered from the oldest record, so the new ones are at its end.
+        """
+        start = len(history)
+        while start > 0 and history[start - 1].timestamp > last_time:
+            start -= 1
+        return history[start:]
+
+    def __write_peers_trust_data(self, peers: List[PeerTrustData]) -> None:
+        """
+        Upserts the trust data of the given peers and appends only their history
+        records that aren't in the database yet, all in one transaction.
+        The history of each peer is then trimmed to the last history_max_size records.
+        """
+        self.__slips_log(f"Storing trust data of {len(peers)} peers")
+        # the cached times are only updated once the transaction is committed
+        new_history_times: Dict[PeerId, Tuple[float, float]] = {}
         with SQLiteDB._lock:
-            # Insert PeerInfo first to ensure the peer exists
-            self.__execute_query("""
-                INSERT OR REPLACE INTO PeerInfo (peerID, ip) 
-                VALUES (?, ?);
-            """, (peer_trust_data.info.id, peer_trust_data.info.ip))
-
-            # Insert organisations for the peer into the PeerOrganisation table
-            for org_id in peer_trust_data.info.organisations:
-                self.__execute_query("""
-                    INSERT OR REPLACE INTO PeerOrganisation (peerID, organisationID) 
+            with self.connection:
+                cursor = self.connection.cursor()
+                cursor.executemany("""
+                    INSERT INTO PeerInfo (peerID, ip) VALUES (?, ?)
+                    ON CONFLICT(peerID) DO UPDATE SET ip = excluded.ip;
+                """, [(td.info.id, td.info.ip) for td in peers])
+
+                cursor.executemany("""
+                    INSERT OR IGNORE INTO PeerOrganisation (peerID, organisationID)
                     VALUES (?, ?);
-                """, (peer_trust_data.info.id, org_id))
-
-            # Insert PeerTrustData itself
-            self.__execute_query("""
-                INSERT INTO PeerTrustData (
-                    peerID, has_fixed_trust, service_trust, reputation, recommendation_trust, 
-                    competence_belief, integrity_belief, initial_reputation_provided_by_count
-                ) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?);
-            """, (
-                peer_trust_data.info.id, int(peer_trust_data.has_fixed_trust),
-                peer_trust_data.service_trust, peer_trust_data.reputation,
-                peer_trust_data.recommendation_trust, peer_trust_data.competence_belief,
-                peer_trust_data.integrity_belief, peer_trust_data.initial_reputation_provided_by_count
-            ))
-
-            # Prepare to insert service history and link to PeerTrustData
-            for sh in peer_trust_data.service_history:
-                self.__execute_query("""
+                """, [(td.info.id, org_id) for td in peers for org_id in td.info.organisations])
+
+                cursor.executemany("""
+                    INSERT INTO PeerTrustData (
+                        peerID, has_fixed_trust, service_trust, reputation, recommendation_trust,
+                        competence_belief, integrity_belief, initial_reputation_provided_by_count
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(peerID) DO UPDATE SET
+                        has_fixed_trust = excluded.has_fixed_trust,
+                        service_trust = excluded.service_trust,
+                        reputation = excluded.reputation,
+                        recommendation_trust = excluded.recommendation_trust,
+                        competence_belief = excluded.competence_belief,
+                        integrity_belief = excluded.integrity_belief,
+                        initial_reputation_provided_by_count = excluded.initial_reputation_provided_by_count;
+                """, [(
+                    td.info.id, int(td.has_fixed_trust),
+                    td.service_trust, td.reputation,
+                    td.recommendation_trust, td.competence_belief,
+                    td.integrity_belief, td.initial_reputation_provided_by_count
+                ) for td in peers])
+
+                new_service_records = []
+                new_recommendation_records = []
+                for td in peers:
+                    last_service_time, last_recommend_time = self.__get_last_history_times(cursor, td.info.id)
+                    service_records = self.__get_new_records(td.service_history, last_service_time)
+                    recommendation_records = self.__get_new_records(td.recommendation_history, last_recommend_time)
+                    new_service_records.extend(
+                        (td.info.id, sh.satisfaction, sh.weight, sh.timestamp) for sh in service_records
+                    )
+                    new_recommendation_records.extend(
+                        (td.info.id, rh.satisfaction, rh.weight, rh.timestamp) for rh in recommendation_records
+                    )
+                    new_history_times[td.info.id] = (
+                        service_records[-1].timestamp if service_records else last_service_time,
+                        recommendation_records[-1].timestamp if recommendation_records else last_recommend_time,
+                    )
+
+                cursor.executemany("""
                     INSERT INTO ServiceHistory (peerID, satisfaction, weight, service_time)
                     VALUES (?, ?, ?, ?);
-                """, (peer_trust_data.info.id, sh.satisfaction, sh.weight, sh.timestamp))
-
-                # Insert into PeerTrustServiceHistory
-                self.__execute_query("""
-                    INSERT INTO PeerTrustServiceHistory (peer_trust_data_id, service_history_id)
-                    VALUES (last_insert_rowid(), last_insert_rowid());
-                """)
-
-            # Prepare to insert recommendation history and link to PeerTrustData
-            for rh in peer_trust_data.recommendation_history:
-                self.__execute_query("""
+                """, new_service_records)
+                cursor.executemany("""
                     INSERT INTO RecommendationHistory (peerID, satisfaction, weight, recommend_time)
                     VALUES (?, ?, ?, ?);
-                """, (peer_trust_data.info.id, rh.satisfaction, rh.weight, rh.timestamp))
+                """, new_recommendation_records)
 
-                # Insert into PeerTrustRecommendationHistory
-                self.__execute_query("""
-                    INSERT INTO PeerTrustRecommendationHistory (peer_trust_data_id, recommendation_history_id)
-                    VALUES (last_insert_rowid(), last_insert_rowid());
-                """)
+                self.__trim_history(cursor, "ServiceHistory", {r[0] for r in new_service_records})
+                self.__trim_history(cursor, "RecommendationHistory", {r[0] for r in new_recommendation_records})
+                cursor.close()
+            self.last_history_times.update(new_history_times)
+
+    def __trim_history(self, cursor: sqlite3.Cursor, table: str, peer_ids: Iterable[PeerId]) -> None:
+        """
+        Deletes all but the newest history_max_size records of the given peers from the given
+        history table.
+        """
+        cursor.executemany(f"""
+            DELETE FROM {table}
+            WHERE peerID = ? AND id <= (
+                SELECT id FROM {table} WHERE peerID = ?
+                ORDER BY id DESC LIMIT 1 OFFSET ?
+            );
+        """, [(peer_id, peer_id, self.history_max_size) for peer_id in peer_ids])
 
     def get_peers_by_minimal_recommendation_trust(self, minimal_recommendation_trust: float) -> List[PeerInfo]:
+        # the cached trust data have to be in the database for the query
+        self.flush()
         # SQL query to select PeerInfo of peers that meet the minimal recommendation_trust criteria
         query = """
         SELECT pi.peerID, pi.ip
@@ -171,10 +308,27 @@ class SQLiteDB:
 
         return peer_list
 
-    def get_peer_trust_data(self, peer_id: str) -> PeerTrustData:
+    def get_peer_trust_data(self, peer_id: str) -> Optional[PeerTrustData]:
+        """
+        Returns the trust data of the given peer, from the cache of hot peers if
+        it's there, or None if there are no data for the peer.
+        """
+        with SQLiteDB._lock:
+            if peer_id in self.peers_cache:
+                self.peers_cache.move_to_end(peer_id)
+                return self.peers_cache[peer_id]
+
+            peer_trust_data = self.__read_peer_trust_data(peer_id)
+            if peer_trust_data is not None:
+                self.__cache_peer(peer_trust_data)
+            return peer_trust_data
+
+    def __read_peer_trust_data(self, peer_id: str) -> Optional[PeerTrustData]:
         # Fetch PeerTrustData along with PeerInfo
         query_peer_trust = """
-        SELECT ptd.*, pi.peerID, pi.ip
+        SELECT ptd.has_fixed_trust, ptd.service_trust, ptd.reputation, ptd.recommendation_trust,
+               ptd.competence_belief, ptd.integrity_belief, ptd.initial_reputation_provided_by_count,
+               pi.ip
         FROM PeerTrustData ptd
         JOIN PeerInfo pi ON ptd.peerID = pi.peerID
         WHERE ptd.peerID = ?;
@@ -185,44 +339,48 @@ class SQLiteDB:
         if not peer_trust_row:
             return None
 
-        peer_trust_row = peer_trust_row[0]  # Get the first row (since fetchall() returns a list of rows)
-
-        # Unpack PeerTrustData row (adjust indices based on your column order)
-        (trust_data_id, peerID, has_fixed_trust, service_trust, reputation, recommendation_trust,
-         competence_belief, integrity_belief, initial_reputation_count, _, ip) = peer_trust_row
+        (has_fixed_trust, service_trust, reputation, recommendation_trust,
+         competence_belief, integrity_belief, initial_reputation_count, ip) = peer_trust_row[0]
 
-        # Fetch ServiceHistory for the peer
+        # Fetch the newest history records of the peer, the oldest one first
         query_service_history = """
-        SELECT sh.satisfaction, sh.weight, sh.service_time
-        FROM ServiceHistory sh
-        JOIN PeerTrustServiceHistory pts ON sh.id = pts.service_history_id
-        JOIN PeerTrustData ptd ON pts.peer_trust_data_id = ptd.id
-        WHERE ptd.peerID = ?;
+        SELECT satisfaction, weight, service_time FROM (
+            SELECT id, satisfaction, weight, service_time
+            FROM ServiceHistory
+            WHERE peerID = ?
+            ORDER BY id DESC LIMIT ?
+        ) ORDER BY id;
         """
-        service_history_rows = self.__execute_query(query_service_history, [peer_id])
+        service_history_rows = self.__execute_query(query_service_history, [peer_id, self.history_max_size])
 
         service_history = [
             ServiceHistoryRecord(satisfaction=row[0], weight=row[1], timestamp=row[2])
             for row in service_history_rows
         ]
 
-        # Fetch RecommendationHistory for the peer
         query_recommendation_history = """
-        SELECT rh.satisfaction, rh.weight, rh.recommend_time
-        FROM RecommendationHistory rh
-        JOIN PeerTrustRecommendationHistory ptr ON rh.id = ptr.recommendation_history_id
-        JOIN PeerTrustData ptd ON ptr.peer_trust_data_id = ptd.id
-        WHERE ptd.peerID = ?;
-        """
-        recommendation_history_rows = self.__execute_query(query_recommendation_history, [peer_id])
+        SELECT satisfaction, weight, recommend_time FROM (
+            SELECT id, satisfaction, weight, recommend_time
+            FROM RecommendationHistory
+            WHERE peerID = ?
+            ORDER BY id DESC LIMIT ?
+        ) ORDER BY id;
+        """
+        recommendation_history_rows = self.__execute_query(
+            query_recommendation_history, [peer_id, self.history_max_size]
+        )
 
         recommendation_history = [
             RecommendationHistoryRecord(satisfaction=row[0], weight=row[1], timestamp=row[2])
             for row in recommendation_history_rows
         ]
 
-        # Construct PeerInfo
-        peer_info = PeerInfo(id=peerID, organisations=self.get_peer_organisations(peerID), ip=ip)  # Assuming organisation info is not fetched here.
+        self.last_history_times[peer_id] = (
+            max((sh.timestamp for sh in service_history), default=-math.inf),
+            max((rh.timestamp for rh in recommendation_history), default=-math.inf),
+        )
+
+        peer_info = PeerInfo(id=peer_id, organisations=self.get_peer_organisations(peer_id), ip=ip)
 
         # Construct and return PeerTrustData object
         return PeerTrustData(
@@ -293,6 +451,10 @@ class SQLiteDB:
         """
 
         peer_ids = [peer.id for peer in peers]  # Extract the peer IDs from list L
+        # the trust data of the disconnected peers can't be read anymore
+        self.flush()
+        for peer_id in set(self.peers_cache) - set(peer_ids):
+            del self.peers_cache[peer_id]
         placeholders = ','.join('?' for _ in peer_ids)
         delete_query = f"DELETE FROM PeerInfo WHERE peerID NOT IN ({placeholders})"
         self.__execute_query(delete_query, peer_ids)
@@ -436,6 +598,13 @@ class SQLiteDB:
         self.__slips_log(f"Deleting from table: {table} where {condition}")
         self.__execute_query(query, params)
 
+    def close(self) -> None:
+        """
+        Writes the cached trust data to the database and closes the connection.
+        """
+        self.flush()
+        self.__close()
+
     def __close(self) -> None:
         """
         Closes the SQLite database connection.
@@ -444,6 +613,62 @@ class SQLiteDB:
             self.__slips_log("Closing database connection")
             self.connection.close()
 
+    def __migrate_tables(self) -> None:
+        """
+        Migrates databases created before the trust data were keyed by peer. Those have one
+        PeerTrustData row per stored update and a copy of the whole history per update.
+        Keeps the latest trust data of each peer and one copy of the newest history records.
+        """
+        columns = [row[1] for row in self.__execute_query("PRAGMA table_info(PeerTrustData);")]
+        if "id" in columns:
+            self.__slips_log("Migrating PeerTrustData to one row per peer")
+            self.connection.executescript("""
+                BEGIN;
+                DROP TABLE IF EXISTS PeerTrustServiceHistory;
+                DROP TABLE IF EXISTS PeerTrustRecommendationHistory;
+                ALTER TABLE PeerTrustData RENAME TO PeerTrustDataOld;
+                COMMIT;
+            """)
+
+        old_table = self.__execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'PeerTrustDataOld';"
+        )
+        if not old_table:
+            return
+
+        with SQLiteDB._lock:
+            self.__create_tables()
+            self.connection.executescript(f"""
+                BEGIN;
+                INSERT INTO PeerTrustData
+                SELECT peerID, has_fixed_trust, service_trust, reputation, recommendation_trust,
+                       competence_belief, integrity_belief, initial_reputation_provided_by_count
+                FROM PeerTrustDataOld
+                WHERE id IN (SELECT MAX(id) FROM PeerTrustDataOld GROUP BY peerID);
+                DROP TABLE PeerTrustDataOld;
+                DELETE FROM ServiceHistory WHERE id NOT IN (
+                    SELECT MIN(id) FROM ServiceHistory
+                    GROUP BY peerID, satisfaction, weight, service_time
+                );
+                DELETE FROM RecommendationHistory WHERE id NOT IN (
+                    SELECT MIN(id) FROM RecommendationHistory
+                    GROUP BY peerID, satisfaction, weight, recommend_time
+                );
+                DELETE FROM ServiceHistory WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (PARTITION BY peerID ORDER BY id DESC) AS n
+                        FROM ServiceHistory
+                    ) WHERE n > {int(self.history_max_size)}
+                );
+                DELETE FROM RecommendationHistory WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (PARTITION BY peerID ORDER BY id DESC) AS n
+                        FROM RecommendationHistory
+                    ) WHERE n > {int(self.history_max_size)}
+                );
+                COMMIT;
+            """)
+
     def __create_tables(self) -> None:
         """
         Creates the necessary tables in the SQLite database.
@@ -495,8 +720,7 @@ class SQLiteDB:
             """,
             """
             CREATE TABLE IF NOT EXISTS PeerTrustData (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                peerID TEXT,                  -- The peer providing the trust evaluation
+                peerID TEXT PRIMARY KEY,      -- The peer providing the trust evaluation
                 has_fixed_trust INTEGER NOT NULL CHECK (has_fixed_trust IN (0, 1)),   -- Whether the trust is dynamic or fixed
                 service_trust REAL NOT NULL CHECK (service_trust >= 0.0 AND service_trust <= 1.0),  -- Service Trust Metric
                 reputation REAL NOT NULL CHECK (reputation >= 0.0 AND reputation <= 1.0),           -- Reputation Metric
@@ -508,22 +732,10 @@ class SQLiteDB:
             );
             """,
             """
-            CREATE TABLE IF NOT EXISTS PeerTrustServiceHistory (
-                peer_trust_data_id INTEGER,
-                service_history_id INTEGER,
-                PRIMARY KEY (peer_trust_data_id, service_history_id),
-                FOREIGN KEY (peer_trust_data_id) REFERENCES PeerTrustData(id) ON DELETE CASCADE,
-                FOREIGN KEY (service_history_id) REFERENCES ServiceHistory(id) ON DELETE CASCADE
-            );
+            CREATE INDEX IF NOT EXISTS ServiceHistory_peerID_idx ON ServiceHistory (peerID, id);
             """,
             """
-            CREATE TABLE IF NOT EXISTS PeerTrustRecommendationHistory (
-                peer_trust_data_id INTEGER,
-                recommendation_history_id INTEGER,
-                PRIMARY KEY (peer_trust_data_id, recommendation_history_id),
-                FOREIGN KEY (peer_trust_data_id) REFERENCES PeerTrustData(id) ON DELETE CASCADE,
-                FOREIGN KEY (recommendation_history_id) REFERENCES RecommendationHistory(id) ON DELETE CASCADE
-            );
+            CREATE INDEX IF NOT EXISTS RecommendationHistory_peerID_idx ON RecommendationHistory (peerID, id);
             """,
             """
             CREATE TABLE IF NOT EXISTS ThreatIntelligence (
@@ -286,3 +286,125 @@ def test_get_peer_organisations(db):
 
     # Assert that the retrieved organisations match what was inserted
     assert set(result) == set(organisations)  # Ensure all organisations are returned, order does not matter
+
+
+def create_peer_trust_data(peer_id="peer123", service_times=(), recommend_times=(), service_trust=0.5):
+    return PeerTrustData(
+        info=PeerInfo(id=peer_id, organisations=["org1"], ip="192.168.0.10"),
+        has_fixed_trust=False,
+        service_trust=service_trust,
+        reputation=0.5,
+        recommendation_trust=0.5,
+        competence_belief=0.5,
+        integrity_belief=0.5,
+        initial_reputation_provided_by_count=1,
+        service_history=[
+            ServiceHistoryRecord(satisfaction=0.5, weight=1.0, timestamp=t) for t in service_times
+        ],
+        recommendation_history=[
+            RecommendationHistoryRecord(satisfaction=0.5, weight=1.0, timestamp=t) for t in recommend_times
+        ]
+    )
+
+
+def test_store_peer_trust_data_appends_only_new_history_records(db):
+    db.store_peer_trust_data(create_peer_trust_data(service_times=[1, 2], recommend_times=[1]))
+    db.flush()
+    # the model keeps a sliding window of the history
+    db.store_peer_trust_data(
+        create_peer_trust_data(service_times=[2, 3, 4], recommend_times=[1], service_trust=0.9)
+    )
+    db.flush()
+
+    trust_rows = db._SQLiteDB__execute_query("SELECT peerID, service_trust FROM PeerTrustData")
+    assert trust_rows == [("peer123", 0.9)]
+    service_times = db._SQLiteDB__execute_query("SELECT service_time FROM ServiceHistory ORDER BY id")
+    assert service_times == [(1,), (2,), (3,), (4,)]
+    recommend_times = db._SQLiteDB__execute_query("SELECT recommend_time FROM RecommendationHistory")
+    assert recommend_times == [(1,)]
+
+
+def test_store_peer_trust_data_after_a_rolled_back_write(db, mocker):
+    db.store_peer_trust_data(create_peer_trust_data(service_times=[1, 2]))
+    mocker.patch.object(
+        db, "_SQLiteDB__trim_history", side_effect=sqlite3.OperationalError("database is locked")
+    )
+    with pytest.raises(sqlite3.OperationalError):
+        db.flush()
+    assert db._SQLiteDB__execute_query("SELECT * FROM ServiceHistory") == []
+
+    mocker.stopall()
+    # the peer is still dirty, and its records weren't committed
+    db.flush()
+    service_times = db._SQLiteDB__execute_query("SELECT service_time FROM ServiceHistory ORDER BY id")
+    assert service_times == [(1,), (2,)]
+
+
+def test_store_peer_trust_data_bounds_the_history(db):
+    db.history_max_size = 3
+    for last in range(1, 6):
+        db.store_peer_trust_data(create_peer_trust_data(service_times=range(1, last + 1)))
+        db.flush()
+
+    service_times = db._SQLiteDB__execute_query("SELECT service_time FROM ServiceHistory ORDER BY id")
+    assert service_times == [(3,), (4,), (5,)]
+
+
+def test_store_peer_trust_data_writes_back_the_cached_peers(db):
+    db.flush_interval = 1000
+    db.store_peer_trust_data(create_peer_trust_data(service_times=[1]))
+    # served from the cache before it's written
+    assert db.get_peer_trust_data("peer123").service_history[0].timestamp == 1
+    assert db._SQLiteDB__execute_query("SELECT * FROM PeerTrustData") == []
+
+    db.max_dirty_peers = 2
+    db.store_peer_trust_data(create_peer_trust_data(peer_id="peer456"))
+    assert len(db._SQLiteDB__execute_query("SELECT * FROM PeerTrustData")) == 2
+    assert not db.dirty_peers
+
+
+def test_get_peer_trust_data_of_evicted_peer(db):
+    db.peers_cache_size = 1
+    db.store_peer_trust_data(create_peer_trust_data(service_times=[1, 2]))
+    # evicts the dirty peer123 and writes it
+    db.store_peer_trust_data(create_peer_trust_data(peer_id="peer456"))
+    assert list(db.peers_cache) == ["peer456"]
+
+    result = db.get_peer_trust_data("peer123")
+    assert [sh.timestamp for sh in result.service_history] == [1, 2]
+    assert result.info.organisations == ["org1"]
+
+
+def test_migrate_trust_data_stored_per_update(tmp_path):
+    db_path = str(tmp_path / "p2p_db.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE PeerInfo (peerID TEXT PRIMARY KEY, ip VARCHAR(39));
+        CREATE TABLE ServiceHistory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, peerID TEXT, satisfaction FLOAT NOT NULL,
+            weight FLOAT NOT NULL, service_time float NOT NULL
+        );
+        CREATE TABLE PeerTrustData (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, peerID TEXT, has_fixed_trust INTEGER NOT NULL,
+            service_trust REAL NOT NULL, reputation REAL NOT NULL, recommendation_trust REAL NOT NULL,
+            competence_belief REAL NOT NULL, integrity_belief REAL NOT NULL,
+            initial_reputation_provided_by_count INTEGER NOT NULL
+        );
+        CREATE TABLE PeerTrustServiceHistory (peer_trust_data_id INTEGER, service_history_id INTEGER);
+        INSERT INTO PeerInfo VALUES ('peer123', '192.168.0.10');
+        INSERT INTO PeerTrustData VALUES (1, 'peer123', 0, 0.1, 0.5, 0.5, 0.5, 0.5, 1);
+        INSERT INTO ServiceHistory VALUES (1, 'peer123', 0.5, 1.0, 1);
+        INSERT INTO PeerTrustData VALUES (2, 'peer123', 0, 0.2, 0.5, 0.5, 0.5, 0.5, 1);
+        INSERT INTO ServiceHistory VALUES (2, 'peer123', 0.5, 1.0, 1);
+        INSERT INTO ServiceHistory VALUES (3, 'peer123', 0.5, 1.0, 2);
+    """)
+    conn.close()
+
+    db = SQLiteDB(MagicMock(), db_path)
+    result = db.get_peer_trust_data("peer123")
+    assert result.service_trust == 0.2
+    assert [sh.timestamp for sh in result.service_history] == [1, 2]
+    tables = {row[0] for row in db._SQLiteDB__execute_query("SELECT name FROM sqlite_master WHERE type='table';")}
+    assert "PeerTrustDataOld" not in tables
+    assert "PeerTrustServiceHistory" not in tables
+    db.close()
@@ -13,13 +13,16 @@ from slips_files.common.abstracts.flowalerts_analyzer import (
 from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.slips_utils import utils
 from slips_files.common.flow_classifier import FlowClassifier
+from slips_files.core.helpers.tw_state_store import TWStateStore
 
 
 class Conn(IFlowalertsAnalyzer):
     def init(self):
         # get the default gateway
         self.gateway = self.db.get_gateway_ip()
-        self.p2p_daddrs = {}
+        # the number of udp conns to each daddr on ports > 30000
+        # {(profileid, twid): {daddr: count}}
+        self.p2p_daddrs = TWStateStore("conn.p2p_daddrs")
         # If 1 flow uploaded this amount of MBs or more,
         # slips will alert data upload
         self.flow_upload_threshold = 100
@@ -71,24 +74,23 @@ class Conn(IFlowalertsAnalyzer):
             return True
         return False
 
-    def is_p2p(self, flow):
+    def is_p2p(self, profileid, twid, flow):
         """
         P2P is defined as following : proto is udp, port numbers are higher
         than 30000 at least 5 connections to different daddrs
         OR trying to connct to 1 ip on more than 5 unkown 30000+/udp ports
         """
         if flow.proto.lower() == "udp" and int(flow.dport) > 30000:
-            try:
-                # trying to connct to 1 ip on more than 5 unknown ports
-                if self.p2p_daddrs[flow.daddr] >= 6:
-                    return True
-                self.p2p_daddrs[flow.daddr] = self.p2p_daddrs[flow.daddr] + 1
-                # now check if we have more than 4 different dst ips
-            except KeyError:
-                # first time seeing this daddr
-                self.p2p_daddrs[flow.daddr] = 1
+            p2p_daddrs: Dict[str, int] = self.p2p_daddrs.setdefault(
+                profileid, twid, dict
+            )
+            # trying to connct to 1 ip on more than 5 unknown ports
+            if p2p_daddrs.get(flow.daddr, 0) >= 6:
+                return True
+            p2p_daddrs[flow.daddr] = p2p_daddrs.get(flow.daddr, 0) + 1
 
-            if len(self.p2p_daddrs) >= 5:
+            # now check if we have more than 4 different dst ips
+            if len(p2p_daddrs) >= 5:
                 # this is another connection on port 3000+/udp and
                 # we already have 5 of them, so probably p2p
                 return True
@@ -187,7 +189,7 @@ class Conn(IFlowalertsAnalyzer):
 
         if (
             "icmp" not in flow.proto
-            and not self.is_p2p(flow)
+            and not self.is_p2p(profileid, twid, flow)
             and not self.db.is_ftp_port(flow.dport)
         ):
             # we don't have info about this port
@@ -245,59 +247,23 @@ class Conn(IFlowalertsAnalyzer):
 
         return False
 
-    def get_sent_bytes(
-        self, all_flows: Dict[str, dict]
-    ) -> Dict[str, Tuple[int, List[str], str]]:
-        """
-        Returns a dict of sent bytes to all ips in the all_flows dict
-         {
-            contacted_ip: (
-                sum_of_mbs_sent,
-                [uids],
-                last_ts_of_flow_containging_this_contacted_ip
-            )
-        }
-        """
-        bytes_sent = {}
-        for uid, flow in all_flows.items():
-            daddr = flow["daddr"]
-            sbytes: int = int(flow.get("sbytes", 0))
-            ts: str = flow.get("starttime", "")
-
-            if self.is_ignored_ip_data_upload(daddr) or not sbytes:
-                continue
-
-            if daddr in bytes_sent:
-                mbs_sent, uids, _ = bytes_sent[daddr]
-                mbs_sent += int(sbytes)
-                uids.append(uid)
-                bytes_sent[daddr] = (mbs_sent, uids, ts)
-            else:
-                bytes_sent[daddr] = (sbytes, [uid], ts)
-
-        return bytes_sent
-
     def detect_data_upload_in_twid(self, profileid, twid):
         """
         For each contacted ip in this twid,
         check if the total bytes sent to this ip is >= data_exfiltration_threshold
+        The bytes sent in the flows of the tw are summed in the db by the
+        profiler as the flows are added, so they're all there once the tw
+        is closed, no matter when the new_flow msgs of the tw are received
         """
-        all_flows: Dict[str, dict] = self.db.get_all_flows_in_profileid(
-            profileid
-        )
-        if not all_flows:
-            return
-
         bytes_sent: Dict[str, Tuple[int, List[str], str]]
-        bytes_sent = self.get_sent_bytes(all_flows)
-
-        for ip, ip_info in bytes_sent.items():
-            ip_info: Tuple[int, List[str], str]
-            bytes_uploaded, uids, ts = ip_info
-            mbs_uploaded = utils.convert_to_mb(bytes_uploaded)
-            if mbs_uploaded < self.data_exfiltration_threshold:
+        bytes_sent = self.db.pop_sent_bytes(
+            profileid, twid, self.data_exfiltration_threshold * 10**6
+        )
+        for ip, (bytes_uploaded, uids, ts) in bytes_sent.items():
+            if self.is_ignored_ip_data_upload(ip):
                 continue
 
+            mbs_uploaded = utils.convert_to_mb(bytes_uploaded)
             self.set_evidence.data_exfiltration(
                 ip, mbs_uploaded, profileid, twid, uids, ts
             )
@@ -12,23 +12,24 @@ from slips_files.common.abstracts.flowalerts_analyzer import (
 from slips_files.common.flow_classifier import FlowClassifier
 from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.slips_utils import utils
+from slips_files.core.helpers.tw_state_store import TWStateStore
 from slips_files.core.structures.evidence import Direction
 
 
 class DNS(IFlowalertsAnalyzer):
     def init(self):
         self.read_configuration()
-        # this dict will contain the number of nxdomains
-        # found in every profile
-        self.nxdomains = {}
+        # the nxdomains found by each profile in each tw
+        # {(profileid, twid): ([queries], [uids])}
+        self.nxdomains = TWStateStore("dns.nxdomains")
         # if nxdomains are >= this threshold, it's probably DGA
         self.nxdomains_threshold = 10
         # Cache list of connections that we already checked in the timer
         # thread (we waited for the connection of these dns resolutions)
         self.connections_checked_in_dns_conn_timer_thread = []
-        # dict to keep track of arpa queries to check for DNS arpa scans later
-        # format {profileid: [ts,ts,...]}
-        self.dns_arpa_queries = {}
+        # keeps track of arpa queries to check for DNS arpa scans later
+        # {(profileid, twid): ([ts,ts,...], [uids], {domains})}
+        self.dns_arpa_queries = TWStateStore("dns.dns_arpa_queries")
         # after this number of arpa queries, slips will detect an arpa scan
         self.arpa_scan_threshold = 10
         self.is_running_non_stop: bool = self.db.is_running_non_stop()
@@ -343,23 +344,21 @@ class DNS(IFlowalertsAnalyzer):
         ):
             return False
 
-        profileid_twid = f"{profileid}_{twid}"
-
         # found NXDOMAIN by this profile
-        try:
-            # make sure all domains are unique
-            if flow.query not in self.nxdomains[profileid_twid]:
-                queries, uids = self.nxdomains[profileid_twid]
-                queries.append(flow.query)
-                uids.append(flow.uid)
-                self.nxdomains[profileid_twid] = (queries, uids)
-        except KeyError:
+        nxdomains = self.nxdomains.get(profileid, twid)
+        if nxdomains is None:
             # first time seeing nxdomain in this profile and tw
-            self.nxdomains.update({profileid_twid: ([flow.query], [flow.uid])})
+            self.nxdomains.set(profileid, twid, ([flow.query], [flow.uid]))
             return False
 
+        # make sure all domains are unique
+        if flow.query not in nxdomains:
+            queries, uids = nxdomains
+            queries.append(flow.query)
+            uids.append(flow.uid)
+
         # every 5 nxdomains, generate an alert.
-        queries, uids = self.nxdomains[profileid_twid]
+        queries, uids = nxdomains
         number_of_nxdomains = len(queries)
         if (
             number_of_nxdomains % 5 == 0
@@ -367,7 +366,7 @@ class DNS(IFlowalertsAnalyzer):
         ):
             self.set_evidence.dga(twid, flow, number_of_nxdomains, uids)
             # clear the list of alerted queries and uids
-            self.nxdomains[profileid_twid] = ([], [])
+            self.nxdomains.set(profileid, twid, ([], []))
             return True
 
     def check_dns_arpa_scan(self, profileid, twid, flow):
@@ -380,29 +379,22 @@ class DNS(IFlowalertsAnalyzer):
         if not flow.query.endswith(".in-addr.arpa"):
             return False
 
-        try:
-            # format of this dict is
-            # {profileid: [stime of first arpa query, stime of second, etc..]}
-            timestamps, uids, domains_scanned = self.dns_arpa_queries[
-                profileid
-            ]
-            timestamps.append(flow.starttime)
-            uids.append(flow.uid)
-            domains_scanned.add(flow.query)
-            self.dns_arpa_queries[profileid] = (
-                timestamps,
-                uids,
-                domains_scanned,
-            )
-        except KeyError:
-            # first time for this profileid to perform an arpa query
-            self.dns_arpa_queries[profileid] = (
-                [flow.starttime],
-                [flow.uid],
-                {flow.query},
+        arpa_queries = self.dns_arpa_queries.get(profileid, twid)
+        if arpa_queries is None:
+            # first time for this profileid to perform an arpa query in
+            # this tw
+            self.dns_arpa_queries.set(
+                profileid,
+                twid,
+                ([flow.starttime], [flow.uid], {flow.query}),
             )
             return False
 
+        timestamps, uids, domains_scanned = arpa_queries
+        timestamps.append(flow.starttime)
+        uids.append(flow.uid)
+        domains_scanned.add(flow.query)
+
         if len(domains_scanned) < self.arpa_scan_threshold:
             # didn't reach the threshold yet
             return False
@@ -418,7 +410,7 @@ class DNS(IFlowalertsAnalyzer):
         )
         # empty the list of arpa queries for this profile,
         # we don't need them anymore
-        self.dns_arpa_queries.pop(profileid)
+        self.dns_arpa_queries.pop(profileid, twid)
         return True
 
     async def analyze(self, msg):
@@ -1,5 +1,7 @@
 import asyncio
 import json
+import queue
+import threading
 import urllib
 from uuid import uuid4
 
@@ -10,11 +12,13 @@ from typing import (
     Optional,
 )
 
+from modules.http_analyzer.user_agent_parser import parse_user_agent
 from slips_files.common.flow_classifier import FlowClassifier
 from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.slips_utils import utils
 from slips_files.common.abstracts.module import IModule
 from slips_files.core.flows.zeek import Weird
+from slips_files.core.helpers.tw_state_store import TWStateStore
 from slips_files.core.structures.evidence import (
     Evidence,
     ProfileID,
@@ -37,8 +41,18 @@ class HTTPAnalyzer(IModule):
     def init(self):
         self.c1 = self.db.subscribe("new_http")
         self.c2 = self.db.subscribe("new_weird")
-        self.channels = {"new_http": self.c1, "new_weird": self.c2}
-        self.connections_counter = {}
+        self.c3 = self.db.subscribe("tw_closed")
+        self.channels = {
+            "new_http": self.c1,
+            "new_weird": self.c2,
+            "tw_closed": self.c3,
+        }
+        # the empty connections of each profile and tw to each of
+        # self.empty_connection_hosts {(profileid, twid): {host: (uids,
+        # number of connections)}}
+        self.connections_counter = TWStateStore(
+            "http_analyzer.connections_counter"
+        )
         self.empty_connections_threshold = 4
         # this is a list of hosts known to be resolved by malware
         # to check your internet connection
@@ -65,12 +79,19 @@ class HTTPAnalyzer(IModule):
             "application/x-dosexec",
         ]
         self.classifier = FlowClassifier()
+        # (profileid, user agent) that the offline parser has no info
+        # about, looked up online by self.online_ua_lookup_thread
+        self.pending_online_ua_lookups = queue.Queue(maxsize=1000)
+        self.online_ua_lookup_thread = threading.Thread(
+            target=self.lookup_user_agents_online, daemon=True
+        )
 
     def read_configuration(self):
         conf = ConfigParser()
         self.pastebin_downloads_threshold = (
             conf.get_pastebin_download_threshold()
         )
+        self.online_user_agent_lookup: bool = conf.online_user_agent_lookup()
 
     def detect_executable_mime_types(self, twid, flow) -> bool:
         """
@@ -129,7 +150,9 @@ class HTTPAnalyzer(IModule):
             return True
         return False
 
-    def check_multiple_empty_connections(self, twid: str, flow):
+    def check_multiple_empty_connections(
+        self, profileid: str, twid: str, flow
+    ):
         """
         Detects more than 4 empty connections to
             google, bing, yandex and yahoo on port 80
@@ -152,15 +175,18 @@ class HTTPAnalyzer(IModule):
                 flow.host in [host, f"www.{host}"]
                 and flow.request_body_len == 0
             ):
+                connections_counter = self.connections_counter.setdefault(
+                    profileid, twid, dict
+                )
                 try:
                     # this host has past connections, add to counter
-                    uids, connections = self.connections_counter[host]
+                    uids, connections = connections_counter[host]
                     connections += 1
                     uids.append(flow.uid)
-                    self.connections_counter[host] = (uids, connections)
+                    connections_counter[host] = (uids, connections)
                 except KeyError:
                     # first empty connection to this host
-                    self.connections_counter.update({host: ([flow.uid], 1)})
+                    connections_counter[host] = ([flow.uid], 1)
                 break
         else:
             # it's an http connection to a domain that isn't
@@ -168,7 +194,7 @@ class HTTPAnalyzer(IModule):
             # ignore it
             return False
 
-        uids, connections = self.connections_counter[host]
+        uids, connections = connections_counter[host]
         if connections != self.empty_connections_threshold:
             return False
 
@@ -193,7 +219,7 @@ class HTTPAnalyzer(IModule):
 
         self.db.set_evidence(evidence)
         # reset the counter
-        self.connections_counter[host] = ([], 0)
+        connections_counter[host] = ([], 0)
         return True
 
     def set_evidence_incompatible_user_agent(self, twid, flow, user_agent):
@@ -377,9 +403,33 @@ class HTTPAnalyzer(IModule):
             return False
         return json_response
 
+    @staticmethod
+    def parse_online_ua_info(ua_info: dict) -> Dict[str, str]:
+        """
+        returns the os and browser of the info returned by
+        get_ua_info_online()
+        """
+        parsed = {}
+        for key, online_key in (
+            ("os_type", "os_type"),
+            ("os_name", "os_name"),
+            ("browser", "agent_name"),
+        ):
+            # the above website returns unknown if it has
+            # no info about this UA, remove the 'unknown' from the string
+            # before storing in the db
+            parsed[key] = (
+                ua_info.get(online_key, "")
+                .replace("unknown", "")
+                .replace("  ", "")
+            )
+        return parsed
+
     def get_user_agent_info(self, user_agent: str, profileid: str):
         """
-        Get OS and browser info about a user agent online
+        Get OS and browser info about a user agent using the offline
+        parser. The UAs it has no info about are looked up online in
+        the background if online_user_agent_lookup is enabled
         """
         # some zeek http flows don't have a user agent field
         if not user_agent:
@@ -388,44 +438,60 @@ class HTTPAnalyzer(IModule):
         # keep a history of the past user agents
         self.db.add_all_user_agent_to_profile(profileid, user_agent)
 
-        # don't make a request again if we already have a
+        # don't parse it again if we already have a
         # user agent associated with this profile
         if self.db.get_user_agent_from_profile(profileid) is not None:
             # this profile already has a user agent
             return False
 
-        UA_info = {"user_agent": user_agent, "os_type": "", "os_name": ""}
+        ua_info = parse_user_agent(user_agent)
+        UA_info = {"user_agent": user_agent, **ua_info._asdict()}
+        self.db.add_user_agent_to_profile(profileid, json.dumps(UA_info))
 
-        if ua_info := self.get_ua_info_online(user_agent):
-            # the above website returns unknown if it has
-            # no info about this UA, remove the 'unknown' from the string
-            # before storing in the db
-            os_type = (
-                ua_info.get("os_type", "")
-                .replace("unknown", "")
-                .replace("  ", "")
-            )
-            os_name = (
-                ua_info.get("os_name", "")
-                .replace("unknown", "")
-                .replace("  ", "")
-            )
-            browser = (
-                ua_info.get("agent_name", "")
-                .replace("unknown", "")
-                .replace("  ", "")
-            )
+        if (
+            self.online_user_agent_lookup
+            and not ua_info.os_type
+            and not ua_info.browser
+        ):
+            try:
+                self.pending_online_ua_lookups.put_nowait(
+                    (profileid, user_agent)
+                )
+            except queue.Full:
+                pass
+        return UA_info
 
-            UA_info.update(
-                {
-                    "os_name": os_name,
-                    "os_type": os_type,
-                    "browser": browser,
-                }
+    def lookup_user_agents_online(self):
+        """
+        runs in a thread to keep the slow online queries off the main
+        loop. updates the info of the profiles' UAs that the offline
+        parser has no info about
+        """
+        while True:
+            self.lookup_user_agent_online(
+                *self.pending_online_ua_lookups.get()
             )
 
-        self.db.add_user_agent_to_profile(profileid, json.dumps(UA_info))
-        return UA_info
+    def lookup_user_agent_online(
+        self, profileid: str, user_agent: str
+    ) -> Optional[dict]:
+        """
+        updates the stored info of the given profile's UA with the info
+        found online
+        """
+        if not (ua_info := self.get_ua_info_online(user_agent)):
+            return
+
+        cached_ua = self.db.get_user_agent_from_profile(profileid)
+        if (
+            not isinstance(cached_ua, dict)
+            or cached_ua.get("user_agent") != user_agent
+        ):
+            # the profile's UA changed
+            return
+        cached_ua.update(self.parse_online_ua_info(ua_info))
+        self.db.add_user_agent_to_profile(profileid, json.dumps(cached_ua))
+        return cached_ua
 
     def extract_info_from_ua(self, user_agent, profileid):
         """
@@ -487,6 +553,11 @@ class HTTPAnalyzer(IModule):
                 # 'Linux' in both UAs, so we shouldn't alert
                 return False
 
+        # the os names given by the parser don't always appear in the UAs,
+        # e.g. iOS UAs say iPhone OS or CPU OS
+        if parse_user_agent(flow.user_agent).os_type == os_type:
+            return False
+
         ua: str = cached_ua.get("user_agent", "")
         description: str = (
             f"Using multiple user-agents:" f' "{ua}" then "{flow.user_agent}"'
@@ -645,6 +716,8 @@ class HTTPAnalyzer(IModule):
 
     def pre_main(self):
         utils.drop_root_privs()
+        if self.online_user_agent_lookup:
+            self.online_ua_lookup_thread.start()
 
     def main(self):
         if msg := self.get_msg("new_http"):
@@ -653,7 +726,7 @@ class HTTPAnalyzer(IModule):
             twid = msg["twid"]
             flow = self.classifier.convert_to_flow_obj(msg["flow"])
             self.check_suspicious_user_agents(profileid, twid, flow)
-            self.check_multiple_empty_connections(twid, flow)
+            self.check_multiple_empty_connections(profileid, twid, flow)
             # find the UA of this profileid if we don't have it
             # get the last used ua of this profile
             cached_ua = self.db.get_user_agent_from_profile(profileid)
@@ -682,3 +755,7 @@ class HTTPAnalyzer(IModule):
         if msg := self.get_msg("new_weird"):
             msg = json.loads(msg["data"])
             self.check_weird_http_method(msg)
+
+        # get_msg() evicts the empty connections of the closed tw from
+        # self.connections_counter
+        self.get_msg("tw_closed")
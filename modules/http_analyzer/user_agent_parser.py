@@ -0,0 +1,144 @@
+"""
+Offline parser of the OS, browser and device of HTTP user agents.
+Replaces querying http://useragentstring.com about each user agent.
+"""
+
+import re
+from functools import lru_cache
+from typing import (
+    NamedTuple,
+    Optional,
+    Pattern,
+    Tuple,
+)
+
+# the number of parsed user agents to keep in memory
+CACHE_SIZE = 4096
+
+
+class UserAgentInfo(NamedTuple):
+    # e.g. Windows, Macintosh, Linux
+    os_type: str
+    # e.g. Windows 10, OS X
+    os_name: str
+    # e.g. Chrome, Safari, curl
+    browser: str
+    # Desktop, Mobile, Tablet or Bot
+    device_type: str
+
+
+def compile_rules(*rules: Tuple) -> Tuple[Tuple[Pattern, ...], ...]:
+    return tuple((re.compile(rule[0], re.I), *rule[1:]) for rule in rules)
+
+
+# the rules of each field are tried in order and the first match wins,
+# so more specific rules come first. e.g. android UAs contain Linux,
+# edge UAs contain Chrome, and chrome UAs contain Safari.
+# (regex, os_type, os_name). os_name None means the os_name is the
+# windows version in the first group of the regex
+OS_RULES = compile_rules(
+    (r"windows phone", "Windows", "Windows Phone"),
+    (r"windows nt (\d+\.\d+)", "Windows", None),
+    (r"windows (?:xp|98|95|me|ce)|win(?:32|64)|windows", "Windows", "Windows"),
+    (r"iphone|ipad|ipod", "iOS", "iOS"),
+    (r"mac os x|macintosh|darwin|macos|cfnetwork", "Macintosh", "OS X"),
+    (r"android", "Linux", "Android"),
+    (r"\bcros\b", "Linux", "Chrome OS"),
+    (r"ubuntu", "Linux", "Ubuntu"),
+    (r"fedora", "Linux", "Fedora"),
+    (r"debian", "Linux", "Debian"),
+    (r"linux|x11", "Linux", "Linux"),
+    (r"freebsd", "BSD", "FreeBSD"),
+    (r"openbsd", "BSD", "OpenBSD"),
+)
+# {windows nt version: windows name}
+WINDOWS_VERSIONS = {
+    "10.0": "Windows 10",
+    "6.3": "Windows 8.1",
+    "6.2": "Windows 8",
+    "6.1": "Windows 7",
+    "6.0": "Windows Vista",
+    "5.2": "Windows XP",
+    "5.1": "Windows XP",
+    "5.0": "Windows 2000",
+}
+# (regex, browser)
+BROWSER_RULES = compile_rules(
+    (r"googlebot", "Googlebot"),
+    (r"bingbot", "Bingbot"),
+    (r"edg(?:e|a|ios)?/", "Edge"),
+    (r"opr/|opera", "Opera"),
+    (r"samsungbrowser/", "Samsung Internet"),
+    (r"yabrowser/", "Yandex Browser"),
+    (r"vivaldi/", "Vivaldi"),
+    (r"firefox/|fxios/", "Firefox"),
+    (r"chromium/", "Chromium"),
+    (r"chrome/|crios/", "Chrome"),
+    (r"msie |trident/", "Internet Explorer"),
+    # other webkit based clients, e.g. android webviews, have
+    # Safari/ too, only safari has Version/ before it
+    (r"^(?!.*android).*version/[\d.]+ .*safari/", "Safari"),
+    (r"^curl/", "curl"),
+    (r"^wget/", "Wget"),
+    (r"python-requests/", "python-requests"),
+    (r"python-urllib/", "Python-urllib"),
+    (r"go-http-client/", "Go-http-client"),
+    (r"okhttp/", "okhttp"),
+    (r"^java/|apache-httpclient/", "Java"),
+    (r"libwww-perl/", "libwww-perl"),
+    (r"windowspowershell/", "PowerShell"),
+    (r"microsoft-cryptoapi/", "Microsoft-CryptoAPI"),
+    (r"windows-update-agent", "Windows-Update-Agent"),
+    (r"microsoft bits/", "Microsoft BITS"),
+)
+# (regex, device_type)
+DEVICE_RULES = compile_rules(
+    (r"bot\b|crawler|spider", "Bot"),
+    # android apps don't say if they're running on a phone or a tablet
+    (r"^dalvik/", ""),
+    (r"ipad|tablet|kindle|silk/|android(?!.*mobile)", "Tablet"),
+    (r"mobile|iphone|ipod|windows phone", "Mobile"),
+)
+
+
+def match(rules: Tuple, user_agent: str) -> Optional[Tuple]:
+    """
+    returns the first rule that matches the given user agent and the
+    match object
+    """
+    for rule in rules:
+        if found := rule[0].search(user_agent):
+            return rule, found
+    return None
+
+
+def get_os(user_agent: str) -> Tuple[str, str]:
+    if not (res := match(OS_RULES, user_agent)):
+        return "", ""
+    (_, os_type, os_name), found = res
+    if os_name is None:
+        os_name = WINDOWS_VERSIONS.get(found.group(1), "Windows")
+    return os_type, os_name
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_user_agent(user_agent: str) -> UserAgentInfo:
+    """
+    returns the os, browser and device type of the given user agent.
+    the fields that aren't found are empty strings.
+    the user agents of a busy network are mostly the same few, so the
+    result of each one is cached
+    """
+    os_type, os_name = get_os(user_agent)
+
+    browser = ""
+    if res := match(BROWSER_RULES, user_agent):
+        browser = res[0][1]
+
+    device_type = ""
+    if res := match(DEVICE_RULES, user_agent):
+        device_type = res[0][1]
+    elif os_type:
+        device_type = "Desktop"
+
+    return UserAgentInfo(os_type, os_name, browser, device_type)
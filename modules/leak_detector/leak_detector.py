@@ -5,13 +5,13 @@ import binascii
 import os
 import subprocess
 import json
-import shutil
 from typing import (
     Dict,
     List,
 )
 from uuid import uuid4
 
+from modules.leak_detector.yara_scanner import YaraScanner
 from slips_files.common.slips_utils import utils
 from slips_files.common.abstracts.module import IModule
 from slips_files.core.structures.evidence import (
@@ -34,6 +34,7 @@ class LeakDetector(IModule):
     authors = ["Alya Gomaa"]
 
     def init(self):
+        self.pcap = None
         # this module is only loaded when a pcap is given get the pcap path
         try:
             self.pcap = utils.sanitize(sys.argv[sys.argv.index("-f") + 1])
@@ -45,22 +46,23 @@ class LeakDetector(IModule):
         self.compiled_yara_rules_path = (
             "modules/leak_detector/yara_rules/compiled/"
         )
+        self.scanner = YaraScanner(
+            self.yara_rules_path, self.compiled_yara_rules_path
+        )
         self.bin_found = False
         if self.is_yara_installed():
             self.bin_found = True
 
     def is_yara_installed(self) -> bool:
         """
-        Checks if yara bin is installed
+        Checks if yara-python is installed
         """
-        cmd = "yara -h > /dev/null 2>&1"
-        returncode = os.system(cmd)
-        if returncode in [256, 0]:
-            # it is installed
+        if self.scanner.is_available():
             return True
-        # elif returncode == 32512:
+
         self.print(
-            "yara is not installed. install it using:\nsudo apt-get install yara"
+            "yara-python is not installed. install it using:\n"
+            "pip3 install yara-python"
         )
         return False
 
@@ -265,115 +267,54 @@ class LeakDetector(IModule):
 
         self.db.set_evidence(evidence)
 
-    def compile_and_save_rules(self):
+    def compile_and_save_rules(self) -> bool:
         """
-        Compile and save all yara rules in the compiled_yara_rules_path
+        Compile all yara rules into one ruleset and save it in the
+        compiled_yara_rules_path
         """
-
         try:
-            os.mkdir(self.compiled_yara_rules_path)
-        except FileExistsError:
-            pass
-
-        for yara_rule in os.listdir(self.yara_rules_path):
-            compiled_rule_path = os.path.join(
-                self.compiled_yara_rules_path, f"{yara_rule}_compiled"
-            )
-            # if we already have the rule compiled, don't compile again
-            if os.path.exists(compiled_rule_path):
-                # we already have the rule compiled
-                continue
-
-            # get the complete path of the .yara rule
-            rule_path = os.path.join(self.yara_rules_path, yara_rule)
-            # compile
-            cmd = f"yarac {rule_path} {compiled_rule_path} >/dev/null 2>&1"
-            return_code = os.system(cmd)
-            if return_code != 0:
-                self.print(f"Error compiling {yara_rule}.")
-                return False
+            self.scanner.compile()
+        except Exception as e:
+            # yara.Error or SyntaxError
+            self.print(f"Error compiling yara rules. {e}")
+            return False
         return True
 
-    def delete_compiled_rules(self):
+    def find_matches(self):
         """
-        delete old YARA compiled rules when a new version of yara is being used
+        Run the compiled yara ruleset on the part of the given pcap that
+        wasn't scanned yet, and set evidence for each match
         """
-        shutil.rmtree(self.compiled_yara_rules_path)
-        os.mkdir(self.compiled_yara_rules_path)
-
-    def find_matches(self):
-        """Run yara rules on the given pcap and find matches"""
-        for compiled_rule in os.listdir(self.compiled_yara_rules_path):
-            compiled_rule_path = os.path.join(
-                self.compiled_yara_rules_path, compiled_rule
-            )
-            # -p 7 means use 7 threads for faster analysis
-            # -f to stop searching for strings when they were already found
-            # -s prints the found string
-            cmd = f'yara -C {compiled_rule_path} "{self.pcap}" -p 7 -f -s '
-            yara_proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-                shell=True,
-            )
-
-            lines, error = yara_proc.communicate()
-            lines = lines.decode()
-            if error:
-                if (
-                    b"rules were compiled with a different version of YARA"
-                    in error.strip()
-                ):
-                    self.delete_compiled_rules()
-                    # will re-compile and save rules again and try to find matches
-                    self.run()
-                else:
-                    self.print(
-                        f"YARA error {yara_proc.returncode}: {error.strip()}"
-                    )
-                    return
-
-            if not lines:
-                # no match
-                return
-
-            lines = lines.splitlines()
-            matching_rule = lines[0].split()[0]
-            # each match (line) should be a separate detection(yara match)
-            for line in lines[1:]:
-                # example of a line: 0x4e15c:$rgx_gps_loc: ll=00.000000,-00.000000
-                line = line.split(":")
-                # offset: pcap index where the rule was matched
-                offset = int(line[0], 16)
-                # var is either $rgx_gps_loc, $rgx_gps_lon or $rgx_gps_lat
-                var = line[1].replace("$", "")
-                # strings_matched is exactly the string that was found that triggered this detection
-                # starts from the var until the end of the line
-                strings_matched = " ".join(list(line[2:]))
-                self.set_evidence_yara_match(
-                    {
-                        "rule": matching_rule,
-                        "vars_matched": var,
-                        "strings_matched": strings_matched,
-                        "offset": offset,
-                    }
-                )
+        try:
+            for match in self.scanner.scan(self.pcap):
+                self.set_evidence_yara_match(match)
+        except Exception as e:
+            # yara.Error
+            self.print(f"YARA error: {e}")
 
     def pre_main(self):
         utils.drop_root_privs()
 
-        if not self.bin_found:
-            # yara is not installed
+        if not self.bin_found or not self.pcap:
+            # yara-python is not installed
             return 1
 
         # if we we don't have compiled rules, compile them
-        if self.compile_and_save_rules():
-            # run the yara rules on the given pcap
-            self.find_matches()
+        if not self.compile_and_save_rules():
+            return 1
+
+        # run the yara rules on what's available of the given pcap
+        self.find_matches()
 
     def main(self):
-        # nothing runs in a loop in this module
-        # exit module
-        return 1
+        # the pcap may still be growing, scan whatever was added to it
+        # since the last scan
+        if self.scanner.has_unscanned_data(self.pcap):
+            self.find_matches()
+        else:
+            time.sleep(1)
+
+    def shutdown_gracefully(self):
+        # don't miss anything written to the pcap after the last scan
+        if self.scanner.rules and self.scanner.has_unscanned_data(self.pcap):
+            self.find_matches()
@@ -0,0 +1,188 @@
+import os
+from typing import (
+    Dict,
+    Iterator,
+    List,
+)
+
+try:
+    import yara
+except ImportError:
+    # the leak detector checks for this and stops if yara-python
+    # isn't installed
+    yara = None
+
+
+class YaraScanner:
+    """
+    Compiles all the YARA rules of the leak detector into one ruleset
+    using yara-python and scans the pcap in-process, in streamed,
+    overlapping chunks.
+
+    The scanner remembers how much of the pcap was scanned, so calling
+    scan() again only reads the bytes that were appended since the last
+    call. this way the pcap is read once no matter how many rules we have,
+    and a pcap that is still being written can be scanned incrementally.
+    """
+
+    # the name of the file that has all the compiled rules
+    compiled_ruleset_name = "all_rules_compiled"
+
+    def __init__(
+        self,
+        rules_path: str,
+        compiled_rules_path: str,
+        chunk_size: int = 8 * 1024 * 1024,
+        overlap: int = 64 * 1024,
+    ):
+        """
+        :param rules_path: dir with the .yara rules
+        :param compiled_rules_path: dir to store the compiled ruleset in
+        :param chunk_size: number of bytes read from the pcap per scan
+        :param overlap: number of bytes of the previous chunk that are
+        re-scanned with every new chunk. matches that cross a chunk
+        boundary are detected as long as they're shorter than this
+        """
+        if overlap >= chunk_size:
+            raise ValueError("overlap should be smaller than the chunk size")
+
+        self.rules_path = rules_path
+        self.compiled_rules_path = compiled_rules_path
+        self.compiled_ruleset_path = os.path.join(
+            compiled_rules_path, self.compiled_ruleset_name
+        )
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.rules = None
+        # the number of bytes of the pcap that were already scanned
+        self.scanned_until = 0
+
+    @staticmethod
+    def is_available() -> bool:
+        """returns True if yara-python is installed"""
+        return yara is not None
+
+    def get_rule_files(self) -> Dict[str, str]:
+        """
+        returns a dict with the name of each rule file as the namespace
+        and its path as the value
+        """
+        rule_files = {}
+        for rule_file in sorted(os.listdir(self.rules_path)):
+            rule_path = os.path.join(self.rules_path, rule_file)
+            if os.path.isfile(rule_path):
+                rule_files[rule_file] = rule_path
+        return rule_files
+
+    def is_compiled_ruleset_outdated(self, rule_files: Dict[str, str]):
+        """
+        returns True if any of the rules was modified after the
+        ruleset was compiled
+        """
+        if not os.path.exists(self.compiled_ruleset_path):
+            return True
+
+        compiled_at = os.path.getmtime(self.compiled_ruleset_path)
+        return any(
+            os.path.getmtime(rule_path) > compiled_at
+            for rule_path in rule_files.values()
+        )
+
+    def compile(self):
+        """
+        Compiles all the rules into one ruleset and saves it to
+        compiled_rules_path. loads the saved ruleset instead if none
+        of the rules changed since it was compiled.
+        raises yara.Error if any rule doesn't compile
+        """
+        rule_files: Dict[str, str] = self.get_rule_files()
+        if not self.is_compiled_ruleset_outdated(rule_files):
+            try:
+                self.rules = yara.load(self.compiled_ruleset_path)
+                return
+            except yara.Error:
+                # compiled with a different version of YARA,
+                # compile it again
+                pass
+
+        self.rules = yara.compile(filepaths=rule_files)
+        os.makedirs(self.compiled_rules_path, exist_ok=True)
+        self.rules.save(self.compiled_ruleset_path)
+
+    @staticmethod
+    def get_string_matches(match) -> List[tuple]:
+        """
+        returns a list of (offset, identifier, matched_data) of the given
+        yara match.
+        yara-python >= 4.3 returns StringMatch objects, older versions
+        return tuples of the same 3 values
+        """
+        string_matches = []
+        for string_match in match.strings:
+            if isinstance(string_match, tuple):
+                string_matches.append(string_match)
+                continue
+
+            for instance in string_match.instances:
+                string_matches.append(
+                    (
+                        instance.offset,
+                        string_match.identifier,
+                        instance.matched_data,
+                    )
+                )
+        return string_matches
+
+    def scan_chunk(
+        self, data: bytes, chunk_start: int, already_scanned_until: int
+    ) -> Iterator[dict]:
+        """
+        Scans the given chunk and yields a dict per matched string.
+        matches that are completely before already_scanned_until were
+        yielded when the previous chunk was scanned, so they are skipped
+        :param chunk_start: the offset of the given data in the pcap
+        """
+        for match in self.rules.match(data=data):
+            for offset, identifier, matched_data in self.get_string_matches(
+                match
+            ):
+                offset += chunk_start
+                if offset + len(matched_data) <= already_scanned_until:
+                    continue
+
+                yield {
+                    "rule": match.rule,
+                    "vars_matched": identifier.replace("$", ""),
+                    "strings_matched": matched_data.decode(
+                        "utf-8", errors="replace"
+                    ),
+                    "offset": offset,
+                }
+
+    def scan(self, pcap: str) -> Iterator[dict]:
+        """
+        Scans the part of the given pcap that wasn't scanned before and
+        yields a dict per match with the keys 'rule', 'vars_matched',
+        'strings_matched' and 'offset', where offset is the
+        index of the match in the pcap
+        """
+        with open(pcap, "rb") as f:
+            while True:
+                chunk_start = max(0, self.scanned_until - self.overlap)
+                f.seek(chunk_start)
+                data: bytes = f.read(
+                    self.chunk_size + self.scanned_until - chunk_start
+                )
+                chunk_end = chunk_start + len(data)
+                if chunk_end <= self.scanned_until:
+                    # nothing new was written to the pcap
+                    return
+
+                already_scanned_until = self.scanned_until
+                self.scanned_until = chunk_end
+                yield from self.scan_chunk(
+                    data, chunk_start, already_scanned_until
+                )
+
+    def has_unscanned_data(self, pcap: str) -> bool:
+        return os.path.getsize(pcap) > self.scanned_until
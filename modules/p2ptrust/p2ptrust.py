@@ -18,7 +18,7 @@ import modules.p2ptrust.trust.trustdb as trustdb
 import modules.p2ptrust.utils.utils as p2p_utils
 from modules.p2ptrust.utils.go_director import GoDirector
 from slips_files.core.structures.evidence import (
-    dict_to_evidence,
+    trusted_dict_to_evidence,
     Evidence,
     ProfileID,
     TimeWindow,
@@ -331,7 +331,8 @@ class Trust(IModule):
             evidence: Dict[str, str] = json.loads(msg["data"])
         except json.decoder.JSONDecodeError:
             return
-        evidence: Evidence = dict_to_evidence(evidence)
+        # sent by the evidence handler
+        evidence: Evidence = trusted_dict_to_evidence(evidence)
 
         if not self.should_share(evidence):
             return
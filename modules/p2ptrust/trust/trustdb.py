@@ -1,10 +1,64 @@
 import sqlite3
 import datetime
 import time
+from collections import OrderedDict
+from typing import (
+    List,
+    Tuple,
+)
+
 from slips_files.common.printer import Printer
 from slips_files.core.output import Output
 
 
+# computes the opinion of the peers on an ip in 1 query.
+# for each report on the ip, gets the ip of the reporter at the time of
+# the report, the latest reliability of the reporter and the latest slips
+# reputation of the reporter's ip. each latest row is looked up using the
+# (key, update_time) indexes
+OPINION_ON_IP_QUERY = """
+WITH ip_reports AS (
+    SELECT id, reporter_peerid, update_time, score, confidence,
+        (
+            SELECT ipaddress FROM peer_ips
+            WHERE peerid = reports.reporter_peerid
+                AND update_time <= reports.update_time
+            ORDER BY update_time DESC, id DESC
+            LIMIT 1
+        ) AS reporter_ip
+    FROM reports
+    WHERE key_type = 'ip' AND reported_key = :ip
+),
+reliabilities AS (
+    SELECT peerid, reliability FROM (
+        SELECT peerid, reliability, ROW_NUMBER() OVER (
+            PARTITION BY peerid ORDER BY update_time DESC, id DESC
+        ) AS row_number
+        FROM go_reliability
+        WHERE peerid IN (SELECT reporter_peerid FROM ip_reports)
+    )
+    WHERE row_number = 1
+),
+reputations AS (
+    SELECT ipaddress, score, confidence FROM (
+        SELECT ipaddress, score, confidence, ROW_NUMBER() OVER (
+            PARTITION BY ipaddress ORDER BY update_time DESC, id DESC
+        ) AS row_number
+        FROM slips_reputation
+        WHERE ipaddress IN (SELECT reporter_ip FROM ip_reports)
+    )
+    WHERE row_number = 1
+)
+SELECT ip_reports.score, ip_reports.confidence, reliabilities.reliability,
+    reputations.score, reputations.confidence
+FROM ip_reports
+JOIN reliabilities ON reliabilities.peerid = ip_reports.reporter_peerid
+JOIN reputations ON reputations.ipaddress = ip_reports.reporter_ip
+WHERE ip_reports.reporter_ip != :ip
+ORDER BY ip_reports.update_time DESC, ip_reports.id DESC;
+"""
+
+
 class TrustDB:
     name = "P2P Trust DB"
 
@@ -13,9 +67,20 @@ class TrustDB:
         logger: Output,
         db_file: str,
         drop_tables_on_startup: bool = False,
+        opinion_cache_size: int = 1000,
     ):
-        """create a database connection to a SQLite database"""
+        """
+        create a database connection to a SQLite database
+        :param opinion_cache_size: max number of computed opinions to keep
+        in memory. 0 disables the cache
+        """
         self.printer = Printer(logger, self.name)
+        self.opinion_cache_size = opinion_cache_size
+        # {ip: the result of get_opinion_on_ip()}
+        # the opinion on an ip is invalidated when a new report about it
+        # arrives, all of them are invalidated when the reliability, ip or
+        # reputation of any peer changes
+        self.opinions: OrderedDict[str, List[Tuple]] = OrderedDict()
         self.conn = sqlite3.connect(db_file)
         if drop_tables_on_startup:
             self.print("Dropping tables")
@@ -77,6 +142,40 @@ class TrustDB:
             "network_score REAL NOT NULL, "
             "update_time DATE NOT NULL);"
         )
+        self.create_indexes()
+
+    def create_indexes(self):
+        """
+        indexes the columns used for getting the latest row of each
+        peer/ip and the reports on an ip
+        """
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS reports_reported_key_idx "
+            "ON reports (reported_key, key_type, update_time);"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS peer_ips_peerid_idx "
+            "ON peer_ips (peerid, update_time);"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS go_reliability_peerid_idx "
+            "ON go_reliability (peerid, update_time);"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS slips_reputation_ipaddress_idx "
+            "ON slips_reputation (ipaddress, update_time);"
+        )
+
+    def invalidate_opinions(self, *ips: str):
+        """
+        removes the cached opinions on the given ips, or all the cached
+        opinions if no ips are given
+        """
+        if not ips:
+            self.opinions.clear()
+            return
+        for ip in ips:
+            self.opinions.pop(ip, None)
 
     def delete_tables(self):
         self.conn.execute("DROP TABLE IF EXISTS opinion_cache;")
@@ -97,6 +196,7 @@ class TrustDB:
             parameters,
         )
         self.conn.commit()
+        self.invalidate_opinions()
 
     def insert_go_reliability(
         self, peerid: str, reliability: float, timestamp: int = None
@@ -111,6 +211,7 @@ class TrustDB:
             parameters,
         )
         self.conn.commit()
+        self.invalidate_opinions()
 
     def insert_go_ip_pairing(
         self, peerid: str, ip: str, timestamp: int = None
@@ -125,6 +226,7 @@ class TrustDB:
             parameters,
         )
         self.conn.commit()
+        self.invalidate_opinions()
 
     def insert_new_go_data(self, reports: list):
         self.conn.executemany(
@@ -134,6 +236,8 @@ class TrustDB:
             reports,
         )
         self.conn.commit()
+        # the reported key is the 3rd value of each report
+        self.invalidate_opinions(*(report[2] for report in reports))
 
     def insert_new_go_report(
         self,
@@ -167,6 +271,7 @@ class TrustDB:
             parameters,
         )
         self.conn.commit()
+        self.invalidate_opinions(reported_key)
 
     def update_cached_network_opinion(
         self,
@@ -252,7 +357,8 @@ class TrustDB:
             "FROM go_reliability "
             "WHERE peerid = ? "
             "ORDER BY update_time DESC "
-            "LIMIT 1;"
+            "LIMIT 1;",
+            (reporter_peerid,),
         )
         if res := go_reliability_cur.fetchone():
             return res[0]
@@ -274,50 +380,28 @@ class TrustDB:
             return res
         return None, None
 
-    def get_opinion_on_ip(self, ipaddress):
+    def get_opinion_on_ip(self, ipaddress) -> List[Tuple]:
         """
         Returns a list of tuples, where each tuple contains the report score, report confidence,
         reporter reliability, reporter score, and reporter confidence for a given IP address.
+        reports by peers that had the given ip at the time of the report,
+        or whose reliability or reputation is unknown, are skipped.
         """
-        reports = self.get_reports_for_ip(ipaddress)
-        reporters_scores = []
-
-        for (
-            reporter_peerid,
-            report_timestamp,
-            report_score,
-            report_confidence,
-            reported_ip,
-        ) in reports:
-            reporter_ipaddress = self.get_reporter_ip(
-                reporter_peerid, report_timestamp
-            )
-            if reporter_ipaddress == ipaddress:
-                continue
-
-            reporter_reliability = self.get_reporter_reliability(
-                reporter_peerid
-            )
-            if reporter_reliability is None:
-                continue
-
-            reporter_score, reporter_confidence = self.get_reporter_reputation(
-                reporter_ipaddress
-            )
-            if reporter_score is None or reporter_confidence is None:
-                continue
-
-            reporters_scores.append(
-                (
-                    report_score,
-                    report_confidence,
-                    reporter_reliability,
-                    reporter_score,
-                    reporter_confidence,
-                )
-            )
-
-        return reporters_scores
+        try:
+            self.opinions.move_to_end(ipaddress)
+            return list(self.opinions[ipaddress])
+        except KeyError:
+            pass
+
+        reporters_scores: List[Tuple] = self.conn.execute(
+            OPINION_ON_IP_QUERY, {"ip": ipaddress}
+        ).fetchall()
+
+        if self.opinion_cache_size:
+            self.opinions[ipaddress] = reporters_scores
+            if len(self.opinions) > self.opinion_cache_size:
+                self.opinions.popitem(last=False)
+        return list(reporters_scores)
 
 
 if __name__ == "__main__":
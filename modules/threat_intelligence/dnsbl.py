@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from dns.exception import DNSException
+import dns.asyncresolver
+from dns.resolver import (
+    NXDOMAIN,
+    NoAnswer,
+)
+
+
+class DNSBLClient:
+    """
+    Asynchronous DNSBL lookups shared by the TI sources.
+
+    The lookups run in an asyncio event loop in a daemon thread, so the
+    TI module's main loop never waits for them.
+    - at most max_concurrent_queries lookups are sent at the same time,
+      the rest wait for their turn
+    - concurrent lookups of the same hostname are sent once
+    - listed hostnames are cached for the TTL of their record,
+      at most positive_ttl seconds. unlisted ones are cached for
+      negative_ttl seconds. failed lookups aren't cached
+    """
+
+    def __init__(
+        self,
+        max_concurrent_queries: int = 20,
+        timeout: float = 2.0,
+        positive_ttl: float = 3600,
+        negative_ttl: float = 3600,
+        cache_size: int = 10000,
+        nameservers: Optional[List[str]] = None,
+        port: int = 53,
+    ):
+        """
+        :param nameservers: the nameservers to query instead of the ones
+        in /etc/resolv.conf
+        """
+        self.max_concurrent_queries = max_concurrent_queries
+        self.timeout = timeout
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.cache_size = cache_size
+        self.nameservers = nameservers
+        self.port = port
+        # {hostname: (expiry time, the A records or None if not listed)}
+        # accessed by the loop's thread and the callers' thread
+        self.cache: OrderedDict[str, Tuple[float, Optional[List[str]]]] = (
+            OrderedDict()
+        )
+        self.cache_lock = threading.Lock()
+        # the following are only accessed by the loop's thread
+        # {hostname: the future of its lookup}
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.resolver = None
+        # the loop and thread are created on the first lookup, in the
+        # process that does the lookups
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.start_lock = threading.Lock()
+
+    def setup_resolver(self):
+        if self.nameservers:
+            resolver = dns.asyncresolver.Resolver(configure=False)
+            resolver.nameservers = self.nameservers
+        else:
+            resolver = dns.asyncresolver.Resolver()
+        resolver.port = self.port
+        resolver.timeout = self.timeout
+        resolver.lifetime = self.timeout
+        return resolver
+
+    def start(self):
+        """starts the event loop thread if it isn't started"""
+        with self.start_lock:
+            if self.loop:
+                return
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(
+                target=self.loop.run_forever, daemon=True, name="dnsbl"
+            )
+            self.thread.start()
+
+    def stop(self):
+        if not self.loop:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.loop = None
+
+    def get_cached(self, hostname: str) -> Tuple[bool, Optional[List[str]]]:
+        """
+        returns whether the given hostname is cached, and its A records,
+        None if it's not listed
+        """
+        with self.cache_lock:
+            try:
+                expiry, records = self.cache[hostname]
+            except KeyError:
+                return False, None
+            if expiry < time.time():
+                del self.cache[hostname]
+                return False, None
+            self.cache.move_to_end(hostname)
+            return True, records
+
+    def cache_result(
+        self, hostname: str, records: Optional[List[str]], ttl: float
+    ):
+        with self.cache_lock:
+            self.cache[hostname] = (time.time() + ttl, records)
+            self.cache.move_to_end(hostname)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def lookup(
+        self,
+        hostname: str,
+        callback: Callable[[Optional[List[str]]], None],
+    ):
+        """
+        looks up the given hostname without waiting for the result.
+        callback is called with the A records of the hostname, or None
+        if it's not listed or the lookup failed. it's called in the
+        loop's thread
+        """
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(
+            self.resolve(hostname), self.loop
+        )
+        future.add_done_callback(
+            lambda future: callback(
+                None if future.exception() else future.result()
+            )
+        )
+
+    async def resolve(self, hostname: str) -> Optional[List[str]]:
+        """returns the A records of the given hostname"""
+        cached, records = self.get_cached(hostname)
+        if cached:
+            return records
+
+        if hostname in self.in_flight:
+            # another lookup of the same hostname is in progress
+            return await asyncio.shield(self.in_flight[hostname])
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[hostname] = future
+        records = None
+        try:
+            records = await self.query(hostname)
+            return records
+        finally:
+            # the waiting lookups get None if the query failed
+            future.set_result(records)
+            del self.in_flight[hostname]
+
+    async def query(self, hostname: str) -> Optional[List[str]]:
+        if not self.semaphore:
+            # created in the loop's thread
+            self.semaphore = asyncio.Semaphore(self.max_concurrent_queries)
+            self.resolver = self.setup_resolver()
+
+        async with self.semaphore:
+            try:
+                answer = await self.resolver.resolve(hostname, "A")
+            except (NXDOMAIN, NoAnswer):
+                # not listed
+                self.cache_result(hostname, None, self.negative_ttl)
+                return None
+            except (DNSException, OSError):
+                # e.g. timeout, try again next time
+                return None
+
+        records = [record.to_text() for record in answer]
+        self.cache_result(
+            hostname, records, min(answer.rrset.ttl, self.positive_ttl)
+        )
+        return records
@@ -1,12 +1,13 @@
 from typing import (
+    Callable,
     Dict,
+    List,
+    Optional,
     Tuple,
     Union,
 )
 
-from dns.exception import DNSException
-import dns.resolver
-from dns.resolver import NXDOMAIN
+from modules.threat_intelligence.dnsbl import DNSBLClient
 
 
 class Spamhaus:
@@ -14,47 +15,58 @@ class Spamhaus:
     description = "Spamhaus lookups of IPs"
     authors = ["Alya Gomaa"]
 
-    def __init__(self, db):
+    def __init__(self, db, dnsbl: Optional[DNSBLClient] = None):
         self.db = db
-        self._resolver = self._setup_resolver()
-
-    @staticmethod
-    def _setup_resolver():
-        """Initialize and configure the DNS resolver."""
-        resolver = dns.resolver.Resolver()
-        resolver.timeout = 2.0
-        resolver.lifetime = 2.0
-        resolver.cache = dns.resolver.LRUCache()
-        return resolver
-
-    def query(self, ip) -> Union[bool, Dict[str, str]]:
-        """Queries the Spamhaus DNSBL to check if the IP is listed."""
+        # shared with the other TI sources that use DNSBLs
+        self.dnsbl = dnsbl or DNSBLClient()
+
+    def query(
+        self,
+        ip,
+        callback: Optional[Callable[[Union[bool, Dict[str, str]]], None]] = (
+            None
+        ),
+    ) -> Union[bool, Dict[str, str]]:
+        """
+        Checks if the IP is listed in the Spamhaus DNSBL without waiting
+        for the DNS query.
+        Returns the spamhaus info of the IP if its lookup is cached,
+        False otherwise. IPs that aren't cached are looked up in the
+        background, and callback is called with their info, or False,
+        from the DNSBL thread once the lookup is done
+        """
         spamhaus_dns_hostname: str = self._get_dns_hostname(ip)
-        spamhaus_result = self._perform_dns_query(spamhaus_dns_hostname)
-
-        if not spamhaus_result:
-            return False
-
-        return self._parse_result(spamhaus_result)
+        cached, spamhaus_result = self.dnsbl.get_cached(spamhaus_dns_hostname)
+        if cached:
+            return self._parse_result(spamhaus_result)
+
+        if callback:
+            self.dnsbl.lookup(
+                spamhaus_dns_hostname,
+                lambda spamhaus_result: callback(
+                    self._parse_result(spamhaus_result)
+                ),
+            )
+        return False
 
     @staticmethod
     def _get_dns_hostname(ip) -> str:
         """Formats the IP address for the Spamhaus DNS query."""
         return ".".join(ip.split(".")[::-1]) + ".zen.spamhaus.org"
 
-    def _perform_dns_query(self, hostname):
-        """Performs the DNS query to the Spamhaus service."""
-        try:
-            return self._resolver.resolve(hostname, "A")
-        except (DNSException, NXDOMAIN):
-            return None
+    def _parse_result(
+        self, spamhaus_result: Optional[List[str]]
+    ) -> Union[bool, Dict[str, str]]:
+        """
+        Maps the A records of the DNS query result to the dataset info.
+        """
+        if not spamhaus_result:
+            return False
 
-    def _parse_result(self, spamhaus_result):
-        """Parses the DNS query result and maps it to the dataset info."""
         lists_names: Dict[str, str] = self._get_list_names()
         list_descriptions: Dict[str, str] = self._get_list_descriptions()
 
-        lists_that_have_this_ip = [data.to_text() for data in spamhaus_result]
+        lists_that_have_this_ip = spamhaus_result
 
         source_dataset: str
         description: str
@@ -2,13 +2,20 @@ import ipaddress
 import multiprocessing
 import os
 import json
+import queue
 import threading
 import time
 from uuid import uuid4
 import validators
-from typing import Dict, List
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+)
 
 from modules.threat_intelligence.circl_lu import Circllu
+from modules.threat_intelligence.dnsbl import DNSBLClient
 from modules.threat_intelligence.spamhaus import Spamhaus
 from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.slips_utils import utils
@@ -60,7 +67,14 @@ class ThreatIntel(IModule, URLhaus, Spamhaus):
         self.__read_configuration()
         self.get_all_blacklisted_ip_ranges()
         self.urlhaus = URLhaus(self.db)
-        self.spamhaus = Spamhaus(self.db)
+        self.dnsbl = DNSBLClient(
+            max_concurrent_queries=self.dnsbl_max_concurrent_queries
+        )
+        self.spamhaus = Spamhaus(self.db, self.dnsbl)
+        # the results of the online lookups of IPs done in the
+        # background, handled by the main loop
+        # (ip_info, the args of report_malicious_ip())
+        self.online_ip_results = queue.Queue()
         self.pending_queries = multiprocessing.Queue()
         self.pending_circllu_calls_thread = threading.Thread(
             target=self.handle_pending_queries, daemon=True
@@ -115,6 +129,9 @@ class ThreatIntel(IModule, URLhaus, Spamhaus):
         if not os.path.exists(self.path_to_local_ti_files):
             os.mkdir(self.path_to_local_ti_files)
         self.client_ips: List[str] = conf.client_ips()
+        self.dnsbl_max_concurrent_queries: int = (
+            conf.dnsbl_max_concurrent_queries()
+        )
 
     def set_evidence_malicious_asn(
         self,
@@ -1154,11 +1171,21 @@ class ThreatIntel(IModule, URLhaus, Spamhaus):
             and ip not in self.client_ips
         )
 
-    def search_online_for_ip(self, ip: str, ip_state: str):
+    def search_online_for_ip(
+        self,
+        ip: str,
+        ip_state: str,
+        callback: Optional[Callable[[dict], None]] = None,
+    ):
+        """
+        returns the cached info of the given ip from the online TI
+        sources. the ips that aren't cached are looked up in the
+        background and callback is called with their info
+        """
         if self.is_inbound_traffic(ip, ip_state):
             # we're excluding outbound traffic from spamhaus queries
             # to reduce FPs
-            if spamhaus_res := self.spamhaus.query(ip):
+            if spamhaus_res := self.spamhaus.query(ip, callback):
                 return spamhaus_res
 
     def ip_has_blacklisted_asn(
@@ -1352,13 +1379,51 @@ class ThreatIntel(IModule, URLhaus, Spamhaus):
             using either `set_evidence_malicious_ip_in_dns_response`
             or `set_evidence_malicious_ip` methods depending on the context.
         """
+        report_args = (
+            ip,
+            uid,
+            daddr,
+            timestamp,
+            profileid,
+            twid,
+            ip_state,
+            is_dns_response,
+            dns_query,
+        )
         ip_info = self.search_offline_for_ip(ip)
         if not ip_info:
-            ip_info = self.search_online_for_ip(ip, ip_state)
+            ip_info = self.search_online_for_ip(
+                ip,
+                ip_state,
+                callback=lambda ip_info: self.online_ip_results.put(
+                    (ip_info, report_args)
+                ),
+            )
         if not ip_info:
-            # not malicious
+            # not malicious, or will be known once the online lookup is
+            # done
             return False
 
+        self.report_malicious_ip(ip_info, *report_args)
+        return True
+
+    def report_malicious_ip(
+        self,
+        ip_info: dict,
+        ip: str,
+        uid: str,
+        daddr: str,
+        timestamp: str,
+        profileid: str,
+        twid: str,
+        ip_state: str,
+        is_dns_response: bool,
+        dns_query: str,
+    ):
+        """
+        stores the given malicious ip in the db and sets an evidence
+        about it
+        """
         self.db.add_ips_to_IoC({ip: json.dumps(ip_info)})
         if is_dns_response:
             self.set_evidence_malicious_ip_in_dns_response(
@@ -1381,7 +1446,6 @@ class ThreatIntel(IModule, URLhaus, Spamhaus):
                 twid,
                 ip_state,
             )
-        return True
 
     def is_malicious_hash(self, flow_info: dict):
         """Checks if a file hash is considered malicious based on online threat
@@ -1779,7 +1843,25 @@ class ThreatIntel(IModule, URLhaus, Spamhaus):
 
         self.pending_circllu_calls_thread.start()
 
+    def handle_online_ip_results(self):
+        """
+        sets evidence for the malicious ips found by the online lookups
+        done in the background
+        """
+        while True:
+            try:
+                ip_info, report_args = self.online_ip_results.get_nowait()
+            except queue.Empty:
+                return
+            if ip_info:
+                self.report_malicious_ip(ip_info, *report_args)
+
+    def shutdown_gracefully(self):
+        self.dnsbl.stop()
+        self.handle_online_ip_results()
+
     def main(self):
+        self.handle_online_ip_results()
         # The channel can receive an IP address or a domain name
         if msg := self.get_msg("give_threat_intelligence"):
             data = json.loads(msg["data"])
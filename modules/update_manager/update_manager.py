@@ -2,11 +2,15 @@ import asyncio
 import datetime
 import json
 import os
+import re
 import sys
 import time
 import traceback
 from typing import (
     IO,
+    Dict,
+    Iterator,
+    List,
     Optional,
     Tuple,
 )
@@ -72,6 +76,12 @@ class UpdateManager(IModule):
             "score",
         )
         self.ignored_IoCs = ("email", "url", "file_hash", "file")
+        self.ignored_keywords_pattern = re.compile(
+            "|".join(map(re.escape, self.header_keywords + self.ignored_IoCs))
+        )
+        # {profileid: [threat levels]} of the ips of the TI feed being
+        # parsed, every listing of an ip is kept in its past threat levels
+        self.blacklisted_ips_threat_levels: Dict[str, List[str]] = {}
         # to track how many times an ip is present in different blacklists
         self.ips_ctr = {}
         self.first_time_reading_files = False
@@ -572,6 +582,14 @@ class UpdateManager(IModule):
         self.db.add_ssl_sha1_to_IoC(malicious_ssl_certs)
         return True
 
+    def delete_downloaded_file(self, full_path: str):
+        try:
+            os.remove(full_path)
+        except FileNotFoundError:
+            # this happens in integration tests, when another test deletes
+            # the file while this one is updating it, ignore it
+            pass
+
     async def update_TI_file(self, link_to_download: str) -> bool:
         """
         Update remote TI files, JA3 feeds and SSL feeds by writing them to
@@ -588,6 +606,23 @@ class UpdateManager(IModule):
             )
             self.write_file_to_disk(response, full_path)
 
+            # Store the new etag and time of file in the database
+            file_info = {
+                "e-tag": self.get_e_tag(response),
+                "time": time.time(),
+                "Last-Modified": self.get_last_modified(response),
+                "hash": utils.get_sha256_hash(full_path),
+            }
+            old_hash = self.db.get_ti_feed_info(link_to_download).get("hash")
+            if file_info["hash"] == old_hash:
+                # the e-tag or last modified changed, but the content
+                # didn't, the iocs we have from it are up to date
+                self.log(f"{link_to_download} is unchanged. Skipping it.")
+                self.db.set_ti_feed_info(link_to_download, file_info)
+                self.loaded_ti_files += 1
+                self.delete_downloaded_file(full_path)
+                return True
+
             # File is updated in the server and was in our database.
             # Delete previous iocs of this file.
             self.db.delete_feed_entries(link_to_download)
@@ -628,12 +663,6 @@ class UpdateManager(IModule):
                 )
                 return False
 
-            # Store the new etag and time of file in the database
-            file_info = {
-                "e-tag": self.get_e_tag(response),
-                "time": time.time(),
-                "Last-Modified": self.get_last_modified(response),
-            }
             self.db.set_ti_feed_info(link_to_download, file_info)
 
             self.log(
@@ -642,13 +671,7 @@ class UpdateManager(IModule):
             self.loaded_ti_files += 1
 
             # done parsing the file, delete it from disk
-            try:
-                os.remove(full_path)
-            except FileNotFoundError:
-                # this happens in integration tests, when another test deletes
-                # the file while this one is updating it, ignore it
-                pass
-
+            self.delete_downloaded_file(full_path)
             return True
 
         except Exception:
@@ -964,10 +987,9 @@ class UpdateManager(IModule):
         ):
             return True
 
-        for keyword in self.header_keywords + self.ignored_IoCs:
-            if keyword in line.lower():
-                # we should ignore this line
-                return True
+        if self.ignored_keywords_pattern.search(line.lower()):
+            # we should ignore this line
+            return True
 
     def get_feed_fields_and_sep(self, line, file_path) -> tuple:
         """
@@ -1251,11 +1273,12 @@ class UpdateManager(IModule):
                     "tags": self.url_feeds[feed_link]["tags"],
                 }
             )
-            # set the score and confidence of this ip in ipsinfo
-            # and the profile of this ip to the same as the
-            # ones given in slips.conf
-            # todo for now the confidence is 1
-            self.db.update_threat_level(f"profile_{ip}", threat_level, 1)
+            # the score and confidence of this ip in ipsinfo
+            # and the profile of this ip are set to the same as the
+            # ones given in slips.conf once the whole feed is parsed
+            self.blacklisted_ips_threat_levels.setdefault(
+                f"profile_{ip}", []
+            ).append(threat_level)
 
     def extract_ip_range_info(
         self,
@@ -1308,9 +1331,11 @@ class UpdateManager(IModule):
                 }
             )
 
-    def is_valid_ioc_and_description(
-        self, ioc, description, ti_file_path: str
-    ) -> bool:
+    def is_valid_ioc_and_description(self, ioc, description) -> bool:
+        """
+        the type of the ioc is checked by parse_ti_feed() for all the
+        iocs of the feed at once
+        """
         if not ioc and not description:
             return False
 
@@ -1318,17 +1343,38 @@ class UpdateManager(IModule):
         # the file, ignore them
         if len(ioc) < 3:
             return False
+        return True
 
-        data_type = utils.detect_ioc_type(ioc)
-        if data_type is None:
-            self.print(
-                f"The data {ioc} is not valid. It "
-                f"was found in {ti_file_path}.",
-                0,
-                1,
+    def read_feed_in_chunks(self, feed: IO) -> Iterator[List[str]]:
+        """yields the lines of the given feed, ~1MB of lines at a time"""
+        while lines := feed.readlines(1024 * 1024):
+            yield lines
+
+    def extract_iocs_from_lines(
+        self, lines: List[str], structure: tuple, ti_file_path: str
+    ) -> List[Tuple[str, str]]:
+        """
+        returns the (ioc, description) of every line of the given lines
+        that has one
+        """
+        description_col, data_col, line_fields, separator = structure
+        iocs = []
+        for line in lines:
+            if self.is_ignored_line(line):
+                continue
+
+            line = self.normalize_line(ti_file_path, line)
+            ioc, description = self.extract_ioc_from_line(
+                line,
+                line_fields,
+                separator,
+                data_col,
+                description_col,
+                ti_file_path,
             )
-            return False
-        return True
+            if self.is_valid_ioc_and_description(ioc, description):
+                iocs.append((ioc, description))
+        return iocs
 
     def parse_ti_feed(self, feed_link: str, ti_file_path: str) -> bool:
         """
@@ -1350,46 +1396,47 @@ class UpdateManager(IModule):
         structure: Tuple[int] = self.get_feed_structure(ti_file_path)
         if not structure:
             return False
-        description_col, data_col, line_fields, separator = structure
 
         self.malicious_ips_dict = {}
         self.malicious_domains_dict = {}
         self.malicious_ip_ranges = {}
+        self.blacklisted_ips_threat_levels = {}
+
+        handlers = {
+            "domain": self.extract_domain_info,
+            "ip": self.extract_ip_info,
+            "ip_range": self.extract_ip_range_info,
+        }
+        ti_file_name: str = ti_file_path.split("/")[-1]
+        with open(ti_file_path) as feed:
+            for lines in self.read_feed_in_chunks(feed):
+                iocs: List[Tuple[str, str]] = self.extract_iocs_from_lines(
+                    lines, structure, ti_file_path
+                )
+                ioc_types: List[Optional[str]] = utils.detect_ioc_types(
+                    [ioc for ioc, _ in iocs]
+                )
+                for (ioc, description), ioc_type in zip(iocs, ioc_types):
+                    if ioc_type is None:
+                        self.print(
+                            f"The data {ioc} is not valid. It "
+                            f"was found in {ti_file_path}.",
+                            0,
+                            1,
+                        )
+                        continue
 
-        feed: IO = open(ti_file_path)
-        while line := feed.readline():
-            if self.is_ignored_line(line):
-                continue
-
-            line = self.normalize_line(ti_file_path, line)
-            ioc, description = self.extract_ioc_from_line(
-                line,
-                line_fields,
-                separator,
-                data_col,
-                description_col,
-                ti_file_path,
-            )
-
-            if not self.is_valid_ioc_and_description(
-                ioc, description, ti_file_path
-            ):
-                continue
-
-            data_type = utils.detect_ioc_type(ioc)
-            handlers = {
-                "domain": self.extract_domain_info,
-                "ip": self.extract_ip_info,
-                "ip_range": self.extract_ip_range_info,
-            }
-
-            ti_file_name: str = ti_file_path.split("/")[-1]
-            handlers[data_type](ioc, ti_file_name, feed_link, description)
+                    if handler := handlers.get(ioc_type):
+                        handler(ioc, ti_file_name, feed_link, description)
 
         self.db.add_ips_to_IoC(self.malicious_ips_dict)
         self.db.add_domains_to_IoC(self.malicious_domains_dict)
         self.db.add_ip_range_to_IoC(self.malicious_ip_ranges)
-        feed.close()
+        # set the score and confidence of the ips in ipsinfo
+        # and the profiles of the ips to the same as the
+        # ones given in slips.conf
+        # todo for now the confidence is 1
+        self.db.update_threat_levels(self.blacklisted_ips_threat_levels, 1)
         return True
 
         # except Exception:
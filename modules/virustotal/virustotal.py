@@ -7,6 +7,7 @@ import time
 import ipaddress
 import threading
 import validators
+from collections import deque
 
 from slips_files.common.flow_classifier import FlowClassifier
 from slips_files.common.parsers.config_parser import ConfigParser
@@ -37,8 +38,9 @@ class VT(IModule):
         self.__read_configuration()
         # query counter for debugging purposes
         self.counter = 0
-        # Queue of API calls
-        self.api_call_queue = []
+        # Queue of API calls. bounded, the oldest iocs are dropped when
+        # the api limit is reached for too long
+        self.api_call_queue = deque(maxlen=1000)
         # Pool manager to make HTTP requests with urllib3
         # The certificate provides a bundle of trusted CAs,
         # the certificates are located in certifi.where()
@@ -206,7 +208,7 @@ class VT(IModule):
             time.sleep(60)
             while self.api_call_queue:
                 # get the first element in the queue
-                ioc = self.api_call_queue.pop(0)
+                ioc = self.api_call_queue.popleft()
                 ioc_type = self.get_ioc_type(ioc)
                 if ioc_type == "ip":
                     cached_data = self.db.get_ip_info(ioc)
@@ -363,7 +365,8 @@ class VT(IModule):
             # (minute, daily or monthly).
             if response.status == 204:
                 # Add to the queue of api calls in case of api limit reached.
-                self.api_call_queue.append(ioc)
+                if ioc not in self.api_call_queue:
+                    self.api_call_queue.append(ioc)
             # 403 means you don't have enough privileges to make
             # the request or wrong API key
             elif response.status == 403:
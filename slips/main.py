@@ -282,11 +282,16 @@ class Main:
             input_type = "binetflow"
         elif "directory" in cmd_result and os.path.isdir(given_path):
             from slips_files.core.input import SUPPORTED_LOGFILES
+            from slips_files.core.helpers.flow_files import (
+                strip_compression_extension,
+            )
 
             for log_file in os.listdir(given_path):
                 # if there is at least 1 supported log file inside the
                 # given directory, start slips normally
                 # otherwise, stop slips
+                # compressed logs e.g. conn.log.gz are supported too
+                log_file = strip_compression_extension(log_file)
                 if log_file.replace(".log", "") in SUPPORTED_LOGFILES:
                     input_type = "zeek_folder"
                     break
@@ -296,14 +301,22 @@ class Main:
                 print(
                     f"Log files in {given_path} are not supported \n"
                     f"Make sure all log files inside the given "
-                    f"directory end with .log .. Stopping."
+                    f"directory end with .log, .log.gz, .log.zst or "
+                    f".log.bz2 .. Stopping."
                 )
                 sys.exit(-1)
         else:
             # is it a zeek log file or suricata, binetflow tabs,
             # or binetflow comma separated file?
             # use first line to determine
-            with open(given_path, "r") as f:
+            from slips_files.core.helpers.flow_files import open_flow_file
+
+            # compressed files are decompressed on the fly
+            # e.g. "gzip compressed data" or "Zstandard compressed data"
+            opener = (
+                open_flow_file if "compressed data" in cmd_result else open
+            )
+            with opener(given_path) as f:
                 while True:
                     # get the first line that isn't a comment
                     first_line = f.readline().replace("\n", "")
@@ -407,11 +420,15 @@ class Main:
         if self.is_total_flows_unknown():
             return ""
 
-        if not hasattr(self, "total_flows"):
-            self.total_flows = self.db.get_total_flows()
+        # the input process may update the total while reading the flows,
+        # it starts with an estimate for large files
+        total_flows = self.db.get_total_flows()
+        if not total_flows:
+            return ""
 
-        flows_percentage = int(
-            (self.db.get_processed_flows_so_far() / self.total_flows) * 100
+        flows_percentage = min(
+            int((self.db.get_processed_flows_so_far() / total_flows) * 100),
+            100,
         )
         return f"Analyzed Flows: {green(flows_percentage)}{green('%')}. "
 
@@ -32,6 +32,7 @@ class AsyncModule(IModule):
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
+        self.init_sampling_profiler()
         try:
             error: bool = self.pre_main()
             if error or self.should_stop():
@@ -53,7 +54,9 @@ class AsyncModule(IModule):
 
                 # if a module's main() returns 1, it means there's an
                 # error and it needs to stop immediately
-                error: bool = self.run_async_function(self.run_main)
+                error: bool = self.run_main_and_time_it(
+                    lambda: self.run_async_function(self.run_main)
+                )
                 if error:
                     self.run_async_function(self.shutdown_gracefully)
                     return
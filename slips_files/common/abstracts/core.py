@@ -29,6 +29,7 @@ class ICore(IModule, Process):
         """
         must be called run because this is what multiprocessing runs
         """
+        self.init_sampling_profiler()
         try:
             self.pre_main()
             # this should be defined in every core file
@@ -1,18 +1,26 @@
 import asyncio
+import json
+import signal
 import sys
+import threading
+import time
 import traceback
 import warnings
 from abc import ABC, abstractmethod
 from multiprocessing import Process, Event
 from typing import (
     Dict,
+    List,
     Optional,
     Callable,
 )
+from slips_files.common.parsers.config_parser import ConfigParser
+from slips_files.common.performance_profilers import sampling_profiler
 from slips_files.common.printer import Printer
 from slips_files.core.output import Output
 from slips_files.common.slips_utils import utils
 from slips_files.core.database.database_manager import DBManager
+from slips_files.core.helpers import tw_state_store
 
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
@@ -27,6 +35,9 @@ class IModule(ABC, Process):
     authors = ["Template Author"]
     # should be filled with the channels each module subscribes to
     channels = {}
+    # min seconds between 2 reports of the memory used by the module's
+    # tw state stores
+    state_memory_report_interval = 60
 
     def __init__(
         self,
@@ -46,6 +57,13 @@ class IModule(ABC, Process):
         self.printer = Printer(self.logger, self.name)
         self.db = DBManager(self.logger, self.output_dir, self.redis_port)
         self.keyboard_int_ctr = 0
+        self.last_state_memory_report = 0
+        # the channels the module received msgs from in the current
+        # iteration of main()
+        self.channels_received_in_iteration = []
+        self.sampling_profiler: Optional[
+            sampling_profiler.SamplingProfiler
+        ] = None
         self.init(**kwargs)
         # should after the module's init() so the module has a chance to
         # set its own channels
@@ -57,6 +75,9 @@ class IModule(ABC, Process):
     def print(self, *args, **kwargs):
         return self.printer.print(*args, **kwargs)
 
+    def lazy_print(self, *args, **kwargs):
+        return self.printer.lazy_print(*args, **kwargs)
+
     def init_channel_tracker(self) -> Dict[str, Dict[str, bool]]:
         """
         tracks if in the last loop, a msg was received in any of the
@@ -135,11 +156,137 @@ class IModule(ABC, Process):
         message = self.db.get_message(self.channels[channel])
         if utils.is_msg_intended_for(message, channel):
             self.channel_tracker[channel]["msg_received"] = True
-            self.db.incr_msgs_received_in_channel(self.name, channel)
+            self.db.count_msg_received(self.name, channel, message)
+            self.channels_received_in_iteration.append(channel)
+            if channel == "tw_closed":
+                self.evict_closed_tw(message["data"])
             return message
 
         self.channel_tracker[channel]["msg_received"] = False
 
+    def evict_closed_tw(self, profileid_twid: str):
+        """
+        evicts the given closed tw from the tw state stores of the
+        module's detectors and reports the memory used by them
+        """
+        tw_state_store.evict_closed_tw(profileid_twid)
+
+        now = time.time()
+        if now - self.last_state_memory_report < (
+            self.state_memory_report_interval
+        ):
+            return
+        self.last_state_memory_report = now
+        if usage := tw_state_store.get_memory_usage():
+            self.db.set_state_memory_usage(self.name, usage)
+
+    def should_be_profiled(self, processes: List[str]) -> bool:
+        """
+        returns True if this process is one of the given process names
+        or if they contain all
+        """
+        processes = [process.lower() for process in processes]
+        return "all" in processes or self.name.lower() in processes
+
+    def init_sampling_profiler(self):
+        """
+        starts the sampling cpu profiler if it's enabled for this process
+        in slips.yaml, and a thread that writes the sampled stacks. the
+        thread also starts and stops the profiler when asked to in the
+        sampling_profiler channel if sampling_profiler_runtime_control
+        is enabled.
+        processes that aren't profiled and can't be asked to get no
+        signal handler and no thread.
+        should be called in the main thread of the process
+        """
+        if not hasattr(signal, "setitimer"):
+            return
+        conf = ConfigParser()
+        profile_now: bool = self.should_be_profiled(
+            conf.sampling_profiler_processes()
+        )
+        runtime_control: bool = conf.sampling_profiler_runtime_control()
+        if not (profile_now or runtime_control):
+            return
+
+        self.sampling_profiler = sampling_profiler.SamplingProfiler(
+            self.name,
+            self.output_dir,
+            interval=conf.sampling_profiler_interval(),
+        )
+        self.sampling_profiler.install()
+        if profile_now:
+            self.sampling_profiler.start()
+
+        threading.Thread(
+            target=self.control_sampling_profiler,
+            args=(conf.sampling_profiler_write_interval(), runtime_control),
+            daemon=True,
+            name="sampling_profiler",
+        ).start()
+
+    def handle_sampling_profiler_msg(self, msg: str):
+        """
+        starts or stops the profiler if the given msg is for this process
+        :param msg: a json dict with a process name or all, and an action,
+        start or stop
+        """
+        try:
+            msg = json.loads(msg)
+            processes = [msg["process"]]
+            action = msg["action"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return
+
+        if not self.should_be_profiled(processes):
+            return
+        if action == "start":
+            self.sampling_profiler.start()
+        elif action == "stop":
+            self.sampling_profiler.stop()
+
+    def control_sampling_profiler(
+        self, write_interval: float, runtime_control: bool
+    ):
+        """
+        runs in its own thread, writes the sampled stacks every
+        write_interval seconds, and handles the msgs of the
+        sampling_profiler channel if runtime_control is True
+        """
+        channel = None
+        if runtime_control:
+            channel = self.db.subscribe(sampling_profiler.CONTROL_CHANNEL)
+        last_write = time.time()
+        while True:
+            if channel is None:
+                time.sleep(max(last_write + write_interval - time.time(), 0))
+            else:
+                msg = self.db.get_message(channel, timeout=1)
+                if msg and isinstance(msg["data"], str):
+                    self.handle_sampling_profiler_msg(msg["data"])
+
+            now = time.time()
+            if now - last_write >= write_interval:
+                last_write = now
+                if self.sampling_profiler.is_running:
+                    self.sampling_profiler.print()
+
+    def run_main_and_time_it(self, run_main: Callable) -> bool:
+        """
+        runs the given main() and records how long it took to handle
+        the msgs it received
+        """
+        self.channels_received_in_iteration = []
+        start = time.perf_counter()
+        error: bool = run_main()
+        if self.channels_received_in_iteration:
+            self.db.record_handler_time(
+                self.name,
+                self.channels_received_in_iteration,
+                time.perf_counter() - start,
+            )
+        return error
+
     def print_traceback(self):
         exception_line = sys.exc_info()[2].tb_lineno
         self.print(f"Problem in pre_main() line {exception_line}", 0, 1)
@@ -151,6 +298,7 @@ class IModule(ABC, Process):
         the goals of this function is to make sure that async and normal
         shutdown_gracefully() functions run until completion
         """
+        self.init_sampling_profiler()
         try:
             error: bool = self.pre_main()
             if error or self.should_stop():
@@ -169,7 +317,7 @@ class IModule(ABC, Process):
                     self.shutdown_gracefully()
                     return
 
-                error: bool = self.main()
+                error: bool = self.run_main_and_time_it(self.main)
                 if error:
                     self.shutdown_gracefully()
             except KeyboardInterrupt:
@@ -208,6 +356,7 @@ class AsyncModule(IModule, ABC, Process):
         return loop.run_until_complete(func())
 
     def run(self):
+        self.init_sampling_profiler()
         try:
             error: bool = self.pre_main()
             if error or self.should_stop():
@@ -228,7 +377,9 @@ class AsyncModule(IModule, ABC, Process):
 
                 # if a module's main() returns 1, it means there's an
                 # error and it needs to stop immediately
-                error: bool = self.run_async_function(self.run_main)
+                error: bool = self.run_main_and_time_it(
+                    lambda: self.run_async_function(self.run_main)
+                )
                 if error:
                     self.run_async_function(self.shutdown_gracefully)
                     return
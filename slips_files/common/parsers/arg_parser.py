@@ -240,6 +240,15 @@ class ArgumentParser(argparse.ArgumentParser):
             required=False,
             help="Kill all unused redis servers",
         )
+        self.add_argument(
+            "-bt",
+            "--bus-telemetry",
+            action="store_true",
+            required=False,
+            help="Print the throughput, backlog and latency of each "
+            "module's redis channels of the slips instance "
+            "using the port given with -P",
+        )
         self.add_argument(
             "-m",
             "--multiinstance",
@@ -1,12 +1,58 @@
+from dataclasses import dataclass
 from datetime import timedelta
+import os
 import sys
 import ipaddress
-from typing import List
+from types import MappingProxyType
+from typing import (
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Tuple,
+)
 from slips_files.common.parsers.arg_parser import ArgumentParser
 from slips_files.common.slips_utils import utils
 import yaml
 
 
+def freeze(value):
+    """returns a read-only copy of the given parsed yaml value"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """returns a mutable copy of the given frozen value"""
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """the parsed and validated content of a config file"""
+
+    path: str
+    # the modification time of the file when it was parsed
+    mtime: float
+    config: Mapping[str, Mapping[str, Any]]
+
+
+# the config files are parsed once per process and modification of the
+# file. {path: ConfigSnapshot}
+# the snapshots parsed by the main process before starting the other
+# processes are inherited by them when they're forked
+config_snapshots: Dict[str, ConfigSnapshot] = {}
+# {(cwd, sys.argv): path of the config file given using -c}
+config_files: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+
+
 class ConfigParser(object):
     name = "ConfigParser"
     description = "Parse and sanitize slips.yaml values. used by all modules"
@@ -14,7 +60,8 @@ class ConfigParser(object):
 
     def __init__(self):
         configfile: str = self.get_config_file()
-        self.config = self.read_config_file(configfile)
+        self.snapshot: ConfigSnapshot = self.get_snapshot(configfile)
+        self.config = self.snapshot.config
         self.home_network_ranges = (
             "192.168.0.0/16",
             "172.16.0.0/12",
@@ -29,15 +76,46 @@ class ConfigParser(object):
         reads slips configuration file, slips.conf/slips.yaml is the default file
         """
         with open(configfile) as source:
-            return yaml.safe_load(source)
+            config = yaml.safe_load(source)
+
+        if config is None:
+            # empty file
+            return {}
+        if not isinstance(config, dict):
+            raise ValueError(
+                f"Invalid config file {configfile}. "
+                f"Expected a mapping of sections, got {type(config)}"
+            )
+        return config
+
+    def get_snapshot(self, configfile: str) -> ConfigSnapshot:
+        """
+        returns the parsed content of the given config file.
+        the file is only parsed again if it was modified since the last
+        time it was parsed by this process
+        """
+        mtime: float = os.path.getmtime(configfile)
+        snapshot = config_snapshots.get(configfile)
+        if snapshot is None or snapshot.mtime != mtime:
+            snapshot = ConfigSnapshot(
+                path=configfile,
+                mtime=mtime,
+                config=freeze(self.read_config_file(configfile)),
+            )
+            config_snapshots[configfile] = snapshot
+        return snapshot
 
     def get_config_file(self):
         """
         uses the arg parser to get the config file specified by -c or the
         path of the default one
         """
-        parser = self.get_parser()
-        return parser.get_configfile()
+        # the default config file is relative to the cwd
+        key = (os.getcwd(), tuple(sys.argv))
+        if key not in config_files:
+            parser = self.get_parser()
+            config_files[key] = parser.get_configfile()
+        return config_files[key]
 
     def get_parser(self, help=False):
         return ArgumentParser(
@@ -57,10 +135,11 @@ class ConfigParser(object):
          Other processes also access the configuration
         """
         try:
-            section_data: dict = self.config.get(section, None)
-            if section_data is None:
+            section_data: Mapping = self.config.get(section, None)
+            if section_data is None or name not in section_data:
                 return default_value
-            return section_data.get(name, default_value)
+            # a copy, so the callers can't modify the snapshot
+            return thaw(section_data[name])
         except (NameError, ValueError):
             # There is a conf, but there is no option,
             # or no section or no configuration file specified
@@ -97,6 +176,20 @@ class ConfigParser(object):
         except Exception:
             return 700
 
+    def online_user_agent_lookup(self) -> bool:
+        return self.read_configuration(
+            "flowalerts", "online_user_agent_lookup", False
+        )
+
+    def dnsbl_max_concurrent_queries(self) -> int:
+        max_queries = self.read_configuration(
+            "threatintelligence", "dnsbl_max_concurrent_queries", 20
+        )
+        try:
+            return max(int(max_queries), 1)
+        except Exception:
+            return 20
+
     def get_all_homenet_ranges(self):
         return self.home_network_ranges
 
@@ -146,6 +239,9 @@ class ConfigParser(object):
             "parameters", "export_labeled_flows", False
         )
 
+    def flow_archive(self) -> bool:
+        return self.read_configuration("parameters", "flow_archive", False)
+
     def export_labeled_flows_to(self):
         export = self.read_configuration(
             "parameters", "export_format", "None"
@@ -677,6 +773,41 @@ class ConfigParser(object):
             )
         )
 
+    def sampling_profiler_processes(self) -> List[str]:
+        processes = self.read_configuration(
+            "Profiling", "sampling_profiler_processes", []
+        )
+        if isinstance(processes, str):
+            processes = [processes]
+        return processes or []
+
+    def sampling_profiler_runtime_control(self) -> bool:
+        return self.read_configuration(
+            "Profiling", "sampling_profiler_runtime_control", False
+        )
+
+    def sampling_profiler_interval(self) -> float:
+        """returns the seconds of cpu time between 2 samples"""
+        try:
+            ms = float(
+                self.read_configuration(
+                    "Profiling", "sampling_profiler_interval_ms", 10
+                )
+            )
+        except (TypeError, ValueError):
+            ms = 10
+        return max(ms, 1) / 1000
+
+    def sampling_profiler_write_interval(self) -> float:
+        try:
+            return float(
+                self.read_configuration(
+                    "Profiling", "sampling_profiler_write_interval", 60
+                )
+            )
+        except (TypeError, ValueError):
+            return 60
+
     def get_memory_profiler_enable(self):
         return self.read_configuration(
             "Profiling", "memory_profiler_enable", False
@@ -0,0 +1,199 @@
+"""
+Statistical CPU profiler of a single slips process.
+
+The kernel sends SIGPROF to the process every `interval` seconds of CPU
+time it uses, and the handler counts the stack of the python frame that
+was running. Idle processes aren't sampled at all, and the overhead is
+about one stack walk per sample. If the time spent in the handler goes
+above max_overhead of the profiled time, the sampling interval is
+doubled.
+
+The counted stacks are written periodically to the output dir as
+collapsed stacks, the input of flamegraph.pl and speedscope, and as a
+speedscope json file.
+"""
+
+import json
+import os
+import signal
+import time
+from multiprocessing.util import Finalize
+from types import CodeType, FrameType
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from slips_files.common.abstracts.performance_profiler import (
+    IPerformanceProfiler,
+)
+
+# the redis channel used to start and stop the profiler at runtime
+CONTROL_CHANNEL = "sampling_profiler"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class SamplingProfiler(IPerformanceProfiler):
+    def __init__(
+        self,
+        name: str,
+        output_dir: str,
+        interval: float = 0.01,
+        max_depth: int = 64,
+        max_overhead: float = 0.02,
+    ):
+        """
+        :param name: the name of the profiled process, used as the root
+        frame of every stack and in the names of the output files
+        :param interval: seconds of CPU time between 2 samples
+        """
+        self.name = name
+        self.output_dir = os.path.join(output_dir, "cpu_profile")
+        self.interval = interval
+        self.max_depth = max_depth
+        self.max_overhead = max_overhead
+        filename = name.replace(" ", "_")
+        self.collapsed_file = os.path.join(
+            self.output_dir, f"{filename}.collapsed"
+        )
+        self.speedscope_file = os.path.join(
+            self.output_dir, f"{filename}.speedscope.json"
+        )
+        self.is_running = False
+        # the handler time is checked every this many samples
+        self.overhead_check_samples = 100
+        # {stack from the root frame: samples}. a plain dict, so it can
+        # be copied atomically while the signal handler updates it
+        self.stacks: Dict[Tuple[str, ...], int] = {}
+        # {code obj: its frame name}
+        self.frame_names: Dict[CodeType, str] = {}
+        self.handler_time = 0.0
+        self.samples = 0
+        self.finalizer: Optional[Finalize] = None
+
+    def _create_profiler(self):
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def install(self):
+        """
+        installs the SIGPROF handler. python only allows this in the
+        main thread, so it's done once when the process starts, and
+        start() and stop() can be called from any thread
+        """
+        signal.signal(signal.SIGPROF, self.sample)
+
+    def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self._create_profiler()
+        if not self.finalizer:
+            # write the stacks when the process exits
+            self.finalizer = Finalize(self, self.stop, exitpriority=10)
+
+    def stop(self):
+        if not self.is_running:
+            return
+        self.is_running = False
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        self.print()
+
+    def get_frame_name(self, code: CodeType) -> str:
+        try:
+            return self.frame_names[code]
+        except KeyError:
+            filename = os.path.relpath(code.co_filename)
+            name = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+            self.frame_names[code] = name
+            return name
+
+    def sample(self, signum: int, frame: Optional[FrameType]):
+        """the SIGPROF handler, counts the stack of the given frame"""
+        if not self.is_running:
+            return
+        start = time.perf_counter()
+        stack: List[str] = []
+        while frame and len(stack) < self.max_depth:
+            stack.append(self.get_frame_name(frame.f_code))
+            frame = frame.f_back
+        stack.append(self.name)
+        stack = tuple(reversed(stack))
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+        self.handler_time += time.perf_counter() - start
+        if self.samples % self.overhead_check_samples:
+            return
+        profiled_time = self.overhead_check_samples * self.interval
+        if self.handler_time > profiled_time * self.max_overhead:
+            # sample less often to keep the overhead bounded
+            self.interval *= 2
+            self._create_profiler()
+        self.handler_time = 0.0
+
+    def get_stacks(self) -> Dict[Tuple[str, ...], int]:
+        # dict.copy() doesn't run python code, so the handler can't
+        # modify the stacks while they're copied
+        return dict.copy(self.stacks)
+
+    def get_collapsed_stacks(self) -> str:
+        """returns a 'frame;frame;frame samples' line per stack"""
+        return "".join(
+            f"{';'.join(stack)} {samples}\n"
+            for stack, samples in self.get_stacks().items()
+        )
+
+    def get_speedscope_profile(self) -> dict:
+        frames: List[dict] = []
+        frame_indices: Dict[str, int] = {}
+        samples: List[List[int]] = []
+        weights: List[int] = []
+        for stack, count in self.get_stacks().items():
+            sample = []
+            for frame in stack:
+                if frame not in frame_indices:
+                    frame_indices[frame] = len(frames)
+                    frames.append({"name": frame})
+                sample.append(frame_indices[frame])
+            samples.append(sample)
+            weights.append(count)
+
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": self.name,
+            "exporter": "slips",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": self.name,
+                    # weights are the number of samples
+                    "unit": "none",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+    @staticmethod
+    def write(path: str, content: str):
+        """
+        writes the given content to a tmp file and renames it, so the
+        file is never read half written
+        """
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+    def print(self):
+        """writes the stacks sampled so far to the output dir"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.write(self.collapsed_file, self.get_collapsed_stacks())
+        self.write(
+            self.speedscope_file, json.dumps(self.get_speedscope_profile())
+        )
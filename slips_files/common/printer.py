@@ -1,3 +1,10 @@
+from typing import (
+    Callable,
+    Optional,
+    Tuple,
+    Union,
+)
+
 from slips_files.common.abstracts.observer import IObservable
 from slips_files.core.output import Output
 
@@ -16,6 +23,37 @@ class Printer(IObservable):
         IObservable.__init__(self)
         self.logger = logger
         self.add_observer(self.logger)
+        # the (verbose, debug) levels of the logger. read once per
+        # process by get_thresholds()
+        self.thresholds: Optional[Tuple[int, int]] = None
+
+    def get_thresholds(self) -> Tuple[int, int]:
+        """
+        returns the max verbose and debug levels the logger prints
+        """
+        if self.thresholds is None:
+            verbose = getattr(self.logger, "verbose", None)
+            debug = getattr(self.logger, "debug", None)
+            if not (isinstance(verbose, int) and isinstance(debug, int)):
+                # this logger doesn't filter msgs by their levels,
+                # e.g. a mock in the unit tests. let everything through
+                verbose, debug = 3, 3
+            self.thresholds = (verbose, debug)
+        return self.thresholds
+
+    def is_enabled(self, verbose=1, debug=0) -> bool:
+        """
+        returns True if the output process would print or log a msg
+        with the given levels. the same conditions used in
+        Output.output_line()
+        """
+        if debug == 1:
+            # errors are always logged to errors.log
+            return True
+        max_verbose, max_debug = self.get_thresholds()
+        return 0 < verbose <= min(max_verbose, 3) or (
+            0 < debug <= min(max_debug, 3)
+        )
 
     def print(
         self, text, verbose=1, debug=0, log_to_logfiles_only=False, end="\n"
@@ -38,6 +76,10 @@ class Printer(IObservable):
         only and doesn't log the given text to cli
         :param end: this is exactly linke print()'s end kwarg
         """
+        if not log_to_logfiles_only and not self.is_enabled(verbose, debug):
+            # the output process would discard it anyway
+            return
+
         self.notify_observers(
             {
                 "from": self.name,
@@ -48,3 +90,38 @@ class Printer(IObservable):
                 "end": end,
             }
         )
+
+    def lazy_print(
+        self,
+        text: Union[str, Callable[[], str]],
+        *args,
+        verbose=1,
+        debug=0,
+        log_to_logfiles_only=False,
+        end="\n",
+    ):
+        """
+        Same as print(), but the text is only formatted if the given
+        levels are enough to print it. use it in hot paths instead of
+        building f-strings that are discarded at the default verbosity.
+        :param text: either a %-style format str that is formatted
+        using the given args, or a callable that returns the text to print
+        e.g.
+            lazy_print("Received line: %s", line, verbose=2)
+            lazy_print(lambda: f"Prev data: {prev_data}", verbose=3)
+        """
+        if not log_to_logfiles_only and not self.is_enabled(verbose, debug):
+            return
+
+        if callable(text):
+            text = text()
+        elif args:
+            text = text % args
+
+        self.print(
+            text,
+            verbose=verbose,
+            debug=debug,
+            log_to_logfiles_only=log_to_logfiles_only,
+            end=end,
+        )
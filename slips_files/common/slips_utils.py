@@ -2,6 +2,7 @@ import base64
 import binascii
 import hashlib
 from datetime import datetime, timedelta
+import re
 from re import findall
 
 from uuid import UUID
@@ -16,7 +17,13 @@ import os
 import sys
 import ipaddress
 import aid_hash
-from typing import Any, Optional
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
 from dataclasses import is_dataclass, asdict
 from enum import Enum
 
@@ -67,11 +74,26 @@ class Utils(object):
             "%Y/%m/%d-%H:%M:%S",
             "%Y-%m-%dT%H:%M:%S",
         )
+        # the format of each timestamp "shape" (the timestamp with
+        # every digit replaced by d) detected so far, and whether
+        # datetime.fromisoformat() gives the same result as strptime()
+        # for it. ts read from the same source always have the same
+        # shape, so their format is only detected once.
+        # {shape: (format, is_iso)}
+        self.time_formats_cache: Dict[str, Tuple[str, bool]] = {}
+        self.digits_to_d = str.maketrans("0123456789", "d" * 10)
         # this format will be used across all modules and logfiles of slips
         # its timezone aware
         self.alerts_format = "%Y/%m/%d %H:%M:%S.%f%z"
         self.local_tz = self.get_local_timezone()
         self.aid = aid_hash.AID()
+        # used by detect_ioc_types() to detect the most common iocs of TI
+        # feeds without trying every ioc type on them
+        octet = "(25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])"
+        self.ipv4_pattern = re.compile(rf"{octet}(\.{octet}){{3}}")
+        self.hostname_pattern = re.compile(
+            r"([a-zA-Z0-9_-]+\.)+[a-zA-Z][a-zA-Z0-9-]*"
+        )
 
     def generate_uid(self):
         """Generates a UID similar to what Zeek uses."""
@@ -154,6 +176,16 @@ class Utils(object):
 
         return obj
 
+    def flow_to_dict(self, flow) -> dict:
+        """
+        returns the fields of the given flow as a dict.
+        zeek flows cache it, so it's only computed once no matter how
+        many times the flow is published or stored
+        """
+        if hasattr(type(flow), "to_dict"):
+            return flow.to_dict()
+        return asdict(flow)
+
     def is_valid_uuid4(self, uuid_string: str) -> bool:
         """Validate that the given str in UUID4"""
         try:
@@ -203,6 +235,35 @@ class Utils(object):
         if data.startswith("AS"):
             return "asn"
 
+    def detect_ioc_types(self, iocs: List[str]) -> List[Optional[str]]:
+        """
+        Same as detect_ioc_type() for many iocs, e.g. all the iocs of a
+        TI feed.
+        Every unique ioc is detected once. ipv4s and domains, most of
+        the iocs of TI feeds, are detected using a regex instead of trying
+        every ioc type on them, the rest are detected using
+        detect_ioc_type()
+        """
+        types: Dict[str, Optional[str]] = dict.fromkeys(iocs)
+        is_ipv4 = self.ipv4_pattern.fullmatch
+        remaining = []
+        for ioc in types:
+            if is_ipv4(ioc):
+                types[ioc] = "ip"
+            else:
+                remaining.append(ioc)
+
+        # hostnames can't be ips, ranges, hashes or urls, so they're either
+        # domains or whatever detect_ioc_type() says if they're invalid ones
+        is_hostname = self.hostname_pattern.fullmatch
+        for ioc in remaining:
+            if is_hostname(ioc) and self.is_valid_domain(ioc):
+                types[ioc] = "domain"
+            else:
+                types[ioc] = self.detect_ioc_type(ioc)
+
+        return [types[ioc] for ioc in iocs]
+
     def get_first_octet(self, ip):
         # the ranges stored are sorted by first octet
         if "." in ip:
@@ -254,14 +315,12 @@ class Utils(object):
         :param required_format: can be any format like '%Y/%m/%d %H:%M:%S.%f'
         or 'unixtimestamp', 'iso'
         """
-        given_format = self.get_time_format(ts)
+        given_format, datetime_obj = self.parse_timestamp(ts)
         if given_format == required_format:
             return ts
 
-        if given_format == "datetimeobj":
-            datetime_obj = ts
-        else:
-            datetime_obj = self.convert_to_datetime(ts)
+        if not given_format:
+            raise ValueError(f"Unknown time format: {ts}")
 
         # convert to the req format
         if required_format == "iso":
@@ -297,35 +356,72 @@ class Utils(object):
             return False
 
     def convert_to_datetime(self, ts):
-        if self.is_datetime_obj(ts):
-            return ts
-
-        given_format = self.get_time_format(ts)
-        return (
-            datetime.fromtimestamp(float(ts))
-            if given_format == "unixtimestamp"
-            else datetime.strptime(ts, given_format)
-        )
+        given_format, datetime_obj = self.parse_timestamp(ts)
+        if not given_format:
+            raise ValueError(f"Unknown time format: {ts}")
+        return datetime_obj
 
     def get_time_format(self, time) -> Optional[str]:
-        if self.is_datetime_obj(time):
-            return "datetimeobj"
+        return self.parse_timestamp(time)[0]
+
+    def detect_time_format(self, ts: str) -> Tuple[str, Optional[datetime]]:
+        """
+        tries all the time_formats on the given ts.
+        returns the first format that parses it and the parsed datetime,
+        or (False, None) if none of them does
+        """
+        for time_format in self.time_formats:
+            try:
+                return time_format, datetime.strptime(ts, time_format)
+            except ValueError:
+                pass
+        return False, None
+
+    def parse_timestamp(self, ts) -> Tuple[str, Optional[datetime]]:
+        """
+        Detects the format of the given ts and parses it, only once.
+        returns the format and the datetime obj. the format is
+        'datetimeobj', 'unixtimestamp', one of self.time_formats, or
+        False if the ts isn't in any of them
+        """
+        if isinstance(ts, datetime):
+            return "datetimeobj", ts
 
         try:
             # Try unix timestamp in seconds.
-            datetime.fromtimestamp(float(time))
-            return "unixtimestamp"
+            return "unixtimestamp", datetime.fromtimestamp(float(ts))
         except ValueError:
             pass
 
-        for time_format in self.time_formats:
+        shape = ts.translate(self.digits_to_d)
+        if cached := self.time_formats_cache.get(shape):
+            time_format, is_iso = cached
             try:
-                datetime.strptime(time, time_format)
-                return time_format
+                if is_iso:
+                    return time_format, datetime.fromisoformat(ts)
+                return time_format, datetime.strptime(ts, time_format)
             except ValueError:
+                # e.g. month 13, let the detection decide
                 pass
 
-        return False
+        time_format, datetime_obj = self.detect_time_format(ts)
+        if not time_format:
+            return False, None
+
+        try:
+            iso_datetime_obj = datetime.fromisoformat(ts)
+            is_iso = (
+                iso_datetime_obj == datetime_obj
+                and iso_datetime_obj.utcoffset() == datetime_obj.utcoffset()
+            )
+        except ValueError:
+            is_iso = False
+
+        if len(self.time_formats_cache) > 1000:
+            # the shape of %f and %z varies, don't grow forever
+            self.time_formats_cache.clear()
+        self.time_formats_cache[shape] = (time_format, is_iso)
+        return time_format, datetime_obj
 
     def to_delta(self, time_in_seconds):
         return timedelta(seconds=int(time_in_seconds))
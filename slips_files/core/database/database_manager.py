@@ -454,6 +454,9 @@ class DBManager:
     def update_threat_level(self, *args, **kwargs):
         return self.rdb.update_threat_level(*args, **kwargs)
 
+    def update_threat_levels(self, *args, **kwargs):
+        return self.rdb.update_threat_levels(*args, **kwargs)
+
     def set_loaded_ti_files(self, *args, **kwargs):
         return self.rdb.set_loaded_ti_files(*args, **kwargs)
 
@@ -568,12 +571,27 @@ class DBManager:
     def get_intuples_from_profile_tw(self, *args, **kwargs):
         return self.rdb.get_intuples_from_profile_tw(*args, **kwargs)
 
-    def incr_msgs_received_in_channel(self, *args, **kwargs):
-        return self.rdb.incr_msgs_received_in_channel(*args, **kwargs)
+    def count_msg_received(self, *args, **kwargs):
+        return self.rdb.count_msg_received(*args, **kwargs)
+
+    def record_handler_time(self, *args, **kwargs):
+        return self.rdb.record_handler_time(*args, **kwargs)
+
+    def flush_bus_telemetry(self, *args, **kwargs):
+        return self.rdb.flush_bus_telemetry(*args, **kwargs)
+
+    def get_bus_telemetry(self, *args, **kwargs):
+        return self.rdb.get_bus_telemetry(*args, **kwargs)
 
     def get_enabled_modules(self, *args, **kwargs):
         return self.rdb.get_enabled_modules(*args, **kwargs)
 
+    def set_state_memory_usage(self, *args, **kwargs):
+        return self.rdb.set_state_memory_usage(*args, **kwargs)
+
+    def get_state_memory_usage(self, *args, **kwargs):
+        return self.rdb.get_state_memory_usage(*args, **kwargs)
+
     def get_msgs_received_at_runtime(self, *args, **kwargs):
         return self.rdb.get_msgs_received_at_runtime(*args, **kwargs)
 
@@ -586,6 +604,9 @@ class DBManager:
     def set_dhcp_flow(self, *args, **kwargs):
         return self.rdb.set_dhcp_flow(*args, **kwargs)
 
+    def pop_sent_bytes(self, *args, **kwargs):
+        return self.rdb.pop_sent_bytes(*args, **kwargs)
+
     def get_timewindow(self, *args, **kwargs):
         return self.rdb.get_timewindow(*args, **kwargs)
 
@@ -643,7 +664,8 @@ class DBManager:
         return self.rdb.add_software_to_profile(*args, **kwargs)
 
     def get_total_flows(self, *args, **kwargs):
-        return int(self.rdb.get_total_flows(*args, **kwargs))
+        # is 0 until the input process knows or estimates the total
+        return int(self.rdb.get_total_flows(*args, **kwargs) or 0)
 
     def increment_processed_flows(self, *args, **kwargs):
         return self.rdb.increment_processed_flows(*args, **kwargs)
@@ -849,6 +871,9 @@ class DBManager:
     def set_flow_label(self, *args, **kwargs):
         return self.sqlite.set_flow_label(*args, **kwargs)
 
+    def get_flow_labels(self, *args, **kwargs):
+        return self.sqlite.get_flow_labels(*args, **kwargs)
+
     def get_flow(self, *args, **kwargs):
         """returns the raw flow as read from the log file"""
         return self.sqlite.get_flow(*args, **kwargs)
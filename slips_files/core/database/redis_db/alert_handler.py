@@ -16,6 +16,7 @@ from slips_files.core.structures.evidence import (
     ProfileID,
     IoCType,
     Attacker,
+    evidence_to_dict,
 )
 
 
@@ -26,6 +27,11 @@ class AlertHandler:
     """
 
     name = "DB"
+    # the info of the attackers and victims is cached for this many
+    # seconds to enrich the evidence, since the same attacker usually
+    # causes many evidence in a short time
+    ip_info_cache_ttl = 5
+    ip_info_cache_size = 1000
 
     def increment_attack_counter(
         self, attacker: str, victim: Optional[Victim], evidence_type: str
@@ -149,6 +155,119 @@ class AlertHandler:
         except (KeyError, TypeError):
             return
 
+    def invalidate_ip_info_cache(self, ip: str):
+        """removes the given ip from the cache used to enrich evidence"""
+        self.ip_info_cache.pop(ip, None)
+
+    def get_ips_enrichment_info(
+        self, ips: List[str]
+    ) -> Dict[str, Tuple[Optional[dict], Union[dict, bool]]]:
+        """
+        returns {ip: (ip info, blacklisted ip info)} of the given ips.
+        the ip info is the ip's entry in IPsInfo as returned by
+        get_ip_info() and the blacklisted ip info is the value returned
+        by is_blacklisted_ip().
+        the ips that aren't cached are read from the db in one round trip
+        and cached for ip_info_cache_ttl seconds
+        """
+        now = time.monotonic()
+        result = {}
+        to_read = []
+        for ip in dict.fromkeys(ips):
+            cached = self.ip_info_cache.get(ip)
+            if cached and cached[0] > now:
+                self.ip_info_cache.move_to_end(ip)
+                result[ip] = cached[1:]
+            else:
+                to_read.append(ip)
+
+        if not to_read:
+            return result
+
+        pipe = self.rcache.pipeline()
+        pipe.hmget(self.constants.IPS_INFO, to_read)
+        pipe.hmget(self.constants.IOC_IPS, to_read)
+        ips_info, blacklisted_ips = pipe.execute()
+
+        expiry = now + self.ip_info_cache_ttl
+        for ip, ip_info, blacklisted_ip in zip(
+            to_read, ips_info, blacklisted_ips
+        ):
+            ip_info = json.loads(ip_info) if ip_info else None
+            blacklisted_ip = (
+                False if blacklisted_ip is None else json.loads(blacklisted_ip)
+            )
+            result[ip] = (ip_info, blacklisted_ip)
+            self.ip_info_cache[ip] = (expiry, ip_info, blacklisted_ip)
+            self.ip_info_cache.move_to_end(ip)
+
+        while len(self.ip_info_cache) > self.ip_info_cache_size:
+            self.ip_info_cache.popitem(last=False)
+        return result
+
+    def enrich_evidence(self, evidence: Evidence):
+        """
+        sets the TI, AS, rDNS and SNI of the attacker and the victim of
+        the given evidence.
+        the info of the attacker's and victim's IPs is read once using
+        get_ips_enrichment_info()
+        """
+        to_enrich: List[Union[Attacker, Victim]] = [evidence.attacker]
+        if hasattr(evidence, "victim") and evidence.victim:
+            to_enrich.append(evidence.victim)
+
+        ips_info = self.get_ips_enrichment_info(
+            [entity.value for entity in to_enrich if self._is_ip(entity)]
+        )
+        for entity in to_enrich:
+            if not self._is_ip(entity):
+                # domains don't have ip info
+                entity.TI = self.get_ti(entity)
+                entity.AS = entity.rDNS = entity.SNI = None
+                continue
+
+            ip = entity.value
+            ip_info, blacklisted_ip = ips_info[ip]
+            entity.TI = (
+                blacklisted_ip.get("source")
+                if isinstance(blacklisted_ip, dict)
+                else None
+            )
+            entity.AS = self._get_info(ip, ip_info, "asn")
+            entity.rDNS = self._get_info(ip, ip_info, "reverse_dns")
+            entity.SNI = self._get_server_name(
+                self._get_info(ip, ip_info, "SNI")
+            )
+
+    @staticmethod
+    def _get_info(ip: str, ip_info: Optional[dict], info_to_get: str):
+        """
+        :param ip_info: the ip info hash of the given ip as returned by
+        get_ip_info()
+        :param info_to_get: the value to get from the ip info hash
+        """
+        if utils.is_ignored_ip(ip) or not ip_info:
+            return
+
+        info = ip_info.get(info_to_get)
+        if not info:
+            return
+        return info
+
+    @staticmethod
+    def _get_server_name(sni) -> Optional[str]:
+        """returns the server name of the SNI stored in the ip info hash"""
+        if not sni:
+            return
+        sni = sni[0] if isinstance(sni, list) else sni
+        return sni.get("server_name")
+
+    @staticmethod
+    def _is_ip(entity: Union[Attacker, Victim]) -> bool:
+        if isinstance(entity, Victim):
+            return entity.victim_type == IoCType.IP
+        return entity.attacker_type == IoCType.IP
+
     def set_evidence(self, evidence: Evidence):
         """
         Set the evidence for this Profile and Timewindow.
@@ -167,17 +286,9 @@ class AlertHandler:
 
         self.set_flow_causing_evidence(evidence.uid, evidence.id)
 
-        evidence.attacker.TI = self.get_ti(evidence.attacker)
-        evidence.attacker.AS = self.get_asn_info(evidence.attacker.value)
-        evidence.attacker.rDNS = self.get_rdns_info(evidence.attacker.value)
-        evidence.attacker.SNI = self.get_sni_info(evidence.attacker.value)
-        if hasattr(evidence, "victim") and evidence.victim:
-            evidence.victim.TI = self.get_ti(evidence.victim)
-            evidence.victim.AS = self.get_asn_info(evidence.victim.value)
-            evidence.victim.rDNS = self.get_rdns_info(evidence.victim.value)
-            evidence.victim.SNI = self.get_sni_info(evidence.victim.value)
+        self.enrich_evidence(evidence)
 
-        evidence_to_send: dict = utils.to_dict(evidence)
+        evidence_to_send: dict = evidence_to_dict(evidence)
         evidence_to_send: str = json.dumps(evidence_to_send)
 
         evidence_hash = f"{evidence.profile}_{evidence.timewindow}_evidence"
@@ -372,18 +483,23 @@ class AlertHandler:
 
         return old_max_threat_level_float
 
-    def update_past_threat_levels(self, profileid, threat_level, confidence):
+    @staticmethod
+    def add_to_past_threat_levels(
+        past_threat_levels: Optional[str],
+        threat_level: str,
+        confidence,
+        now: str,
+    ) -> str:
         """
-        updates the past_threat_levels key of the given profileid
+        returns the given past_threat_levels with the given threat level
+        added.
         if the past threat level and confidence
         are the same as the ones we wanna store, we replace the timestamp only
         """
-        now = utils.convert_format(time.time(), utils.alerts_format)
         confidence = f"confidence: {confidence}"
         # this is what we'll be storing in the db, tl, ts, and confidence
         threat_level_data = (threat_level, now, confidence)
 
-        past_threat_levels: str = self.r.hget(profileid, "past_threat_levels")
         if past_threat_levels:
             # get the list of ts and past threat levels
             past_threat_levels: List[Tuple] = json.loads(past_threat_levels)
@@ -408,7 +524,17 @@ class AlertHandler:
             # first time setting a threat level for this profile
             past_threat_levels = [threat_level_data]
 
-        past_threat_levels = json.dumps(past_threat_levels)
+        return json.dumps(past_threat_levels)
+
+    def update_past_threat_levels(self, profileid, threat_level, confidence):
+        """
+        updates the past_threat_levels key of the given profileid
+        """
+        now = utils.convert_format(time.time(), utils.alerts_format)
+        past_threat_levels: str = self.r.hget(profileid, "past_threat_levels")
+        past_threat_levels = self.add_to_past_threat_levels(
+            past_threat_levels, threat_level, confidence, now
+        )
         self.r.hset(profileid, "past_threat_levels", past_threat_levels)
 
     def update_ips_info(self, profileid, max_threat_lvl, confidence):
@@ -424,6 +550,7 @@ class AlertHandler:
             score_confidence = cached_ip_info
 
         self.rcache.hset("IPsInfo", ip, json.dumps(score_confidence))
+        self.invalidate_ip_info_cache(ip)
 
     def update_threat_level(
         self, profileid: str, threat_level: str, confidence: float
@@ -447,3 +574,67 @@ class AlertHandler:
         )
 
         self.update_ips_info(profileid, max_threat_lvl, confidence)
+
+    def update_threat_levels(
+        self,
+        threat_levels: Dict[str, List[str]],
+        confidence: float,
+        chunk_size: int = 5000,
+    ):
+        """
+        Same as calling update_threat_level() for every given threat level
+        of many profiles, e.g. the ips of a TI feed. Instead of a few
+        round trips per threat level, the profiles are read and updated in
+        pipelines of chunk_size profiles each
+        :param threat_levels: {profileid: [threat levels]} in the order
+        they were set, they're all added to the past threat levels
+        """
+        now = utils.convert_format(time.time(), utils.alerts_format)
+        profileids = list(threat_levels)
+        for start in range(0, len(profileids), chunk_size):
+            chunk = profileids[start : start + chunk_size]
+            ips = [profileid.split("_")[-1] for profileid in chunk]
+
+            pipe = self.r.pipeline(transaction=False)
+            for profileid in chunk:
+                pipe.hmget(profileid, "past_threat_levels", "max_threat_level")
+            old_values: List[list] = pipe.execute()
+            ips_info: List[Optional[str]] = self.rcache.hmget(
+                self.constants.IPS_INFO, ips
+            )
+
+            pipe = self.r.pipeline(transaction=False)
+            new_ips_info = {}
+            for profileid, ip, (past, old_max), ip_info in zip(
+                chunk, ips, old_values, ips_info
+            ):
+                profile_threat_levels: List[str] = threat_levels[profileid]
+                for threat_level in profile_threat_levels:
+                    past = self.add_to_past_threat_levels(
+                        past, threat_level, confidence, now
+                    )
+                max_threat_level: str = max(
+                    profile_threat_levels, key=utils.threat_levels.get
+                )
+                max_threat_lvl = utils.threat_levels[max_threat_level]
+                if old_max and utils.threat_levels[old_max] >= max_threat_lvl:
+                    max_threat_lvl = utils.threat_levels[old_max]
+                else:
+                    pipe.hset(profileid, "max_threat_level", max_threat_level)
+                pipe.hset(
+                    profileid,
+                    mapping={
+                        "threat_level": profile_threat_levels[-1],
+                        "past_threat_levels": past,
+                    },
+                )
+
+                ip_info = json.loads(ip_info) if ip_info else {}
+                ip_info.update(
+                    {"score": max_threat_lvl, "confidence": confidence}
+                )
+                new_ips_info[ip] = json.dumps(ip_info)
+                self.invalidate_ip_info_cache(ip)
+
+            pipe.execute()
+            self.rcache.hset(self.constants.IPS_INFO, mapping=new_ips_info)
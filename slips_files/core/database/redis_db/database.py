@@ -9,6 +9,7 @@ from slips_files.core.database.redis_db.ioc_handler import IoCHandler
 from slips_files.core.database.redis_db.alert_handler import AlertHandler
 from slips_files.core.database.redis_db.profile_handler import ProfileHandler
 from slips_files.core.database.redis_db.p2p_handler import P2PHandler
+from slips_files.core.helpers import bus_telemetry
 
 import os
 import signal
@@ -19,6 +20,7 @@ import subprocess
 import ipaddress
 import sys
 import validators
+from collections import OrderedDict
 from typing import (
     List,
     Dict,
@@ -81,6 +83,7 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler, P2PHandler):
         "control_channel",
         "new_module_flow" "cpu_profile",
         "memory_profile",
+        "sampling_profiler",
         "fides_d",
         "fides2network",
         "network2fides",
@@ -137,6 +140,10 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler, P2PHandler):
                 )
 
             cls._instances[cls.redis_port] = super().__new__(cls)
+            cls._instances[cls.redis_port].ip_info_cache = OrderedDict()
+            cls._instances[cls.redis_port].bus_telemetry = (
+                bus_telemetry.BusTelemetry(cls.r, cls.supported_channels)
+            )
             # By default the slips internal time is
             # 0 until we receive something
             cls.set_slips_internal_time(0)
@@ -371,13 +378,14 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler, P2PHandler):
 
     def publish(self, channel, msg):
         """Publish a msg in the given channel"""
-        # keeps track of how many msgs were published in the given channel
-        self.r.hincrby("msgs_published_at_runtime", channel, 1)
+        # keeps track of how many msgs were published in the given
+        # channel, and adds the publish time and seq to the msg
+        msg = self.bus_telemetry.publish(channel, msg)
         self.r.publish(channel, msg)
 
     def get_msgs_published_in_channel(self, channel: str) -> int:
         """returns the number of msgs published in a channel"""
-        return self.r.hget("msgs_published_at_runtime", channel)
+        return self.r.hget(bus_telemetry.PUBLISHED_KEY, channel)
 
     def subscribe(self, channel: str, ignore_subscribe_messages=True):
         """Subscribe to channel"""
@@ -405,7 +413,7 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler, P2PHandler):
         notice: there has to be a timeout or the channel will wait forever and never receive a new msg
         """
         try:
-            return channel.get_message(timeout=timeout)
+            return self.unwrap_message(channel.get_message(timeout=timeout))
         except redis.exceptions.ConnectionError as ex:
             # make sure we log the error only once
             if not self.is_connection_error_logged():
@@ -435,9 +443,26 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler, P2PHandler):
                 self.connection_retry += 1
                 self.get_message(channel, timeout)
 
+    @staticmethod
+    def unwrap_message(message: Optional[dict]) -> Optional[dict]:
+        """
+        replaces the data of the given msg with the data published and
+        sets the time and seq it was published with
+        """
+        if message:
+            (
+                message["publish_ts"],
+                message["seq"],
+                message["data"],
+            ) = bus_telemetry.unwrap(message["data"])
+        return message
+
     def print(self, *args, **kwargs):
         return self.printer.print(*args, **kwargs)
 
+    def lazy_print(self, *args, **kwargs):
+        return self.printer.lazy_print(*args, **kwargs)
+
     def get_ip_info(self, ip: str) -> Optional[dict]:
         """
         Return information about this IP from IPsInfo key
@@ -454,14 +479,7 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler, P2PHandler):
         if utils.is_ignored_ip(ip):
             return
 
-        ip_info = self.get_ip_info(ip)
-        if not ip_info:
-            return
-
-        info = ip_info.get(info_to_get)
-        if not info:
-            return
-        return info
+        return self._get_info(ip, self.get_ip_info(ip), info_to_get)
 
     def set_new_ip(self, ip: str):
         """
@@ -480,6 +498,7 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler, P2PHandler):
             # must be '{}', an empty dictionary! if not the logic breaks.
             # We use the empty dictionary to find if an IP exists or not
             self.rcache.hset(self.constants.IPS_INFO, ip, "{}")
+            self.invalidate_ip_info_cache(ip)
             # Publish that there is a new IP ready in the channel
             self.publish("new_ip", ip)
 
@@ -641,6 +660,7 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler, P2PHandler):
         self.rcache.hset(
             self.constants.IPS_INFO, ip, json.dumps(cached_ip_info)
         )
+        self.invalidate_ip_info_cache(ip)
         if is_new_info:
             self.r.publish("ip_info_change", ip)
 
@@ -1020,11 +1040,7 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler, P2PHandler):
         returns sni info about the given IP
         returns the server name or none
         """
-        sni = self._get_from_ip_info(ip, "SNI")
-        if not sni:
-            return
-        sni = sni[0] if isinstance(sni, list) else sni
-        return sni.get("server_name")
+        return self._get_server_name(self._get_from_ip_info(ip, "SNI"))
 
     def get_ip_identification(self, ip: str, get_ti_data=True) -> str:
         """
@@ -1524,10 +1540,51 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler, P2PHandler):
     def get_stdfile(self, file_type):
         return self.r.get(file_type)
 
-    def incr_msgs_received_in_channel(self, module: str, channel: str):
-        """increments the number of msgs received by a module in the given
-        channel by 1"""
-        self.r.hincrby(f"{module}_msgs_received_at_runtime", channel, 1)
+    def count_msg_received(self, module: str, channel: str, message: dict):
+        """
+        counts the given msg received by a module in the given channel
+        and how long it waited in the channel
+        """
+        self.bus_telemetry.receive(module, channel, message.get("publish_ts"))
+
+    def record_handler_time(
+        self, module: str, channels: List[str], seconds: float
+    ):
+        """
+        records how long the given module took to handle the msgs it
+        received in the given channels
+        """
+        self.bus_telemetry.record_handler_time(module, channels, seconds)
+
+    def flush_bus_telemetry(self):
+        self.bus_telemetry.flush()
+
+    def get_bus_telemetry(self) -> List[dict]:
+        """
+        returns the msgs received, backlog, and latency and handler
+        time percentiles of each module and channel
+        """
+        return bus_telemetry.get_bus_telemetry(self.r)
+
+    def set_state_memory_usage(self, module: str, usage: Dict[str, int]):
+        """
+        stores the approximate memory used by the tw state stores of
+        the given module
+        :param usage: {store name: bytes}
+        """
+        self.r.hset(f"{module}_state_memory_usage", mapping=usage)
+
+    def get_state_memory_usage(self, module: str) -> Dict[str, int]:
+        """
+        returns the approximate memory used by the tw state stores of
+        the given module {store name: bytes}
+        """
+        return {
+            store: int(usage)
+            for store, usage in self.r.hgetall(
+                f"{module}_state_memory_usage"
+            ).items()
+        }
 
     def get_msgs_received_at_runtime(self, module: str) -> Dict[str, int]:
         """
@@ -1535,4 +1592,4 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler, P2PHandler):
         many msgs were received on each one
         :returns: {channel_name: number_of_msgs, ...}
         """
-        return self.r.hgetall(f"{module}_msgs_received_at_runtime")
+        return self.r.hgetall(bus_telemetry.RECEIVED_KEY.format(module=module))
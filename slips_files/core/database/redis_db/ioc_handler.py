@@ -1,4 +1,5 @@
 import json
+from itertools import islice
 from typing import (
     Dict,
     List,
@@ -7,6 +8,11 @@ from typing import (
     Optional,
 )
 
+# the number of fields written to a hash per redis cmd when storing the
+# IoCs of a TI feed. big feeds are written in a pipeline of cmds of this
+# size instead of a single huge HSET that blocks redis while it runs
+IOC_WRITE_CHUNK_SIZE = 5000
+
 
 class IoCHandler:
     """
@@ -140,6 +146,17 @@ class IoCHandler:
         """
         self.rcache.hdel(self.constants.IOC_DOMAINS, *domains)
 
+    def _set_iocs_in_chunks(self, key: str, iocs: Dict[str, str]):
+        """
+        stores the given {ioc: info} in the given hash in the cache db,
+        IOC_WRITE_CHUNK_SIZE fields per HSET, all sent in 1 pipeline
+        """
+        pipe = self.rcache.pipeline(transaction=False)
+        iocs = iter(iocs.items())
+        while chunk := dict(islice(iocs, IOC_WRITE_CHUNK_SIZE)):
+            pipe.hset(key, mapping=chunk)
+        pipe.execute()
+
     def add_ips_to_IoC(self, ips_and_description: Dict[str, str]) -> None:
         """
         Store a group of IPs in the db as they were obtained from an IoC source
@@ -150,7 +167,9 @@ class IoCHandler:
 
         """
         if ips_and_description:
-            self.rcache.hmset(self.constants.IOC_IPS, ips_and_description)
+            self._set_iocs_in_chunks(
+                self.constants.IOC_IPS, ips_and_description
+            )
 
     def add_domains_to_IoC(self, domains_and_description: dict) -> None:
         """
@@ -161,7 +180,7 @@ class IoCHandler:
             'threat_level':... ,'description'}}
         """
         if domains_and_description:
-            self.rcache.hmset(
+            self._set_iocs_in_chunks(
                 self.constants.IOC_DOMAINS, domains_and_description
             )
 
@@ -173,7 +192,7 @@ class IoCHandler:
          'threat_level':... ,'description'}}
         """
         if malicious_ip_ranges:
-            self.rcache.hmset(
+            self._set_iocs_in_chunks(
                 self.constants.IOC_IP_RANGES, malicious_ip_ranges
             )
 
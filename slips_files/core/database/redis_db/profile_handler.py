@@ -3,9 +3,9 @@ import json
 import sys
 import time
 import traceback
-from dataclasses import asdict
 from math import floor
 from typing import (
+    Dict,
     Tuple,
     Union,
     Optional,
@@ -15,6 +15,8 @@ from typing import (
 import redis
 import validators
 
+from slips_files.common.slips_utils import utils
+
 
 class ProfileHandler:
     """
@@ -58,6 +60,66 @@ class ProfileHandler:
         else:
             self.r.hset("DHCP_flows", f"{profileid}_{twid}", json.dumps(flow))
 
+    def add_sent_bytes(self, profileid: str, twid: str, flow):
+        """
+        Adds the sent bytes of the given flow to the total sent to its
+        daddr in the given profileid and twid, and stores the starttime of
+        the flow as the last one sent to it. the uids of the flows are kept
+        in a set per daddr, so a flow added twice is counted once.
+        the totals are read by flowalerts when the tw is closed to detect
+        data uploads
+        """
+        try:
+            sbytes = int(flow.sbytes)
+        except (AttributeError, TypeError, ValueError):
+            return
+
+        if not sbytes or not flow.daddr:
+            return
+
+        key = f"{profileid}_{twid}_sent_bytes"
+        pipe = self.r.pipeline(transaction=False)
+        pipe.sadd(f"{key}_uids_{flow.daddr}", flow.uid)
+        pipe.hincrby(key, flow.daddr, sbytes)
+        pipe.hset(f"{key}_last_ts", flow.daddr, flow.starttime)
+        is_new_flow, *_ = pipe.execute()
+        if not is_new_flow:
+            # duplicates are rare, undo the increment instead of waiting
+            # for the sadd result before every increment
+            self.r.hincrby(key, flow.daddr, -sbytes)
+
+    def pop_sent_bytes(
+        self, profileid: str, twid: str, min_bytes: int
+    ) -> Dict[str, Tuple[int, List[str], str]]:
+        """
+        Deletes the totals stored by add_sent_bytes() in the given
+        profileid and twid, and returns the daddrs that were sent at least
+        min_bytes
+        {daddr: (sent bytes, [uids], starttime of the last flow)}
+        """
+        key = f"{profileid}_{twid}_sent_bytes"
+        pipe = self.r.pipeline()
+        pipe.hgetall(key)
+        pipe.hgetall(f"{key}_last_ts")
+        pipe.delete(key, f"{key}_last_ts")
+        totals, last_ts, _ = pipe.execute()
+        if not totals:
+            return {}
+
+        # only the uids of the daddrs to alert on are read
+        uploads = [
+            daddr for daddr, total in totals.items() if int(total) >= min_bytes
+        ]
+        pipe = self.r.pipeline()
+        for daddr in uploads:
+            pipe.smembers(f"{key}_uids_{daddr}")
+        pipe.delete(*(f"{key}_uids_{daddr}" for daddr in totals))
+        *uids, _ = pipe.execute()
+        return {
+            daddr: (int(totals[daddr]), sorted(daddr_uids), last_ts[daddr])
+            for daddr, daddr_uids in zip(uploads, uids)
+        }
+
     def get_timewindow(self, flowtime, profileid):
         """
         This function returns the TW in the database where the flow belongs.
@@ -123,7 +185,7 @@ class ProfileHandler:
         http_flow = {
             "profileid": profileid,
             "twid": twid,
-            "flow": asdict(flow),
+            "flow": utils.flow_to_dict(flow),
         }
         to_send = json.dumps(http_flow)
         self.publish("new_http", to_send)
@@ -176,7 +238,7 @@ class ProfileHandler:
         to_send = {
             "profileid": profileid,
             "twid": twid,
-            "flow": asdict(flow),
+            "flow": utils.flow_to_dict(flow),
         }
 
         to_send = json.dumps(to_send)
@@ -765,7 +827,7 @@ class ProfileHandler:
         to_send = {
             "profileid": profileid,
             "twid": twid,
-            "flow": asdict(flow),
+            "flow": utils.flow_to_dict(flow),
             "stime": flow.starttime,
             "interpreted_state": self.get_final_state_from_flags(
                 flow.state, flow.pkts
@@ -780,6 +842,8 @@ class ProfileHandler:
             self.set_input_metadata({"file_start": flow.starttime})
             self.first_flow = False
 
+        self.add_sent_bytes(profileid, twid, flow)
+
         # dont send arp flows in this channel, they have their own
         # new_arp channel
         if flow.type_ != "arp":
@@ -833,7 +897,7 @@ class ProfileHandler:
         to_send = {
             "profileid": profileid,
             "twid": twid,
-            "flow": asdict(flow),
+            "flow": utils.flow_to_dict(flow),
         }
         to_send = json.dumps(to_send)
         self.publish("new_ssh", to_send)
@@ -858,7 +922,7 @@ class ProfileHandler:
         to_send = {
             "profileid": profileid,
             "twid": twid,
-            "flow": asdict(flow),
+            "flow": utils.flow_to_dict(flow),
         }
         to_send = json.dumps(to_send)
         self.publish("new_notice", to_send)
@@ -881,7 +945,11 @@ class ProfileHandler:
         The idea is that from the uid of a netflow, you can access which other
          type of info is related to that uid
         """
-        to_send = {"profileid": profileid, "twid": twid, "flow": asdict(flow)}
+        to_send = {
+            "profileid": profileid,
+            "twid": twid,
+            "flow": utils.flow_to_dict(flow),
+        }
         to_send = json.dumps(to_send)
         self.publish("new_ssl", to_send)
         self.print(f"Adding SSL flow to DB: {flow}", 3, 0)
@@ -1466,15 +1534,14 @@ class ProfileHandler:
         for profile_tw_to_close in profiles_tws_to_close:
             profile_tw_to_close_id = profile_tw_to_close[0]
             profile_tw_to_close_time = profile_tw_to_close[1]
-            self.print(
-                f"The profile id {profile_tw_to_close_id} has to be closed"
-                f" because it was"
+            self.lazy_print(
+                lambda: f"The profile id {profile_tw_to_close_id} has to be "
+                f"closed because it was"
                 f" last modifed on {profile_tw_to_close_time} and we are "
                 f"closing everything older than {modification_time}."
                 f" Current time {sit}. "
                 f"Difference: {modification_time - profile_tw_to_close_time}",
-                3,
-                0,
+                verbose=3,
             )
             self.mark_profile_tw_as_closed(profile_tw_to_close_id)
 
@@ -1520,7 +1587,7 @@ class ProfileHandler:
             "twid": twid,
             "tupleid": str(tupleid),
             "uid": flow.uid,
-            "flow": asdict(flow),
+            "flow": utils.flow_to_dict(flow),
         }
         to_send = json.dumps(to_send)
         self.publish("new_letters", to_send)
@@ -1584,14 +1651,16 @@ class ProfileHandler:
 
                 # Separate the symbol to add and the previous data
                 (symbol_to_add, previous_two_timestamps) = symbol
-                self.print(
-                    f"Not the first time for tuple {tupleid} as an "
+                # formatting prev_symbols is expensive, only do it when
+                # the verbosity is high enough to print it
+                self.lazy_print(
+                    lambda: f"Not the first time for tuple {tupleid} as an "
                     f"{direction} for "
-                    f"{profileid} in TW {twid}. Add the symbol: {symbol_to_add}. "
+                    f"{profileid} in TW {twid}. Add the symbol: "
+                    f"{symbol_to_add}. "
                     f"Store previous_times: {previous_two_timestamps}. "
                     f"Prev Data: {prev_symbols}",
-                    3,
-                    0,
+                    verbose=3,
                 )
 
                 # Add it to form the string of letters
@@ -1602,21 +1671,24 @@ class ProfileHandler:
                 )
 
                 prev_symbols[tupleid] = (new_symbol, previous_two_timestamps)
-                self.print(
-                    f"\tLetters so far for tuple {tupleid}:" f" {new_symbol}",
-                    3,
-                    0,
+                self.lazy_print(
+                    "\tLetters so far for tuple %s: %s",
+                    tupleid,
+                    new_symbol,
+                    verbose=3,
                 )
             except (TypeError, KeyError):
                 # TODO check that this condition is triggered correctly
                 #  only for the first case and not the rest after...
                 # There was no previous data stored in the DB to append
                 # the given symbol to.
-                self.print(
-                    f"First time for tuple {tupleid} as an"
-                    f" {direction} for {profileid} in TW {twid}",
-                    3,
-                    0,
+                self.lazy_print(
+                    "First time for tuple %s as an %s for %s in TW %s",
+                    tupleid,
+                    direction,
+                    profileid,
+                    twid,
+                    verbose=3,
                 )
                 prev_symbols[tupleid] = symbol
 
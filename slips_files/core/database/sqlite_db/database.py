@@ -4,7 +4,6 @@ import os.path
 import sqlite3
 import json
 import csv
-from dataclasses import asdict
 from threading import Lock
 from time import sleep
 
@@ -163,6 +162,26 @@ class SQLiteDB:
             )
             self.execute(query)
 
+    def get_flow_labels(self, uids: List[str]) -> Dict[str, str]:
+        """
+        returns the labels of the flows and altflows with the given uids
+        """
+        labels = {}
+        # sqlite limits the number of params of a query
+        chunk_size = 500
+        for i in range(0, len(uids), chunk_size):
+            chunk = uids[i : i + chunk_size]
+            placeholders = ", ".join("?" * len(chunk))
+            self.execute(
+                f"SELECT uid, label FROM flows "
+                f"WHERE uid IN ({placeholders}) "
+                f"UNION SELECT uid, label FROM altflows "
+                f"WHERE uid IN ({placeholders})",
+                chunk * 2,
+            )
+            labels.update(self.fetchall())
+        return labels
+
     def export_labeled_flows(self, output_dir, format):
         if "tsv" in format:
             csv_output_file = os.path.join(output_dir, "labeled_flows.tsv")
@@ -238,7 +257,7 @@ class SQLiteDB:
                 profileid,
                 twid,
                 flow.uid,
-                json.dumps(asdict(flow)),
+                json.dumps(utils.flow_to_dict(flow)),
                 label,
                 flow.aid,
             )
@@ -252,7 +271,7 @@ class SQLiteDB:
                 profileid,
                 twid,
                 flow.uid,
-                json.dumps(asdict(flow)),
+                json.dumps(utils.flow_to_dict(flow)),
                 label,
             )
 
@@ -284,7 +303,7 @@ class SQLiteDB:
             profileid,
             twid,
             flow.uid,
-            json.dumps(asdict(flow)),
+            json.dumps(utils.flow_to_dict(flow)),
             label,
             flow.type_,
         )
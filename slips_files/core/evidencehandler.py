@@ -19,7 +19,8 @@
 # stratosphere@aic.fel.cvut.cz
 
 import json
-from typing import List, Dict, Optional
+from copy import copy
+from typing import Container, List, Dict, Optional
 from datetime import datetime
 from os import path
 import sys
@@ -37,9 +38,14 @@ from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.slips_utils import utils
 from slips_files.core.helpers.whitelist.whitelist import Whitelist
 from slips_files.core.helpers.notify import Notify
+from slips_files.core.helpers.evidence_accumulator import (
+    EvidenceAccumulator,
+    TWEvidence,
+)
 from slips_files.common.abstracts.core import ICore
 from slips_files.core.structures.evidence import (
-    dict_to_evidence,
+    evidence_to_dict,
+    trusted_dict_to_evidence,
     Evidence,
     Victim,
     EvidenceType,
@@ -78,10 +84,17 @@ class EvidenceHandler(ICore):
 
         self.c1 = self.db.subscribe("evidence_added")
         self.c2 = self.db.subscribe("new_blame")
+        self.c3 = self.db.subscribe("tw_closed")
         self.channels = {
             "evidence_added": self.c1,
             "new_blame": self.c2,
+            "tw_closed": self.c3,
         }
+        # the evidence of the recently modified timewindows, so we don't
+        # get them from the db every time we alert
+        self.accumulator = EvidenceAccumulator(
+            self.load_tw_evidence, separator=self.separator
+        )
 
         # clear output/alerts.log
         self.logfile = self.clean_file(self.output_dir, "alerts.log")
@@ -316,16 +329,13 @@ class EvidenceHandler(ICore):
         self, profileid: str, twid: str
     ) -> List[str]:
         """
-        returns a list of evidence <ids that were part of an alert in the
+        returns a list of evidence ids that were part of any alert in the
         given timewindow
         """
         past_alerts: dict = self.db.get_profileid_twid_alerts(profileid, twid)
-        try:
-            past_evidence_ids = list(past_alerts.values())[0]
-            past_evidence_ids: List[str] = json.loads(past_evidence_ids)
-        except IndexError:
-            # no past evidence
-            past_evidence_ids = []
+        past_evidence_ids: List[str] = []
+        for evidence_ids in past_alerts.values():
+            past_evidence_ids.extend(json.loads(evidence_ids))
         return past_evidence_ids
 
     def is_evidence_done_by_others(self, evidence: Evidence) -> bool:
@@ -335,32 +345,29 @@ class EvidenceHandler(ICore):
         # others.
         return evidence.attacker.direction != "SRC"
 
-    def get_evidence_for_tw(
-        self, profileid: str, twid: str
-    ) -> Optional[Dict[str, Evidence]]:
+    def load_tw_evidence(self, profileid: str, twid: str) -> TWEvidence:
         """
-        filters and returns all the evidence for this profile in this TW
-        returns the dict with filtered evidence
+        gets, parses and filters all the evidence of this profile in
+        this TW from the db.
+        used by the accumulator for the timewindows that aren't in memory
         """
+        tw = TWEvidence(
+            alerted_ids=set(
+                self.get_evidence_that_were_part_of_a_past_alert(
+                    profileid, twid
+                )
+            )
+        )
         tw_evidence: Dict[str, dict] = self.db.get_twid_evidence(
             profileid, twid
         )
-        if not tw_evidence:
-            return
-
-        past_evidence_ids: List[str] = (
-            self.get_evidence_that_were_part_of_a_past_alert(profileid, twid)
-        )
-
-        filtered_evidence = {}
-
         for id, evidence in tw_evidence.items():
             id: str
             evidence: str
             evidence: dict = json.loads(evidence)
-            evidence: Evidence = dict_to_evidence(evidence)
+            evidence: Evidence = trusted_dict_to_evidence(evidence)
 
-            if self.is_filtered_evidence(evidence, past_evidence_ids):
+            if self.is_filtered_evidence(evidence, tw.alerted_ids):
                 continue
 
             if self.db.is_whitelisted_evidence(id):
@@ -375,12 +382,21 @@ class EvidenceHandler(ICore):
             if not self.db.is_evidence_processed(id):
                 continue
 
-            filtered_evidence[evidence.id] = evidence
+            tw.evidence[evidence.id] = evidence
 
-        return filtered_evidence
+        return tw
+
+    def get_evidence_for_tw(
+        self, profileid: str, twid: str
+    ) -> Optional[Dict[str, Evidence]]:
+        """
+        returns the filtered evidence of this profile in this TW that
+        weren't part of a past alert
+        """
+        return self.accumulator.get_evidence(profileid, twid) or None
 
     def is_filtered_evidence(
-        self, evidence: Evidence, past_evidence_ids: List[str]
+        self, evidence: Evidence, past_evidence_ids: Container[str]
     ):
         """
         filters the following
@@ -432,7 +448,7 @@ class EvidenceHandler(ICore):
         """
         for evidence in tw_evidence.values():
             evidence: Evidence
-            evidence: dict = utils.to_dict(evidence)
+            evidence: dict = evidence_to_dict(evidence)
             self.db.publish("export_evidence", json.dumps(evidence))
 
     def is_blocking_module_supported(self) -> bool:
@@ -602,7 +618,9 @@ class EvidenceHandler(ICore):
             if msg := self.get_msg("evidence_added"):
                 msg["data"]: str
                 evidence: dict = json.loads(msg["data"])
-                evidence: Evidence = dict_to_evidence(evidence)
+                # this evidence was validated when it was created and
+                # serialized by the db
+                evidence: Evidence = trusted_dict_to_evidence(evidence)
                 profileid: str = str(evidence.profile)
                 twid: str = str(evidence.timewindow)
                 evidence_type: EvidenceType = evidence.evidence_type
@@ -622,6 +640,16 @@ class EvidenceHandler(ICore):
                     self.db.delete_evidence(profileid, twid, evidence.id)
                     continue
 
+                tw: TWEvidence = self.accumulator.get_tw(profileid, twid)
+                # filtered evidence dont add to the acc threat level
+                is_filtered: bool = self.is_filtered_evidence(
+                    evidence, tw.alerted_ids
+                )
+                if not is_filtered:
+                    # a copy, because the description of this one is
+                    # changed below
+                    self.accumulator.add(copy(evidence))
+
                 # convert time to local timezone
                 if self.is_running_non_stop:
                     timestamp: datetime = utils.convert_to_local_timezone(
@@ -644,13 +672,7 @@ class EvidenceHandler(ICore):
                     evidence.profile.ip, evidence.victim, evidence_type
                 )
 
-                past_evidence_ids: List[str] = (
-                    self.get_evidence_that_were_part_of_a_past_alert(
-                        profileid, twid
-                    )
-                )
-                # filtered evidence dont add to the acc threat level
-                if not self.is_filtered_evidence(evidence, past_evidence_ids):
+                if not is_filtered:
                     accumulated_threat_level: float = (
                         self.update_accumulated_threat_level(evidence)
                     )
@@ -665,7 +687,7 @@ class EvidenceHandler(ICore):
                     accumulated_threat_level,
                 )
 
-                evidence_dict: dict = utils.to_dict(evidence)
+                evidence_dict: dict = evidence_to_dict(evidence)
                 self.db.publish("report_to_peers", json.dumps(evidence_dict))
 
                 # if the profile was already blocked in
@@ -702,6 +724,14 @@ class EvidenceHandler(ICore):
                             correl_id=list(tw_evidence.keys()),
                         )
                         self.handle_new_alert(alert, tw_evidence)
+                        self.accumulator.mark_as_alerted(
+                            profileid, twid, tw_evidence.keys()
+                        )
+
+            if msg := self.get_msg("tw_closed"):
+                # no more flows are added to this tw, the few evidence
+                # that may still come for it are loaded from the db
+                self.accumulator.evict(msg["data"])
 
             if msg := self.get_msg("new_blame"):
                 data = msg["data"]
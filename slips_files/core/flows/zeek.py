@@ -1,18 +1,83 @@
 """
 Data classes for all types of zeek flows
+
+The flows are slotted, so they don't have a __dict__, and the fields
+derived from other fields are computed when they're accessed instead
+of every time a flow is created.
 """
 
 from dataclasses import (
     dataclass,
     field,
+    fields,
+)
+from operator import attrgetter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Tuple,
 )
-from typing import List
 from datetime import timedelta
 from slips_files.common.slips_utils import utils
 
-
-@dataclass
-class Conn:
+# {flow class: (the names of its fields, a func returning their values)}
+FIELDS: Dict[type, Tuple[Tuple[str, ...], Callable]] = {}
+
+
+def get_fields(flow_class) -> Tuple[Tuple[str, ...], Callable]:
+    try:
+        return FIELDS[flow_class]
+    except KeyError:
+        names = tuple(f.name for f in fields(flow_class))
+        FIELDS[flow_class] = (names, attrgetter(*names))
+        return FIELDS[flow_class]
+
+
+class ZeekFlow:
+    __slots__ = (
+        # (the values of the fields, the dict returned by to_dict())
+        "_serialized",
+        # the following are set by the modules while analyzing the flow
+        "interpreted_state",
+        "dport_name",
+        "timestamp_human",
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        returns the fields of the flow as a dict, same as asdict().
+        the dict is computed once and reused every time the flow is
+        published or stored, until one of its fields changes, so the
+        caller shouldn't modify it
+        """
+        names, get_values = get_fields(type(self))
+        # the lists are copied to tuples, the cached values would
+        # otherwise be the lists of the flow and change with them
+        flow_values = get_values(self)
+        values = tuple(
+            tuple(value) if isinstance(value, list) else value
+            for value in flow_values
+        )
+        try:
+            serialized_values, serialized = self._serialized
+            if serialized_values == values:
+                return serialized
+        except AttributeError:
+            # not serialized yet
+            pass
+
+        serialized = {
+            name: list(value) if isinstance(value, list) else value
+            for name, value in zip(names, flow_values)
+        }
+        self._serialized = (values, serialized)
+        return serialized
+
+
+@dataclass(slots=True)
+class Conn(ZeekFlow):
     starttime: str
     uid: str
     saddr: str
@@ -40,18 +105,30 @@ class Conn:
     type_: str = "conn"
     dir_: str = "->"
 
-    def __post_init__(self) -> None:
-        endtime = str(self.starttime) + str(timedelta(seconds=float(self.dur)))
-        self.endtime: str = endtime
-        self.pkts: int = self.spkts + self.dpkts
-        self.bytes: int = self.sbytes + self.dbytes
-        self.state_hist: str = self.history or self.state
+    @property
+    def endtime(self) -> str:
+        return str(self.starttime) + str(timedelta(seconds=float(self.dur)))
+
+    @property
+    def pkts(self) -> int:
+        return self.spkts + self.dpkts
+
+    @property
+    def bytes(self) -> int:
+        return self.sbytes + self.dbytes
+
+    @property
+    def state_hist(self) -> str:
+        return self.history or self.state
+
+    @property
+    def aid(self) -> str:
         # AIDs are for conn.log flows only
-        self.aid = utils.get_aid(self)
+        return utils.get_aid(self)
 
 
-@dataclass
-class DNS:
+@dataclass(slots=True)
+class DNS(ZeekFlow):
     starttime: str
     uid: str
     saddr: str
@@ -76,8 +153,8 @@ class DNS:
         )
 
 
-@dataclass
-class HTTP:
+@dataclass(slots=True)
+class HTTP(ZeekFlow):
     starttime: str
     uid: str
     saddr: str
@@ -101,12 +178,9 @@ class HTTP:
 
     type_: str = "http"
 
-    def __post_init__(self) -> None:
-        pass
-
 
-@dataclass
-class SSL:
+@dataclass(slots=True)
+class SSL(ZeekFlow):
     starttime: str
     uid: str
     saddr: str
@@ -137,8 +211,8 @@ class SSL:
     type_: str = "ssl"
 
 
-@dataclass
-class SSH:
+@dataclass(slots=True)
+class SSH(ZeekFlow):
     starttime: float
     uid: str
     saddr: str
@@ -162,8 +236,8 @@ class SSH:
     type_: str = "ssh"
 
 
-@dataclass
-class DHCP:
+@dataclass(slots=True)
+class DHCP(ZeekFlow):
     starttime: float
     uids: List[str]
     saddr: str
@@ -177,6 +251,9 @@ class DHCP:
     requested_addr: str
 
     type_: str = "dhcp"
+    # dhcp flows are stored once per uid in uids, this is the uid of
+    # the stored copy
+    uid: str = ""
 
     def __post_init__(self) -> None:
         # Some zeek flow don't have saddr or daddr,
@@ -186,8 +263,8 @@ class DHCP:
             self.saddr = self.smac
 
 
-@dataclass
-class FTP:
+@dataclass(slots=True)
+class FTP(ZeekFlow):
     starttime: float
     uid: str
     saddr: str
@@ -197,8 +274,8 @@ class FTP:
     type_: str = "ftp"
 
 
-@dataclass
-class SMTP:
+@dataclass(slots=True)
+class SMTP(ZeekFlow):
     starttime: float
     uid: str
     saddr: str
@@ -208,8 +285,8 @@ class SMTP:
     type_: str = "smtp"
 
 
-@dataclass
-class Tunnel:
+@dataclass(slots=True)
+class Tunnel(ZeekFlow):
     starttime: str
     uid: str
     saddr: str
@@ -224,8 +301,8 @@ class Tunnel:
     type_: str = "tunnel"
 
 
-@dataclass
-class Notice:
+@dataclass(slots=True)
+class Notice(ZeekFlow):
     starttime: str
     saddr: str
     daddr: str
@@ -267,8 +344,8 @@ class Notice:
             self.dport = self.dport
 
 
-@dataclass
-class Files:
+@dataclass(slots=True)
+class Files(ZeekFlow):
     starttime: str
     uid: str
     saddr: str
@@ -299,8 +376,8 @@ class Files:
             self.daddr = daddr
 
 
-@dataclass
-class ARP:
+@dataclass(slots=True)
+class ARP(ZeekFlow):
     starttime: str
     uid: str
     saddr: str
@@ -332,8 +409,8 @@ class ARP:
     type_: str = "arp"
 
 
-@dataclass
-class Software:
+@dataclass(slots=True)
+class Software(ZeekFlow):
     starttime: str
     uid: str
     saddr: str
@@ -346,14 +423,15 @@ class Software:
     version_minor: str
     type_: str = "software"
 
-    def __post_init__(self) -> None:
+    @property
+    def http_browser(self) -> bool:
         # store info about everything except http:broswer
         # we're already reading browser UA from http.log
-        self.http_browser = self.software == "HTTP::BROWSER"
+        return self.software == "HTTP::BROWSER"
 
 
-@dataclass
-class Weird:
+@dataclass(slots=True)
+class Weird(ZeekFlow):
     starttime: str
     uid: str
     saddr: str
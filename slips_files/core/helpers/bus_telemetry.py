@@ -0,0 +1,292 @@
+"""
+Throughput and latency telemetry of the redis message bus.
+
+Each process counts the msgs it publishes and receives in memory and
+flushes the counters to redis every few seconds in 1 pipeline, instead
+of sending 1 HINCRBY per msg.
+The msgs published by slips carry the time they were published and a
+sequence number, used to measure how long they wait in the channel
+before a module receives them.
+"""
+
+import os
+import threading
+import time
+from collections import (
+    Counter,
+    defaultdict,
+)
+from multiprocessing.util import Finalize
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+import redis
+
+# msgs published by slips start with this char, followed by the publish
+# time and sequence number separated by SEPARATOR
+ENVELOPE_PREFIX = "\x1e"
+SEPARATOR = "\x1f"
+# only the msgs of the channels slips reads using RedisDB.get_message()
+# are wrapped, the ones published to external processes, e.g. the go p2p
+# pigeon, are published as they are.
+# the msgs of these channels are read by slips but their readers don't
+# unwrap the envelope, e.g. the fides queues, so they're published as
+# they are too
+RAW_CHANNELS = frozenset(
+    {
+        "control_channel",
+        "p2p_data_request",
+        "report_to_peers",
+        "fides_d",
+        "fides2network",
+        "network2fides",
+        "fides2slips",
+        "slips2fides",
+        "cpu_profile",
+        "memory_profile",
+    }
+)
+# the upper bounds in ms of the histogram buckets, the last bucket is
+# for everything above the last bound
+BUCKETS = tuple(2**i for i in range(17))
+# redis keys
+PUBLISHED_KEY = "msgs_published_at_runtime"
+RECEIVED_KEY = "{module}_msgs_received_at_runtime"
+LATENCY_KEY = "bus_telemetry_latency"
+HANDLER_TIME_KEY = "bus_telemetry_handler_time"
+
+
+def get_bucket(ms: float) -> int:
+    for bucket, upper_bound in enumerate(BUCKETS):
+        if ms <= upper_bound:
+            return bucket
+    return len(BUCKETS)
+
+
+def wrap(msg: str, seq: int) -> str:
+    return f"{ENVELOPE_PREFIX}{time.time()}{SEPARATOR}{seq}{SEPARATOR}{msg}"
+
+
+def unwrap(data) -> Tuple[Optional[float], Optional[int], str]:
+    """
+    returns the publish time, sequence number and the msg published,
+    the time and seq are None if the msg wasn't wrapped
+    """
+    if not isinstance(data, str) or not data.startswith(ENVELOPE_PREFIX):
+        return None, None, data
+    publish_ts, seq, msg = data[1:].split(SEPARATOR, 2)
+    return float(publish_ts), int(seq), msg
+
+
+class BusTelemetry:
+    """
+    The in-memory counters of the current process.
+    They're flushed every flush_interval seconds and when the process
+    exits.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        wrapped_channels: Iterable[str] = (),
+        flush_interval: float = 5,
+    ):
+        """
+        :param wrapped_channels: the channels slips reads using
+        RedisDB.get_message(), only their msgs are wrapped
+        """
+        self.r = redis_client
+        self.wrapped_channels = frozenset(wrapped_channels) - RAW_CHANNELS
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.pid: Optional[int] = None
+        self.check_process()
+
+    def check_process(self):
+        """
+        resets the counters copied from the parent process when the
+        current process is forked, they're flushed by the parent
+        """
+        if self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        # {channel: the seq of the last msg published}
+        self.seq: Dict[str, int] = Counter()
+        # {channel: msgs}
+        self.published: Dict[str, int] = Counter()
+        # {(module, channel): msgs}
+        self.received: Dict[Tuple[str, str], int] = Counter()
+        # {(module, channel): {bucket: msgs}}
+        self.latency: Dict[Tuple[str, str], Dict[int, int]] = defaultdict(
+            Counter
+        )
+        self.handler_time: Dict[Tuple[str, str], Dict[int, int]] = defaultdict(
+            Counter
+        )
+        self.last_flush = time.time()
+        # multiprocessing runs it when the process exits
+        Finalize(self, self.flush, exitpriority=10)
+
+    def publish(self, channel: str, msg):
+        """
+        counts the given msg and returns it wrapped with its publish
+        time and seq
+        """
+        with self.lock:
+            self.check_process()
+            self.published[channel] += 1
+            if channel in self.wrapped_channels and isinstance(msg, str):
+                self.seq[channel] += 1
+                msg = wrap(msg, self.seq[channel])
+        self.flush_if_due()
+        return msg
+
+    def receive(self, module: str, channel: str, publish_ts: Optional[float]):
+        with self.lock:
+            self.check_process()
+            self.received[(module, channel)] += 1
+            if publish_ts is not None:
+                latency_ms = (time.time() - publish_ts) * 1000
+                self.latency[(module, channel)][get_bucket(latency_ms)] += 1
+        self.flush_if_due()
+
+    def record_handler_time(
+        self, module: str, channels: Iterable[str], seconds: float
+    ):
+        """
+        records the time the module took to handle the msgs it
+        received in the given channels, split evenly between them
+        """
+        channels = list(channels)
+        if not channels:
+            return
+        bucket = get_bucket(seconds * 1000 / len(channels))
+        with self.lock:
+            self.check_process()
+            for channel in channels:
+                self.handler_time[(module, channel)][bucket] += 1
+
+    def flush_if_due(self):
+        if time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            self.check_process()
+            published, self.published = self.published, Counter()
+            received, self.received = self.received, Counter()
+            latency, self.latency = self.latency, defaultdict(Counter)
+            handler_time, self.handler_time = (
+                self.handler_time,
+                defaultdict(Counter),
+            )
+            self.last_flush = time.time()
+
+        if not (published or received or handler_time):
+            return
+        pipe = self.r.pipeline(transaction=False)
+        for channel, msgs in published.items():
+            pipe.hincrby(PUBLISHED_KEY, channel, msgs)
+        for (module, channel), msgs in received.items():
+            pipe.hincrby(RECEIVED_KEY.format(module=module), channel, msgs)
+        for key, histograms in (
+            (LATENCY_KEY, latency),
+            (HANDLER_TIME_KEY, handler_time),
+        ):
+            for (module, channel), histogram in histograms.items():
+                for bucket, msgs in histogram.items():
+                    pipe.hincrby(key, f"{module}|{channel}|{bucket}", msgs)
+        try:
+            pipe.execute()
+        except redis.exceptions.ConnectionError:
+            # the db was shutdown before this process exited
+            pass
+
+
+def read_histograms(r, key: str) -> Dict[Tuple[str, str], Dict[int, int]]:
+    histograms = defaultdict(Counter)
+    for field, msgs in r.hgetall(key).items():
+        module, channel, bucket = field.rsplit("|", 2)
+        histograms[(module, channel)][int(bucket)] += int(msgs)
+    return histograms
+
+
+def get_percentile(histogram: Dict[int, int], percentile: float) -> float:
+    """
+    returns the upper bound in ms of the bucket that contains the given
+    percentile, inf if it's above the last bucket
+    """
+    total = sum(histogram.values())
+    if not total:
+        return 0
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= total * percentile:
+            break
+    return BUCKETS[bucket] if bucket < len(BUCKETS) else float("inf")
+
+
+def get_bus_telemetry(r) -> List[dict]:
+    """
+    returns the telemetry of each channel each module receives msgs
+    from, as flushed by all slips processes.
+    the backlog is the number of msgs published in the channel that
+    the module didn't receive yet
+    :param r: the redis client of the db used by slips
+    """
+    published = {
+        channel: int(msgs)
+        for channel, msgs in r.hgetall(PUBLISHED_KEY).items()
+    }
+    latency = read_histograms(r, LATENCY_KEY)
+    handler_time = read_histograms(r, HANDLER_TIME_KEY)
+
+    telemetry = []
+    received_keys = r.scan_iter(match=RECEIVED_KEY.format(module="*"))
+    for received_key in sorted(received_keys):
+        module = received_key[: -len(RECEIVED_KEY.format(module=""))]
+        received = r.hgetall(received_key)
+        for channel, msgs in sorted(received.items()):
+            msgs = int(msgs)
+            key = (module, channel)
+            telemetry.append(
+                {
+                    "module": module,
+                    "channel": channel,
+                    "received": msgs,
+                    "backlog": max(published.get(channel, 0) - msgs, 0),
+                    "latency_p50_ms": get_percentile(latency[key], 0.5),
+                    "latency_p99_ms": get_percentile(latency[key], 0.99),
+                    "handler_p50_ms": get_percentile(handler_time[key], 0.5),
+                    "handler_p99_ms": get_percentile(handler_time[key], 0.99),
+                }
+            )
+    return telemetry
+
+
+def format_bus_telemetry(telemetry: List[dict]) -> str:
+    """returns the given telemetry as a table to print in the CLI"""
+    columns = (
+        ("module", "Module"),
+        ("channel", "Channel"),
+        ("received", "Received"),
+        ("backlog", "Backlog"),
+        ("latency_p50_ms", "Latency p50 (ms)"),
+        ("latency_p99_ms", "Latency p99 (ms)"),
+        ("handler_p50_ms", "Handler p50 (ms)"),
+        ("handler_p99_ms", "Handler p99 (ms)"),
+    )
+    rows = [[title for _, title in columns]]
+    for row in telemetry:
+        rows.append([str(row[key]) for key, _ in columns])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths))
+        for row in rows
+    )
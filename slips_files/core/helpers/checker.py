@@ -129,6 +129,13 @@ class Checker:
             self.main.redis_man.close_open_redis_servers()
             self.main.terminate_slips()
 
+        # print the redis bus telemetry of a running slips instance
+        if self.main.args.bus_telemetry:
+            self.main.redis_man.print_bus_telemetry(
+                int(self.main.args.port or 6379)
+            )
+            self.main.terminate_slips()
+
         if self.main.args.version:
             self.main.print_version()
             self.main.terminate_slips()
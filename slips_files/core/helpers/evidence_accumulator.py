@@ -0,0 +1,103 @@
+from collections import OrderedDict
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Set,
+)
+
+from slips_files.core.structures.evidence import Evidence
+
+
+@dataclass
+class TWEvidence:
+    """the evidence of one profile in one timewindow"""
+
+    # {evidence_id: Evidence} of the evidence that can be part of the
+    # next alert. processed, not whitelisted, done by the profile, and
+    # not part of a past alert
+    evidence: Dict[str, Evidence] = field(default_factory=dict)
+    # ids of the evidence that were part of a past alert in this tw
+    alerted_ids: Set[str] = field(default_factory=set)
+
+
+class EvidenceAccumulator:
+    """
+    Keeps the parsed evidence of the recently modified timewindows in
+    memory so the evidence handler doesn't have to get, parse and filter
+    all the evidence of a timewindow from the db every time it alerts.
+
+    The evidence handler adds each evidence once, when it receives it in
+    the evidence_added channel, and evicts a timewindow once it's closed.
+    Timewindows that aren't in memory (first evidence, closed or evicted
+    ones) are loaded from the db using the given load_tw.
+    """
+
+    def __init__(
+        self,
+        load_tw: Callable[[str, str], TWEvidence],
+        separator: str = "_",
+        max_tws: int = 10000,
+    ):
+        """
+        :param load_tw: returns the TWEvidence of the given profileid and
+        twid as stored in the db
+        :param max_tws: max number of timewindows to keep in memory, the
+        least recently used ones are evicted first
+        """
+        self.load_tw = load_tw
+        self.separator = separator
+        self.max_tws = max_tws
+        # {profileid_twid: TWEvidence}
+        self.tws: OrderedDict[str, TWEvidence] = OrderedDict()
+
+    def get_tw(self, profileid: str, twid: str) -> TWEvidence:
+        key = f"{profileid}{self.separator}{twid}"
+        try:
+            self.tws.move_to_end(key)
+            return self.tws[key]
+        except KeyError:
+            pass
+
+        tw = self.load_tw(profileid, twid)
+        self.tws[key] = tw
+        if len(self.tws) > self.max_tws:
+            self.tws.popitem(last=False)
+        return tw
+
+    def add(self, evidence: Evidence):
+        """
+        adds the given evidence to the evidence of its timewindow.
+        the evidence should be already filtered by the evidence handler
+        """
+        tw = self.get_tw(str(evidence.profile), str(evidence.timewindow))
+        if evidence.id not in tw.alerted_ids:
+            tw.evidence[evidence.id] = evidence
+
+    def get_evidence(self, profileid: str, twid: str) -> Dict[str, Evidence]:
+        """returns the evidence that can be part of the next alert"""
+        return dict(self.get_tw(profileid, twid).evidence)
+
+    def mark_as_alerted(
+        self, profileid: str, twid: str, evidence_ids: Iterable[str]
+    ):
+        """
+        marks the given evidence as part of an alert so they're not
+        part of the next alerts of the same timewindow
+        """
+        tw = self.get_tw(profileid, twid)
+        for evidence_id in evidence_ids:
+            tw.alerted_ids.add(evidence_id)
+            tw.evidence.pop(evidence_id, None)
+
+    def evict(self, profileid_twid: str):
+        """
+        removes the given timewindow from memory.
+        :param profileid_twid: the closed tw as sent in the
+        tw_closed channel
+        """
+        self.tws.pop(profileid_twid, None)
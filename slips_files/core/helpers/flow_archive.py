@@ -0,0 +1,263 @@
+"""
+Columnar archive of the conn, dns, http and ssl flows slips reads.
+
+The flows of each timewindow are written to parquet files with a typed
+column per field of their dataclass, plus the profileid, twid and label
+of the flow, so they can be re-analysed or used for training without
+parsing the json flows stored in flows.sqlite.
+
+The archive is a dir per flow type in <output_dir>/flows_archive/, with
+a parquet file per timewindow.
+"""
+
+import dataclasses
+import os
+import typing
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+
+from slips_files.core.flows.zeek import (
+    Conn,
+    DNS,
+    HTTP,
+    SSL,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pa_dataset
+    import pyarrow.parquet as pq
+except ImportError:
+    # the flow archive isn't available without it
+    pa = None
+
+ARCHIVE_DIR = "flows_archive"
+# {flow class: the dir of its flows in the archive}
+ARCHIVED_FLOWS = {
+    Conn: "conn",
+    DNS: "dns",
+    HTTP: "http",
+    SSL: "ssl",
+}
+# the columns added to the fields of each flow
+EXTRA_COLUMNS = ("profileid", "twid", "label")
+DEFAULT_LABEL = "benign"
+# zeek's empty value
+EMPTY = ("", "-", None)
+
+
+def is_available() -> bool:
+    return pa is not None
+
+
+def get_arrow_type(python_type):
+    if python_type is bool:
+        return pa.bool_()
+    if python_type is int:
+        return pa.int64()
+    if python_type is float:
+        return pa.float64()
+    if typing.get_origin(python_type) is list:
+        return pa.list_(pa.string())
+    return pa.string()
+
+
+def get_schema(flow_class) -> "pa.Schema":
+    """
+    returns a column per field of the given flow class, the starttime
+    is stored as a unix timestamp
+    """
+    columns = []
+    for field in dataclasses.fields(flow_class):
+        if field.name == "starttime":
+            arrow_type = pa.float64()
+        else:
+            arrow_type = get_arrow_type(field.type)
+        columns.append(pa.field(field.name, arrow_type))
+    columns.extend(pa.field(column, pa.string()) for column in EXTRA_COLUMNS)
+    return pa.schema(columns)
+
+
+def to_column_value(value, arrow_type):
+    """
+    converts the given flow value to the type of its column, None if it
+    can't be converted
+    """
+    if value in EMPTY:
+        return None
+    try:
+        if pa.types.is_floating(arrow_type):
+            return float(value)
+        if pa.types.is_integer(arrow_type):
+            return int(float(value))
+        if pa.types.is_boolean(arrow_type):
+            return value in (True, "T", "true", "True", 1)
+        if pa.types.is_list(arrow_type):
+            if isinstance(value, str):
+                value = [value]
+            return [str(item) for item in value]
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+def get_tw_number(twid: str) -> int:
+    return int(twid.replace("timewindow", ""))
+
+
+class FlowArchive:
+    """
+    Buffers the flows of each timewindow in memory and writes them to
+    the archive when flows of a later timewindow arrive, when they reach
+    max_rows, or on close()
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        get_labels: Optional[Callable[[List[str]], Dict[str, str]]] = None,
+        max_rows: int = 100000,
+    ):
+        """
+        :param get_labels: returns the labels of the given flow uids,
+        used to get the labels the flows have when they're written,
+        e.g. DBManager.get_flow_labels
+        """
+        self.archive_dir = os.path.join(output_dir, ARCHIVE_DIR)
+        self.get_labels = get_labels
+        self.max_rows = max_rows
+        self.schemas = {
+            flow_type: get_schema(flow_class)
+            for flow_class, flow_type in ARCHIVED_FLOWS.items()
+        }
+        # {(flow type, twid): {column: values}}
+        self.buffers: Dict[Tuple[str, str], Dict[str, list]] = {}
+        # {(flow type, twid): the number of files written}
+        self.files_written: Dict[Tuple[str, str], int] = {}
+        self.last_tw_number: Optional[int] = None
+
+    def add(self, flow, profileid: str, twid: str, label=DEFAULT_LABEL):
+        flow_type = ARCHIVED_FLOWS.get(type(flow))
+        if not flow_type:
+            return
+
+        key = (flow_type, twid)
+        schema = self.schemas[flow_type]
+        if key not in self.buffers:
+            self.buffers[key] = {name: [] for name in schema.names}
+        buffer = self.buffers[key]
+
+        values = {
+            "profileid": profileid,
+            "twid": twid,
+            "label": label,
+        }
+        for field in schema:
+            value = values.get(field.name, getattr(flow, field.name, None))
+            buffer[field.name].append(to_column_value(value, field.type))
+
+        if len(buffer["uid"]) >= self.max_rows:
+            self.flush(key)
+
+        tw_number = get_tw_number(twid)
+        if self.last_tw_number is None or tw_number > self.last_tw_number:
+            self.last_tw_number = tw_number
+            self.flush_older_tws(tw_number)
+
+    def flush_older_tws(self, tw_number: int):
+        for key in list(self.buffers):
+            if get_tw_number(key[1]) < tw_number:
+                self.flush(key)
+
+    def set_labels(self, buffer: Dict[str, list]):
+        """sets the labels the flows have now in the given buffer"""
+        if not self.get_labels:
+            return
+        labels: Dict[str, str] = self.get_labels(buffer["uid"])
+        buffer["label"] = [
+            labels.get(uid) or label
+            for uid, label in zip(buffer["uid"], buffer["label"])
+        ]
+
+    def flush(self, key: Tuple[str, str]):
+        buffer = self.buffers.pop(key, None)
+        if not buffer or not buffer["uid"]:
+            return
+        self.set_labels(buffer)
+
+        flow_type, twid = key
+        table = pa.Table.from_pydict(buffer, schema=self.schemas[flow_type])
+        # late flows of a tw that was already written go to a new file
+        file_number = self.files_written.get(key, 0)
+        self.files_written[key] = file_number + 1
+
+        flow_type_dir = os.path.join(self.archive_dir, flow_type)
+        os.makedirs(flow_type_dir, exist_ok=True)
+        path = os.path.join(flow_type_dir, f"{twid}-{file_number}.parquet")
+        # written to a hidden tmp file first so readers never see a half
+        # written file
+        tmp = os.path.join(flow_type_dir, f".{twid}-{file_number}.tmp")
+        pq.write_table(table, tmp, row_group_size=self.max_rows)
+        os.replace(tmp, path)
+
+    def close(self):
+        for key in list(self.buffers):
+            self.flush(key)
+
+
+def read_flows(
+    archive_dir: str,
+    flow_type: str,
+    columns: Optional[Iterable[str]] = None,
+    filters: Optional[List[Tuple]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    reads the given columns of the archived flows of the given type
+    that match the given filters.
+    only the given columns and the row groups that may match the
+    filters are read.
+    :param archive_dir: the flows_archive dir in the output dir
+    :param flow_type: conn, dns, http or ssl
+    :param columns: the columns to read, all of them if not given
+    :param filters: (column, op, value) tuples, all of them have to
+    match, e.g. [("label", "==", "malicious"), ("dport", "in", ["80"])].
+    ops are the ones of pyarrow.parquet.filters_to_expression()
+    :return: {column: numpy array of its values}
+    """
+    if not is_available():
+        raise ImportError("pyarrow is required to read the flows archive")
+
+    flow_class = {
+        flow_type: flow_class
+        for flow_class, flow_type in ARCHIVED_FLOWS.items()
+    }[flow_type]
+    schema = get_schema(flow_class)
+    columns = list(columns) if columns else schema.names
+    flow_type_dir = os.path.join(archive_dir, flow_type)
+    if not os.path.isdir(flow_type_dir):
+        return {column: np.array([]) for column in columns}
+
+    dataset = pa_dataset.dataset(
+        flow_type_dir,
+        schema=schema,
+        format="parquet",
+        # skips the tmp files of the writer
+        exclude_invalid_files=False,
+        ignore_prefixes=["."],
+    )
+    table = dataset.to_table(
+        columns=columns,
+        filter=pq.filters_to_expression(filters) if filters else None,
+    )
+    return {
+        column: table.column(column).to_numpy(zero_copy_only=False)
+        for column in columns
+    }
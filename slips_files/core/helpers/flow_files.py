@@ -0,0 +1,233 @@
+import bz2
+import gzip
+import io
+import os
+import queue
+import threading
+import zlib
+from typing import (
+    BinaryIO,
+    List,
+    Optional,
+    TextIO,
+    Union,
+)
+
+try:
+    import zstandard
+except ImportError:
+    # zstd compressed input files aren't supported without it
+    zstandard = None
+
+
+# {compression: the magic bytes files compressed with it start with}
+MAGIC_BYTES = {
+    "gzip": b"\x1f\x8b",
+    "zstd": b"\x28\xb5\x2f\xfd",
+    "bz2": b"BZh",
+}
+# e.g. conn.log.gz
+COMPRESSION_EXTENSIONS = (".gz", ".zst", ".bz2")
+
+
+def get_compression(path: str) -> Optional[str]:
+    """
+    returns the compression of the given file using its magic bytes,
+    or None if it's not compressed
+    """
+    with open(path, "rb") as f:
+        header = f.read(4)
+    for compression, magic in MAGIC_BYTES.items():
+        if header.startswith(magic):
+            return compression
+    return None
+
+
+def strip_compression_extension(path: str) -> str:
+    """
+    returns the given path without its compression extension,
+    e.g. conn.log.gz -> conn.log
+    """
+    for ext in COMPRESSION_EXTENSIONS:
+        if path.endswith(ext):
+            return path[: -len(ext)]
+    return path
+
+
+def open_binary(path: str) -> BinaryIO:
+    """
+    returns a binary file object that yields the decompressed content
+    of the given file.
+    """
+    compression = get_compression(path)
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+
+    if compression == "bz2":
+        return bz2.open(path, "rb")
+
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError(
+                f"Can't read {path}. zstandard is required to read zstd "
+                f"compressed files."
+            )
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+
+    return open(path, "rb")
+
+
+def open_flow_file(path: str) -> TextIO:
+    """
+    opens the given flows file for reading lines, decompressing it on the
+    fly if it's compressed
+    """
+    if get_compression(path) is None:
+        return open(path, "r")
+    return io.TextIOWrapper(open_binary(path))
+
+
+def get_decompressor(path: str):
+    """
+    returns an object whose decompress() decompresses the given file
+    chunk by chunk, or None if the file isn't compressed
+    """
+    compression = get_compression(path)
+    if compression == "gzip":
+        # 16 + MAX_WBITS tells zlib to expect the gzip header
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if compression == "bz2":
+        return bz2.BZ2Decompressor()
+    if compression == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+
+def estimate_flows_number(
+    path: str, sample_size: int = 2**20, chunk_size: int = 2**12
+) -> int:
+    """
+    Estimates the number of lines in the given file without reading all
+    of it.
+    The number of lines in the first sample_size decompressed bytes
+    is scaled by the size of the file on disk, so the estimate of
+    compressed files accounts for the compression ratio.
+    The number is exact for files whose content fits in the sample.
+    like get_flows_number(), counts the \\n in the file
+    :param chunk_size: the file is read and decompressed in chunks of
+    this size
+    """
+    decompressor = get_decompressor(path)
+    lines = 0
+    sample_len = 0
+    read_bytes = 0
+    with open(path, "rb") as f:
+        while sample_len < sample_size:
+            chunk: bytes = f.read(chunk_size)
+            if not chunk:
+                # read the whole file
+                return lines
+            read_bytes += len(chunk)
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+            lines += chunk.count(b"\n")
+            sample_len += len(chunk)
+
+    file_size = os.path.getsize(path)
+    if read_bytes == file_size:
+        return lines
+    return int(lines * file_size / read_bytes)
+
+
+class DecompressingReader:
+    """
+    Decompresses a compressed log file in a background thread that
+    buffers the decompressed lines in a bounded queue, so the lines of
+    several files are decompressed concurrently while the input process
+    reads them one by one in timestamp order.
+    zlib, bz2 and zstandard release the GIL while decompressing, so
+    the threads of different files run on different cores.
+    Has the readline() and close() of a file opened for reading.
+    """
+
+    def __init__(
+        self, path: str, max_batches: int = 32, batch_size: int = 2**16
+    ):
+        """
+        :param max_batches: max number of batches of decompressed lines
+        to keep in memory before the thread waits for them to be read
+        :param batch_size: approximate number of decompressed bytes per
+        batch
+        """
+        self.path = path
+        self.batch_size = batch_size
+        # an empty batch means there are no more lines
+        self.batches: queue.Queue = queue.Queue(maxsize=max_batches)
+        # the batch being read and the index of the next line in it
+        self.batch: List[str] = []
+        self.index = 0
+        self.reached_eof = False
+        # set when the file couldn't be decompressed
+        self.error: Optional[Exception] = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(
+            target=self.decompress, daemon=True, name=f"decompress_{path}"
+        )
+        self.thread.start()
+
+    def put(self, batch: List[str]) -> bool:
+        """
+        waits for a free slot in the queue unless the reader is closed.
+        returns False if it's closed
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.batches.put(batch, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def decompress(self):
+        try:
+            with open_flow_file(self.path) as f:
+                while batch := f.readlines(self.batch_size):
+                    if not self.put(batch):
+                        return
+        except Exception as e:
+            # e.g. a corrupted or truncated file. the lines decompressed
+            # so far are still read, and readline() mustn't wait forever
+            self.error = e
+        self.put([])
+
+    def readline(self) -> str:
+        """
+        returns the next line, or "" once all lines are read.
+        waits for the next line to be decompressed
+        """
+        if self.index == len(self.batch):
+            if self.reached_eof:
+                return ""
+            self.batch = self.batches.get()
+            self.index = 0
+            if not self.batch:
+                self.reached_eof = True
+                return ""
+
+        line = self.batch[self.index]
+        self.index += 1
+        return line
+
+    def close(self):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def open_log_file(path: str) -> Union[TextIO, DecompressingReader]:
+    """
+    opens the given zeek log file for reading lines.
+    compressed files are decompressed in a background thread
+    """
+    if get_compression(path) is None:
+        return open(path, "r")
+    return DecompressingReader(path)
@@ -1,6 +1,5 @@
 import ipaddress
 import json
-from dataclasses import asdict
 from typing import Tuple
 
 from slips_files.core.flows.suricata import SuricataFile
@@ -23,7 +22,7 @@ class Publisher:
         to_send = {
             "profileid": profileid,
             "twid": self.db.get_timewindow(flow.starttime, profileid),
-            "flow": asdict(flow),
+            "flow": utils.flow_to_dict(flow),
         }
         self.db.publish("new_dhcp", json.dumps(to_send))
 
@@ -54,7 +53,7 @@ class Publisher:
         Send the whole flow to new_software channel
         """
         to_send = {
-            "sw_flow": asdict(flow),
+            "sw_flow": utils.flow_to_dict(flow),
             "twid": self.db.get_timewindow(flow.starttime, profileid),
         }
         self.db.publish("new_software", json.dumps(to_send))
@@ -176,7 +175,7 @@ class FlowHandler:
 
     def handle_smtp(self):
         to_send = {
-            "flow": asdict(self.flow),
+            "flow": utils.flow_to_dict(self.flow),
             "profileid": self.profileid,
             "twid": self.twid,
         }
@@ -225,7 +224,7 @@ class FlowHandler:
 
         # files slips sees can be of 2 types: suricata or zeek
         to_send = {
-            "flow": asdict(self.flow),
+            "flow": utils.flow_to_dict(self.flow),
             "type": "suricata" if type(self.flow) == SuricataFile else "zeek",
             "profileid": self.profileid,
             "twid": self.twid,
@@ -237,7 +236,7 @@ class FlowHandler:
 
     def handle_arp(self):
         to_send = {
-            "flow": asdict(self.flow),
+            "flow": utils.flow_to_dict(self.flow),
             "profileid": self.profileid,
             "twid": self.twid,
         }
@@ -256,7 +255,7 @@ class FlowHandler:
         to_send = {
             "profileid": self.profileid,
             "twid": self.twid,
-            "flow": asdict(self.flow),
+            "flow": utils.flow_to_dict(self.flow),
         }
         to_send = json.dumps(to_send)
         self.db.publish("new_weird", to_send)
@@ -266,7 +265,7 @@ class FlowHandler:
         to_send = {
             "profileid": self.profileid,
             "twid": self.twid,
-            "flow": asdict(self.flow),
+            "flow": utils.flow_to_dict(self.flow),
         }
         to_send = json.dumps(to_send)
         self.db.publish("new_tunnel", to_send)
@@ -0,0 +1,103 @@
+import os
+import queue
+import threading
+import time
+from multiprocessing import Queue
+from typing import (
+    Dict,
+    Optional,
+    TextIO,
+)
+
+
+class LogWriter:
+    """
+    Writes the lines of slips.log and errors.log from a dedicated thread
+    in the process that started it.
+    The other processes only put their lines in a multiprocessing queue,
+    so nobody opens, appends and closes the logfiles per line.
+    The files are kept open and the lines are flushed and fsynced every
+    flush_interval seconds.
+    Lines sent by the same process are written in the order they were
+    sent.
+    """
+
+    def __init__(self, flush_interval: float = 1):
+        self.flush_interval = flush_interval
+        # (path, line) records, None tells the writer thread to stop
+        self.queue = Queue()
+        self.files: Dict[str, TextIO] = {}
+        # files with lines written since the last flush
+        self.dirty_files = set()
+        self.thread: Optional[threading.Thread] = None
+        # the pid of the process that owns the writer thread
+        self.pid: Optional[int] = None
+
+    def start(self):
+        self.pid = os.getpid()
+        self.thread = threading.Thread(
+            target=self.run, daemon=True, name="log_writer"
+        )
+        self.thread.start()
+
+    def is_running(self) -> bool:
+        return self.pid is not None
+
+    def write(self, path: str, line: str):
+        """can be called from any process"""
+        self.queue.put((path, line))
+
+    def get_file(self, path: str) -> TextIO:
+        if path not in self.files:
+            self.files[path] = open(path, "a")
+        return self.files[path]
+
+    def flush(self):
+        for path in self.dirty_files:
+            f = self.files[path]
+            f.flush()
+            os.fsync(f.fileno())
+        self.dirty_files.clear()
+
+    def handle_record(self, record) -> bool:
+        """
+        writes the given record.
+        returns False if it's the one telling the writer to stop
+        """
+        if record is None:
+            return False
+        path, line = record
+        self.get_file(path).write(line)
+        self.dirty_files.add(path)
+        return True
+
+    def run(self):
+        last_flush = time.time()
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+                if not self.handle_record(record):
+                    break
+            except queue.Empty:
+                pass
+
+            if time.time() - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = time.time()
+
+        self.flush()
+
+    def shutdown_gracefully(self):
+        """
+        writes the pending lines and closes the logfiles.
+        only does something in the process that started the writer
+        """
+        if self.pid != os.getpid():
+            return
+
+        self.queue.put(None)
+        self.thread.join()
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+        self.pid = None
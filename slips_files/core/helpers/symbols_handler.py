@@ -15,6 +15,9 @@ class SymbolHandler:
     def print(self, *args, **kwargs):
         return self.printer.print(*args, **kwargs)
 
+    def lazy_print(self, *args, **kwargs):
+        return self.printer.lazy_print(*args, **kwargs)
+
     def compute_periodicity(
         self,
         now_ts: float,
@@ -55,11 +58,15 @@ class SymbolHandler:
             elif TD > tt3:
                 TD = 4
 
-        self.print(
-            f"Compute Periodicity: Profileid: {profileid}, Tuple: {tupleid}, T1={T1}, "
-            f"T2={T2}, TD={TD}",
-            3,
-            0,
+        self.lazy_print(
+            "Compute Periodicity: Profileid: %s, Tuple: %s, T1=%s, "
+            "T2=%s, TD=%s",
+            profileid,
+            tupleid,
+            T1,
+            T2,
+            TD,
+            verbose=3,
         )
         return TD, zeros, T2
 
@@ -153,11 +160,11 @@ class SymbolHandler:
         now_ts = float(flow.starttime)
 
         try:
-            self.print(
-                f"Starting compute symbol. Profileid: {profileid}, "
-                f"Tupleid {tupleid}, time:{twid} ({type(twid)}), dur:{current_duration}, size:{current_size}",
-                3,
-                0,
+            self.lazy_print(
+                lambda: f"Starting compute symbol. Profileid: {profileid}, "
+                f"Tupleid {tupleid}, time:{twid} ({type(twid)}), "
+                f"dur:{current_duration}, size:{current_size}",
+                verbose=3,
             )
 
             tto = timedelta(seconds=3600)
@@ -185,11 +192,11 @@ class SymbolHandler:
             letter = self.compute_letter(periodicity, size, duration)
             timechar = self.compute_timechar(T2)
 
-            self.print(
-                f"Profileid: {profileid}, Tuple: {tupleid}, Periodicity: {periodicity}, "
-                f"Duration: {duration}, Size: {size}, Letter: {letter}. TimeChar: {timechar}",
-                3,
-                0,
+            self.lazy_print(
+                lambda: f"Profileid: {profileid}, Tuple: {tupleid}, "
+                f"Periodicity: {periodicity}, Duration: {duration}, "
+                f"Size: {size}, Letter: {letter}. TimeChar: {timechar}",
+                verbose=3,
             )
 
             symbol = zeros + letter + timechar
@@ -0,0 +1,189 @@
+import os
+import sys
+import time
+import weakref
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Optional,
+    Tuple,
+)
+
+# all the stores, used to evict closed timewindows from all of them and
+# to report their memory usage. modules create their stores in init(),
+# before they're started in their own process, so the stores of all
+# modules are copied to each module's process
+_stores: "weakref.WeakSet[TWStateStore]" = weakref.WeakSet()
+
+
+def parse_profileid_twid(profileid_twid: str) -> Tuple[str, str]:
+    """
+    splits the profileid_twid sent in the tw_closed channel, e.g.
+    profile_192.168.1.1_timewindow1 -> (profile_192.168.1.1, timewindow1)
+    """
+    parts = profileid_twid.split("_")
+    return f"{parts[0]}_{parts[1]}", parts[-1]
+
+
+def get_size(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    returns the approximate number of bytes used by the given obj and
+    the containers and __slots__ records it contains
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += get_size(key, seen) + get_size(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += get_size(item, seen)
+    elif hasattr(obj, "__slots__"):
+        for slot in obj.__slots__:
+            size += get_size(getattr(obj, slot, None), seen)
+    return size
+
+
+class TWStateStore:
+    """
+    Bounded in-memory state of a detector, keyed by (profileid, twid).
+
+    Replaces the per-profile dicts the detectors used to keep in memory
+    forever. The state of a timewindow is evicted when:
+    - the timewindow is closed. IModule.get_msg() evicts it from all
+      the stores of the module's process once it receives the tw_closed
+      msg, before the module handles the msg.
+    - there are more than max_tws timewindows in the store, the least
+      recently used ones are evicted first.
+    - it wasn't used for ttl seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_tws: int = 10000,
+        ttl: Optional[float] = 3600,
+    ):
+        """
+        :param name: used to report the memory usage of the store,
+        e.g. dns.nxdomains
+        :param ttl: seconds after which the state of a timewindow
+        that wasn't used is evicted, None to never expire it
+        """
+        self.name = name
+        self.max_tws = max_tws
+        self.ttl = ttl
+        # {(profileid, twid): (last access time, state)}
+        self.tws: OrderedDict[Tuple[str, str], Tuple[float, Any]] = (
+            OrderedDict()
+        )
+        # the pid of the process that last used the store
+        self.pid: Optional[int] = None
+        _stores.add(self)
+
+    def __len__(self) -> int:
+        return len(self.tws)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return self.get(*key) is not None
+
+    def is_expired(self, last_access: float, now: float) -> bool:
+        return self.ttl is not None and now - last_access > self.ttl
+
+    def evict_expired(self, now: float):
+        """
+        evicts the timewindows that weren't used for ttl seconds.
+        the least recently used ones are at the start of self.tws
+        """
+        while self.tws:
+            last_access, _ = next(iter(self.tws.values()))
+            if not self.is_expired(last_access, now):
+                return
+            self.tws.popitem(last=False)
+
+    def get(self, profileid: str, twid: str, default=None):
+        key = (profileid, twid)
+        now = time.monotonic()
+        try:
+            last_access, state = self.tws[key]
+        except KeyError:
+            return default
+
+        if self.is_expired(last_access, now):
+            del self.tws[key]
+            return default
+
+        self.tws[key] = (now, state)
+        self.tws.move_to_end(key)
+        return state
+
+    def set(self, profileid: str, twid: str, state: Any):
+        key = (profileid, twid)
+        now = time.monotonic()
+        self.pid = os.getpid()
+        self.tws[key] = (now, state)
+        self.tws.move_to_end(key)
+        self.evict_expired(now)
+        while len(self.tws) > self.max_tws:
+            self.tws.popitem(last=False)
+
+    def setdefault(
+        self, profileid: str, twid: str, default_factory: Callable[[], Any]
+    ):
+        """
+        returns the state of the given timewindow, after setting it to
+        default_factory() if it doesn't exist
+        """
+        state = self.get(profileid, twid)
+        if state is None:
+            state = default_factory()
+            self.set(profileid, twid, state)
+        return state
+
+    def pop(self, profileid: str, twid: str, default=None):
+        try:
+            _, state = self.tws.pop((profileid, twid))
+            return state
+        except KeyError:
+            return default
+
+    def evict_tw(self, profileid_twid: str):
+        """
+        evicts the state of the given closed timewindow
+        :param profileid_twid: the closed tw as sent in the
+        tw_closed channel
+        """
+        self.pop(*parse_profileid_twid(profileid_twid))
+
+    def memory_usage(self) -> int:
+        """returns the approximate number of bytes used by the store"""
+        return get_size(self.tws)
+
+
+def evict_closed_tw(profileid_twid: str):
+    """
+    evicts the given closed timewindow from all the stores of the
+    current process
+    """
+    for store in list(_stores):
+        store.evict_tw(profileid_twid)
+
+
+def get_memory_usage() -> Dict[str, int]:
+    """
+    returns the approximate memory used by each store used by the
+    current process {store name: bytes}
+    """
+    usage = {}
+    pid = os.getpid()
+    for store in list(_stores):
+        if store.pid != pid:
+            continue
+        usage[store.name] = usage.get(store.name, 0) + store.memory_usage()
+    return usage
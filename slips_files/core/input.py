@@ -26,6 +26,10 @@ import time
 # Contact: eldraco@gmail.com, sebastian.garcia@agents.fel.cvut.cz, stratosphere@aic.fel.cvut.cz
 from pathlib import Path
 from re import split
+from typing import (
+    Iterable,
+    Optional,
+)
 
 from watchdog.observers import Observer
 
@@ -36,6 +40,12 @@ from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.slips_utils import utils
 import multiprocessing
 from slips_files.core.helpers.filemonitor import FileEventHandler
+from slips_files.core.helpers.flow_files import (
+    estimate_flows_number,
+    open_flow_file,
+    open_log_file,
+    strip_compression_extension,
+)
 
 SUPPORTED_LOGFILES = (
     "conn",
@@ -152,27 +162,27 @@ class Input(ICore):
         # do nothing.
         self.profiler_queue.cancel_join_thread()
 
-    def read_nfdump_output(self) -> int:
+    def read_nfdump_output(self, nfdump_output: Iterable[str]) -> int:
         """
         A binary file generated by nfcapd can be read by nfdump.
         The task for this function is to send nfdump output line by line to
         performance_profiler.py for processing
+        :param nfdump_output: the lines printed by nfdump, they're sent to
+        the profiler as soon as nfdump prints them
+        returns the number of lines read
         """
-        if not self.nfdump_output:
+        lines = 0
+        for nfdump_line in nfdump_output:
+            line = {"type": "nfdump", "data": nfdump_line.rstrip("\n")}
+            self.give_profiler(line)
+            lines += 1
+            if self.testing:
+                break
+
+        if not lines:
             # The nfdump command returned nothing
             self.print("Error reading nfdump output ", 1, 3)
-        else:
-            self.total_flows = len(self.nfdump_output.splitlines())
-            self.db.set_input_metadata({"total_flows": self.total_flows})
-            for nfdump_line in self.nfdump_output.splitlines():
-                # this line is taken from stdout we need to remove whitespaces
-                nfdump_line.replace(" ", "")
-                line = {"type": "nfdump", "data": nfdump_line}
-                self.give_profiler(line)
-                if self.testing:
-                    break
-
-        return self.total_flows
+        return lines
 
     def check_if_time_to_del_rotated_files(self):
         """
@@ -202,7 +212,7 @@ class Input(ICore):
         Ignore zeek log files that we don't use
         :param filepath: full path to a zeek log file
         """
-        filename_without_ext = Path(filepath).stem
+        filename_without_ext = Path(strip_compression_extension(filepath)).stem
         return filename_without_ext not in SUPPORTED_LOGFILES
 
     def get_file_handle(self, filename):
@@ -213,7 +223,8 @@ class Input(ICore):
         except KeyError:
             # First time opening this file.
             try:
-                file_handler = open(filename, "r")
+                # compressed files are decompressed in a background thread
+                file_handler = open_log_file(filename)
                 lock = threading.Lock()
                 lock.acquire()
                 self.open_file_handlers[filename] = file_handler
@@ -324,6 +335,13 @@ class Input(ICore):
         for file, handle in self.open_file_handlers.items():
             self.print(f"Closing file {file}", 2, 0)
             handle.close()
+            if getattr(handle, "error", None):
+                self.print(
+                    f"Error decompressing {file}: {handle.error}. "
+                    f"Only the flows before the error were read.",
+                    0,
+                    1,
+                )
 
     def get_earliest_line(self):
         """
@@ -399,26 +417,15 @@ class Input(ICore):
         self.close_all_handles()
         return self.lines
 
-    def _make_gen(self, reader):
-        """yeilds (64 kilobytes) at a time from the file"""
-        while True:
-            b = reader(2**16)
-            if not b:
-                break
-            yield b
-
     def get_flows_number(self, file: str) -> int:
         """
-        returns the number of flows/lines in a given file
+        returns the number of flows/lines in a given file.
+        the number is estimated using the size of the file instead of
+        reading all of it, so it's exact for small files only.
+        the exact number is set once the file is read, check
+        set_total_flows()
         """
-        # using wc -l doesn't count last line of the file if it does not have end of line character
-        # using  grep -c "" returns incorrect line numbers sometimes
-        # this method is the most efficient and accurate i found online
-        # https://stackoverflow.com/a/68385697/11604069
-
-        with open(file, "rb") as f:
-            # counts the occurances of \n in a file
-            count = sum(buf.count(b"\n") for buf in self._make_gen(f.raw.read))
+        count = estimate_flows_number(file)
 
         if hasattr(self, "is_zeek_tabs") and self.is_zeek_tabs:
             # subtract comment lines in zeek tab files,
@@ -477,13 +484,23 @@ class Input(ICore):
             self.mark_self_as_done_processing()
             return True
 
-        self.total_flows = total_flows
-        self.db.set_input_metadata({"total_flows": total_flows})
+        self.set_total_flows(total_flows)
         self.lines = self.read_zeek_files()
+        if not growing_zeek_dir:
+            # the total was estimated, now it's known
+            self.set_total_flows(self.lines)
         self.print_lines_read()
         self.mark_self_as_done_processing()
         return True
 
+    def set_total_flows(self, total_flows: int):
+        """
+        sets the number of flows slips is going to read, used for
+        printing the percentage of analyzed flows
+        """
+        self.total_flows = total_flows
+        self.db.set_input_metadata({"total_flows": total_flows})
+
     def print_lines_read(self):
         self.print(
             f"Done reading all flows. Stopping the input process. "
@@ -526,11 +543,10 @@ class Input(ICore):
     def handle_binetflow(self):
         # the number of flows returned by get_flows_number contains the header
         # , so subtract that
-        self.total_flows = self.get_flows_number(self.given_path) - 1
-        self.db.set_input_metadata({"total_flows": self.total_flows})
+        self.set_total_flows(self.get_flows_number(self.given_path) - 1)
 
         self.lines = 0
-        with open(self.given_path) as file_stream:
+        with open_flow_file(self.given_path) as file_stream:
             # read first line to determine the type of line, tab or comma separated
             t_line = file_stream.readline()
             type_ = "argus-tabs" if "\t" in t_line else "argus"
@@ -549,13 +565,14 @@ class Input(ICore):
                 if self.testing:
                     break
 
+        # the total was estimated, now it's known
+        self.set_total_flows(max(self.lines - 1, 0))
         self.mark_self_as_done_processing()
         return True
 
     def handle_suricata(self):
-        self.total_flows = self.get_flows_number(self.given_path)
-        self.db.set_input_metadata({"total_flows": self.total_flows})
-        with open(self.given_path) as file_stream:
+        self.set_total_flows(self.get_flows_number(self.given_path))
+        with open_flow_file(self.given_path) as file_stream:
             for t_line in file_stream:
                 line = {
                     "type": "suricata",
@@ -567,6 +584,7 @@ class Input(ICore):
                 self.lines += 1
                 if self.testing:
                     break
+        self.set_total_flows(self.lines)
         self.mark_self_as_done_processing()
         return True
 
@@ -575,7 +593,7 @@ class Input(ICore):
         returns true if the given path is a zeek tab separated file
         :param filepath: full log file path with the .log extension
         """
-        with open(filepath, "r") as f:
+        with open_flow_file(filepath) as f:
             line = f.readline()
 
         if "\t" in line:
@@ -595,7 +613,7 @@ class Input(ICore):
          and conn.log flows given to slips through CYST unix socket.
         """
         if (
-            not self.given_path.endswith(".log")
+            not strip_compression_extension(self.given_path).endswith(".log")
             or self.is_ignored_file(self.given_path)
         ) and "cyst" not in self.given_path.lower():
             # unsupported file
@@ -604,9 +622,7 @@ class Input(ICore):
         if os.path.exists(self.given_path):
             # in case of CYST flows, the given path is 'cyst' and there's no way to get the total flows
             self.is_zeek_tabs = self.is_zeek_tabs_file(self.given_path)
-            total_flows = self.get_flows_number(self.given_path)
-            self.db.set_input_metadata({"total_flows": total_flows})
-            self.total_flows = total_flows
+            self.set_total_flows(self.get_flows_number(self.given_path))
 
         # Add log file to database
         self.db.add_zeek_file(self.given_path)
@@ -617,16 +633,48 @@ class Input(ICore):
         # as we're running on an interface
         self.bro_timeout = 30
         self.lines = self.read_zeek_files()
+        if os.path.exists(self.given_path):
+            # the total was estimated, now it's known
+            self.set_total_flows(self.lines)
         self.mark_self_as_done_processing()
         return True
 
+    def get_nfdump_flows_number(self) -> Optional[int]:
+        """
+        returns the number of flows in the given nfdump file as stored in
+        the file's stat record, or None if nfdump can't tell
+        """
+        result = subprocess.run(
+            ["nfdump", "-I", "-r", self.given_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        for stat in result.stdout.splitlines():
+            # e.g. "Flows: 1234"
+            key, _, value = stat.partition(":")
+            if key.strip() == "Flows" and value.strip().isdigit():
+                return int(value)
+        return None
+
     def handle_nfdump(self):
+        if total_flows := self.get_nfdump_flows_number():
+            self.set_total_flows(total_flows)
+
         command = f"nfdump -b -N -o csv -q -r {self.given_path}"
-        # Execute command
-        result = subprocess.run(command.split(), stdout=subprocess.PIPE)
-        # Get command output
-        self.nfdump_output = result.stdout.decode("utf-8")
-        self.lines = self.read_nfdump_output()
+        # the output is read line by line while nfdump is still running
+        # instead of waiting for all of it
+        nfdump = subprocess.Popen(
+            command.split(), stdout=subprocess.PIPE, text=True
+        )
+        try:
+            self.lines = self.read_nfdump_output(nfdump.stdout)
+        finally:
+            # when testing, nfdump is stopped before printing all flows
+            nfdump.terminate()
+            nfdump.stdout.close()
+            nfdump.wait()
+        self.set_total_flows(self.lines)
         self.print_lines_read()
         self.mark_self_as_done_processing()
         return True
@@ -18,12 +18,15 @@ from multiprocessing.connection import Connection
 import sys
 from pathlib import Path
 from datetime import datetime
+from typing import Optional
 import os
+import time
 
 from slips_files.common.abstracts.observer import IObserver
 from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.slips_utils import utils
 from slips_files.common.style import red, yellow
+from slips_files.core.helpers.log_writer import LogWriter
 
 
 class Output(IObserver):
@@ -59,6 +62,13 @@ class Output(IObserver):
         self.stop_daemon = stop_daemon
         self.errors_logfile = stderr
         self.slips_logfile = slips_logfile
+        # writes to the logfiles from a separate thread once started
+        # using start_log_writer()
+        self.log_writer: Optional[LogWriter] = None
+        # the formatted date of the last second a line was logged in.
+        # used by get_log_timestamp()
+        self.cached_second: Optional[int] = None
+        self.cached_second_str = ""
         # if we're using -S, no need to init all the logfiles
         # we just need an instance of this class to be able
         # to start the db from the daemon class
@@ -116,6 +126,44 @@ class Output(IObserver):
             p.mkdir(parents=True, exist_ok=True)
             open(path, "w").close()
 
+    def start_log_writer(self):
+        """
+        starts the thread that writes to slips.log and errors.log.
+        should be called before starting the rest of slips processes
+        so they share the writer's queue
+        """
+        self.log_writer = LogWriter()
+        self.log_writer.start()
+
+    def shutdown_gracefully(self):
+        """writes the pending log lines and closes the logfiles"""
+        if self.log_writer:
+            self.log_writer.shutdown_gracefully()
+
+    def get_log_timestamp(self) -> str:
+        """
+        returns the current local time in utils.alerts_format.
+        the date is only formatted once per second
+        """
+        now = time.time()
+        second = int(now)
+        if second != self.cached_second:
+            self.cached_second = second
+            self.cached_second_str = datetime.fromtimestamp(second).strftime(
+                "%Y/%m/%d %H:%M:%S"
+            )
+        microseconds = int((now - second) * 1_000_000)
+        return f"{self.cached_second_str}.{microseconds:06d}"
+
+    def write_to_logfile(self, path: str, line: str, lock: Lock):
+        if self.log_writer and self.log_writer.is_running():
+            self.log_writer.write(path, line)
+            return
+
+        with lock:
+            with open(path, "a") as logfile:
+                logfile.write(line)
+
     def log_line(self, msg: dict):
         """
         Logs line to slips.log
@@ -127,14 +175,12 @@ class Output(IObserver):
             return
 
         sender, msg = msg["from"], msg["txt"]
-
-        date_time = datetime.now()
-        date_time = utils.convert_format(date_time, utils.alerts_format)
-
-        self.slips_logfile_lock.acquire()
-        with open(self.slips_logfile, "a") as slips_logfile:
-            slips_logfile.write(f"{date_time} [{sender}] {msg}\n")
-        self.slips_logfile_lock.release()
+        date_time = self.get_log_timestamp()
+        self.write_to_logfile(
+            self.slips_logfile,
+            f"{date_time} [{sender}] {msg}\n",
+            self.slips_logfile_lock,
+        )
 
     def print(self, sender: str, txt: str, end="\n"):
         """
@@ -158,13 +204,12 @@ class Output(IObserver):
         """
         Log error line to errors.log
         """
-        date_time = datetime.now()
-        date_time = utils.convert_format(date_time, utils.alerts_format)
-
-        self.errors_logfile_lock.acquire()
-        with open(self.errors_logfile, "a") as errors_logfile:
-            errors_logfile.write(f'{date_time} [{msg["from"]}] {msg["txt"]}\n')
-        self.errors_logfile_lock.release()
+        date_time = self.get_log_timestamp()
+        self.write_to_logfile(
+            self.errors_logfile,
+            f'{date_time} [{msg["from"]}] {msg["txt"]}\n',
+            self.errors_logfile_lock,
+        )
 
     def enough_verbose(self, verbose: int):
         """
@@ -22,6 +22,7 @@ import pprint
 import multiprocessing
 from typing import (
     List,
+    Optional,
 )
 
 import validators
@@ -31,6 +32,7 @@ from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.slips_utils import utils
 from slips_files.common.abstracts.core import ICore
 from slips_files.common.style import green
+from slips_files.core.helpers import flow_archive
 from slips_files.core.helpers.flow_handler import FlowHandler
 from slips_files.core.helpers.symbols_handler import SymbolHandler
 from slips_files.core.helpers.whitelist.whitelist import Whitelist
@@ -95,6 +97,9 @@ class Profiler(ICore, IObservable):
         # is set by this proc to tell input proc that we are done
         # processing and it can exit no issue
         self.is_profiler_done_event = is_profiler_done_event
+        self.flow_archive: Optional[flow_archive.FlowArchive] = (
+            self.init_flow_archive()
+        )
 
     def read_configuration(self):
         conf = ConfigParser()
@@ -104,6 +109,22 @@ class Profiler(ICore, IObservable):
         self.label = conf.label()
         self.width = conf.get_tw_width_as_float()
         self.client_ips: List[str] = conf.client_ips()
+        self.flow_archive_enabled: bool = conf.flow_archive()
+
+    def init_flow_archive(self) -> Optional[flow_archive.FlowArchive]:
+        if not self.flow_archive_enabled:
+            return None
+        if not flow_archive.is_available():
+            self.print(
+                "pyarrow is required to archive the flows. "
+                "The flow archive is disabled.",
+                0,
+                1,
+            )
+            return None
+        return flow_archive.FlowArchive(
+            self.output_dir, get_labels=self.db.get_flow_labels
+        )
 
     def convert_starttime_to_epoch(self):
         try:
@@ -177,7 +198,9 @@ class Profiler(ICore, IObservable):
         # 5th. Store the data according to the paremeters
         # Now that we have the profileid and twid, add the data from the flow
         # in this tw for this profile
-        self.print(f"Storing data in the profile: {self.profileid}", 3, 0)
+        self.lazy_print(
+            "Storing data in the profile: %s", self.profileid, verbose=3
+        )
         self.convert_starttime_to_epoch()
         # For this 'forward' profile, find the id in the
         # database of the tw where the flow belongs.
@@ -187,6 +210,10 @@ class Profiler(ICore, IObservable):
         # Create profiles for all ips we see
         self.db.add_profile(self.profileid, self.flow.starttime)
         self.store_features_going_out()
+        if self.flow_archive:
+            self.flow_archive.add(
+                self.flow, self.profileid, self.twid, label=self.label
+            )
         if self.analysis_direction == "all":
             self.handle_in_flows()
 
@@ -342,6 +369,8 @@ class Profiler(ICore, IObservable):
             f"Stopping. Total lines read: {self.rec_lines}",
             log_to_logfiles_only=True,
         )
+        if self.flow_archive:
+            self.flow_archive.close()
         self.mark_process_as_done_processing()
 
     def mark_process_as_done_processing(self):
@@ -459,7 +488,7 @@ class Profiler(ICore, IObservable):
                 continue
 
             # Received new input data
-            self.print(f"< Received Line: {line}", 2, 0)
+            self.lazy_print("< Received Line: %s", line, verbose=2)
             self.rec_lines += 1
 
             # self.input_type is set only once by define_separator
@@ -3,22 +3,31 @@ Contains evidence dataclass that is used in slips
 """
 
 import ipaddress
-from dataclasses import dataclass, field
+from dataclasses import (
+    MISSING,
+    dataclass,
+    field,
+    fields,
+    is_dataclass,
+)
 from enum import Enum, auto
+from functools import lru_cache
 from pprint import pformat
 from uuid import uuid4
 from typing import (
+    Any,
     List,
     Optional,
     Dict,
+    Tuple,
 )
 
 from slips_files.common.slips_utils import utils
 
 
-# IMPORTANT: remember to update dict_to_evidence() function based on the
-# field you add to the evidence class, or any class used by the evidence
-# class.
+# IMPORTANT: remember to update dict_to_evidence() and
+# trusted_dict_to_evidence() functions based on the field you add to the
+# evidence class, or any class used by the evidence class.
 
 
 def validate_ip(ip):
@@ -345,3 +354,103 @@ def dict_to_evidence(evidence: dict) -> Evidence:
     }
 
     return Evidence(**evidence_attributes)
+
+
+@lru_cache(maxsize=None)
+def get_field_names(cls: type) -> Tuple[str, ...]:
+    """
+    returns the field names of the given dataclass, or an empty tuple
+    if it's not a dataclass
+    """
+    if not is_dataclass(cls):
+        return ()
+    return tuple(f.name for f in fields(cls))
+
+
+@lru_cache(maxsize=None)
+def get_field_defaults(cls) -> Dict[str, Any]:
+    """returns the default values of the fields of the given dataclass"""
+    return {f.name: f.default for f in fields(cls) if f.default is not MISSING}
+
+
+def to_wire(obj):
+    """
+    Same as utils.to_dict(), but reads the fields of the dataclasses
+    directly instead of deep copying them using asdict() first.
+    """
+    if field_names := get_field_names(type(obj)):
+        return {name: to_wire(getattr(obj, name)) for name in field_names}
+
+    if isinstance(obj, Enum):
+        return obj.name
+
+    if isinstance(obj, list):
+        return [to_wire(item) for item in obj]
+
+    if isinstance(obj, dict):
+        return {k: to_wire(v) for k, v in obj.items()}
+
+    return obj
+
+
+def evidence_to_dict(evidence: Evidence) -> dict:
+    """
+    Converts the given evidence to the json serializable dict that is
+    stored in the db and sent in the evidence channels.
+    returns the same dict utils.to_dict() returns.
+    """
+    return to_wire(evidence)
+
+
+def create_without_validation(cls, attributes: dict):
+    """
+    creates an instance of the given dataclass with the given
+    attributes without calling its __init__() or __post_init__()
+    """
+    obj = object.__new__(cls)
+    obj.__dict__.update(get_field_defaults(cls))
+    obj.__dict__.update(attributes)
+    return obj
+
+
+def trusted_dict_to_evidence(evidence: dict) -> Evidence:
+    """
+    Same as dict_to_evidence(), but skips validating the ips,
+    timestamps and uids of the evidence.
+    Only use it for dicts created by evidence_to_dict() in slips, for
+    example the evidence stored in the db or sent in the evidence_added
+    channel, they were validated when the evidence was created.
+    """
+    attacker: dict = evidence["attacker"]
+    victim: Optional[dict] = evidence.get("victim")
+    profile: Optional[dict] = evidence.get("profile")
+    proto: Optional[str] = evidence.get("proto")
+    return create_without_validation(
+        Evidence,
+        {
+            "evidence_type": EvidenceType[evidence["evidence_type"]],
+            "description": evidence["description"],
+            "attacker": create_without_validation(Attacker, attacker),
+            "threat_level": ThreatLevel[evidence["threat_level"].upper()],
+            "victim": (
+                create_without_validation(Victim, victim) if victim else None
+            ),
+            "profile": (
+                create_without_validation(ProfileID, {"ip": profile["ip"]})
+                if profile is not None
+                else None
+            ),
+            "timewindow": create_without_validation(
+                TimeWindow, {"number": evidence["timewindow"]["number"]}
+            ),
+            "uid": evidence["uid"],
+            "timestamp": evidence["timestamp"],
+            "proto": Proto[proto.upper()] if proto else None,
+            "dst_port": evidence.get("dst_port"),
+            "src_port": evidence.get("src_port"),
+            "id": evidence["id"],
+            "rel_id": evidence["rel_id"],
+            "confidence": evidence["confidence"],
+            "method": Method[evidence["method"].upper()],
+        },
+    )
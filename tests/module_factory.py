@@ -1,4 +1,5 @@
 import shutil
+from collections import OrderedDict
 from unittest.mock import (
     patch,
     Mock,
@@ -33,6 +34,7 @@ from modules.p2ptrust.utils.go_director import GoDirector
 from slips.main import Main
 from modules.update_manager.update_manager import UpdateManager
 from modules.leak_detector.leak_detector import LeakDetector
+from modules.leak_detector.yara_scanner import YaraScanner
 from slips_files.core.profiler import Profiler
 from slips_files.core.output import Output
 from modules.threat_intelligence.threat_intelligence import ThreatIntel
@@ -76,6 +78,7 @@ from slips_files.core.structures.evidence import (
     Victim,
 )
 from modules.fidesModule.fidesModule import FidesModule
+from modules.exporting_alerts.stix_exporter import StixExporter
 
 
 def read_configuration():
@@ -331,6 +334,9 @@ class ModuleFactory:
         # it matches every pcap
         leak_detector.yara_rules_path = yara_rules_path
         leak_detector.compiled_yara_rules_path = compiled_yara_rules_path
+        leak_detector.scanner = YaraScanner(
+            yara_rules_path, compiled_yara_rules_path
+        )
         leak_detector.pcap = test_pcap
         return leak_detector
 
@@ -392,6 +398,18 @@ class ModuleFactory:
         update_manager.print = Mock()
         return update_manager
 
+    def create_stix_exporter_obj(self):
+        db = Mock()
+        db.is_running_non_stop.return_value = True
+        with patch(
+            "modules.exporting_alerts.stix_exporter.ConfigParser"
+        ) as conf:
+            conf.return_value.export_to.return_value = ["stix"]
+            conf.return_value.push_delay.return_value = 3600
+            stix = StixExporter(self.logger, db)
+        stix.print = Mock()
+        return stix
+
     @patch(MODULE_DB_MANAGER, name="mock_db")
     def create_whitelist_obj(self, mock_db):
         whitelist = Whitelist(self.logger, mock_db)
@@ -633,7 +651,10 @@ class ModuleFactory:
         return riskiq
 
     def create_alert_handler_obj(self):
-        return AlertHandler()
+        alert_handler = AlertHandler()
+        alert_handler.constants = Constants()
+        alert_handler.ip_info_cache = OrderedDict()
+        return alert_handler
 
     @patch(MODULE_DB_MANAGER, name="mock_db")
     def create_timeline_object(self, mock_db):
@@ -10,6 +10,7 @@ from slips_files.core.structures.evidence import (
     Evidence,
     EvidenceType,
     Attacker,
+    Victim,
     Direction,
     IoCType,
     ThreatLevel,
@@ -529,3 +530,151 @@ def test_get_evidence_causing_alert(profileid, twid, alert_id, expected_alert):
         f"{profileid}_{twid}", "alerts"
     )
     assert result == expected_alert
+
+
+def create_evidence_with_victim(attacker: str, victim: str) -> Evidence:
+    return Evidence(
+        evidence_type=EvidenceType.ARP_SCAN,
+        description="ARP scan detected",
+        attacker=Attacker(
+            direction=Direction.SRC,
+            attacker_type=IoCType.IP,
+            value=attacker,
+        ),
+        victim=Victim(
+            direction=Direction.DST,
+            victim_type=IoCType.IP,
+            value=victim,
+        ),
+        threat_level=ThreatLevel.INFO,
+        profile=ProfileID(attacker),
+        timewindow=TimeWindow(1),
+        uid=[],
+        timestamp="1728417813.8868346",
+    )
+
+
+def test_enrich_evidence():
+    alert_handler = ModuleFactory().create_alert_handler_obj()
+    alert_handler.rcache = MagicMock()
+    pipe = alert_handler.rcache.pipeline.return_value
+    pipe.execute.return_value = [
+        [
+            json.dumps(
+                {
+                    "asn": {"number": "AS15169", "org": "GOOGLE"},
+                    "reverse_dns": "dns.google",
+                    "SNI": [{"server_name": "dns.google"}],
+                }
+            ),
+            None,
+        ],
+        [json.dumps({"source": "feed.csv"}), None],
+    ]
+    evidence = create_evidence_with_victim("8.8.8.8", "1.1.1.1")
+
+    alert_handler.enrich_evidence(evidence)
+
+    pipe.hmget.assert_has_calls(
+        [
+            call("IPsInfo", ["8.8.8.8", "1.1.1.1"]),
+            call("IoC_ips", ["8.8.8.8", "1.1.1.1"]),
+        ]
+    )
+    pipe.execute.assert_called_once()
+    assert evidence.attacker.TI == "feed.csv"
+    assert evidence.attacker.AS == {"number": "AS15169", "org": "GOOGLE"}
+    assert evidence.attacker.rDNS == "dns.google"
+    assert evidence.attacker.SNI == "dns.google"
+    assert evidence.victim.TI is None
+    assert evidence.victim.AS is None
+
+
+def test_enrich_evidence_uses_the_ip_info_cache():
+    alert_handler = ModuleFactory().create_alert_handler_obj()
+    alert_handler.rcache = MagicMock()
+    pipe = alert_handler.rcache.pipeline.return_value
+    pipe.execute.return_value = [[None, None], [None, None]]
+
+    alert_handler.enrich_evidence(
+        create_evidence_with_victim("8.8.8.8", "1.1.1.1")
+    )
+    alert_handler.enrich_evidence(
+        create_evidence_with_victim("8.8.8.8", "1.1.1.1")
+    )
+    pipe.execute.assert_called_once()
+
+    # updating the ip info invalidates it
+    alert_handler.get_ip_info = MagicMock(return_value=None)
+    alert_handler.update_ips_info("profile_1.1.1.1", 0.5, 0.5)
+    pipe.execute.return_value = [[None], [None]]
+    alert_handler.enrich_evidence(
+        create_evidence_with_victim("8.8.8.8", "1.1.1.1")
+    )
+    pipe.hmget.assert_called_with("IoC_ips", ["1.1.1.1"])
+
+
+def test_get_ips_enrichment_info_expired():
+    alert_handler = ModuleFactory().create_alert_handler_obj()
+    alert_handler.rcache = MagicMock()
+    pipe = alert_handler.rcache.pipeline.return_value
+    pipe.execute.return_value = [[None], [None]]
+
+    alert_handler.ip_info_cache_ttl = 0
+    alert_handler.get_ips_enrichment_info(["8.8.8.8"])
+    assert alert_handler.get_ips_enrichment_info(["8.8.8.8"]) == {
+        "8.8.8.8": (None, False)
+    }
+    assert pipe.execute.call_count == 2
+
+
+def test_update_threat_levels():
+    alert_handler = ModuleFactory().create_alert_handler_obj()
+    alert_handler.r = MagicMock()
+    alert_handler.rcache = MagicMock()
+    pipe = alert_handler.r.pipeline.return_value
+    past_threat_levels = json.dumps([["low", "ts", "confidence: 1"]])
+    pipe.execute.return_value = [
+        # new profile
+        [None, None],
+        # a profile with a higher max threat level
+        [past_threat_levels, "high"],
+    ]
+    alert_handler.rcache.hmget.return_value = [
+        None,
+        json.dumps({"asn": "x"}),
+    ]
+    alert_handler.ip_info_cache["2.2.2.2"] = (0, None, False)
+
+    alert_handler.update_threat_levels(
+        # 1.1.1.1 was listed twice, every listing is kept
+        {"profile_1.1.1.1": ["medium", "low"], "profile_2.2.2.2": ["medium"]},
+        1,
+    )
+
+    pipe.hset.assert_any_call("profile_1.1.1.1", "max_threat_level", "medium")
+    assert (
+        call("profile_2.2.2.2", "max_threat_level", "medium")
+        not in pipe.hset.call_args_list
+    )
+    stored = {
+        c.args[0]: c.kwargs["mapping"]
+        for c in pipe.hset.call_args_list
+        if "mapping" in c.kwargs
+    }
+    assert stored["profile_1.1.1.1"]["threat_level"] == "low"
+    assert [
+        past[0]
+        for past in json.loads(stored["profile_1.1.1.1"]["past_threat_levels"])
+    ] == ["medium", "low"]
+    assert (
+        len(json.loads(stored["profile_2.2.2.2"]["past_threat_levels"])) == 2
+    )
+    alert_handler.rcache.hset.assert_called_once_with(
+        "IPsInfo",
+        mapping={
+            "1.1.1.1": json.dumps({"score": 0.5, "confidence": 1}),
+            "2.2.2.2": json.dumps({"asn": "x", "score": 0.8, "confidence": 1}),
+        },
+    )
+    assert "2.2.2.2" not in alert_handler.ip_info_cache
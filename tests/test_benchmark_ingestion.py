@@ -0,0 +1,71 @@
+"""Unit test for benchmarks/ingestion.py"""
+
+import fnmatch
+import json
+
+import pytest
+import redis
+
+from benchmarks.ingestion import Run
+
+
+class StubRedis:
+    """a dict based redis that raises WRONGTYPE like redis does"""
+
+    def __init__(self, data: dict):
+        self.data = data
+
+    def scan_iter(self, match: str):
+        return (key for key in self.data if fnmatch.fnmatch(key, match))
+
+    def hvals(self, key: str) -> list:
+        if not isinstance(self.data[key], dict):
+            raise redis.exceptions.ResponseError("WRONGTYPE")
+        return list(self.data[key].values())
+
+    def scard(self, key: str) -> int:
+        return len(self.data.get(key, ()))
+
+    def get(self, key: str):
+        return self.data.get(key)
+
+
+def create_evidence(evidence_type: str) -> str:
+    return json.dumps({"evidence_type": evidence_type})
+
+
+@pytest.mark.parametrize(
+    "other_keys",
+    [
+        {},
+        # keys that end with _evidence but aren't evidence hashes
+        {
+            "processed_evidence": {"id1", "id2"},
+            "whitelisted_evidence": {"id3"},
+            "flows_causing_evidence": {"id1": json.dumps(["uid1"])},
+        },
+    ],
+)
+def test_get_detections(other_keys):
+    run = Run("dataset/test.pcap", 6379, "output", 1)
+    run.r = StubRedis(
+        {
+            "profile_192.168.1.1_timewindow1_evidence": {
+                "id1": create_evidence("PORT_SCAN"),
+                "id2": create_evidence("LONG_CONNECTION"),
+            },
+            "profile_192.168.1.2_timewindow3_evidence": {
+                "id3": create_evidence("PORT_SCAN"),
+            },
+            "profiles": {"profile_192.168.1.1", "profile_192.168.1.2"},
+            "number_of_evidence": "3",
+            "number_of_alerts": "1",
+            **other_keys,
+        }
+    )
+    assert run.get_detections() == {
+        "profiles": 2,
+        "evidence": 3,
+        "alerts": 1,
+        "evidence_types": {"LONG_CONNECTION": 1, "PORT_SCAN": 2},
+    }
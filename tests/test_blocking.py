@@ -2,10 +2,18 @@
 this file needs sudoroot to run
 """
 
+from unittest.mock import Mock
+
+from modules.blocking.blocking import Blocking
+from modules.blocking.firewall_sets import (
+    IPSet,
+    NFTSet,
+)
 from tests.common_test_utils import IS_IN_A_DOCKER_CONTAINER
 from tests.module_factory import ModuleFactory
 import platform
 import pytest
+import time
 import os
 
 
@@ -100,3 +108,247 @@ def test_unblock_ip():
     if not blocking.is_ip_blocked("2.2.0.0"):
         assert blocking.block_ip(ip, from_, to) is True
     assert blocking.unblock_ip(ip, from_, to) is True
+
+
+class FakeExecutor:
+    """records the firewall commands instead of running them"""
+
+    def __init__(self, succeed=True):
+        self.succeed = succeed
+        self.commands = []
+
+    def run(self, cmd, stdin=None):
+        self.commands.append((cmd, stdin))
+        return self.succeed
+
+    def get_output(self, cmd):
+        self.commands.append((cmd, None))
+        return ""
+
+
+def test_ipset_batches_additions_and_removals():
+    executor = FakeExecutor()
+    ipset = IPSet(executor)
+    assert ipset.add("1.2.3.4", "src")
+    assert ipset.add("1.2.3.4", "dst", timeout=60)
+    assert ipset.add("2001:db8::1", "src")
+    # nothing is executed until the flush
+    assert executor.commands == []
+    assert ipset.is_blocked("1.2.3.4")
+
+    assert ipset.flush()
+    assert executor.commands == [
+        (
+            ["ipset", "-exist", "restore"],
+            "add slips_blocked_src_v4 1.2.3.4\n"
+            "add slips_blocked_dst_v4 1.2.3.4 timeout 60\n"
+            "add slips_blocked_src_v6 2001:db8::1\n",
+        )
+    ]
+
+    assert ipset.remove("1.2.3.4", "src")
+    assert ipset.remove("1.2.3.4", "dst")
+    assert ipset.flush()
+    cmd, transaction = executor.commands[-1]
+    assert sorted(transaction.splitlines()) == [
+        "del slips_blocked_dst_v4 1.2.3.4",
+        "del slips_blocked_src_v4 1.2.3.4",
+    ]
+    assert not ipset.is_blocked("1.2.3.4")
+    assert ipset.is_blocked("2001:db8::1")
+
+
+@pytest.mark.parametrize(
+    "ip, expected_result",
+    [
+        # Testcase1: valid ip
+        ("1.2.3.4", True),
+        # Testcase2: valid network
+        ("10.0.0.0/8", True),
+        # Testcase3: invalid ip
+        ("not an ip", False),
+    ],
+)
+def test_firewall_set_add(ip, expected_result):
+    nft = NFTSet(FakeExecutor())
+    assert nft.add(ip, "src") is expected_result
+
+
+def test_firewall_set_remove_pending_addition():
+    """removing an ip that wasn't flushed yet shouldn't reach the kernel"""
+    executor = FakeExecutor()
+    nft = NFTSet(executor)
+    nft.add("1.2.3.4", "src")
+    assert nft.remove("1.2.3.4", "src")
+    assert not nft.has_pending_changes()
+    assert not nft.remove("5.6.7.8", "src")
+    assert nft.flush()
+    assert executor.commands == []
+
+
+def test_nft_transaction():
+    executor = FakeExecutor()
+    nft = NFTSet(executor)
+    nft.add("1.2.3.4", "src", timeout=30)
+    nft.add("2001:db8::/32", "dst")
+    assert nft.flush()
+    assert executor.commands == [
+        (
+            ["nft", "-f", "-"],
+            "add element inet slipsBlocking slips_blocked_src_v4 "
+            "{ 1.2.3.4 timeout 30s }\n"
+            "add element inet slipsBlocking slips_blocked_dst_v6 "
+            "{ 2001:db8::/32 }\n",
+        )
+    ]
+
+
+def test_firewall_set_failed_flush():
+    """the changes of a failed transaction are kept for a retry"""
+    executor = FakeExecutor(succeed=False)
+    nft = NFTSet(executor, flush_interval=1)
+    nft.add("1.2.3.4", "src")
+    assert not nft.flush()
+    assert nft.pending_additions == {("1.2.3.4", "src"): None}
+    assert nft.blocked == {}
+    # the retry waits for the flush interval
+    assert not nft.should_flush()
+
+    executor.succeed = True
+    assert nft.flush()
+    assert nft.blocked == {("1.2.3.4", "src"): None}
+    assert not nft.has_pending_changes()
+    assert nft.failed_flushes == 0
+
+
+def test_firewall_set_gives_up_after_failed_flushes():
+    nft = NFTSet(FakeExecutor(succeed=False))
+    nft.add("1.2.3.4", "src", timeout=60)
+    for _ in range(nft.max_failed_flushes):
+        assert not nft.has_given_up()
+        nft.flush()
+    assert nft.has_given_up()
+
+    additions, removals = nft.drop_pending_changes()
+    assert additions == {("1.2.3.4", "src"): 60}
+    assert removals == set()
+    assert not nft.has_pending_changes()
+    assert not nft.is_blocked("1.2.3.4")
+
+
+def create_blocking_obj_with_set(
+    mocker, executor, firewall_set=IPSet, firewall="iptables"
+) -> Blocking:
+    mocker.patch.object(Blocking, "init")
+    blocking = ModuleFactory().create_blocking_obj()
+    blocking.firewall = firewall
+    blocking.firewall_set = firewall_set(executor)
+    blocking.unblock_ips = {}
+    blocking.exec_iptables_command = Mock(return_value=True)
+    return blocking
+
+
+def get_printed(blocking: Blocking) -> list:
+    return [call.args[0] for call in blocking.print.call_args_list]
+
+
+def test_ips_are_reported_blocked_after_the_flush(mocker):
+    blocking = create_blocking_obj_with_set(mocker, FakeExecutor())
+    assert blocking.block_ip("1.2.3.4", True, True) is True
+    # queued, not blocked yet
+    assert get_printed(blocking) == []
+
+    assert blocking.flush_firewall_set()
+    assert get_printed(blocking) == [
+        "Blocked all traffic from: 1.2.3.4",
+        "Blocked all traffic to: 1.2.3.4",
+    ]
+
+
+def test_failed_flush_falls_back_to_iptables(mocker):
+    blocking = create_blocking_obj_with_set(
+        mocker, FakeExecutor(succeed=False)
+    )
+    blocking.block_ip("1.2.3.4", True, False, block_for=60)
+
+    # the failure is logged and the block is retried
+    assert not blocking.flush_firewall_set()
+    assert "Blocked all traffic from: 1.2.3.4" not in get_printed(blocking)
+    assert any("Failed to apply" in msg for msg in get_printed(blocking))
+    assert blocking.firewall_set.has_pending_changes()
+    blocking.exec_iptables_command.assert_not_called()
+
+    # once the retries are used up, the ip is blocked using iptables
+    while blocking.firewall_set.has_pending_changes():
+        blocking.flush_firewall_set()
+    blocking.exec_iptables_command.assert_called_once_with(
+        action="insert", ip_to_block="1.2.3.4", flag="-s", options={}
+    )
+    assert "Blocked all traffic from: 1.2.3.4" in get_printed(blocking)
+    assert blocking.unblock_ips["1.2.3.4"]["block_for"] == 60
+    assert blocking.unblock_ips["1.2.3.4"]["blocking_details"]["from"]
+
+
+def test_failed_nft_flush_is_applied_one_by_one(mocker):
+    """nftables hosts have no iptables to fall back to"""
+
+    class FailingIPExecutor(FakeExecutor):
+        def run(self, cmd, stdin=None):
+            super().run(cmd, stdin)
+            return "5.6.7.8" not in stdin
+
+    blocking = create_blocking_obj_with_set(
+        mocker, FailingIPExecutor(), firewall_set=NFTSet, firewall="nftables"
+    )
+    blocking.block_ip("1.2.3.4", True, False, block_for=60)
+    blocking.block_ip("5.6.7.8", True, False)
+
+    assert not blocking.flush_firewall_set(retry=False)
+    blocking.exec_iptables_command.assert_not_called()
+    assert not blocking.firewall_set.has_pending_changes()
+    assert blocking.firewall_set.is_blocked("1.2.3.4")
+    assert not blocking.firewall_set.is_blocked("5.6.7.8")
+    printed = get_printed(blocking)
+    assert "Blocked all traffic from: 1.2.3.4" in printed
+    assert "Unable to block 5.6.7.8." in printed
+    # the kernel unblocks it, no need to track it
+    assert blocking.unblock_ips == {}
+
+
+@pytest.mark.parametrize(
+    "pending, seconds_pending, expected_result",
+    [
+        # Testcase1: nothing to flush
+        (0, None, False),
+        # Testcase2: batch is full
+        (3, 0, True),
+        # Testcase3: batch isn't full and the interval didn't pass
+        (2, 0, False),
+        # Testcase4: the oldest change waited for the whole interval
+        (1, 5, True),
+    ],
+)
+def test_should_flush(pending, seconds_pending, expected_result):
+    ipset = IPSet(FakeExecutor(), batch_size=3, flush_interval=1)
+    for i in range(pending):
+        ipset.add(f"1.1.1.{i}", "src")
+    if seconds_pending is not None:
+        ipset.first_pending_at = time.time() - seconds_pending
+    assert ipset.should_flush() is expected_result
+
+
+def test_ipset_init_sets():
+    executor = FakeExecutor(succeed=False)
+    # restore fails
+    assert not IPSet(executor).init_sets()
+    assert len(executor.commands) == 1
+
+    executor = FakeExecutor()
+    assert IPSet(executor).init_sets()
+    restore_cmd, creation = executor.commands[0]
+    assert creation.splitlines() == [
+        "create slips_blocked_src_v4 hash:net family inet timeout 0",
+        "create slips_blocked_src_v6 hash:net family inet6 timeout 0",
+        "create slips_blocked_dst_v4 hash:net family inet timeout 0",
+        "create slips_blocked_dst_v6 hash:net family inet6 timeout 0",
+    ]
@@ -0,0 +1,214 @@
+"""Unit test for slips_files/core/helpers/bus_telemetry.py"""
+
+import base64
+import json
+import time
+from unittest.mock import MagicMock, Mock
+
+import pytest
+
+from modules.p2ptrust.utils.utils import send_b64_to_go
+from slips_files.core.database.redis_db.database import RedisDB
+from slips_files.core.helpers import bus_telemetry
+from slips_files.core.helpers.bus_telemetry import BusTelemetry
+
+
+def create_bus_telemetry(flush_interval: float = 5) -> BusTelemetry:
+    return BusTelemetry(
+        MagicMock(), RedisDB.supported_channels, flush_interval=flush_interval
+    )
+
+
+def get_hincrbys(telemetry: BusTelemetry) -> list:
+    pipe = telemetry.r.pipeline.return_value
+    return [call.args for call in pipe.hincrby.call_args_list]
+
+
+@pytest.mark.parametrize(
+    "msg",
+    ["some msg", "", '{"a": "b\x1fc"}'],
+)
+def test_wrap_and_unwrap(msg):
+    before = time.time()
+    publish_ts, seq, unwrapped = bus_telemetry.unwrap(
+        bus_telemetry.wrap(msg, 3)
+    )
+    assert unwrapped == msg
+    assert seq == 3
+    assert before <= publish_ts <= time.time()
+
+
+@pytest.mark.parametrize("data", ["not wrapped", 1, None])
+def test_unwrap_unwrapped_msg(data):
+    assert bus_telemetry.unwrap(data) == (None, None, data)
+
+
+@pytest.mark.parametrize(
+    "channel, msg, should_wrap",
+    [
+        ("new_flow", "some msg", True),
+        # read by slips, but by code that doesn't unwrap msgs
+        ("control_channel", "stop_slips", False),
+        ("fides2slips", "some msg", False),
+        # read by the go p2p pigeon
+        ("p2p_pygo", '{"message_type": "report"}', False),
+        ("p2p_pygo6379", '{"message_type": "report"}', False),
+        # not a str
+        ("memory_profile", 1234, False),
+    ],
+)
+def test_publish(channel, msg, should_wrap):
+    telemetry = create_bus_telemetry()
+    published = telemetry.publish(channel, msg)
+    assert (published != msg) == should_wrap
+    assert bus_telemetry.unwrap(published)[2] == msg
+    assert telemetry.published[channel] == 1
+
+
+def test_publish_seq():
+    telemetry = create_bus_telemetry()
+    seqs = [
+        bus_telemetry.unwrap(telemetry.publish("new_flow", "msg"))[1]
+        for _ in range(3)
+    ]
+    assert seqs == [1, 2, 3]
+
+
+def test_counters_are_flushed_in_batches():
+    telemetry = create_bus_telemetry()
+    for _ in range(100):
+        telemetry.publish("new_flow", "msg")
+        telemetry.receive("flowalerts", "new_flow", time.time())
+    # nothing is sent to redis before the flush interval
+    telemetry.r.pipeline.assert_not_called()
+
+    telemetry.flush()
+    telemetry.r.pipeline.assert_called_once_with(transaction=False)
+    telemetry.r.pipeline.return_value.execute.assert_called_once()
+    hincrbys = get_hincrbys(telemetry)
+    assert (bus_telemetry.PUBLISHED_KEY, "new_flow", 100) in hincrbys
+    assert (
+        "flowalerts_msgs_received_at_runtime",
+        "new_flow",
+        100,
+    ) in hincrbys
+    # the counters are reset after flushing
+    assert not telemetry.published
+    assert not telemetry.received
+
+
+def test_flush_if_due():
+    telemetry = create_bus_telemetry(flush_interval=0)
+    telemetry.publish("new_flow", "msg")
+    telemetry.r.pipeline.return_value.execute.assert_called_once()
+
+
+def test_flush_without_msgs():
+    telemetry = create_bus_telemetry()
+    telemetry.flush()
+    telemetry.r.pipeline.assert_not_called()
+
+
+def test_latency_and_handler_time_histograms():
+    telemetry = create_bus_telemetry()
+    # waited 10ms in the channel
+    telemetry.receive("flowalerts", "new_flow", time.time() - 0.01)
+    telemetry.receive("flowalerts", "new_dns", None)
+    # 3ms split between the 2 channels
+    telemetry.record_handler_time("flowalerts", ["new_flow", "new_dns"], 0.003)
+    telemetry.record_handler_time("flowalerts", [], 1)
+    telemetry.flush()
+
+    hincrbys = get_hincrbys(telemetry)
+    latency = [
+        args for args in hincrbys if args[0] == bus_telemetry.LATENCY_KEY
+    ]
+    # the 10ms bucket is (8, 16], new_dns msg had no publish time
+    assert latency == [(bus_telemetry.LATENCY_KEY, "flowalerts|new_flow|4", 1)]
+    handler_time = [
+        args for args in hincrbys if args[0] == bus_telemetry.HANDLER_TIME_KEY
+    ]
+    assert sorted(handler_time) == [
+        (bus_telemetry.HANDLER_TIME_KEY, "flowalerts|new_dns|1", 1),
+        (bus_telemetry.HANDLER_TIME_KEY, "flowalerts|new_flow|1", 1),
+    ]
+
+
+@pytest.mark.parametrize(
+    "ms, expected_bucket",
+    [(0, 0), (1, 0), (1.5, 1), (10, 4), (65536, 16), (100000, 17)],
+)
+def test_get_bucket(ms, expected_bucket):
+    assert bus_telemetry.get_bucket(ms) == expected_bucket
+
+
+@pytest.mark.parametrize(
+    "histogram, percentile, expected",
+    [
+        ({}, 0.5, 0),
+        ({0: 50, 4: 49, 10: 1}, 0.5, 1),
+        ({0: 50, 4: 49, 10: 1}, 0.99, 16),
+        ({0: 50, 4: 49, 10: 1}, 1, 1024),
+        ({17: 1}, 0.5, float("inf")),
+    ],
+)
+def test_get_percentile(histogram, percentile, expected):
+    assert bus_telemetry.get_percentile(histogram, percentile) == expected
+
+
+def test_get_bus_telemetry():
+    hashes = {
+        bus_telemetry.PUBLISHED_KEY: {"new_flow": "10", "new_dns": "5"},
+        "flowalerts_msgs_received_at_runtime": {
+            "new_flow": "7",
+            "new_dns": "5",
+        },
+        bus_telemetry.LATENCY_KEY: {"flowalerts|new_flow|4": "7"},
+        bus_telemetry.HANDLER_TIME_KEY: {"flowalerts|new_flow|0": "7"},
+    }
+    r = Mock()
+    r.hgetall.side_effect = lambda key: hashes.get(key, {})
+    r.scan_iter.return_value = iter(["flowalerts_msgs_received_at_runtime"])
+
+    telemetry = bus_telemetry.get_bus_telemetry(r)
+    assert telemetry == [
+        {
+            "module": "flowalerts",
+            "channel": "new_dns",
+            "received": 5,
+            "backlog": 0,
+            "latency_p50_ms": 0,
+            "latency_p99_ms": 0,
+            "handler_p50_ms": 0,
+            "handler_p99_ms": 0,
+        },
+        {
+            "module": "flowalerts",
+            "channel": "new_flow",
+            "received": 7,
+            "backlog": 3,
+            "latency_p50_ms": 16,
+            "latency_p99_ms": 16,
+            "handler_p50_ms": 1,
+            "handler_p99_ms": 1,
+        },
+    ]
+    table = bus_telemetry.format_bus_telemetry(telemetry).splitlines()
+    assert len(table) == 3
+    assert table[0].startswith("Module")
+
+
+@pytest.mark.parametrize("channel", ["p2p_pygo", "p2p_pygo6379"])
+def test_msgs_to_the_go_pigeon_arent_wrapped(channel):
+    db = Mock()
+    db.bus_telemetry = create_bus_telemetry()
+    db.publish = lambda *args: RedisDB.publish(db, *args)
+    message = base64.b64encode(b'{"message_type": "report"}').decode()
+
+    send_b64_to_go(message, "*", channel, db)
+
+    published_channel, published = db.r.publish.call_args.args
+    assert published_channel == channel
+    # the go pigeon parses the msg as json
+    assert json.loads(published) == {"message": message, "recipient": "*"}
+    assert db.bus_telemetry.published[channel] == 1
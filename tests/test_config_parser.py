@@ -0,0 +1,90 @@
+"""Unit test for slips_files/common/parsers/config_parser.py"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+from slips_files.common.parsers.config_parser import (
+    ConfigParser,
+    config_snapshots,
+)
+
+
+def write_config(path, content: str, mtime: float):
+    path.write_text(content)
+    # so the modification is detected even if the test is fast
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "slips.yaml"
+    write_config(
+        path,
+        "parameters:\n"
+        "  time_window_width: 60\n"
+        "modules:\n"
+        "  disable: [template, rnn_cc_detection]\n",
+        mtime=1000,
+    )
+    with patch("sys.argv", ["slips.py", "-c", str(path)]):
+        yield path
+    config_snapshots.pop(str(path), None)
+
+
+def test_config_file_is_parsed_once(config_file):
+    with patch("yaml.safe_load", wraps=yaml.safe_load) as safe_load:
+        first = ConfigParser()
+        second = ConfigParser()
+
+    safe_load.assert_called_once()
+    assert first.snapshot is second.snapshot
+    assert second.get_tw_width_as_float() == 60
+
+
+def test_read_values_cant_modify_the_snapshot(config_file):
+    conf = ConfigParser()
+    disabled: list = conf.read_configuration("modules", "disable", [])
+    disabled.append("arp")
+
+    assert disabled == ["template", "rnn_cc_detection", "arp"]
+    assert conf.read_configuration("modules", "disable", []) == [
+        "template",
+        "rnn_cc_detection",
+    ]
+    with pytest.raises(TypeError):
+        conf.config["parameters"]["time_window_width"] = 5
+
+
+def test_modified_config_file_is_parsed_again(config_file):
+    conf = ConfigParser()
+
+    write_config(
+        config_file, "parameters:\n  time_window_width: 120\n", mtime=2000
+    )
+
+    assert ConfigParser().get_tw_width_as_float() == 120
+    # old instances keep their snapshot
+    assert conf.get_tw_width_as_float() == 60
+
+
+@pytest.mark.parametrize(
+    "content, expected_width",
+    [
+        # testcase1: empty file, use the defaults
+        ("", 3600),
+        # testcase2: missing option
+        ("parameters:\n  label: normal\n", 3600),
+    ],
+)
+def test_defaults(config_file, content, expected_width):
+    write_config(config_file, content, mtime=3000)
+    assert ConfigParser().get_tw_width_as_float() == expected_width
+
+
+def test_invalid_config_file(config_file):
+    write_config(config_file, "- not\n- sections\n", mtime=4000)
+    with pytest.raises(ValueError):
+        ConfigParser()
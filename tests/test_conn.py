@@ -79,7 +79,8 @@ def test_is_p2p(
     expected_final_p2p_daddrs,
 ):
     conn = ModuleFactory().create_conn_analyzer_obj()
-    conn.p2p_daddrs = initial_p2p_daddrs.copy()
+    if initial_p2p_daddrs:
+        conn.p2p_daddrs.set(profileid, twid, initial_p2p_daddrs.copy())
     flow = Conn(
         starttime="1726249372.312124",
         uid="123",
@@ -99,9 +100,11 @@ def test_is_p2p(
         state="Established",
         history="",
     )
-    result = conn.is_p2p(flow)
+    result = conn.is_p2p(profileid, twid, flow)
     assert result == expected_result
-    assert conn.p2p_daddrs == expected_final_p2p_daddrs
+    assert (
+        conn.p2p_daddrs.get(profileid, twid, {}) == expected_final_p2p_daddrs
+    )
 
 
 @pytest.mark.parametrize(
@@ -276,43 +279,55 @@ def test_is_ignored_ip_data_upload(ip_address, expected_result):
 
 
 @pytest.mark.parametrize(
-    "all_flows, expected_bytes_sent",
+    "daddr, expected_call_count",
     [
-        (  # Testcase 1: Normal flows with data
-            {
-                "uid1": {
-                    "daddr": "8.8.8.8",
-                    "sbytes": 1024,
-                    "starttime": "2023-11-01 12:00:00",
-                },
-                "uid2": {
-                    "daddr": "8.8.8.8",
-                    "sbytes": 2048,
-                    "starttime": "2023-11-01 12:02:00",
-                },
-            },
-            {"8.8.8.8": (3072, ["uid1", "uid2"], "2023-11-01 12:02:00")},
-        ),
-        (  # Testcase 2: Flows with no 'sbytes'
-            {
-                "uid1": {
-                    "daddr": "8.8.8.8",
-                    "starttime": "2023-11-01 12:00:00",
-                },
-                "uid2": {
-                    "daddr": "8.8.4.4",
-                    "sbytes": 2048,
-                    "starttime": "2023-11-01 12:02:00",
-                },
-            },
-            {"8.8.4.4": (2048, ["uid2"], "2023-11-01 12:02:00")},
-        ),
+        # Testcase1: Exceeds threshold
+        ("8.8.8.8", 1),
+        # Testcase2: Ignored IP
+        ("224.0.0.1", 0),
     ],
 )
-def test_get_sent_bytes(all_flows, expected_bytes_sent):
+def test_detect_data_upload_in_twid(mocker, daddr, expected_call_count):
     conn = ModuleFactory().create_conn_analyzer_obj()
-    bytes_sent = conn.get_sent_bytes(all_flows)
-    assert bytes_sent == expected_bytes_sent
+    conn.data_exfiltration_threshold = 3
+    mock_set_evidence = mocker.patch(
+        "modules.flowalerts.set_evidence.SetEvidnceHelper.data_exfiltration"
+    )
+    # the db only returns the daddrs sent more than the threshold
+    conn.db.pop_sent_bytes.return_value = {
+        daddr: (4 * 10**6, ["uid1", "uid2"], "1726249372.1")
+    }
+
+    conn.detect_data_upload_in_twid(profileid, twid)
+
+    conn.db.pop_sent_bytes.assert_called_once_with(profileid, twid, 3 * 10**6)
+    assert mock_set_evidence.call_count == expected_call_count
+    if expected_call_count:
+        mock_set_evidence.assert_called_once_with(
+            daddr, 4, profileid, twid, ["uid1", "uid2"], "1726249372.1"
+        )
+
+
+async def test_tw_closed_before_its_new_flow_msgs(mocker):
+    """
+    the sent bytes of the tw are summed by the profiler before the tw is
+    closed, so they're counted even if flowalerts receives tw_closed
+    before their new_flow msgs
+    """
+    conn = ModuleFactory().create_conn_analyzer_obj()
+    conn.data_exfiltration_threshold = 3
+    mock_set_evidence = mocker.patch(
+        "modules.flowalerts.set_evidence.SetEvidnceHelper.data_exfiltration"
+    )
+    conn.db.pop_sent_bytes.return_value = {
+        "8.8.8.8": (4 * 10**6, ["uid0", "uid1"], "1726249372.1")
+    }
+
+    await conn.analyze({"channel": "tw_closed", "data": f"{profileid}_{twid}"})
+    mock_set_evidence.assert_called_once_with(
+        "8.8.8.8", 4, profileid, twid, ["uid0", "uid1"], "1726249372.1"
+    )
+    conn.db.pop_sent_bytes.assert_called_once_with(profileid, twid, 3 * 10**6)
 
 
 @pytest.mark.parametrize(
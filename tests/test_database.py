@@ -3,6 +3,7 @@ from unittest.mock import (
     call,
 )
 
+import dataclasses
 import redis
 import json
 import time
@@ -100,6 +101,34 @@ def test_add_ips():
     assert stored_src_ips == '{"192.168.1.1": 1}'
 
 
+def test_add_and_pop_sent_bytes():
+    db = ModuleFactory().create_db_manager_obj(
+        get_random_port(), flush_db=True
+    )
+    db.rdb.add_sent_bytes(profileid, twid, flow)
+    # the same flow added twice is counted once
+    db.rdb.add_sent_bytes(profileid, twid, flow)
+    flow2 = dataclasses.replace(flow, uid="5678", sbytes=30)
+    db.rdb.add_sent_bytes(profileid, twid, flow2)
+
+    assert db.pop_sent_bytes(profileid, twid, 50) == {
+        "8.8.8.8": (50, ["1234", "5678"], "1601998398.945854")
+    }
+    # the totals of the closed tw are deleted
+    assert db.pop_sent_bytes(profileid, twid, 0) == {}
+    assert not db.rdb.r.keys(f"{profileid}_{twid}_sent_bytes*")
+
+
+def test_pop_sent_bytes_below_min_bytes():
+    db = ModuleFactory().create_db_manager_obj(
+        get_random_port(), flush_db=True
+    )
+    db.rdb.add_sent_bytes(profileid, twid, flow)
+
+    assert db.pop_sent_bytes(profileid, twid, 21) == {}
+    assert not db.rdb.r.keys(f"{profileid}_{twid}_sent_bytes*")
+
+
 def test_add_port():
     db = ModuleFactory().create_db_manager_obj(
         get_random_port(), flush_db=True
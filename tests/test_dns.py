@@ -476,6 +476,15 @@ async def test_analyze_new_flow_msg(test_case, expected_calls):
     )
 
 
+def set_nxdomains(dns, nxdomains: dict):
+    for (profileid_, twid_), state in nxdomains.items():
+        dns.nxdomains.set(profileid_, twid_, state)
+
+
+def get_nxdomains(dns) -> dict:
+    return {key: state for key, (_, state) in dns.nxdomains.tws.items()}
+
+
 @pytest.mark.parametrize(
     "rcode_name, query, initial_nxdomains, "
     "expected_nxdomains, expected_result",
@@ -487,7 +496,7 @@ async def test_analyze_new_flow_msg(test_case, expected_calls):
             "NXDOMAIN",
             "example.com",
             {},
-            {f"{profileid}_{twid}": (["example.com"], [uid])},
+            {(profileid, twid): (["example.com"], [uid])},
             False,
         ),
         # NXDOMAIN, 9th occurrence (below threshold)
@@ -495,7 +504,7 @@ async def test_analyze_new_flow_msg(test_case, expected_calls):
             "NXDOMAIN",
             "example9.com",
             {
-                f"{profileid}_{twid}": (
+                (profileid, twid): (
                     [
                         "example1.com",
                         "example2.com",
@@ -510,7 +519,7 @@ async def test_analyze_new_flow_msg(test_case, expected_calls):
                 )
             },
             {
-                f"{profileid}_{twid}": (
+                (profileid, twid): (
                     [
                         "example1.com",
                         "example2.com",
@@ -537,7 +546,7 @@ def test_detect_dga_no_alert(
     expected_result,
 ):
     dns = ModuleFactory().create_dns_analyzer_obj()
-    dns.nxdomains = initial_nxdomains
+    set_nxdomains(dns, initial_nxdomains)
     dns.nxdomains_threshold = 10
     flow = DNS(
         starttime="1726568479.5997488",
@@ -558,7 +567,7 @@ def test_detect_dga_no_alert(
     dns.set_evidence.dga = Mock()
 
     assert dns.detect_dga(profileid, twid, flow) == expected_result
-    assert dns.nxdomains == expected_nxdomains
+    assert get_nxdomains(dns) == expected_nxdomains
     dns.set_evidence.dga.assert_not_called()
 
 
@@ -566,7 +575,7 @@ def test_detect_dga_alert():
     dns = ModuleFactory().create_dns_analyzer_obj()
 
     initial_nxdomains = {
-        f"{profileid}_{twid}": (
+        (profileid, twid): (
             [
                 "example1.com",
                 "example2.com",
@@ -581,7 +590,7 @@ def test_detect_dga_alert():
             [uid] * 9,
         )
     }
-    dns.nxdomains = initial_nxdomains
+    set_nxdomains(dns, initial_nxdomains)
     dns.nxdomains_threshold = 10
 
     dns.flowalerts.whitelist.domain_analyzer.is_whitelisted = Mock()
@@ -605,13 +614,12 @@ def test_detect_dga_alert():
     result = dns.detect_dga(profileid, twid, flow)
     expected_result = True
     assert result == expected_result
-    assert dns.nxdomains == {f"{profileid}_{twid}": ([], [])}
+    assert get_nxdomains(dns) == {(profileid, twid): ([], [])}
     dns.set_evidence.dga.assert_called_once_with(twid, flow, 10, [uid] * 10)
 
 
 def test_detect_dga_whitelisted():
     dns = ModuleFactory().create_dns_analyzer_obj()
-    dns.nxdomains = {}
     dns.nxdomains_threshold = 10
 
     dns.flowalerts.whitelist.domain_analyzer.is_whitelisted = Mock()
@@ -633,7 +641,7 @@ def test_detect_dga_whitelisted():
     result = dns.detect_dga(profileid, twid, flow)
     expected_result = False
     assert result == expected_result
-    assert dns.nxdomains == {}
+    assert get_nxdomains(dns) == {}
     dns.set_evidence.dga.assert_not_called()
 
 
@@ -648,7 +656,6 @@ def test_detect_dga_whitelisted():
 )
 def test_detect_dga_special_domains(query, expected_result):
     dns = ModuleFactory().create_dns_analyzer_obj()
-    dns.nxdomains = {}
     dns.nxdomains_threshold = 10
 
     dns.flowalerts.whitelist.domain_analyzer.is_whitelisted = Mock()
@@ -672,5 +679,5 @@ def test_detect_dga_special_domains(query, expected_result):
     result = dns.detect_dga(profileid, twid, flow)
 
     assert result == expected_result
-    assert dns.nxdomains == {}
+    assert get_nxdomains(dns) == {}
     dns.set_evidence.dga.assert_not_called()
@@ -0,0 +1,135 @@
+"""Unit test for modules/threat_intelligence/dnsbl.py"""
+
+import socketserver
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import dns.message
+import dns.rcode
+import dns.rrset
+import pytest
+
+from modules.threat_intelligence.dnsbl import DNSBLClient
+
+LISTED = {"2.0.0.127.zen.spamhaus.org.": "127.0.0.2"}
+
+
+class StubDNSHandler(socketserver.BaseRequestHandler):
+    """
+    answers the A queries of the hostnames in LISTED, and NXDOMAIN
+    for the rest
+    """
+
+    def handle(self):
+        data, sock = self.request
+        query = dns.message.from_wire(data)
+        question = query.question[0]
+        hostname = question.name.to_text()
+        self.server.queries[hostname] += 1
+        time.sleep(self.server.delay)
+
+        response = dns.message.make_response(query)
+        if hostname in LISTED:
+            response.answer.append(
+                dns.rrset.from_text(hostname, 300, "IN", "A", LISTED[hostname])
+            )
+        else:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        sock.sendto(response.to_wire(), self.client_address)
+
+
+@pytest.fixture
+def stub_dns_server():
+    server = socketserver.ThreadingUDPServer(("127.0.0.1", 0), StubDNSHandler)
+    server.queries = Counter()
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def dnsbl(stub_dns_server):
+    client = DNSBLClient(
+        nameservers=["127.0.0.1"],
+        port=stub_dns_server.server_address[1],
+    )
+    yield client
+    client.stop()
+
+
+def lookup(dnsbl: DNSBLClient, hostname: str) -> Future:
+    """returns a future that is done when the callback is called"""
+    future = Future()
+    dnsbl.lookup(hostname, future.set_result)
+    return future
+
+
+@pytest.mark.parametrize(
+    "hostname, expected_records",
+    [
+        ("2.0.0.127.zen.spamhaus.org", ["127.0.0.2"]),
+        ("1.1.1.1.zen.spamhaus.org", None),
+    ],
+)
+def test_lookup(dnsbl, stub_dns_server, hostname, expected_records):
+    assert lookup(dnsbl, hostname).result(timeout=5) == expected_records
+    # positive and negative results are cached
+    assert dnsbl.get_cached(hostname) == (True, expected_records)
+    assert lookup(dnsbl, hostname).result(timeout=5) == expected_records
+    assert sum(stub_dns_server.queries.values()) == 1
+
+
+def test_concurrent_lookups_of_the_same_hostname(dnsbl, stub_dns_server):
+    stub_dns_server.delay = 0.2
+    hostname = "2.0.0.127.zen.spamhaus.org"
+    futures = [lookup(dnsbl, hostname) for _ in range(10)]
+    for future in futures:
+        assert future.result(timeout=5) == ["127.0.0.2"]
+    assert stub_dns_server.queries[f"{hostname}."] == 1
+
+
+def test_max_concurrent_queries(dnsbl, stub_dns_server):
+    stub_dns_server.delay = 0.2
+    dnsbl.max_concurrent_queries = 2
+    hostnames = [f"{i}.1.1.1.zen.spamhaus.org" for i in range(4)]
+    start = time.time()
+    futures = [lookup(dnsbl, hostname) for hostname in hostnames]
+    # lookup() doesn't wait for the queries
+    assert time.time() - start < 0.2
+    for future in futures:
+        assert future.result(timeout=5) is None
+    # 2 rounds of 2 queries
+    assert time.time() - start >= 0.4
+    assert len(stub_dns_server.queries) == 4
+
+
+def test_failed_lookups_arent_cached(stub_dns_server):
+    stub_dns_server.delay = 0.5
+    dnsbl = DNSBLClient(
+        nameservers=["127.0.0.1"],
+        port=stub_dns_server.server_address[1],
+        timeout=0.1,
+    )
+    hostname = "2.0.0.127.zen.spamhaus.org"
+    assert lookup(dnsbl, hostname).result(timeout=5) is None
+    assert dnsbl.get_cached(hostname) == (False, None)
+    dnsbl.stop()
+    # let the server reply before it's closed
+    time.sleep(stub_dns_server.delay)
+
+
+def test_cache_expiry_and_size():
+    dnsbl = DNSBLClient(cache_size=2)
+    dnsbl.cache_result("a", ["127.0.0.2"], 100)
+    dnsbl.cache_result("b", None, -1)
+    dnsbl.cache_result("c", None, 100)
+    # the least recently used is evicted
+    assert dnsbl.get_cached("a") == (False, None)
+    # expired
+    assert dnsbl.get_cached("b") == (False, None)
+    assert dnsbl.get_cached("c") == (True, None)
@@ -1,3 +1,5 @@
+import json
+
 from tests.module_factory import ModuleFactory
 import pytest
 from slips_files.common.slips_utils import utils
@@ -12,6 +14,10 @@ from slips_files.core.structures.evidence import (
     Proto,
     ThreatLevel,
     TimeWindow,
+    Victim,
+    dict_to_evidence,
+    evidence_to_dict,
+    trusted_dict_to_evidence,
 )
 
 
@@ -237,6 +243,7 @@ def test_evidence_to_dict(
     )
 
     evidence_dict = utils.to_dict(evidence)
+    assert evidence_to_dict(evidence) == evidence_dict
 
     assert isinstance(evidence_dict, dict)
     assert evidence_dict["evidence_type"] == evidence_type.name
@@ -332,3 +339,79 @@ def test_threat_level(threat_level, expected_value, expected_str):
 )
 def test_proto(proto_member, expected_value):
     assert proto_member.value == expected_value
+
+
+@pytest.mark.parametrize(
+    "attacker, victim, proto",
+    [
+        # testcase1: ip attacker and victim
+        (
+            Attacker(
+                direction=Direction.SRC,
+                attacker_type=IoCType.IP,
+                value="192.168.1.1",
+                AS={"org": "org"},
+            ),
+            Victim(
+                direction=Direction.DST,
+                victim_type=IoCType.IP,
+                value="8.8.8.8",
+                TI="feed",
+            ),
+            Proto.TCP,
+        ),
+        # testcase2: domain attacker, no victim or proto
+        (
+            Attacker(
+                direction=Direction.DST,
+                attacker_type=IoCType.DOMAIN,
+                value="example.com",
+            ),
+            None,
+            None,
+        ),
+        # testcase3: ipv6 attacker, domain victim
+        (
+            Attacker(
+                direction=Direction.SRC,
+                attacker_type=IoCType.IP,
+                value="2001:db8::1",
+            ),
+            Victim(
+                direction=Direction.DST,
+                victim_type=IoCType.DOMAIN,
+                value="example.com",
+            ),
+            Proto.UDP,
+        ),
+    ],
+)
+def test_trusted_dict_to_evidence(attacker, victim, proto):
+    evidence = Evidence(
+        evidence_type=EvidenceType.ARP_SCAN,
+        description="ARP scan detected",
+        attacker=attacker,
+        victim=victim,
+        threat_level=ThreatLevel.HIGH,
+        profile=ProfileID(ip="192.168.1.1"),
+        timewindow=TimeWindow(number=2),
+        uid=["flow1", "flow2"],
+        timestamp="2023/10/26 10:10:10.000000+0000",
+        proto=proto,
+        dst_port=80,
+        rel_id=["d243119b-2aae-4d7a-8ea1-edf3c6e72f4a"],
+        confidence=0.8,
+    )
+    evidence_dict = json.loads(json.dumps(evidence_to_dict(evidence)))
+
+    expected = dict_to_evidence(evidence_dict)
+    result = trusted_dict_to_evidence(evidence_dict)
+
+    # dict_to_evidence() removes duplicate uids using a set
+    expected.uid.sort()
+    result.uid.sort()
+    assert result == expected
+    assert vars(result.attacker) == vars(expected.attacker)
+    assert str(result.profile) == str(expected.profile)
+    assert str(result.timewindow) == str(expected.timewindow)
+    assert evidence_to_dict(result) == evidence_to_dict(expected)
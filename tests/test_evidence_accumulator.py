@@ -0,0 +1,98 @@
+"""Unit test for slips_files/core/helpers/evidence_accumulator.py"""
+
+from unittest.mock import Mock
+
+from slips_files.core.helpers.evidence_accumulator import (
+    EvidenceAccumulator,
+    TWEvidence,
+)
+from slips_files.core.structures.evidence import (
+    Attacker,
+    Evidence,
+    EvidenceType,
+    IoCType,
+    ProfileID,
+    ThreatLevel,
+    TimeWindow,
+)
+
+
+def get_evidence(evidence_id: str, ip="192.168.1.1", tw=1) -> Evidence:
+    return Evidence(
+        evidence_type=EvidenceType.ARP_SCAN,
+        description="",
+        attacker=Attacker(
+            direction="SRC",
+            attacker_type=IoCType.IP,
+            value=ip,
+        ),
+        threat_level=ThreatLevel.HIGH,
+        profile=ProfileID(ip),
+        timewindow=TimeWindow(tw),
+        uid=[],
+        timestamp="2024/10/04 15:45:30.123456+0000",
+        id=evidence_id,
+    )
+
+
+def test_tw_is_loaded_once():
+    loaded = get_evidence("1")
+    load_tw = Mock(
+        return_value=TWEvidence(evidence={"1": loaded}, alerted_ids={"0"})
+    )
+    accumulator = EvidenceAccumulator(load_tw)
+
+    accumulator.add(get_evidence("2"))
+    accumulator.add(get_evidence("0"))
+    accumulator.add(get_evidence("3"))
+
+    load_tw.assert_called_once_with("profile_192.168.1.1", "timewindow1")
+    evidence = accumulator.get_evidence("profile_192.168.1.1", "timewindow1")
+    # "0" was part of a past alert
+    assert list(evidence) == ["1", "2", "3"]
+    assert evidence["1"] is loaded
+
+
+def test_alerted_evidence_arent_part_of_the_next_alert():
+    accumulator = EvidenceAccumulator(
+        Mock(side_effect=lambda *_: TWEvidence())
+    )
+    for evidence_id in ("1", "2"):
+        accumulator.add(get_evidence(evidence_id))
+
+    accumulator.mark_as_alerted("profile_192.168.1.1", "timewindow1", ["1"])
+    # a duplicate of an alerted evidence
+    accumulator.add(get_evidence("1"))
+    accumulator.add(get_evidence("3"))
+
+    evidence = accumulator.get_evidence("profile_192.168.1.1", "timewindow1")
+    assert list(evidence) == ["2", "3"]
+
+
+def test_evicted_tw_is_loaded_again():
+    load_tw = Mock(side_effect=lambda *_: TWEvidence())
+    accumulator = EvidenceAccumulator(load_tw)
+    accumulator.add(get_evidence("1", tw=1))
+    accumulator.add(get_evidence("2", tw=2))
+
+    accumulator.evict("profile_192.168.1.1_timewindow1")
+
+    assert "profile_192.168.1.1_timewindow1" not in accumulator.tws
+    assert "profile_192.168.1.1_timewindow2" in accumulator.tws
+    accumulator.add(get_evidence("3", tw=1))
+    assert load_tw.call_count == 3
+
+
+def test_least_recently_used_tw_is_evicted():
+    accumulator = EvidenceAccumulator(
+        Mock(side_effect=lambda *_: TWEvidence()), max_tws=2
+    )
+    accumulator.add(get_evidence("1", ip="10.0.0.1"))
+    accumulator.add(get_evidence("2", ip="10.0.0.2"))
+    accumulator.add(get_evidence("3", ip="10.0.0.1"))
+    accumulator.add(get_evidence("4", ip="10.0.0.3"))
+
+    assert list(accumulator.tws) == [
+        "profile_10.0.0.1_timewindow1",
+        "profile_10.0.0.3_timewindow1",
+    ]
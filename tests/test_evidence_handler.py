@@ -1,3 +1,5 @@
+import json
+
 import pytest
 import os
 from unittest.mock import Mock, patch, call
@@ -14,6 +16,8 @@ from slips_files.core.structures.evidence import (
     Direction,
     ThreatLevel,
 )
+from slips_files.common.slips_utils import utils
+from slips_files.core.helpers.evidence_accumulator import TWEvidence
 from tests.module_factory import ModuleFactory
 from datetime import datetime
 
@@ -64,6 +68,16 @@ def test_shutdown_gracefully():
             {"alert1": '["evidence1", "evidence2"]'},
             ["evidence1", "evidence2"],
         ),
+        # testcase3: Many past alerts
+        (
+            "profile2_10.0.0.1",
+            "timewindow2",
+            {
+                "alert1": '["evidence1", "evidence2"]',
+                "alert2": '["evidence3"]',
+            },
+            ["evidence1", "evidence2", "evidence3"],
+        ),
     ],
 )
 def test_get_evidence_that_were_part_of_a_past_alert(
@@ -778,3 +792,78 @@ def test_log_alert(
     evidence_handler.add_alert_to_json_log_file.assert_called_once()
     assert flow_datetime in evidence_handler.add_to_log_file.call_args[0][0]
     assert str(twid) in evidence_handler.add_to_log_file.call_args[0][0]
+
+
+def get_tw_evidence(evidence_id: str, direction="SRC") -> Evidence:
+    return Evidence(
+        evidence_type=EvidenceType.ARP_SCAN,
+        description="",
+        attacker=Attacker(
+            direction=direction,
+            attacker_type=IoCType.IP,
+            value="192.168.1.1",
+        ),
+        threat_level=ThreatLevel.HIGH,
+        profile=ProfileID("192.168.1.1"),
+        timewindow=TimeWindow(1),
+        uid=[],
+        timestamp="2024/10/04 15:45:30.123456+0000",
+        id=evidence_id,
+    )
+
+
+def test_load_tw_evidence():
+    evidence_handler = ModuleFactory().create_evidence_handler_obj()
+    all_evidence = {
+        # part of a past alert
+        "1": get_tw_evidence("1"),
+        # done by others
+        "2": get_tw_evidence("2", direction="DST"),
+        "3": get_tw_evidence("3"),
+        # not processed yet
+        "4": get_tw_evidence("4"),
+        # whitelisted
+        "5": get_tw_evidence("5"),
+    }
+    evidence_handler.db.get_profileid_twid_alerts.return_value = {
+        "alert1": '["1"]'
+    }
+    evidence_handler.db.get_twid_evidence.return_value = {
+        evidence_id: json.dumps(utils.to_dict(evidence))
+        for evidence_id, evidence in all_evidence.items()
+    }
+    evidence_handler.db.is_evidence_processed.side_effect = (
+        lambda evidence_id: evidence_id != "4"
+    )
+    evidence_handler.db.is_whitelisted_evidence.side_effect = (
+        lambda evidence_id: evidence_id == "5"
+    )
+
+    tw = evidence_handler.load_tw_evidence(
+        "profile_192.168.1.1", "timewindow1"
+    )
+
+    assert tw.alerted_ids == {"1"}
+    assert list(tw.evidence) == ["3"]
+    assert isinstance(tw.evidence["3"], Evidence)
+
+
+def test_get_evidence_for_tw_doesnt_reload_the_tw():
+    evidence_handler = ModuleFactory().create_evidence_handler_obj()
+    evidence_handler.separator = "_"
+    evidence_handler.accumulator.separator = "_"
+    evidence_handler.load_tw_evidence = Mock(return_value=TWEvidence())
+    evidence_handler.accumulator.load_tw = evidence_handler.load_tw_evidence
+    profileid, twid = "profile_192.168.1.1", "timewindow1"
+
+    assert evidence_handler.get_evidence_for_tw(profileid, twid) is None
+    for evidence_id in ("1", "2"):
+        evidence_handler.accumulator.add(get_tw_evidence(evidence_id))
+    assert list(evidence_handler.get_evidence_for_tw(profileid, twid)) == [
+        "1",
+        "2",
+    ]
+
+    evidence_handler.accumulator.mark_as_alerted(profileid, twid, ["1", "2"])
+    assert evidence_handler.get_evidence_for_tw(profileid, twid) is None
+    evidence_handler.load_tw_evidence.assert_called_once_with(profileid, twid)
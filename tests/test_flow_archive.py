@@ -0,0 +1,160 @@
+"""Unit test for slips_files/core/helpers/flow_archive.py"""
+
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+import pyarrow as pa  # noqa: E402
+
+from slips_files.core.flows.zeek import (  # noqa: E402
+    Conn,
+    DNS,
+    Weird,
+)
+from slips_files.core.helpers.flow_archive import (  # noqa: E402
+    FlowArchive,
+    read_flows,
+    to_column_value,
+)
+
+
+def create_conn(uid: str, dport: str, sbytes: int, proto="tcp") -> Conn:
+    return Conn(
+        starttime="1726249372.312124",
+        uid=uid,
+        saddr="192.168.1.1",
+        daddr="1.1.1.1",
+        dur="1.5",
+        proto=proto,
+        appproto="",
+        sport="12345",
+        dport=dport,
+        spkts=1,
+        dpkts=1,
+        sbytes=sbytes,
+        dbytes=0,
+        smac="",
+        dmac="",
+        state="SF",
+        history="",
+    )
+
+
+def create_dns(uid: str) -> DNS:
+    return DNS(
+        starttime="1726249372.312124",
+        uid=uid,
+        saddr="192.168.1.1",
+        daddr="8.8.8.8",
+        query="example.com",
+        qclass_name="C_INTERNET",
+        qtype_name="A",
+        rcode_name="NOERROR",
+        answers="1.2.3.4",
+        TTLs="-",
+    )
+
+
+@pytest.mark.parametrize(
+    "value, arrow_type, expected",
+    [
+        ("1.5", pa.float64(), 1.5),
+        ("-", pa.float64(), None),
+        ("10", pa.int64(), 10),
+        ("not a number", pa.int64(), None),
+        ("", pa.string(), None),
+        (443, pa.string(), "443"),
+        ("1.2.3.4", pa.list_(pa.string()), ["1.2.3.4"]),
+        (["a", "b"], pa.list_(pa.string()), ["a", "b"]),
+        ("T", pa.bool_(), True),
+    ],
+)
+def test_to_column_value(value, arrow_type, expected):
+    assert to_column_value(value, arrow_type) == expected
+
+
+def test_flows_are_written_per_tw(tmp_path):
+    archive = FlowArchive(str(tmp_path))
+    archive.add(create_conn("c1", "80", 100), "profile_1", "timewindow1")
+    archive.add(create_dns("d1"), "profile_1", "timewindow1")
+    conn_dir = os.path.join(archive.archive_dir, "conn")
+    # tw1 is still buffered
+    assert not os.path.exists(conn_dir)
+
+    # a flow of a later tw flushes the earlier ones
+    archive.add(create_conn("c2", "443", 200), "profile_1", "timewindow2")
+    assert os.listdir(conn_dir) == ["timewindow1-0.parquet"]
+    assert os.listdir(os.path.join(archive.archive_dir, "dns")) == [
+        "timewindow1-0.parquet"
+    ]
+
+    # late flows of tw1 are written to a new file
+    archive.add(create_conn("c3", "443", 300), "profile_2", "timewindow1")
+    archive.close()
+    assert sorted(os.listdir(conn_dir)) == [
+        "timewindow1-0.parquet",
+        "timewindow1-1.parquet",
+        "timewindow2-0.parquet",
+    ]
+
+    flows = read_flows(archive.archive_dir, "conn")
+    assert sorted(flows["uid"]) == ["c1", "c2", "c3"]
+    assert flows["starttime"].dtype == np.float64
+    assert flows["sbytes"].dtype == np.int64
+    assert set(flows["label"]) == {"benign"}
+
+
+def test_unsupported_flows_arent_archived(tmp_path):
+    archive = FlowArchive(str(tmp_path))
+    weird = Weird(
+        starttime="1726249372.312124",
+        uid="w1",
+        saddr="192.168.1.1",
+        daddr="1.1.1.1",
+        name="bad_TCP_checksum",
+        addl="",
+    )
+    archive.add(weird, "profile_1", "timewindow1")
+    assert not archive.buffers
+
+
+def test_labels_are_read_on_flush(tmp_path):
+    archive = FlowArchive(
+        str(tmp_path), get_labels=lambda uids: {"c2": "malicious"}
+    )
+    archive.add(create_conn("c1", "80", 100), "profile_1", "timewindow1")
+    archive.add(create_conn("c2", "80", 100), "profile_1", "timewindow1")
+    archive.close()
+
+    flows = read_flows(archive.archive_dir, "conn", columns=["uid", "label"])
+    assert dict(zip(flows["uid"], flows["label"])) == {
+        "c1": "benign",
+        "c2": "malicious",
+    }
+
+
+def test_read_flows_columns_and_filters(tmp_path):
+    archive = FlowArchive(str(tmp_path))
+    archive.add(create_conn("c1", "80", 100), "profile_1", "timewindow1")
+    archive.add(create_conn("c2", "443", 200), "profile_1", "timewindow1")
+    archive.add(
+        create_conn("c3", "443", 300, proto="udp"), "profile_1", "timewindow1"
+    )
+    archive.close()
+
+    flows = read_flows(
+        archive.archive_dir,
+        "conn",
+        columns=["uid", "sbytes"],
+        filters=[("dport", "==", "443"), ("proto", "==", "tcp")],
+    )
+    assert list(flows) == ["uid", "sbytes"]
+    assert list(flows["uid"]) == ["c2"]
+    assert list(flows["sbytes"]) == [200]
+
+
+def test_read_flows_without_archived_flows(tmp_path):
+    flows = read_flows(str(tmp_path), "ssl", columns=["uid"])
+    assert len(flows["uid"]) == 0
@@ -0,0 +1,123 @@
+import bz2
+import gzip
+
+import pytest
+
+from slips_files.core.helpers import flow_files
+from slips_files.core.helpers.flow_files import (
+    DecompressingReader,
+    estimate_flows_number,
+    get_compression,
+    open_flow_file,
+    open_log_file,
+    strip_compression_extension,
+)
+
+LINES = [f"line number {i},a,b,c\n".encode() for i in range(20000)]
+
+
+def write(path, lines, compression=None):
+    if compression == "gzip":
+        with gzip.open(path, "wb") as f:
+            f.writelines(lines)
+    elif compression == "bz2":
+        with bz2.open(path, "wb") as f:
+            f.writelines(lines)
+    elif compression == "zstd":
+        data = flow_files.zstandard.ZstdCompressor().compress(b"".join(lines))
+        with open(path, "wb") as f:
+            f.write(data)
+    else:
+        with open(path, "wb") as f:
+            f.writelines(lines)
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "compression",
+    [
+        None,
+        "gzip",
+        "bz2",
+        pytest.param(
+            "zstd",
+            marks=pytest.mark.skipif(
+                flow_files.zstandard is None,
+                reason="zstandard is not installed",
+            ),
+        ),
+    ],
+)
+def test_open_flow_file(tmp_path, compression):
+    path = write(tmp_path / "flows", LINES[:10], compression)
+    assert get_compression(path) == compression
+    with open_flow_file(path) as f:
+        assert f.readlines() == [line.decode() for line in LINES[:10]]
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "bz2"])
+def test_estimate_flows_number_of_small_files_is_exact(tmp_path, compression):
+    path = write(tmp_path / "flows", LINES[:100], compression)
+    assert estimate_flows_number(path) == 100
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_estimate_flows_number_of_large_files(tmp_path, compression):
+    path = write(tmp_path / "flows", LINES, compression)
+    estimate = estimate_flows_number(path, sample_size=2**14)
+    assert abs(estimate - len(LINES)) / len(LINES) < 0.2
+
+
+def test_estimate_flows_number_of_empty_files(tmp_path):
+    path = write(tmp_path / "flows", [])
+    assert estimate_flows_number(path) == 0
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("zeek/conn.log.gz", "zeek/conn.log"),
+        ("zeek/conn.log.zst", "zeek/conn.log"),
+        ("zeek/conn.log.bz2", "zeek/conn.log"),
+        ("zeek/conn.log", "zeek/conn.log"),
+    ],
+)
+def test_strip_compression_extension(path, expected):
+    assert strip_compression_extension(path) == expected
+
+
+@pytest.mark.parametrize("compression", ["gzip", "bz2"])
+def test_decompressing_reader(tmp_path, compression):
+    path = write(tmp_path / "conn.log", LINES, compression)
+    reader = open_log_file(path)
+    assert isinstance(reader, DecompressingReader)
+    lines = [line.encode() for line in iter(reader.readline, "")]
+    # reading after the end keeps returning ""
+    assert reader.readline() == ""
+    reader.close()
+    assert lines == LINES
+    assert reader.error is None
+
+
+def test_decompressing_reader_closed_before_reading_all_lines(tmp_path):
+    path = write(tmp_path / "conn.log", LINES, "gzip")
+    reader = DecompressingReader(path, max_batches=1, batch_size=10)
+    assert reader.readline() == LINES[0].decode()
+    # the thread is waiting for a free slot in the queue,
+    # closing shouldn't wait forever
+    reader.close()
+    assert not reader.thread.is_alive()
+
+
+def test_decompressing_reader_truncated_file(tmp_path):
+    path = write(tmp_path / "conn.log", LINES, "gzip")
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[: len(data) // 2])
+
+    reader = DecompressingReader(path)
+    lines = list(iter(reader.readline, ""))
+    reader.close()
+    assert 0 < len(lines) < len(LINES)
+    assert isinstance(reader.error, EOFError)
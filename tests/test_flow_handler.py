@@ -2,7 +2,7 @@ from tests.module_factory import ModuleFactory
 import pytest
 
 from unittest.mock import Mock, call
-from slips_files.core.flows.zeek import DHCP
+from slips_files.core.flows.zeek import DHCP, Notice
 import json
 from dataclasses import asdict
 
@@ -274,12 +274,21 @@ def test_handle_software(flow):
 
 
 # testing handle_notice
-def test_handle_notice(flow):
+def test_handle_notice():
+    flow = Notice(
+        starttime="1601998398.945854",
+        saddr="192.168.1.1",
+        daddr="8.8.8.8",
+        sport="",
+        dport="",
+        note="Gateway_addr_identified: 192.168.1.1",
+        msg="Gateway_addr_identified: 192.168.1.1",
+        scanned_port="",
+        scanning_ip="",
+        dst="",
+    )
     flow_handler = ModuleFactory().create_flow_handler_obj(flow)
 
-    flow.note = "Gateway_addr_identified: 192.168.1.1"
-    flow.msg = "Gateway_addr_identified: 192.168.1.1"
-
     flow_handler.handle_notice()
 
     flow_handler.db.add_out_notice.assert_called_with(
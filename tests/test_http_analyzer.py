@@ -16,6 +16,10 @@ from unittest.mock import (
     Mock,
 )
 from modules.http_analyzer.http_analyzer import utils
+from modules.http_analyzer.user_agent_parser import (
+    UserAgentInfo,
+    parse_user_agent,
+)
 import requests
 
 # dummy params used for testing
@@ -85,12 +89,12 @@ def test_check_multiple_google_connections():
             resp_fuids="",
         )
         found_detection = http_analyzer.check_multiple_empty_connections(
-            "timewindow1", flow
+            "profile_192.168.1.5", "timewindow1", flow
         )
     assert found_detection is True
 
 
-def test_parsing_online_ua_info(mocker):
+def test_lookup_user_agent_online(mocker):
     """
     tests the parsing and processing the ua found by the online query
     """
@@ -99,33 +103,35 @@ def test_parsing_online_ua_info(mocker):
     # sure we don't already have info about it in the db
     profileid = "profile_192.168.99.99"
 
-    http_analyzer.db.get_user_agent_from_profile.return_value = None
+    http_analyzer.db.get_user_agent_from_profile.return_value = {
+        "user_agent": SAFARI_UA,
+        "os_type": "",
+        "os_name": "",
+        "browser": "",
+        "device_type": "",
+    }
     # mock the function that gets info about the given ua from an online db
     mock_requests = mocker.patch("requests.get")
     mock_requests.return_value.status_code = 200
     mock_requests.return_value.text = """{
         "agent_name":"Safari",
         "os_type":"Macintosh",
-        "os_name":"OS X"
+        "os_name":"unknown"
     }"""
 
-    # add os_type , os_name and agent_name to the db
-    ua_info = http_analyzer.get_user_agent_info(SAFARI_UA, profileid)
+    ua_info = http_analyzer.lookup_user_agent_online(profileid, SAFARI_UA)
     assert ua_info["os_type"] == "Macintosh"
+    assert ua_info["os_name"] == ""
     assert ua_info["browser"] == "Safari"
+    http_analyzer.db.add_user_agent_to_profile.assert_called_once_with(
+        profileid, json.dumps(ua_info)
+    )
 
 
 def test_get_user_agent_info(mocker):
     http_analyzer = ModuleFactory().create_http_analyzer_obj()
-    # mock the function that gets info about the
-    # given ua from an online db: get_ua_info_online()
+    # user agents are parsed offline
     mock_requests = mocker.patch("requests.get")
-    mock_requests.return_value.status_code = 200
-    mock_requests.return_value.text = """{
-        "agent_name":"Safari",
-        "os_type":"Macintosh",
-        "os_name":"OS X"
-    }"""
 
     http_analyzer.db.add_all_user_agent_to_profile.return_value = True
     http_analyzer.db.get_user_agent_from_profile.return_value = None
@@ -134,6 +140,7 @@ def test_get_user_agent_info(mocker):
         "browser": "Safari",
         "os_name": "OS X",
         "os_type": "Macintosh",
+        "device_type": "Desktop",
         "user_agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 12_3_1) AppleWebKit/605.1.15 (KHTML, like Gecko) "
         "Version/15.3 Safari/605.1.15",
     }
@@ -141,6 +148,90 @@ def test_get_user_agent_info(mocker):
         http_analyzer.get_user_agent_info(SAFARI_UA, profileid)
         == expected_ret_value
     )
+    mock_requests.assert_not_called()
+    assert http_analyzer.pending_online_ua_lookups.empty()
+
+
+@pytest.mark.parametrize(
+    "online_user_agent_lookup, expected_pending_lookups",
+    [(True, 1), (False, 0)],
+)
+def test_get_user_agent_info_unknown_ua(
+    online_user_agent_lookup, expected_pending_lookups
+):
+    http_analyzer = ModuleFactory().create_http_analyzer_obj()
+    http_analyzer.online_user_agent_lookup = online_user_agent_lookup
+    http_analyzer.db.get_user_agent_from_profile.return_value = None
+
+    ua_info = http_analyzer.get_user_agent_info("unknown agent", profileid)
+    assert ua_info["os_type"] == ua_info["browser"] == ""
+    assert (
+        http_analyzer.pending_online_ua_lookups.qsize()
+        == expected_pending_lookups
+    )
+
+
+@pytest.mark.parametrize(
+    "user_agent, expected_info",
+    [
+        (SAFARI_UA, ("Macintosh", "OS X", "Safari", "Desktop")),
+        (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 "
+            "Safari/537.36 Edg/120.0.2210.91",
+            ("Windows", "Windows 10", "Edge", "Desktop"),
+        ),
+        (
+            "Mozilla/5.0 (Linux; Android 13; SM-S901B) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 "
+            "Mobile Safari/537.36",
+            ("Linux", "Android", "Chrome", "Mobile"),
+        ),
+        (
+            "Mozilla/5.0 (iPad; CPU OS 16_0 like Mac OS X) "
+            "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 "
+            "Mobile/15E148 Safari/604.1",
+            ("iOS", "iOS", "Safari", "Tablet"),
+        ),
+        (
+            "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:109.0) "
+            "Gecko/20100101 Firefox/115.0",
+            ("Linux", "Ubuntu", "Firefox", "Desktop"),
+        ),
+        (
+            "Mozilla/4.0 (compatible; MSIE 8.0; Windows NT 6.1; "
+            "Trident/4.0)",
+            ("Windows", "Windows 7", "Internet Explorer", "Desktop"),
+        ),
+        (
+            "Mozilla/5.0 (compatible; Googlebot/2.1; "
+            "+http://www.google.com/bot.html)",
+            ("", "", "Googlebot", "Bot"),
+        ),
+        (
+            # android webview, only safari has Version/ before Safari/
+            "Mozilla/5.0 (Linux; Android 10; K; wv) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 "
+            "Mobile Safari/537.36",
+            ("Linux", "Android", "", "Mobile"),
+        ),
+        (
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+            "AppleWebKit/605.1.15 (KHTML, like Gecko)",
+            ("Macintosh", "OS X", "", "Desktop"),
+        ),
+        (
+            # android app, may be a phone or a tablet
+            "Dalvik/2.1.0 (Linux; U; Android 11; SM-G991B "
+            "Build/RP1A.200720.012)",
+            ("Linux", "Android", "", ""),
+        ),
+        ("curl/7.88.1", ("", "", "curl", "")),
+        ("unknown agent", ("", "", "", "")),
+    ],
+)
+def test_parse_user_agent(user_agent, expected_info):
+    assert parse_user_agent(user_agent) == UserAgentInfo(*expected_info)
 
 
 @pytest.mark.parametrize(
@@ -217,6 +308,22 @@ def test_extract_info_from_ua():
             "Safari/537.3",
             False,
         ),
+        (
+            # UAs of the same iphone, the parsed os name isn't in the UA
+            {"os_type": "iOS", "os_name": "iOS"},
+            "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) "
+            "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 "
+            "Mobile/15E148 Safari/604.1",
+            False,
+        ),
+        (
+            # UAs of the same chromebook
+            {"os_type": "Linux", "os_name": "Chrome OS"},
+            "Mozilla/5.0 (X11; CrOS x86_64 14541.0.0) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 "
+            "Safari/537.36",
+            False,
+        ),
         (
             # Missing cached user agent
             None,
@@ -484,7 +591,9 @@ def test_check_multiple_empty_connections(
         resp_mime_types="",
         resp_fuids="",
     )
-    result = http_analyzer.check_multiple_empty_connections(twid, flow)
+    result = http_analyzer.check_multiple_empty_connections(
+        profileid, twid, flow
+    )
     assert result is expected_result
 
     if uri == "/" and request_body_len == 0 and expected_result is False:
@@ -506,8 +615,29 @@ def test_check_multiple_empty_connections(
                 resp_mime_types="",
                 resp_fuids="",
             )
-            http_analyzer.check_multiple_empty_connections(twid, flow)
-        assert http_analyzer.connections_counter[host] == ([], 0)
+            http_analyzer.check_multiple_empty_connections(
+                profileid, twid, flow
+            )
+        connections_counter = http_analyzer.connections_counter.get(
+            profileid, twid
+        )
+        assert connections_counter[host] == ([], 0)
+
+
+def test_tw_closed_evicts_connections_counter():
+    http_analyzer = ModuleFactory().create_http_analyzer_obj()
+    http_analyzer.connections_counter.setdefault(profileid, twid, dict)[
+        "google.com"
+    ] = ([uid], 1)
+    http_analyzer.db.get_message.return_value = {
+        "type": "message",
+        "channel": "tw_closed",
+        "data": f"{profileid}_{twid}",
+    }
+
+    assert http_analyzer.get_msg("tw_closed")
+    assert (profileid, twid) not in http_analyzer.connections_counter
+    http_analyzer.db.set_state_memory_usage.assert_called_once()
 
 
 @pytest.mark.parametrize(
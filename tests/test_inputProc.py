@@ -5,6 +5,8 @@ from unittest.mock import (
     MagicMock,
     Mock,
 )
+import bz2
+import gzip
 import shutil
 import os
 import json
@@ -61,6 +63,19 @@ def test_read_zeek_folder(zeek_dir: str, is_tabs: bool):
     assert input.read_zeek_folder() is True
 
 
+def test_read_zeek_folder_sets_the_exact_total_flows():
+    zeek_dir = "dataset/test9-mixed-zeek-dir/"
+    input = ModuleFactory().create_input_obj(zeek_dir, "zeek_folder")
+    input.given_path = zeek_dir
+    input.db.is_growing_zeek_dir.return_value = False
+    input.start_observer = Mock()
+    input.read_zeek_files = Mock(return_value=25)
+
+    assert input.read_zeek_folder() is True
+    assert input.total_flows == 25
+    input.db.set_input_metadata.assert_called_with({"total_flows": 25})
+
+
 @pytest.mark.parametrize(
     "path, expected_val",
     [
@@ -89,6 +104,16 @@ def test_handle_zeek_log_file(input_information, expected_output):
     assert input.handle_zeek_log_file() == expected_output
 
 
+def test_handle_zeek_log_file_sets_the_exact_total_flows():
+    path = "dataset/test9-mixed-zeek-dir/conn.log"
+    input = ModuleFactory().create_input_obj(path, "zeek_log_file")
+    input.read_zeek_files = Mock(return_value=25)
+
+    assert input.handle_zeek_log_file() is True
+    assert input.total_flows == 25
+    input.db.set_input_metadata.assert_called_with({"total_flows": 25})
+
+
 @pytest.mark.parametrize(
     "path, is_tabs, line_cached",
     [
@@ -517,29 +542,73 @@ def test_get_file_handle_non_existing_file():
     assert file_handle is False
 
 
+def test_read_nfdump_output():
+    input_process = ModuleFactory().create_input_obj("", "nfdump")
+    input_process.give_profiler = Mock()
+    input_process.testing = False
+    nfdump_output = iter(["line1,a\n", "line2,b\n"])
+    assert input_process.read_nfdump_output(nfdump_output) == 2
+    input_process.give_profiler.assert_any_call(
+        {"type": "nfdump", "data": "line2,b"}
+    )
+
+
+def test_read_nfdump_output_empty():
+    input_process = ModuleFactory().create_input_obj("", "nfdump")
+    input_process.give_profiler = Mock()
+    assert input_process.read_nfdump_output(iter([])) == 0
+    input_process.give_profiler.assert_not_called()
+
+
+def test_handle_binetflow_compressed(tmp_path):
+    path = tmp_path / "test.binetflow.gz"
+    with open("dataset/test2-malicious.binetflow", "rb") as f:
+        lines = f.readlines()
+    with gzip.open(path, "wb") as f:
+        f.writelines(lines)
+
+    input_process = ModuleFactory().create_input_obj(str(path), "binetflow")
+    input_process.give_profiler = Mock()
+    # read the whole file
+    input_process.testing = False
+    assert input_process.handle_binetflow() is True
+    first_line = input_process.give_profiler.call_args_list[0].args[0]
+    assert first_line["data"] == lines[0].decode()
+    assert input_process.total_flows == len(lines) - 1
+
+
+def read_zeek_files(zeek_dir: str, zeek_files: list) -> list:
+    """returns the lines given to the profiler"""
+    input = ModuleFactory().create_input_obj(zeek_dir, "zeek_folder")
+    input.testing = False
+    input.is_zeek_tabs = False
+    input.bro_timeout = 0.5
+    input.should_stop = Mock(return_value=False)
+    input.give_profiler = Mock()
+    input.db.get_all_zeek_files.return_value = zeek_files
+    input.read_zeek_files()
+    return [call.args[0] for call in input.give_profiler.call_args_list]
+
+
 @pytest.mark.parametrize(
-    "data, expected_chunks",
-    [  # Testcase 1: String length is multiple of chunk size
-        (b"This is a test string.", [b"This is a", b" test str", b"ing."]),
-        # Testcase 2: String length is less than chunk size
-        (b"Hello", [b"Hello"]),
-        # Testcase 3: String length is more than chunk size
-        (
-            b"This is a longer string that exceeds the chunk size.",
-            [
-                b"This is a longer ",
-                b"string that exceed",
-                b"s the chunk size.",
-            ],
-        ),
-    ],
+    "compress, ext", [(gzip.open, "gz"), (bz2.open, "bz2")]
 )
-def test__make_gen(data, expected_chunks):
-    """
-    Test that the _make_gen function yields chunks of data from a file.
-    """
-    input_process = ModuleFactory().create_input_obj("", "zeek_log_file")
-    reader = MagicMock(side_effect=[*expected_chunks, b""])
-    gen = input_process._make_gen(reader)
-    for expected_chunk in expected_chunks:
-        assert next(gen) == expected_chunk
+def test_read_compressed_zeek_files(tmp_path, compress, ext):
+    zeek_dir = "dataset/test9-mixed-zeek-dir/"
+    log_files = ("conn.log", "dns.log")
+    compressed_files = []
+    for log_file in log_files:
+        path = str(tmp_path / f"{log_file}.{ext}")
+        with open(os.path.join(zeek_dir, log_file), "rb") as src:
+            with compress(path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        compressed_files.append(path)
+
+    expected = read_zeek_files(
+        zeek_dir, [os.path.join(zeek_dir, f) for f in log_files]
+    )
+    lines = read_zeek_files(str(tmp_path), compressed_files)
+    assert len(lines) == 816
+    assert [line["data"] for line in lines] == [
+        line["data"] for line in expected
+    ]
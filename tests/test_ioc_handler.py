@@ -259,3 +259,20 @@ def test_set_feed_last_update_time(mocker, file, time, expected_data):
     ioc_handler.rcache.hset.assert_called_with(
         "TI_files_info", file, expected_data_json
     )
+
+
+def test_add_ips_to_ioc_in_chunks(mocker):
+    mocker.patch(
+        "slips_files.core.database.redis_db.ioc_handler.IOC_WRITE_CHUNK_SIZE",
+        2,
+    )
+    ioc_handler = ModuleFactory().create_ioc_handler_obj()
+    pipe = ioc_handler.rcache.pipeline.return_value
+    ips = {f"1.1.1.{i}": "{}" for i in range(5)}
+
+    ioc_handler.add_ips_to_IoC(ips)
+
+    chunks = [c.kwargs["mapping"] for c in pipe.hset.call_args_list]
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert {ip: info for chunk in chunks for ip, info in chunk.items()} == ips
+    pipe.execute.assert_called_once()
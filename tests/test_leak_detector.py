@@ -1,7 +1,8 @@
 """Unit test for modules/leak_detector/leak_detector.py"""
 
+from modules.leak_detector.yara_scanner import YaraScanner
 from tests.module_factory import ModuleFactory
-from unittest import mock
+import os
 import pytest
 from unittest.mock import patch, mock_open
 import json
@@ -9,34 +10,22 @@ from unittest.mock import MagicMock
 
 
 @pytest.mark.parametrize(
-    "return_code, expected_result",
-    [  # Testcase1: Yara is installed
-        (0, True),
-        # Testcase2: Yara is not installed
-        (1, False),
-        # Testcase3: Yara returns an unexpected return code
-        (32512, False),
+    "yara_python_installed, expected_result",
+    [  # Testcase1: yara-python is installed
+        (True, True),
+        # Testcase2: yara-python is not installed
+        (False, False),
     ],
 )
-@patch("os.system")
-def test_is_yara_installed(
-    mock_os_system, mock_db, return_code, expected_result
-):
+def test_is_yara_installed(mock_db, yara_python_installed, expected_result):
     """Test that the is_yara_installed method correctly identifies
-    if Yara is installed."""
-
-    mock_os_system.return_value = return_code
-    leak_detector = ModuleFactory().create_leak_detector_obj()
-    assert leak_detector.is_yara_installed() == expected_result
-
-
-@patch("os.mkdir")
-@patch("shutil.rmtree")
-def test_delete_compiled_rules(mock_rmtree, mock_mkdir, mock_db):
+    if yara-python is installed."""
     leak_detector = ModuleFactory().create_leak_detector_obj()
-    leak_detector.delete_compiled_rules()
-    mock_rmtree.assert_called_once_with(leak_detector.compiled_yara_rules_path)
-    mock_mkdir.assert_called_once_with(leak_detector.compiled_yara_rules_path)
+    with patch(
+        "modules.leak_detector.yara_scanner.yara",
+        MagicMock() if yara_python_installed else None,
+    ):
+        assert leak_detector.is_yara_installed() == expected_result
 
 
 @pytest.mark.parametrize(
@@ -47,10 +36,9 @@ def test_delete_compiled_rules(mock_rmtree, mock_mkdir, mock_db):
         # Testcase2:yara installed, compile success
         (True, True, None, 1),
         # Testcase3: yara installed, compile fails
-        (True, False, None, 0),
+        (True, False, 1, 0),
     ],
 )
-@patch("subprocess.Popen")
 def test_pre_main(
     mock_db,
     yara_installed,
@@ -70,10 +58,26 @@ def test_pre_main(
     assert leak_detector.find_matches.call_count == expected_find_matches_call
 
 
-def test_main(mock_db):
+@pytest.mark.parametrize(
+    "has_unscanned_data, expected_find_matches_call",
+    [
+        # Testcase1: new data was written to the pcap
+        (True, 1),
+        # Testcase2: nothing new in the pcap
+        (False, 0),
+    ],
+)
+@patch("time.sleep")
+def test_main(
+    mock_sleep, mock_db, has_unscanned_data, expected_find_matches_call
+):
     leak_detector = ModuleFactory().create_leak_detector_obj()
-    result = leak_detector.main()
-    assert result == 1
+    leak_detector.scanner.has_unscanned_data = MagicMock(
+        return_value=has_unscanned_data
+    )
+    leak_detector.find_matches = MagicMock()
+    leak_detector.main()
+    assert leak_detector.find_matches.call_count == expected_find_matches_call
 
 
 @pytest.mark.parametrize(
@@ -122,56 +126,141 @@ def test_fix_json_packet(
 
 
 @pytest.mark.parametrize(
-    "listdir_return, popen_communicate_return, " "evidence_set_call_count",
+    "matches, scan_error, evidence_set_call_count",
     [
         (
             # Test case 1: Matches found, evidence set
-            ["test_rule_compiled"],
-            (b"test_rule\n0x4e15c:$rgx_gps_loc: 37.7749,-122.4194", None),
-            True,
+            [
+                {
+                    "rule": "test_rule",
+                    "vars_matched": "rgx_gps_loc",
+                    "strings_matched": "ll=37.7749,-122.4194",
+                    "offset": 319836,
+                }
+            ],
+            None,
+            1,
         ),
         (
             # Test case 2: No matches found, no evidence set
-            ["test_rule_compiled"],
-            (b"", None),
-            False,
+            [],
+            None,
+            0,
         ),
         (
-            # Test case 3: Error during YARA execution, no action taken
-            ["test_rule_compiled"],
-            (b"", b"Error during YARA execution"),
-            False,
+            # Test case 3: Error during YARA scanning, no action taken
+            [],
+            Exception("Error during YARA scanning"),
+            0,
         ),
     ],
 )
-@mock.patch("subprocess.Popen")
-@mock.patch("os.listdir")
 def test_find_matches(
-    mock_listdir,
-    mock_popen,
-    listdir_return,
-    popen_communicate_return,
+    matches,
+    scan_error,
     evidence_set_call_count,
     mock_db,
 ):
     """Tests the find_matches method of LeakDetector."""
-
     leak_detector = ModuleFactory().create_leak_detector_obj()
-
-    mock_listdir.return_value = listdir_return
-    mock_popen.return_value.communicate.return_value = popen_communicate_return
+    leak_detector.scanner.scan = MagicMock(
+        return_value=iter(matches), side_effect=scan_error
+    )
     leak_detector.set_evidence_yara_match = MagicMock()
-    leak_detector.delete_compiled_rules = MagicMock()
 
     leak_detector.find_matches()
 
-    mock_popen.assert_called_once()
+    leak_detector.scanner.scan.assert_called_once_with(leak_detector.pcap)
     assert (
         leak_detector.set_evidence_yara_match.call_count
         == evidence_set_call_count
     )
 
 
+def write_test_rule(rules_dir):
+    rules_dir.mkdir()
+    (rules_dir / "test_rule.yara").write_text(
+        "rule test_rule { "
+        "strings: $rgx_gps_loc = /ll=\\d{2}\\.\\d{4},-\\d{3}\\.\\d{4}/ "
+        "condition: $rgx_gps_loc }"
+    )
+
+
+@pytest.mark.parametrize(
+    "match_offset",
+    [
+        # Testcase1: match in the middle of the first chunk
+        100,
+        # Testcase2: match crossing the boundary between 2 chunks
+        1020,
+        # Testcase3: match inside the overlap between 2 chunks
+        970,
+        # Testcase4: match in the last chunk
+        2500,
+    ],
+)
+def test_yara_scanner_scan(tmp_path, match_offset):
+    """Tests that the chunked scan reports every match once with the
+    offset of the match in the whole pcap"""
+    write_test_rule(tmp_path / "rules")
+    leaked = b"ll=37.7749,-122.4194"
+    data = bytearray(b"\x00" * 3000)
+    data[match_offset : match_offset + len(leaked)] = leaked
+    pcap = tmp_path / "test.pcap"
+    pcap.write_bytes(bytes(data))
+
+    scanner = YaraScanner(
+        str(tmp_path / "rules"),
+        str(tmp_path / "compiled"),
+        chunk_size=1024,
+        overlap=64,
+    )
+    scanner.compile()
+    matches = list(scanner.scan(str(pcap)))
+
+    assert matches == [
+        {
+            "rule": "test_rule",
+            "vars_matched": "rgx_gps_loc",
+            "strings_matched": leaked.decode(),
+            "offset": match_offset,
+        }
+    ]
+
+
+def test_yara_scanner_scan_growing_pcap(tmp_path):
+    """Tests that only the data appended since the last scan is scanned"""
+    write_test_rule(tmp_path / "rules")
+    leaked = b"ll=37.7749,-122.4194"
+    pcap = tmp_path / "test.pcap"
+    pcap.write_bytes(b"\x00" * 500 + leaked)
+
+    scanner = YaraScanner(
+        str(tmp_path / "rules"),
+        str(tmp_path / "compiled"),
+        chunk_size=1024,
+        overlap=64,
+    )
+    scanner.compile()
+    assert [match["offset"] for match in scanner.scan(str(pcap))] == [500]
+    assert not scanner.has_unscanned_data(str(pcap))
+
+    with open(pcap, "ab") as f:
+        f.write(b"\x00" * 100 + leaked)
+
+    assert scanner.has_unscanned_data(str(pcap))
+    assert [match["offset"] for match in scanner.scan(str(pcap))] == [620]
+    assert list(scanner.scan(str(pcap))) == []
+
+
+def test_yara_scanner_compile_saves_ruleset(tmp_path):
+    write_test_rule(tmp_path / "rules")
+    scanner = YaraScanner(str(tmp_path / "rules"), str(tmp_path / "compiled"))
+    scanner.compile()
+    assert os.path.exists(scanner.compiled_ruleset_path)
+    assert not scanner.is_compiled_ruleset_outdated(scanner.get_rule_files())
+
+
 @pytest.mark.parametrize(
     "pcap_data, offset, tshark_output, expected_result",
     [
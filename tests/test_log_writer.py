@@ -0,0 +1,66 @@
+"""Unit test for slips_files/core/helpers/log_writer.py"""
+
+import os
+from multiprocessing import Process
+
+from slips_files.core.helpers.log_writer import LogWriter
+
+
+def write_lines(log_writer: LogWriter, path: str, sender: str, n: int):
+    for i in range(n):
+        log_writer.write(path, f"{sender} {i}\n")
+
+
+def test_lines_are_written_on_shutdown(tmp_path):
+    logfile = str(tmp_path / "slips.log")
+    errors_logfile = str(tmp_path / "errors.log")
+    log_writer = LogWriter(flush_interval=60)
+    log_writer.start()
+    log_writer.write(logfile, "line 1\n")
+    log_writer.write(errors_logfile, "error 1\n")
+    log_writer.write(logfile, "line 2\n")
+    log_writer.shutdown_gracefully()
+
+    with open(logfile) as f:
+        assert f.read() == "line 1\nline 2\n"
+    with open(errors_logfile) as f:
+        assert f.read() == "error 1\n"
+    assert not log_writer.is_running()
+
+
+def test_order_per_sender_is_preserved(tmp_path):
+    logfile = str(tmp_path / "slips.log")
+    log_writer = LogWriter()
+    log_writer.start()
+    senders = [
+        Process(target=write_lines, args=(log_writer, logfile, sender, 200))
+        for sender in ("A", "B")
+    ]
+    for sender in senders:
+        sender.start()
+    write_lines(log_writer, logfile, "main", 200)
+    for sender in senders:
+        sender.join()
+    log_writer.shutdown_gracefully()
+
+    with open(logfile) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 600
+    for sender in ("A", "B", "main"):
+        numbers = [
+            int(line.split()[1])
+            for line in lines
+            if line.startswith(f"{sender} ")
+        ]
+        assert numbers == list(range(200))
+
+
+def test_shutdown_in_another_process_does_nothing(tmp_path):
+    log_writer = LogWriter()
+    log_writer.start()
+    log_writer.pid = os.getpid() + 1
+    log_writer.shutdown_gracefully()
+    assert log_writer.thread.is_alive()
+    log_writer.pid = os.getpid()
+    log_writer.shutdown_gracefully()
+    assert not log_writer.thread.is_alive()
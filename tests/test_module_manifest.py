@@ -0,0 +1,119 @@
+"""Unit test for managers/module_manifest.py"""
+
+import importlib
+import os
+from unittest.mock import (
+    Mock,
+    patch,
+)
+
+import pytest
+
+from managers.module_manifest import (
+    LazyModule,
+    ModuleManifest,
+    get_manifests,
+    read_manifest,
+)
+from tests.module_factory import ModuleFactory
+
+MANIFESTS = get_manifests("modules")
+
+
+def test_all_modules_have_a_manifest():
+    module_dirs = [
+        dir_name
+        for dir_name in os.listdir("modules")
+        if os.path.isfile(os.path.join("modules", dir_name, f"{dir_name}.py"))
+    ]
+    assert sorted(MANIFESTS) == sorted(module_dirs)
+
+
+@pytest.mark.parametrize("dir_name", sorted(MANIFESTS))
+def test_manifest_matches_the_module(dir_name):
+    manifest: ModuleManifest = MANIFESTS[dir_name]
+    assert manifest.module == f"modules.{dir_name}.{dir_name}"
+    try:
+        module_class = manifest.load_class()
+    except ImportError as e:
+        pytest.skip(f"{manifest.module} dependencies aren't installed: {e}")
+
+    assert module_class.name == manifest.name
+    assert module_class.description == manifest.description
+
+
+def test_read_manifest(tmp_path):
+    path = tmp_path / "manifest.yaml"
+    path.write_text(
+        "name: Test\n"
+        "description: Test module\n"
+        "module: modules.test.test\n"
+        "class: Test\n"
+        "channels:\n"
+        "  - new_ip\n"
+    )
+    assert read_manifest(str(path)) == ModuleManifest(
+        name="Test",
+        description="Test module",
+        module="modules.test.test",
+        class_name="Test",
+        channels=["new_ip"],
+        heavy_dependencies=[],
+    )
+
+
+def test_disabled_modules_are_never_imported():
+    proc_manager = ModuleFactory().create_process_manager_obj()
+    proc_manager.modules_to_ignore = list(MANIFESTS)
+    with patch(
+        "importlib.import_module", wraps=importlib.import_module
+    ) as import_module:
+        plugins, failed_to_load_modules = proc_manager.get_modules()
+
+    assert plugins == {}
+    assert failed_to_load_modules == 0
+    for call in import_module.call_args_list:
+        assert call.args[0] not in {m.module for m in MANIFESTS.values()}
+
+
+def test_enabled_modules_are_loaded_lazily():
+    proc_manager = ModuleFactory().create_process_manager_obj()
+    proc_manager.modules_to_ignore = ["template"]
+    with patch("importlib.import_module") as import_module:
+        plugins, _ = proc_manager.get_modules()
+
+    import_module.assert_not_called()
+    assert "Template" not in plugins
+    # blocking is always started first
+    assert list(plugins)[0] == "Blocking"
+    flowalerts = plugins["Flow Alerts"]
+    assert flowalerts["description"] == MANIFESTS["flowalerts"].description
+    module = flowalerts["obj"](Mock(), "output", 6379, Mock())
+    assert isinstance(module, LazyModule)
+    assert module.name == "Flow Alerts"
+
+
+def test_lazy_module_run():
+    module_class = Mock()
+    manifest = Mock(spec=ModuleManifest)
+    manifest.name = "Test"
+    manifest.load_class.return_value = module_class
+    lazy_module = LazyModule(manifest, "logger", "output", 6379, "event")
+
+    lazy_module.run()
+
+    module_class.assert_called_once_with("logger", "output", 6379, "event")
+    module_class.return_value.run.assert_called_once()
+    assert lazy_module.ready.is_set()
+
+
+def test_lazy_module_fails_to_import():
+    manifest = Mock(spec=ModuleManifest)
+    manifest.name = "Test"
+    manifest.module = "modules.test.test"
+    manifest.load_class.side_effect = ImportError("no module named test")
+    lazy_module = LazyModule(manifest)
+
+    lazy_module.run()
+
+    assert not lazy_module.ready.is_set()
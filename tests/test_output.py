@@ -2,6 +2,7 @@ from unittest.mock import MagicMock, mock_open, patch, call as mockedcall
 import pytest
 from tests.module_factory import ModuleFactory
 from pathlib import Path
+from datetime import datetime
 
 
 @pytest.mark.parametrize(
@@ -24,13 +25,11 @@ from pathlib import Path
         ),
     ],
 )
-@patch("slips_files.common.slips_utils.Utils.convert_format")
-def test_log_line(mock_convert_format, msg, expected_log_content):
+def test_log_line(msg, expected_log_content):
     """Test that the log_line method logs the correct message
     to the slips.log file."""
-    mock_convert_format.return_value = "formatted_datetime"
-
     output = ModuleFactory().create_output_obj()
+    output.get_log_timestamp = MagicMock(return_value="formatted_datetime")
     output.slips_logfile = "path/to/slips.log"
 
     with patch("builtins.open", mock_open()) as mock_file:
@@ -41,6 +40,51 @@ def test_log_line(mock_convert_format, msg, expected_log_content):
         handle.write.assert_called_once_with(expected_log_content)
 
 
+def test_log_line_using_log_writer():
+    output = ModuleFactory().create_output_obj()
+    output.get_log_timestamp = MagicMock(return_value="formatted_datetime")
+    output.slips_logfile = "path/to/slips.log"
+    output.log_writer = MagicMock()
+    output.log_writer.is_running.return_value = True
+
+    with patch("builtins.open", mock_open()) as mock_file:
+        output.log_line({"from": "sender", "txt": "message_text"})
+        mock_file.assert_not_called()
+
+    output.log_writer.write.assert_called_once_with(
+        "path/to/slips.log", "formatted_datetime [sender] message_text\n"
+    )
+
+
+def test_log_error():
+    output = ModuleFactory().create_output_obj()
+    output.get_log_timestamp = MagicMock(return_value="formatted_datetime")
+    output.errors_logfile = "path/to/errors.log"
+
+    with patch("builtins.open", mock_open()) as mock_file:
+        output.log_error({"from": "sender", "txt": "error"})
+
+        mock_file.assert_called_once_with("path/to/errors.log", "a")
+        mock_file().write.assert_called_once_with(
+            "formatted_datetime [sender] error\n"
+        )
+
+
+@patch("slips_files.core.output.time.time")
+def test_get_log_timestamp(mock_time):
+    output = ModuleFactory().create_output_obj()
+    ts = 1680788096.123456
+    mock_time.return_value = ts
+    expected = datetime.fromtimestamp(ts).strftime("%Y/%m/%d %H:%M:%S.%f")
+    assert output.get_log_timestamp() == expected
+    # same second, the cached date should be reused
+    mock_time.return_value = ts + 0.5
+    expected = datetime.fromtimestamp(ts + 0.5).strftime(
+        "%Y/%m/%d %H:%M:%S.%f"
+    )
+    assert output.get_log_timestamp() == expected
+
+
 def test_print():
     output = ModuleFactory().create_output_obj()
     sender = "SenderName"
@@ -0,0 +1,97 @@
+"""Unit test for slips_files/common/printer.py"""
+
+from unittest.mock import MagicMock, Mock
+import pytest
+
+from slips_files.common.printer import Printer
+
+
+def create_printer(verbose=1, debug=0):
+    logger = MagicMock()
+    logger.verbose = verbose
+    logger.debug = debug
+    return Printer(logger, "Test")
+
+
+@pytest.mark.parametrize(
+    "max_verbose, max_debug, verbose, debug, expected_result",
+    [
+        # Testcase1: default verbosity, basic msg
+        (1, 0, 1, 0, True),
+        # Testcase2: default verbosity, verbose 3 msg
+        (1, 0, 3, 0, False),
+        # Testcase3: high verbosity
+        (3, 0, 3, 0, True),
+        # Testcase4: levels higher than 3 are never printed
+        (3, 0, 6, 0, False),
+        # Testcase5: errors are always logged to errors.log
+        (1, 0, 0, 1, True),
+        # Testcase6: debug level isn't enough
+        (1, 1, 0, 2, False),
+        # Testcase7: debug level is enough
+        (1, 2, 0, 2, True),
+        # Testcase8: verbose 0 is never printed
+        (3, 0, 0, 0, False),
+    ],
+)
+def test_is_enabled(max_verbose, max_debug, verbose, debug, expected_result):
+    printer = create_printer(max_verbose, max_debug)
+    assert printer.is_enabled(verbose, debug) is expected_result
+
+
+def test_thresholds_are_cached():
+    printer = create_printer(1, 0)
+    assert printer.get_thresholds() == (1, 0)
+    printer.logger.verbose = 3
+    assert printer.get_thresholds() == (1, 0)
+
+
+def test_thresholds_of_a_logger_without_levels():
+    printer = Printer(Mock(), "Test")
+    assert printer.get_thresholds() == (3, 3)
+
+
+@pytest.mark.parametrize(
+    "verbose, log_to_logfiles_only, expected_update_calls",
+    [
+        # Testcase1: enough verbosity
+        (1, False, 1),
+        # Testcase2: not enough verbosity, the msg is discarded
+        (3, False, 0),
+        # Testcase3: logfile only msgs are always passed to the logger
+        (3, True, 1),
+    ],
+)
+def test_print(verbose, log_to_logfiles_only, expected_update_calls):
+    printer = create_printer(1, 0)
+    printer.print(
+        "text", verbose, 0, log_to_logfiles_only=log_to_logfiles_only
+    )
+    assert printer.logger.update.call_count == expected_update_calls
+
+
+@pytest.mark.parametrize(
+    "text, args, expected_txt",
+    [
+        # Testcase1: %-style args
+        ("Received line: %s %d", ("line", 5), "Received line: line 5"),
+        # Testcase2: callable
+        (lambda: "Prev data: {}", (), "Prev data: {}"),
+        # Testcase3: plain str
+        ("done", (), "done"),
+    ],
+)
+def test_lazy_print_formats_enabled_msgs(text, args, expected_txt):
+    printer = create_printer(3, 0)
+    printer.lazy_print(text, *args, verbose=3)
+    msg = printer.logger.update.call_args[0][0]
+    assert msg["txt"] == expected_txt
+    assert msg["verbose"] == 3
+
+
+def test_lazy_print_doesnt_format_disabled_msgs():
+    printer = create_printer(1, 0)
+    text = Mock(return_value="text")
+    printer.lazy_print(text, verbose=3)
+    text.assert_not_called()
+    printer.logger.update.assert_not_called()
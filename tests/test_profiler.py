@@ -495,6 +495,32 @@ def test_add_flow_to_profile_unsupported_flow():
     assert result is False
 
 
+@patch("slips_files.core.profiler.FlowHandler")
+def test_add_flow_to_profile_archives_the_flow_with_its_label(
+    mock_flow_handler,
+):
+    profiler = ModuleFactory().create_profiler_obj()
+    profiler.label = "malicious"
+    profiler.analysis_direction = "out"
+    profiler.flow = Mock(
+        saddr="192.168.1.1", daddr="8.8.8.8", starttime="1601998398.945854"
+    )
+    profiler.flow.type_ = "conn"
+    profiler.whitelist = Mock()
+    profiler.whitelist.is_whitelisted_flow.return_value = False
+    profiler.db.get_timewindow.return_value = "timewindow1"
+    profiler.db.is_cyst_enabled.return_value = False
+    profiler.flow_archive = Mock()
+
+    assert profiler.add_flow_to_profile() is True
+    profiler.flow_archive.add.assert_called_once_with(
+        profiler.flow,
+        "profile_192.168.1.1",
+        "timewindow1",
+        label="malicious",
+    )
+
+
 @patch("slips_files.core.profiler.FlowHandler")
 def test_store_features_going_out(
     mock_flow_handler,
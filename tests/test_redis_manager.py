@@ -50,13 +50,15 @@ def test_log_redis_server_pid_normal_ports(
     redis_manager.main.args.daemon = is_daemon
     redis_manager.main.args.save = save_db
     redis_manager.remove_old_logline = Mock()
-    slips_files.common.slips_utils.utils.convert_format = Mock(
-        return_value="Date"
-    )
 
     with (
         patch("builtins.open", mock_open()) as mock_file,
         patch("os.getpid", return_value="os_pid"),
+        patch.object(
+            slips_files.common.slips_utils.utils,
+            "convert_format",
+            return_value="Date",
+        ),
     ):
         redis_manager.log_redis_server_pid(redis_port, redis_pid)
         mock_file().write.assert_called_with(expected_output)
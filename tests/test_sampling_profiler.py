@@ -0,0 +1,138 @@
+"""Unit test for slips_files/common/performance_profilers/sampling_profiler.py"""
+
+import json
+import os
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from slips_files.common.performance_profilers.sampling_profiler import (
+    SamplingProfiler,
+)
+from tests.module_factory import ModuleFactory
+
+
+def burn_cpu(seconds: float):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        sum(range(1000))
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = SamplingProfiler("Test Process", str(tmp_path), interval=0.001)
+    profiler.install()
+    yield profiler
+    profiler.stop()
+
+
+def test_sampling(profiler, tmp_path):
+    profiler.start()
+    burn_cpu(0.3)
+    profiler.stop()
+
+    stacks = profiler.get_stacks()
+    assert stacks
+    assert all(stack[0] == "Test Process" for stack in stacks)
+    assert any("burn_cpu" in frame for stack in stacks for frame in stack)
+
+    # the stacks are written when the profiler stops
+    cpu_profile_dir = os.path.join(tmp_path, "cpu_profile")
+    with open(os.path.join(cpu_profile_dir, "Test_Process.collapsed")) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == len(stacks)
+    stack, samples = lines[0].rsplit(" ", 1)
+    assert stack.startswith("Test Process;")
+    assert int(samples) > 0
+
+    with open(
+        os.path.join(cpu_profile_dir, "Test_Process.speedscope.json")
+    ) as f:
+        speedscope = json.load(f)
+    profile = speedscope["profiles"][0]
+    assert profile["type"] == "sampled"
+    assert sum(profile["weights"]) == sum(stacks.values())
+    assert len(profile["samples"]) == len(stacks)
+
+
+def test_not_sampling_when_stopped(profiler):
+    profiler.start()
+    profiler.stop()
+    samples = sum(profiler.get_stacks().values())
+    burn_cpu(0.1)
+    assert sum(profiler.get_stacks().values()) == samples
+
+
+def test_overhead_is_bounded(profiler):
+    # every sample takes more than 2% of the interval
+    profiler.max_overhead = 0
+    profiler.overhead_check_samples = 1
+    profiler.start()
+    burn_cpu(0.1)
+    assert profiler.interval > 0.001
+
+
+@pytest.mark.parametrize(
+    "msg, expected_action",
+    [
+        ('{"process": "ARP", "action": "start"}', "start"),
+        ('{"process": "arp", "action": "stop"}', "stop"),
+        ('{"process": "all", "action": "start"}', "start"),
+        # not for this module
+        ('{"process": "Flow Alerts", "action": "start"}', None),
+        # invalid msgs
+        ('{"process": "ARP"}', None),
+        ("start", None),
+    ],
+)
+def test_handle_sampling_profiler_msg(msg, expected_action):
+    arp = ModuleFactory().create_arp_obj()
+    arp.sampling_profiler = Mock()
+    arp.handle_sampling_profiler_msg(msg)
+    for action in ("start", "stop"):
+        method = getattr(arp.sampling_profiler, action)
+        assert method.called == (action == expected_action)
+
+
+@pytest.mark.parametrize(
+    "processes, runtime_control, expected_thread, expected_running",
+    [
+        # not profiled and can't be asked to
+        ([], False, False, False),
+        (["Flow Alerts"], False, False, False),
+        # can be started at runtime
+        ([], True, True, False),
+        (["ARP"], False, True, True),
+        (["all"], True, True, True),
+    ],
+)
+def test_init_sampling_profiler(
+    mocker,
+    tmp_path,
+    processes,
+    runtime_control,
+    expected_thread,
+    expected_running,
+):
+    arp = ModuleFactory().create_arp_obj()
+    arp.output_dir = str(tmp_path)
+    conf = mocker.patch("slips_files.common.abstracts.module.ConfigParser")
+    conf.return_value.sampling_profiler_processes.return_value = processes
+    conf.return_value.sampling_profiler_runtime_control.return_value = (
+        runtime_control
+    )
+    conf.return_value.sampling_profiler_interval.return_value = 0.01
+    thread = mocker.patch(
+        "slips_files.common.abstracts.module.threading.Thread"
+    )
+
+    arp.init_sampling_profiler()
+
+    assert thread.called == expected_thread
+    if not expected_thread:
+        assert arp.sampling_profiler is None
+        return
+    assert thread.call_args.kwargs["args"][1] == runtime_control
+    assert arp.sampling_profiler.is_running == expected_running
+    arp.sampling_profiler.stop()
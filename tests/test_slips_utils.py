@@ -79,6 +79,29 @@ def test_detect_data_type(data, expected_type):
     assert utils.detect_ioc_type(data) == expected_type
 
 
+def test_detect_ioc_types():
+    utils = ModuleFactory().create_utils_obj()
+    iocs = [
+        "192.168.1.100",
+        "01.2.3.4",
+        "2001:db8::1",
+        "192.168.0.0/16",
+        "1.2.3.4/24",
+        "example.com",
+        "sub_domain.example.co.uk",
+        "ASUS.com",
+        "AS12345",
+        "foo.notatld",
+        "e10adc3949ba59abbe56e057f20f883e",
+        "http://example.com/some/path",
+        "999.999.999.999",
+        "example.com",
+    ]
+    assert utils.detect_ioc_types(iocs) == [
+        utils.detect_ioc_type(ioc) for ioc in iocs
+    ]
+
+
 @pytest.mark.parametrize(
     "ip_address, expected_first_octet",
     [
@@ -625,6 +648,96 @@ def test_define_time_format(time, expected_format):
     assert utils.get_time_format(time) == expected_format
 
 
+def get_time_format_before_memoization(utils, time):
+    """
+    how utils.get_time_format() detected formats before it memoized
+    them, used to make sure both give the same results
+    """
+    if isinstance(time, datetime.datetime):
+        return "datetimeobj"
+    try:
+        datetime.datetime.fromtimestamp(float(time))
+        return "unixtimestamp"
+    except ValueError:
+        pass
+    for time_format in utils.time_formats:
+        try:
+            datetime.datetime.strptime(time, time_format)
+            return time_format
+        except ValueError:
+            pass
+    return False
+
+
+def get_timestamps_in_all_formats():
+    utils = ModuleFactory().create_utils_obj()
+    dates = (
+        datetime.datetime(
+            2023, 4, 6, 12, 34, 56, 789000, tzinfo=datetime.timezone.utc
+        ),
+        datetime.datetime(
+            2024,
+            12,
+            31,
+            23,
+            59,
+            1,
+            123456,
+            tzinfo=datetime.timezone(datetime.timedelta(hours=-5)),
+        ),
+        datetime.datetime(2023, 1, 2, 3, 4, 5, 6),
+    )
+    timestamps = []
+    for time_format in utils.time_formats:
+        for date in dates:
+            if "%z" in time_format and not date.tzinfo:
+                continue
+            timestamps.append(date.strftime(time_format))
+    # isoformat() uses +00:00 instead of +0000 and omits
+    # the microseconds when they're 0
+    timestamps += [
+        "2023-04-06T12:34:56.789+00:00",
+        "2023-04-06 12:34:56+00:00",
+        "2023-04-06T12:34:56",
+        "2023-04-06 12:34:56.1",
+        "2023-04-06T12:34:56.789Z",
+        "2023-13-06 12:34:56",
+        "1680788096.789",
+        "invalid time",
+    ]
+    return timestamps
+
+
+@pytest.mark.parametrize("ts", get_timestamps_in_all_formats())
+def test_memoized_time_format_matches_detection(ts):
+    utils = ModuleFactory().create_utils_obj()
+    expected_format = get_time_format_before_memoization(utils, ts)
+    # the second call uses the memoized format
+    for _ in range(2):
+        assert utils.get_time_format(ts) == expected_format
+        if not expected_format:
+            with pytest.raises(ValueError):
+                utils.convert_to_datetime(ts)
+            continue
+
+        expected_datetime = (
+            datetime.datetime.fromtimestamp(float(ts))
+            if expected_format == "unixtimestamp"
+            else datetime.datetime.strptime(ts, expected_format)
+        )
+        result = utils.convert_to_datetime(ts)
+        assert result == expected_datetime
+        assert result.utcoffset() == expected_datetime.utcoffset()
+
+
+def test_memoized_time_format_with_an_invalid_date():
+    """a ts with the same shape as a memoized one that doesn't parse
+    shouldn't be given the memoized format"""
+    utils = ModuleFactory().create_utils_obj()
+    assert utils.get_time_format("2023/04/06 12:34:56") == "%Y/%m/%d %H:%M:%S"
+    assert utils.get_time_format("2023/13/06 12:34:56") is False
+
+
 @pytest.mark.parametrize(
     "ip_address, expected_result",
     [  # testcase1: Localhost IPv4 should be ignored
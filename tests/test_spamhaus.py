@@ -1,17 +1,18 @@
 """Unit test for modules/threat_intelligence/spamhaus.py"""
 
 from tests.module_factory import ModuleFactory
-from unittest.mock import MagicMock, patch
+from unittest.mock import Mock, patch
 import pytest
 
 
 @pytest.mark.parametrize(
-    "ip, dns_query_result, expected",
+    "ip, cached_result, expected",
     [
-        ("1.1.1.1", [], False),  # Case where the IP is not listed
+        # the IP is not listed
+        ("1.1.1.1", (True, None), False),
         (
             "2.2.2.2",
-            ["127.0.0.2"],
+            (True, ["127.0.0.2"]),
             {  # IP is listed
                 "source": "some_list spamhaus",
                 "description": "This is a spam list",
@@ -19,9 +20,10 @@ import pytest
                 "tags": "spam",
             },
         ),
+        # the IP wasn't looked up yet
+        ("3.3.3.3", (False, None), False),
     ],
 )
-@patch("modules.threat_intelligence.spamhaus.Spamhaus._perform_dns_query")
 @patch("modules.threat_intelligence.spamhaus.Spamhaus._get_list_names")
 @patch("modules.threat_intelligence.spamhaus.Spamhaus._get_list_descriptions")
 @patch("modules.threat_intelligence.spamhaus.Spamhaus._get_dataset_info")
@@ -29,15 +31,10 @@ def test_query(
     mock_get_dataset_info,
     mock_get_list_descriptions,
     mock_get_list_names,
-    mock_perform_dns_query,
     ip,
-    dns_query_result,
+    cached_result,
     expected,
 ):
-    # Mocking the dns_query_result to return an object with a `to_text()` method
-    mock_perform_dns_query.return_value = (
-        [MagicMock(to_text=lambda: "127.0.0.2")] if dns_query_result else []
-    )
     mock_get_list_names.return_value = {"127.0.0.2": "some_list"}
     mock_get_list_descriptions.return_value = {
         "127.0.0.2": "This is a spam list"
@@ -45,16 +42,38 @@ def test_query(
     mock_get_dataset_info.return_value = ("some_list", "This is a spam list")
 
     spamhaus = ModuleFactory().create_spamhaus_obj()
+    spamhaus.dnsbl = Mock()
+    spamhaus.dnsbl.get_cached.return_value = cached_result
     result = spamhaus.query(ip)
     assert result == expected
+    spamhaus.dnsbl.lookup.assert_not_called()
 
 
-def test_spamhaus_dns_error(mocker):
+def test_query_not_cached():
     """
-    Test the `spamhaus` method's handling of DNS resolution errors.
+    IPs that aren't cached are looked up in the background and the
+    callback gets their info
     """
     spamhaus = ModuleFactory().create_spamhaus_obj()
-    mock_resolver = mocker.patch("dns.resolver.resolve")
-    mock_resolver.side_effect = Exception("DNS resolution error")
-    result = spamhaus.query("13.14.15.16")
-    assert result is False
+    spamhaus.dnsbl = Mock()
+    spamhaus.dnsbl.get_cached.return_value = (False, None)
+    callback = Mock()
+
+    assert spamhaus.query("13.14.15.16", callback) is False
+    hostname, on_result = spamhaus.dnsbl.lookup.call_args[0]
+    assert hostname == "16.15.14.13.zen.spamhaus.org"
+
+    # the dnsbl calls back once the lookup is done
+    on_result(["127.0.0.4"])
+    callback.assert_called_once_with(
+        {
+            "source": "XBL CBL Data,  spamhaus",
+            "description": "IP address of exploited systems, such as open "
+            "proxies or malware-infected hosts.",
+            "threat_level": "medium",
+            "tags": "spam",
+        }
+    )
+    # a failed or negative lookup
+    on_result(None)
+    callback.assert_called_with(False)
@@ -0,0 +1,129 @@
+import json
+import os
+from unittest.mock import Mock
+
+import pytest
+
+from tests.module_factory import ModuleFactory
+
+
+@pytest.fixture
+def stix(tmp_path, monkeypatch):
+    # the stix files are written to the cwd
+    monkeypatch.chdir(tmp_path)
+    return ModuleFactory().create_stix_exporter_obj()
+
+
+def read_bundle(stix) -> list:
+    with open(stix.stix_filename) as f:
+        return json.load(f)["objects"]
+
+
+def test_add_to_stix_file_buffers_indicators(stix):
+    assert stix.add_to_stix_file(("PortScan", "192.168.1.1"))
+    assert stix.add_to_stix_file(("ThreatIntelligence", "evil.com"))
+    # nothing is written until the bundle is flushed
+    assert len(stix.indicators) == 2
+    with pytest.raises(FileNotFoundError):
+        read_bundle(stix)
+
+    assert stix.flush() == 2
+    objects = read_bundle(stix)
+    assert [obj["pattern"] for obj in objects] == [
+        "[ip-addr:value = '192.168.1.1']",
+        "[domain-name:value = 'evil.com']",
+    ]
+
+
+def test_add_to_stix_file_deduplicates(stix):
+    stix.add_to_stix_file(("PortScan", "192.168.1.1"))
+    stix.add_to_stix_file(("SSHBruteforce", "192.168.1.1"))
+    assert len(stix.indicators) == 1
+
+
+def test_index_is_kept_across_runs(stix):
+    stix.add_to_stix_file(("PortScan", "192.168.1.1"))
+    # buffered iocs aren't in the index until they're pushed
+    assert not os.path.exists(stix.index_filename)
+    stix.export = Mock(return_value=True)
+    stix.push_snapshot()
+    # a partially written line
+    with open(stix.index_filename, "a") as index:
+        index.write('["ip", "10.0')
+
+    restarted_stix = ModuleFactory().create_stix_exporter_obj()
+    assert restarted_stix.added_iocs == {("ip", "192.168.1.1")}
+    restarted_stix.add_to_stix_file(("PortScan", "192.168.1.1"))
+    assert not restarted_stix.indicators
+
+
+def test_unpushed_indicators_are_pushed_after_a_restart(stix):
+    stix.add_to_stix_file(("PortScan", "192.168.1.1"))
+    stix.add_to_stix_file(("ThreatIntelligence", "evil.com"))
+    stix.flush()
+    # slips stops before the push delay passes, without pushing
+
+    restarted_stix = ModuleFactory().create_stix_exporter_obj()
+    assert restarted_stix.pending_iocs == [
+        ("ip", "192.168.1.1"),
+        ("domain", "evil.com"),
+    ]
+    # the buffered iocs aren't exported twice
+    restarted_stix.add_to_stix_file(("PortScan", "192.168.1.1"))
+    assert len(restarted_stix.indicators) == 2
+
+    pushed = []
+
+    def export():
+        pushed.extend(read_bundle(restarted_stix))
+        return True
+
+    restarted_stix.export = Mock(side_effect=export)
+    restarted_stix.push_snapshot()
+    assert [obj["pattern"] for obj in pushed] == [
+        "[ip-addr:value = '192.168.1.1']",
+        "[domain-name:value = 'evil.com']",
+    ]
+    assert restarted_stix.read_index() == {
+        ("ip", "192.168.1.1"),
+        ("domain", "evil.com"),
+    }
+
+
+def test_flush_if_needed(stix):
+    stix.add_to_stix_file(("PortScan", "192.168.1.1"))
+    stix.flush_if_needed()
+    assert stix.is_dirty
+
+    stix.last_flush -= stix.flush_interval
+    stix.flush_if_needed()
+    assert not stix.is_dirty
+    assert len(read_bundle(stix)) == 1
+
+
+def test_push_snapshot_keeps_indicators_added_while_exporting(stix):
+    stix.add_to_stix_file(("PortScan", "192.168.1.1"))
+
+    def export():
+        stix.add_to_stix_file(("PortScan", "192.168.1.2"))
+        return True
+
+    stix.export = Mock(side_effect=export)
+    stix.push_snapshot()
+    assert [obj["pattern"] for obj in read_bundle(stix)] == [
+        "[ip-addr:value = '192.168.1.2']"
+    ]
+
+    stix.export = Mock(return_value=True)
+    stix.push_snapshot()
+    assert not stix.indicators
+    assert not stix.is_dirty
+    assert not os.path.exists(stix.stix_filename)
+
+
+def test_push_snapshot_failure_keeps_the_bundle(stix):
+    stix.add_to_stix_file(("PortScan", "192.168.1.1"))
+    stix.export = Mock(return_value=False)
+    stix.push_snapshot()
+    assert len(stix.indicators) == 1
+    assert len(read_bundle(stix)) == 1
@@ -741,6 +741,38 @@ def test_search_online_for_hash(
     assert result == expected_result
 
 
+def test_is_malicious_ip_looked_up_online_in_the_background():
+    """
+    the main loop doesn't wait for the online lookup, the evidence is
+    set once the result is handled by the main loop
+    """
+    threatintel = ModuleFactory().create_threatintel_obj()
+    threatintel.search_offline_for_ip = Mock(return_value=None)
+    threatintel.is_inbound_traffic = Mock(return_value=True)
+    threatintel.set_evidence_malicious_ip = Mock()
+    threatintel.spamhaus.dnsbl = Mock()
+    threatintel.spamhaus.dnsbl.get_cached.return_value = (False, None)
+    args = (
+        "8.8.8.8",
+        "uid123",
+        "10.0.0.1",
+        "2023-11-28 12:00:00",
+        "profile_10.0.0.1",
+        "timewindow1",
+        "srcip",
+    )
+
+    assert threatintel.is_malicious_ip(*args) is False
+    # the dnsbl calls back once the lookup is done
+    _, on_result = threatintel.spamhaus.dnsbl.lookup.call_args[0]
+    on_result(["127.0.0.2"])
+    threatintel.set_evidence_malicious_ip.assert_not_called()
+
+    threatintel.handle_online_ip_results()
+    threatintel.set_evidence_malicious_ip.assert_called_once()
+    assert threatintel.online_ip_results.empty()
+
+
 @pytest.mark.parametrize(
     "ip_address, mock_return_value, expected_result",
     [
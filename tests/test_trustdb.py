@@ -2,9 +2,9 @@ import pytest
 from unittest.mock import (
     patch,
     call,
-    MagicMock,
     Mock,
 )
+from modules.p2ptrust.trust.trustdb import TrustDB
 from tests.module_factory import ModuleFactory
 import datetime
 import time
@@ -561,39 +561,88 @@ def test_get_reporter_ip(
     assert ip == expected_ip
 
 
-@pytest.mark.parametrize(
-    "ipaddress, reports, expected_result",
-    [
-        # Testcase 1: No reports for the IP
-        ("192.168.1.1", [], []),
-        # Testcase 2: One report with valid reporter data
-        (
-            "192.168.1.1",
-            [("reporter_1", 1678886400, 0.5, 0.8, "192.168.1.1")],
-            [(0.5, 0.8, 0.7, 0.6, 0.9)],
-        ),
-        # Testcase 3: Multiple reports with valid reporter data
-        (
-            "192.168.1.1",
-            [
-                ("reporter_1", 1678886400, 0.5, 0.8, "192.168.1.1"),
-                ("reporter_2", 1678886500, 0.3, 0.6, "192.168.1.1"),
-            ],
-            [(0.5, 0.8, 0.7, 0.6, 0.9), (0.3, 0.6, 0.8, 0.4, 0.7)],
-        ),
-    ],
-)
-def test_get_opinion_on_ip(ipaddress, reports, expected_result):
-    trust_db = ModuleFactory().create_trust_db_obj()
+@pytest.fixture
+def sqlite_trust_db():
+    trust_db = TrustDB(Mock(), ":memory:")
+    trust_db.print = Mock()
+    # reporter_1 had 192.168.1.2 at the time of its reports
+    trust_db.insert_go_ip_pairing("reporter_1", "192.168.1.2", 100)
+    trust_db.insert_go_ip_pairing("reporter_1", "192.168.1.9", 500)
+    trust_db.insert_go_ip_pairing("reporter_2", "192.168.1.3", 100)
+    trust_db.insert_go_reliability("reporter_1", 0.1, 100)
+    trust_db.insert_go_reliability("reporter_1", 0.7, 200)
+    trust_db.insert_go_reliability("reporter_2", 0.8, 100)
+    trust_db.insert_slips_score("192.168.1.2", 0.6, 0.9, 100)
+    trust_db.insert_slips_score("192.168.1.3", 0.1, 0.1, 100)
+    trust_db.insert_slips_score("192.168.1.3", 0.4, 0.7, 200)
+    trust_db.insert_new_go_data(
+        [
+            ("reporter_1", "ip", "192.168.1.1", 0.5, 0.8, 300),
+            ("reporter_2", "ip", "192.168.1.1", 0.3, 0.6, 400),
+            ("reporter_2", "ip", "10.0.0.1", 0.3, 0.6, 400),
+        ]
+    )
+    return trust_db
 
-    trust_db.get_reports_for_ip = MagicMock(return_value=reports)
-    trust_db.get_reporter_ip = MagicMock(
-        side_effect=["192.168.1.2", "192.168.1.3", "192.168.1.2"]
+
+def test_get_opinion_on_ip(sqlite_trust_db):
+    assert sqlite_trust_db.get_opinion_on_ip("192.168.1.1") == [
+        (0.3, 0.6, 0.8, 0.4, 0.7),
+        (0.5, 0.8, 0.7, 0.6, 0.9),
+    ]
+    assert sqlite_trust_db.get_opinion_on_ip("1.1.1.1") == []
+
+
+def test_get_opinion_on_ip_skips_unknown_reporters(sqlite_trust_db):
+    # no reliability
+    sqlite_trust_db.insert_go_ip_pairing("reporter_3", "192.168.1.4", 100)
+    sqlite_trust_db.insert_slips_score("192.168.1.4", 0.6, 0.9, 100)
+    # no ip at the time of the report
+    sqlite_trust_db.insert_go_reliability("reporter_4", 0.7, 100)
+    sqlite_trust_db.insert_go_ip_pairing("reporter_4", "192.168.1.5", 900)
+    sqlite_trust_db.insert_slips_score("192.168.1.5", 0.6, 0.9, 100)
+    sqlite_trust_db.insert_new_go_data(
+        [
+            ("reporter_3", "ip", "10.0.0.1", 0.5, 0.8, 300),
+            ("reporter_4", "ip", "10.0.0.1", 0.5, 0.8, 300),
+        ]
     )
-    trust_db.get_reporter_reliability = MagicMock(side_effect=[0.7, 0.8, 0.7])
-    trust_db.get_reporter_reputation = MagicMock(
-        side_effect=[(0.6, 0.9), (0.4, 0.7), (0.6, 0.9)]
+    assert sqlite_trust_db.get_opinion_on_ip("10.0.0.1") == [
+        (0.3, 0.6, 0.8, 0.4, 0.7)
+    ]
+
+
+def test_get_opinion_on_ip_skips_reports_by_the_ip_itself(sqlite_trust_db):
+    sqlite_trust_db.insert_new_go_report(
+        "reporter_2", "ip", "192.168.1.3", 0.5, 0.8
     )
+    assert sqlite_trust_db.get_opinion_on_ip("192.168.1.3") == []
 
-    result = trust_db.get_opinion_on_ip(ipaddress)
-    assert result == expected_result
+
+def test_get_opinion_on_ip_cache(sqlite_trust_db):
+    sqlite_trust_db.get_opinion_on_ip("192.168.1.1")
+    assert "192.168.1.1" in sqlite_trust_db.opinions
+    # a new report invalidates the cached opinion
+    sqlite_trust_db.insert_new_go_report(
+        "reporter_2", "ip", "192.168.1.1", 0.9, 0.9
+    )
+    assert "192.168.1.1" not in sqlite_trust_db.opinions
+    assert len(sqlite_trust_db.get_opinion_on_ip("192.168.1.1")) == 3
+
+    # a peer update invalidates all the cached opinions
+    sqlite_trust_db.insert_go_reliability("reporter_2", 0.1)
+    assert not sqlite_trust_db.opinions
+    assert sqlite_trust_db.get_opinion_on_ip("192.168.1.1")[0] == (
+        0.9,
+        0.9,
+        0.1,
+        0.4,
+        0.7,
+    )
+
+
+def test_get_opinion_on_ip_cache_size():
+    trust_db = TrustDB(Mock(), ":memory:", opinion_cache_size=2)
+    for ip in ("1.1.1.1", "1.1.1.2", "1.1.1.3"):
+        trust_db.get_opinion_on_ip(ip)
+    assert list(trust_db.opinions) == ["1.1.1.2", "1.1.1.3"]
@@ -0,0 +1,102 @@
+"""Unit test for slips_files/core/helpers/tw_state_store.py"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from slips_files.core.helpers import tw_state_store
+from slips_files.core.helpers.tw_state_store import (
+    TWStateStore,
+    evict_closed_tw,
+    get_memory_usage,
+    parse_profileid_twid,
+)
+
+# dummy params used for testing
+profileid = "profile_192.168.1.1"
+twid = "timewindow1"
+
+
+@pytest.mark.parametrize(
+    "profileid_twid, expected",
+    [
+        (
+            "profile_192.168.1.1_timewindow1",
+            ("profile_192.168.1.1", "timewindow1"),
+        ),
+        (
+            "profile_2001:db8::1_timewindow10",
+            ("profile_2001:db8::1", "timewindow10"),
+        ),
+    ],
+)
+def test_parse_profileid_twid(profileid_twid, expected):
+    assert parse_profileid_twid(profileid_twid) == expected
+
+
+def test_setdefault():
+    store = TWStateStore("test")
+    state = store.setdefault(profileid, twid, dict)
+    state["1.1.1.1"] = 1
+    assert store.setdefault(profileid, twid, dict) == {"1.1.1.1": 1}
+    assert (profileid, twid) in store
+    assert (profileid, "timewindow2") not in store
+
+
+def test_lru_eviction():
+    store = TWStateStore("test", max_tws=2)
+    store.set(profileid, "timewindow1", 1)
+    store.set(profileid, "timewindow2", 2)
+    # timewindow1 becomes the most recently used
+    store.get(profileid, "timewindow1")
+    store.set(profileid, "timewindow3", 3)
+    assert len(store) == 2
+    assert store.get(profileid, "timewindow2") is None
+    assert store.get(profileid, "timewindow1") == 1
+    assert store.get(profileid, "timewindow3") == 3
+
+
+def test_ttl_eviction():
+    store = TWStateStore("test", ttl=10)
+    with patch("time.monotonic", return_value=100):
+        store.set(profileid, "timewindow1", 1)
+    with patch("time.monotonic", return_value=105):
+        store.set(profileid, "timewindow2", 2)
+    with patch("time.monotonic", return_value=112):
+        # timewindow1 expired, timewindow2 didn't
+        assert store.get(profileid, "timewindow1") is None
+        assert store.get(profileid, "timewindow2") == 2
+        store.set(profileid, "timewindow3", 3)
+    assert len(store) == 2
+
+
+def test_evict_closed_tw():
+    store1 = TWStateStore("test1")
+    store2 = TWStateStore("test2")
+    store1.set(profileid, "timewindow1", 1)
+    store1.set(profileid, "timewindow10", 10)
+    store2.set(profileid, "timewindow1", 1)
+
+    evict_closed_tw(f"{profileid}_timewindow1")
+
+    assert store1.get(profileid, "timewindow1") is None
+    assert store1.get(profileid, "timewindow10") == 10
+    assert store2.get(profileid, "timewindow1") is None
+
+
+def test_get_memory_usage():
+    with patch.object(tw_state_store, "_stores", set()):
+        store = TWStateStore("test")
+        unused_store = TWStateStore("unused")
+        assert get_memory_usage() == {}
+
+        store.set(profileid, twid, {"1.1.1.1": ["uid"] * 100})
+        usage = get_memory_usage()
+        assert list(usage) == ["test"]
+        assert usage["test"] > 100 * 8
+
+        # stores used by other processes aren't reported
+        store.pid = os.getpid() + 1
+        assert get_memory_usage() == {}
+        assert unused_store.pid is None
@@ -820,3 +820,84 @@ def test_parse_ssl_feed_no_valid_fingerprints(mocker, tmp_path):
 
     update_manager.db.add_ssl_sha1_to_IoC.assert_not_called()
     assert result is False
+
+
+@patch("os.path.getsize", return_value=10)
+def test_parse_ti_feed_in_bulk(mocker):
+    update_manager = ModuleFactory().create_update_manager_obj()
+    update_manager.url_feeds = {
+        "https://example.com/test.txt": {
+            "threat_level": "medium",
+            "tags": ["tag3"],
+        }
+    }
+    test_data = (
+        "1.2.3.4,first description\n"
+        "example.com,domain description\n"
+        "1.2.3.0/24,range description\n"
+        "not a valid ioc,description\n"
+        "e10adc3949ba59abbe56e057f20f883e,md5 description\n"
+        "1.2.3.4,second description\n"
+        "5.6.7.8,another ip\n"
+    )
+    with patch("builtins.open", mock_open(read_data=test_data)):
+        result = update_manager.parse_ti_feed(
+            "https://example.com/test.txt", "test.txt"
+        )
+
+    assert result is True
+    ips = update_manager.db.add_ips_to_IoC.call_args[0][0]
+    assert list(ips) == ["1.2.3.4", "5.6.7.8"]
+    domains = update_manager.db.add_domains_to_IoC.call_args[0][0]
+    assert list(domains) == ["example.com"]
+    ranges = update_manager.db.add_ip_range_to_IoC.call_args[0][0]
+    assert list(ranges) == ["1.2.3.0/24"]
+    # the threat level of all the ips is updated at once, with every
+    # listing of each ip
+    update_manager.db.update_threat_levels.assert_called_once_with(
+        {
+            "profile_1.2.3.4": ["medium", "medium"],
+            "profile_5.6.7.8": ["medium"],
+        },
+        1,
+    )
+    update_manager.db.update_threat_level.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "old_hash, expected_parse_calls",
+    [
+        # Testcase1: new content
+        ("old_hash", 1),
+        # Testcase2: the e-tag changed but the content didn't
+        ("new_hash", 0),
+    ],
+)
+async def test_update_ti_file_content_hash(
+    mocker, old_hash, expected_parse_calls
+):
+    update_manager = ModuleFactory().create_update_manager_obj()
+    link = "https://example.com/test.txt"
+    update_manager.url_feeds = {link: {"threat_level": "low", "tags": []}}
+    update_manager.ja3_feeds = {}
+    update_manager.responses[link] = Mock(headers={"ETag": "1234"})
+    update_manager.write_file_to_disk = Mock()
+    update_manager.delete_downloaded_file = Mock()
+    update_manager.parse_ti_feed = Mock(return_value=True)
+    update_manager.db.get_ti_feed_info.return_value = {"hash": old_hash}
+    mocker.patch(
+        "slips_files.common.slips_utils.Utils.get_sha256_hash",
+        return_value="new_hash",
+    )
+
+    assert await update_manager.update_TI_file(link) is True
+
+    assert update_manager.parse_ti_feed.call_count == expected_parse_calls
+    assert (
+        update_manager.db.delete_feed_entries.call_count
+        == expected_parse_calls
+    )
+    file_info = update_manager.db.set_ti_feed_info.call_args[0][1]
+    assert file_info["hash"] == "new_hash"
+    assert file_info["e-tag"] == "1234"
+    update_manager.delete_downloaded_file.assert_called_once()
@@ -0,0 +1,122 @@
+"""Unit test for slips_files/core/flows/zeek.py"""
+
+from dataclasses import asdict
+
+import pytest
+
+from slips_files.core.flows.zeek import (
+    DHCP,
+    DNS,
+    Software,
+)
+
+
+def test_flows_are_slotted(flow):
+    assert not hasattr(flow, "__dict__")
+    # the attributes set by the modules
+    flow.interpreted_state = "Established"
+    flow.dport_name = "HTTP"
+    with pytest.raises(AttributeError):
+        flow.not_a_field = 1
+
+
+def test_conn_derived_fields(flow):
+    assert flow.pkts == 40
+    assert flow.bytes == 40
+    assert flow.state_hist == "Established"
+    assert flow.endtime == "1601998398.9458540:00:05"
+    assert flow.aid
+    # derived fields are computed from the current values
+    flow.history = "ShAD"
+    flow.spkts = 30
+    assert flow.state_hist == "ShAD"
+    assert flow.pkts == 50
+
+
+def test_derived_fields_arent_serialized(flow):
+    serialized = flow.to_dict()
+    for derived_field in ("pkts", "bytes", "endtime", "state_hist", "aid"):
+        assert derived_field not in serialized
+
+
+def test_to_dict(flow):
+    serialized = flow.to_dict()
+    assert serialized == asdict(flow)
+    assert list(serialized) == list(asdict(flow))
+    # the same dict is reused until the flow changes
+    assert flow.to_dict() is serialized
+
+    flow.uid = "5678"
+    assert flow.to_dict() is not serialized
+    assert flow.to_dict()["uid"] == "5678"
+
+
+def test_to_dict_copies_lists():
+    flow = DNS(
+        starttime="1601998398.945854",
+        uid="1234",
+        saddr="192.168.1.1",
+        daddr="8.8.8.8",
+        query="example.com",
+        qclass_name="C_INTERNET",
+        qtype_name="A",
+        rcode_name="NOERROR",
+        answers="1.2.3.4",
+        TTLs="60",
+    )
+    serialized = flow.to_dict()
+    assert serialized["answers"] == ["1.2.3.4"]
+    assert serialized["answers"] is not flow.answers
+
+
+def test_to_dict_after_a_list_is_modified():
+    flow = DNS(
+        starttime="1601998398.945854",
+        uid="1234",
+        saddr="192.168.1.1",
+        daddr="8.8.8.8",
+        query="example.com",
+        qclass_name="C_INTERNET",
+        qtype_name="A",
+        rcode_name="NOERROR",
+        answers="1.2.3.4",
+        TTLs="60",
+    )
+    assert flow.to_dict()["answers"] == ["1.2.3.4"]
+    flow.answers.append("5.6.7.8")
+    assert flow.to_dict()["answers"] == ["1.2.3.4", "5.6.7.8"]
+
+
+def test_dhcp_uid_is_serialized():
+    flow = DHCP(
+        starttime=1234567890,
+        uids=["uid1", "uid2"],
+        saddr="192.168.1.1",
+        daddr="192.168.1.2",
+        client_addr="",
+        server_addr="",
+        host_name="",
+        smac="aa:bb:cc:dd:ee:ff",
+        requested_addr="",
+    )
+    for uid in flow.uids:
+        flow.uid = uid
+        assert flow.to_dict()["uid"] == uid
+
+
+@pytest.mark.parametrize(
+    "software, expected_val",
+    [("HTTP::BROWSER", True), ("SSH::CLIENT", False)],
+)
+def test_software_http_browser(software, expected_val):
+    flow = Software(
+        starttime="1601998398.945854",
+        uid="1234",
+        saddr="192.168.1.1",
+        daddr="8.8.8.8",
+        software=software,
+        unparsed_version="",
+        version_major="",
+        version_minor="",
+    )
+    assert flow.http_browser == expected_val
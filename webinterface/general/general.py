@@ -1,6 +1,7 @@
 from flask import Blueprint
 from flask import render_template
 from ..database.database import __database__
+from slips_files.core.helpers.bus_telemetry import get_bus_telemetry
 
 general = Blueprint(
     "general",
@@ -31,3 +32,21 @@ def setBlockedProfileTWs():
     return {
         "data": data,
     }
+
+
+@general.route("/busTelemetry")
+def setBusTelemetry():
+    """
+    Function to set the msgs received, backlog and latency of each
+    module's channels
+    """
+    data = get_bus_telemetry(__database__.db)
+    for row in data:
+        for key, value in row.items():
+            # json has no infinity
+            if value == float("inf"):
+                row[key] = "inf"
+
+    return {
+        "data": data,
+    }
@@ -6,4 +6,22 @@ let table = $('#general_blockedProfilesTWs').DataTable({
     "paging": false,
     "bInfo": false,
     columns: [{ data: 'blocked' }]
-});
\ No newline at end of file
+});
+
+let bus_telemetry_table = $('#general_busTelemetry').DataTable({
+    ajax: '/general/busTelemetry',
+    "bDestroy": true,
+    searching: false,
+    "paging": false,
+    "bInfo": false,
+    columns: [
+        { data: 'module' },
+        { data: 'channel' },
+        { data: 'received' },
+        { data: 'backlog' },
+        { data: 'latency_p50_ms' },
+        { data: 'latency_p99_ms' },
+        { data: 'handler_p50_ms' },
+        { data: 'handler_p99_ms' }
+    ]
+});